@@ -1,53 +1,95 @@
 """
 Simple internal API server to expose the current SSO token.
-For use by the future Java Streaming Service.
+For use by the Java Streaming Service and the REST client scripts.
+
+Threaded: each connection gets its own thread, so a slow reader or a long-poll
+(/token/wait) never blocks other token readers.
 """
+import json
 import logging
-from http.server import HTTPServer, BaseHTTPRequestHandler
-from typing import Optional
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
 
 logger = logging.getLogger("auth_service")
 
+# Long-poll bounds for /token/wait (seconds)
+DEFAULT_WAIT_TIMEOUT = 30
+MAX_WAIT_TIMEOUT = 300
+
 
 class TokenHandler(BaseHTTPRequestHandler):
     """HTTP handler that serves the current session token."""
 
     auth_service = None  # Injected by main
+    protocol_version = "HTTP/1.1"  # keep-alive for consumers that poll
+    timeout = MAX_WAIT_TIMEOUT + 30  # drop idle keep-alive connections (socket timeout)
 
     def log_message(self, format, *args):
         logger.info("%s - %s", self.address_string(), format % args)
 
     def do_GET(self):
-        if self.path == "/health":
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path == "/health":
             self._send_json({"status": "ok"}, 200)
             return
-        if self.path in ("/token", "/ssoid"):
-            token = self._get_token()
-            if token:
-                self._send_json({"ssoid": token, "status": "valid"}, 200)
-            else:
-                self._send_json({"ssoid": None, "status": "no_session"}, 503)
+        if path in ("/token", "/ssoid"):
+            token, version = self._get_token()
+            self._send_token(token, version)
+            return
+        if path == "/token/wait":
+            self._handle_wait(parse_qs(parts.query))
             return
         self._send_json({"error": "Not found"}, 404)
 
-    def _get_token(self) -> Optional[str]:
+    def _handle_wait(self, query: dict) -> None:
+        """
+        Long-poll for token rotation: GET /token/wait?version=N&timeout=S
+        Returns as soon as the token version differs from N (or immediately if it already does),
+        else after S seconds with the unchanged token. Omit version to wait for the next rotation.
+        """
+        try:
+            timeout = float(query.get("timeout", [DEFAULT_WAIT_TIMEOUT])[0])
+            version_arg = query.get("version", [None])[0]
+            known_version = int(version_arg) if version_arg is not None else None
+        except ValueError:
+            self._send_json({"error": "version must be an integer, timeout a number"}, 400)
+            return
+        timeout = max(0.0, min(timeout, MAX_WAIT_TIMEOUT))
+        if not self.auth_service:
+            self._send_token(None, 0)
+            return
+        if known_version is None:
+            _, known_version = self.auth_service.get_session_token_versioned()
+        token, version = self.auth_service.wait_for_token_change(known_version, timeout)
+        self._send_token(token, version, rotated=version != known_version)
+
+    def _get_token(self) -> Tuple[Optional[str], int]:
         if self.auth_service:
-            return self.auth_service.get_session_token()
-        return None
+            return self.auth_service.get_session_token_versioned()
+        return None, 0
+
+    def _send_token(self, token: Optional[str], version: int, rotated: Optional[bool] = None) -> None:
+        body = {"ssoid": token, "status": "valid" if token else "no_session", "version": version}
+        if rotated is not None:
+            body["rotated"] = rotated
+        self._send_json(body, 200 if token else 503)
 
     def _send_json(self, data: dict, status: int):
-        import json
         body = json.dumps(data).encode("utf-8")
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
         self.end_headers()
         self.wfile.write(body)
 
 
 def run_api_server(host: str, port: int, auth_service) -> None:
-    """Run the token API server."""
+    """Run the token API server (thread per connection)."""
     TokenHandler.auth_service = auth_service
-    server = HTTPServer((host, port), TokenHandler)
+    server = ThreadingHTTPServer((host, port), TokenHandler)
+    server.daemon_threads = True
     logger.info("Token API server listening on %s:%d", host, port)
     server.serve_forever()
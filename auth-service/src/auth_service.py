@@ -10,9 +10,10 @@ import os
 import threading
 import time
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 from .cert_loader import resolve_cert_and_key
@@ -37,6 +38,7 @@ KEEP_ALIVE_URL = "https://identitysso.betfair.com/api/keepAlive"
 DEFAULT_KEEP_ALIVE_INTERVAL = 17 * 60  # 17 minutes (between 15-20 min)
 DEFAULT_RETRY_ATTEMPTS = 3
 DEFAULT_RETRY_DELAY = 5
+HTTP_POOL_MAXSIZE = 4  # login + keep-alive are serialised; small pool is enough
 TOKEN_FILE_PATH = "/data/ssoid"  # Shared volume for Java Streaming Service
 
 
@@ -69,10 +71,28 @@ class BetfairAuthService:
             atexit.register(self._cert_cleanup)
 
         self._session_token: Optional[str] = None
+        self._token_version = 0
         self._lock = threading.Lock()
+        # Signalled on every token rotation; long-poll readers wait on it (see wait_for_token_change)
+        self._token_changed = threading.Condition(self._lock)
+        self._http = self._build_http_session()
         self._stop_event = threading.Event()
         self._keep_alive_thread: Optional[threading.Thread] = None
 
+    @staticmethod
+    def _build_http_session() -> requests.Session:
+        """Persistent HTTP session: reuses TLS connections to the Identity API across login/keep-alive."""
+        session = requests.Session()
+        # Retries are handled by _request_with_retry (with logging + delay), not by urllib3
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def close(self) -> None:
+        """Close pooled HTTP connections."""
+        self._http.close()
+
     def _request_with_retry(
         self,
         method: str,
@@ -84,7 +104,7 @@ class BetfairAuthService:
         last_error = None
         for attempt in range(1, max_attempts + 1):
             try:
-                response = requests.request(
+                response = self._http.request(
                     method,
                     url,
                     timeout=30,
@@ -146,8 +166,7 @@ class BetfairAuthService:
         session_token = result.get("sessionToken")
 
         if login_status == "SUCCESS" and session_token:
-            with self._lock:
-                self._session_token = session_token
+            self._set_session_token(session_token)
             self._write_token_file(session_token)
             logger.info("Login successful. Session token obtained.")
             return True
@@ -189,8 +208,7 @@ class BetfairAuthService:
         if status == "SUCCESS":
             new_token = result.get("token")
             if new_token:
-                with self._lock:
-                    self._session_token = new_token
+                self._set_session_token(new_token)
                 self._write_token_file(new_token)
                 logger.info("Keep-alive successful. Session extended.")
             else:
@@ -238,7 +256,31 @@ class BetfairAuthService:
         except OSError as e:
             logger.warning("Could not write token file %s: %s", self.token_file_path, e)
 
+    def _set_session_token(self, token: str) -> None:
+        """Store token; bump version and wake long-poll readers only if it actually changed."""
+        with self._token_changed:
+            if token == self._session_token:
+                return
+            self._session_token = token
+            self._token_version += 1
+            logger.info("Session token rotated (version %d).", self._token_version)
+            self._token_changed.notify_all()
+
     def get_session_token(self) -> Optional[str]:
         """Return the current valid session token."""
         with self._lock:
             return self._session_token
+
+    def get_session_token_versioned(self) -> Tuple[Optional[str], int]:
+        """Return (token, version). Version increments on every rotation."""
+        with self._lock:
+            return self._session_token, self._token_version
+
+    def wait_for_token_change(self, known_version: int, timeout: float) -> Tuple[Optional[str], int]:
+        """
+        Block until the token version differs from known_version or timeout elapses.
+        Returns the current (token, version); version == known_version means timed out.
+        """
+        with self._token_changed:
+            self._token_changed.wait_for(lambda: self._token_version != known_version, timeout=timeout)
+            return self._session_token, self._token_version
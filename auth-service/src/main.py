@@ -61,6 +61,7 @@ def main() -> int:
     def shutdown(signum=None, frame=None):
         logger.info("Shutdown signal received. Stopping keep-alive...")
         auth_service.stop_keep_alive()
+        auth_service.close()
         sys.exit(0)
 
     signal.signal(signal.SIGTERM, shutdown)
@@ -73,7 +74,7 @@ def main() -> int:
     )
     api_thread.start()
 
-    logger.info("Application started on port %d. Use /token or /health", api_port)
+    logger.info("Application started on port %d. Use /token, /token/wait or /health", api_port)
 
     # Keep main thread alive; API runs in daemon thread
     try:
@@ -0,0 +1,49 @@
+"""
+Token versioning and the /token/wait long-poll of BetfairAuthService. No network: the PEM files only need to exist.
+Run from auth-service: pytest tests -q
+"""
+import threading
+import time
+
+import pytest
+
+from src.auth_service import BetfairAuthService
+
+
+@pytest.fixture
+def service(tmp_path):
+    cert, key = tmp_path / "client.crt", tmp_path / "client.key"
+    cert.write_text("cert")
+    key.write_text("key")
+    svc = BetfairAuthService("app-key", "user", "pass", str(cert), str(key), token_file_path=str(tmp_path / "ssoid"))
+    yield svc
+    svc.close()
+
+
+def test_version_bumps_only_on_a_real_change(service):
+    assert service.get_session_token_versioned() == (None, 0)
+    service._set_session_token("tok-a")
+    assert service.get_session_token_versioned() == ("tok-a", 1)
+    service._set_session_token("tok-a")  # keep-alive returning the same token
+    assert service.get_session_token_versioned() == ("tok-a", 1)
+    service._set_session_token("tok-b")
+    assert service.get_session_token_versioned() == ("tok-b", 2)
+
+
+def test_wait_returns_on_rotation(service):
+    service._set_session_token("tok-a")
+    timer = threading.Timer(0.05, service._set_session_token, args=("tok-b",))
+    timer.start()
+    started = time.monotonic()
+    assert service.wait_for_token_change(1, timeout=5) == ("tok-b", 2)
+    assert time.monotonic() - started < 2
+    timer.join()
+
+
+def test_wait_times_out_with_token_unchanged(service):
+    service._set_session_token("tok-a")
+    started = time.monotonic()
+    assert service.wait_for_token_change(1, timeout=0.1) == ("tok-a", 1)
+    assert time.monotonic() - started >= 0.09
+    # A stale known version returns at once
+    assert service.wait_for_token_change(0, timeout=5) == ("tok-a", 1)
@@ -0,0 +1,179 @@
+"""
+Synthetic but realistic inputs for the micro-benchmarks (seeded, so every run times the same data).
+
+- Match Odds books: 3 runners (HOME/AWAY/DRAW selection ids), listMarketBook JSON shape, N back/lay levels
+  on the Betfair price ladder around a plausible 1X2 favourite/outsider spread.
+- listMarketCatalogue entries in the JSON (lightweight) shape used by discovery and the REST daemon.
+- Stream tick series for one runner and one 15-minute bucket: (publish_time, back_odds, back_size) rows
+  as read from stream_ingest.ladder_levels (level 0, side B), with a baseline row before the bucket.
+- Bulk bucket windows: the three result sets of get_event_buckets_stream_bulk over N closed buckets.
+"""
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+HOME_SID, AWAY_SID, DRAW_SID = 47972, 48317, 58805
+RUNNER_METADATA = {HOME_SID: "HOME", AWAY_SID: "AWAY", DRAW_SID: "DRAW"}
+BUCKET_START = datetime(2026, 2, 14, 18, 0, tzinfo=timezone.utc)
+BUCKET_END = BUCKET_START + timedelta(minutes=15)
+
+# (upper bound, increment) of the Betfair price ladder up to 20.0
+_TICKS = ((2.0, 0.01), (3.0, 0.02), (4.0, 0.05), (6.0, 0.1), (10.0, 0.2), (20.0, 0.5))
+
+
+def _tick_down(price: float) -> float:
+    for upper, inc in _TICKS:
+        if price <= upper:
+            return round(max(1.01, price - inc), 2)
+    return round(price - 1.0, 2)
+
+
+def _tick_up(price: float) -> float:
+    for upper, inc in _TICKS:
+        if price < upper:
+            return round(price + inc, 2)
+    return round(price + 1.0, 2)
+
+
+def _side(best: float, levels: int, rng: random.Random, step) -> List[List[float]]:
+    out, price = [], best
+    for _ in range(levels):
+        out.append([price, round(rng.lognormvariate(4.5, 1.2), 2)])
+        price = step(price)
+    return out
+
+
+def match_odds_book(levels: int, rng: random.Random) -> Dict[str, Any]:
+    """One listMarketBook entry (dict) with `levels` back and lay levels per runner."""
+    home = round(rng.uniform(1.6, 4.5), 2)
+    away = round(rng.uniform(2.0, 6.0), 2)
+    draw = round(rng.uniform(3.0, 4.2), 2)
+    runners = []
+    for sid, best in ((HOME_SID, home), (AWAY_SID, away), (DRAW_SID, draw)):
+        runners.append({
+            "selectionId": sid,
+            "handicap": 0.0,
+            "status": "ACTIVE",
+            "lastPriceTraded": best,
+            "totalMatched": round(rng.uniform(0, 250000), 2),
+            "ex": {
+                "availableToBack": _side(best, levels, rng, _tick_down),
+                "availableToLay": _side(_tick_up(best), levels, rng, _tick_up),
+                "tradedVolume": [],
+            },
+        })
+    return {
+        "marketId": "1.2%08d" % rng.randrange(10 ** 8),
+        "status": "OPEN",
+        "inplay": False,
+        "totalMatched": round(sum(r["totalMatched"] for r in runners), 2),
+        "runners": runners,
+    }
+
+
+def match_odds_books(n: int, levels: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [match_odds_book(levels, rng) for _ in range(n)]
+
+
+def catalogue_entry(rng: random.Random) -> Dict[str, Any]:
+    """One listMarketCatalogue entry (MATCH_ODDS, 3 runners) in JSON shape."""
+    event_id = str(rng.randrange(30_000_000, 40_000_000))
+    home, away = "Team %d" % rng.randrange(500), "Team %d" % rng.randrange(500, 1000)
+    return {
+        "marketId": "1.2%08d" % rng.randrange(10 ** 8),
+        "marketName": "Match Odds",
+        "marketStartTime": "2026-02-14T19:45:00.000Z",
+        "totalMatched": round(rng.uniform(0, 500000), 2),
+        "description": {"marketName": "Match Odds", "marketType": "MATCH_ODDS", "bettingType": "ODDS"},
+        "eventType": {"id": "1", "name": "Soccer"},
+        "competition": {"id": str(rng.randrange(1, 100000)), "name": "English Premier League"},
+        "event": {
+            "id": event_id,
+            "name": "%s v %s" % (home, away),
+            "countryCode": "GB",
+            "timezone": "GMT",
+            "openDate": "2026-02-14T19:45:00.000Z",
+        },
+        "runners": [
+            {"selectionId": HOME_SID, "runnerName": home, "handicap": 0.0, "sortPriority": 1},
+            {"selectionId": AWAY_SID, "runnerName": away, "handicap": 0.0, "sortPriority": 2},
+            {"selectionId": DRAW_SID, "runnerName": "The Draw", "handicap": 0.0, "sortPriority": 3},
+        ],
+    }
+
+
+def catalogue_entries(n: int, seed: int = 11) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    return [catalogue_entry(rng) for _ in range(n)]
+
+
+def tick_rows(n: int, seed: int = 13) -> List[Tuple[datetime, Optional[float], Optional[float]]]:
+    """
+    Baseline row 40s before the bucket plus n in-bucket updates (random walk on the price ladder,
+    irregular spacing, occasional empty level = None size), unsorted like a merged per-runner fetch.
+    """
+    rng = random.Random(seed)
+    price = round(rng.uniform(1.8, 4.0), 2)
+    rows: List[Tuple[datetime, Optional[float], Optional[float]]] = [
+        (BUCKET_START - timedelta(seconds=40), price, round(rng.lognormvariate(5, 1), 2))
+    ]
+    span_us = 15 * 60 * 1_000_000
+    offsets = sorted(rng.sample(range(1, span_us), n))
+    for off in offsets:
+        r = rng.random()
+        if r < 0.35:
+            price = _tick_up(price)
+        elif r < 0.7:
+            price = _tick_down(price)
+        size = None if rng.random() < 0.02 else round(rng.lognormvariate(5, 1), 2)
+        rows.append((BUCKET_START + timedelta(microseconds=off), price, size))
+    rng.shuffle(rows)
+    return rows
+
+
+def bucket_window(buckets: int, ticks_per_bucket: int, seed: int = 23) -> Tuple[Dict[str, Any], List[Dict[str, Any]], List[Dict[str, Any]], datetime, datetime]:
+    """
+    Inputs of stream_data._buckets_from_rows for a window of closed 15-minute buckets ending at BUCKET_END:
+    (meta, level-0 back rows of the 3 runners ascending, liquidity rows ascending, from_dt, to_dt).
+    """
+    rng = random.Random(seed)
+    to_dt = BUCKET_END
+    from_dt = to_dt - timedelta(minutes=15 * buckets)
+    fetch_from = from_dt - timedelta(minutes=15)
+    span_s = (to_dt - fetch_from).total_seconds()
+    rows: List[Dict[str, Any]] = []
+    for sid in (HOME_SID, AWAY_SID, DRAW_SID):
+        price = round(rng.uniform(1.8, 4.0), 2)
+        for off in sorted(rng.uniform(0, span_s) for _ in range(ticks_per_bucket * (buckets + 1))):
+            price = _tick_up(price) if rng.random() < 0.5 else _tick_down(price)
+            rows.append({
+                "publish_time": fetch_from + timedelta(seconds=off), "selection_id": sid,
+                "price": price, "size": round(rng.lognormvariate(5, 1), 2),
+            })
+    rows.sort(key=lambda r: r["publish_time"])
+    liq = [
+        {"publish_time": fetch_from + timedelta(seconds=30 * i), "total_matched": 1000.0 + 25 * i}
+        for i in range(int(span_s // 30))
+    ]
+    meta = {"home_selection_id": HOME_SID, "away_selection_id": AWAY_SID, "draw_selection_id": DRAW_SID}
+    return meta, rows, liq, from_dt, to_dt
+
+
+def weighted_values(n: int, seed: int = 17) -> List[Tuple[float, float]]:
+    """(value, weight_seconds) segments as built by _compute_median_from_rows."""
+    rng = random.Random(seed)
+    return [(round(rng.lognormvariate(5, 1), 2), rng.uniform(0.05, 30.0)) for _ in range(n)]
+
+
+def bucket_medians(n: int, seed: int = 19) -> List[Tuple[float, float, float, float, float, float]]:
+    """Six bucket medians (home/away/draw odds and size) per market."""
+    rng = random.Random(seed)
+    return [
+        (
+            rng.uniform(1.6, 4.5), rng.lognormvariate(5, 1),
+            rng.uniform(2.0, 6.0), rng.lognormvariate(5, 1),
+            rng.uniform(3.0, 4.2), rng.lognormvariate(5, 1),
+        )
+        for _ in range(n)
+    ]
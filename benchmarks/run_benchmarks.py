@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the hot pure-Python kernels of the REST client and the Risk Analytics API.
+
+Each case calls one kernel over a fixed list of synthetic inputs (benchmarks/payloads.py) at a given size and
+reports throughput (ops/s, us/op), throughput normalised by a fixed pure-Python calibration loop timed right
+before the case (so results from different machines and noisy hosts are comparable), and the peak memory allocated by a single call (tracemalloc).
+
+Usage (from the repo root, with betfair-rest-client and risk-analytics-ui/api requirements installed):
+  python benchmarks/run_benchmarks.py                       # run all cases, print a table
+  python benchmarks/run_benchmarks.py --json results.json   # also write machine-readable results
+  python benchmarks/run_benchmarks.py --compare             # compare with benchmarks/baseline.json, exit 1 on regression
+  python benchmarks/run_benchmarks.py --update-baseline     # write this run as the new baseline
+  python benchmarks/run_benchmarks.py --filter median --quick
+
+A case regresses when its normalised throughput drops by more than --tolerance (default 25%) or its peak
+allocation grows by more than --alloc-tolerance (default 20%) against the baseline.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(REPO_ROOT / "betfair-rest-client"))
+sys.path.insert(0, str(REPO_ROOT / "risk-analytics-ui" / "api"))
+sys.path.insert(0, str(BENCH_DIR))
+
+import payloads  # noqa: E402
+
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+SCHEMA_VERSION = 1
+
+
+class Case(NamedTuple):
+    name: str
+    kernel: str
+    size: str
+    fn: Callable[[Any], Any]
+    items: List[Any]
+
+
+def _ladder_metrics(rest_main: Any, runners: Any, meta: Dict[int, str]) -> None:
+    """Book Risk L3 (+ curve) and best prices / L1 sizes of one book, as main.py computes them per snapshot."""
+    rest_main._book_risk_metrics(runners, meta)
+    rest_main._runner_best_prices(runners, meta)
+
+
+def _rest_cases() -> List[Case]:
+    import main as rest_main
+    from risk import compute_book_risk_l3
+
+    meta = payloads.RUNNER_METADATA
+    cases = []
+    for levels in (3, 10):
+        runner_lists = [b["runners"] for b in payloads.match_odds_books(200, levels)]
+        cases.append(Case(
+            "compute_book_risk_l3[levels=%d]" % levels, "risk.compute_book_risk_l3", "levels=%d" % levels,
+            lambda runners: compute_book_risk_l3(runners, meta, depth_limit=3), runner_lists,
+        ))
+        cases.append(Case(
+            "_runner_best_prices[levels=%d]" % levels, "main._runner_best_prices", "levels=%d" % levels,
+            lambda runners: rest_main._runner_best_prices(runners, meta), runner_lists,
+        ))
+        # Per-book metrics of the REST writer: each metric probing the raw runners vs one ladder_core.parse_book
+        cases.append(Case(
+            "ladder_metrics_raw[levels=%d]" % levels, "main ladder metrics (raw runners)", "levels=%d" % levels,
+            lambda runners: _ladder_metrics(rest_main, runners, meta), runner_lists,
+        ))
+        cases.append(Case(
+            "ladder_metrics_parsed[levels=%d]" % levels, "main ladder metrics (parse_book)", "levels=%d" % levels,
+            lambda runners: _ladder_metrics(rest_main, rest_main.parse_book(runners), meta), runner_lists,
+        ))
+    cases.append(Case(
+        "_extract_metadata_row[catalogue]", "main._extract_metadata_row", "catalogue",
+        rest_main._extract_metadata_row, payloads.catalogue_entries(200),
+    ))
+    return cases
+
+
+def _api_cases() -> List[Case]:
+    from app.main import _compute_back_depth_validators
+    from app.stream_data import (
+        _buckets_from_rows,
+        _compute_median_from_rows,
+        _time_weighted_median,
+        compute_impedance_index_from_medians,
+    )
+
+    start, end = payloads.BUCKET_START, payloads.BUCKET_END
+    cases = []
+    for n in (10, 100, 1000):
+        series = [payloads.tick_rows(n, seed=s) for s in range(5)]
+        cases.append(Case(
+            "_compute_median_from_rows[ticks=%d]" % n, "stream_data._compute_median_from_rows", "ticks=%d" % n,
+            lambda rows: _compute_median_from_rows(rows, start, end), series,
+        ))
+        weighted = [payloads.weighted_values(n, seed=s) for s in range(5)]
+        cases.append(Case(
+            "_time_weighted_median[n=%d]" % n, "stream_data._time_weighted_median", "n=%d" % n,
+            _time_weighted_median, weighted,
+        ))
+    cases.append(Case(
+        "compute_impedance_index_from_medians[markets]", "stream_data.compute_impedance_index_from_medians", "markets",
+        lambda m: compute_impedance_index_from_medians(*m), payloads.bucket_medians(500),
+    ))
+    for buckets in (12, 96):
+        window = payloads.bucket_window(buckets, ticks_per_bucket=20)
+        cases.append(Case(
+            "_buckets_from_rows[buckets=%d]" % buckets, "stream_data._buckets_from_rows", "buckets=%d" % buckets,
+            lambda w: _buckets_from_rows(*w), [window],
+        ))
+    sids = (payloads.HOME_SID, payloads.AWAY_SID, payloads.DRAW_SID)
+    for levels in (3, 10):
+        books = payloads.match_odds_books(200, levels)
+        cases.append(Case(
+            "_compute_back_depth_validators[levels=%d]" % levels, "main._compute_back_depth_validators",
+            "levels=%d" % levels, lambda book: _compute_back_depth_validators(book, *sids, 3), books,
+        ))
+    return cases
+
+
+def build_cases() -> List[Case]:
+    cases: List[Case] = []
+    for label, factory in (("betfair-rest-client", _rest_cases), ("risk-analytics-ui/api", _api_cases)):
+        try:
+            cases.extend(factory())
+        except ImportError as e:
+            print("skipping %s cases (%s); install its requirements" % (label, e), file=sys.stderr)
+    return cases
+
+
+def _calibration(min_time: float) -> float:
+    """Ops/s of a fixed pure-Python loop (dict/float/list work similar to the kernels)."""
+    data = [(float(i), {"p": i * 0.5}) for i in range(64)]
+
+    def op(_):
+        acc = 0.0
+        out = []
+        for v, d in data:
+            acc += v * d["p"]
+            out.append(acc)
+        return out
+
+    return 1.0 / _time_per_op(op, [None] * 50, min_time, repeat=5)
+
+
+def _time_per_op(fn: Callable[[Any], Any], items: List[Any], min_time: float, repeat: int) -> float:
+    """Best (lowest) seconds per call over `repeat` runs, each looping the items for at least min_time."""
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            for x in items:
+                fn(x)
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    best = elapsed / (loops * len(items))
+    for _ in range(repeat - 1):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            for x in items:
+                fn(x)
+        best = min(best, (time.perf_counter() - t0) / (loops * len(items)))
+    return best
+
+
+def _alloc_peak(fn: Callable[[Any], Any], items: List[Any]) -> int:
+    """Largest peak of memory allocated during a single call (bytes), over the first items."""
+    worst = 0
+    tracemalloc.start()
+    try:
+        for x in items[:20]:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            fn(x)
+            _, peak = tracemalloc.get_traced_memory()
+            worst = max(worst, peak - before)
+    finally:
+        tracemalloc.stop()
+    return worst
+
+
+def run(cases: List[Case], min_time: float, repeat: int) -> Dict[str, Any]:
+    calibrations = []
+    results: Dict[str, Dict[str, Any]] = {}
+    for case in cases:
+        # Calibrate next to each case so CPU frequency / neighbour noise affects both alike.
+        calibration = _calibration(min_time)
+        calibrations.append(calibration)
+        per_op = _time_per_op(case.fn, case.items, min_time, repeat)
+        ops = 1.0 / per_op
+        results[case.name] = {
+            "kernel": case.kernel,
+            "size": case.size,
+            "items": len(case.items),
+            "ops_per_sec": round(ops, 1),
+            "us_per_op": round(per_op * 1e6, 3),
+            "normalized": round(ops / calibration, 5),
+            "alloc_peak_bytes": _alloc_peak(case.fn, case.items),
+        }
+    return {
+        "schema": SCHEMA_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "calibration_ops_per_sec": round(sorted(calibrations)[len(calibrations) // 2], 1),
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, alloc_tolerance: float) -> List[Dict[str, Any]]:
+    """Per-case comparison rows; status is ok, faster, REGRESSION, ALLOC or new."""
+    rows = []
+    base_results = baseline.get("results", {})
+    for name, cur in current["results"].items():
+        base = base_results.get(name)
+        if base is None:
+            rows.append({"case": name, "status": "new"})
+            continue
+        speed = cur["normalized"] / base["normalized"] if base["normalized"] else 1.0
+        alloc_limit = base["alloc_peak_bytes"] * (1.0 + alloc_tolerance) + 256  # slack for tiny allocations
+        if speed < 1.0 - tolerance:
+            status = "REGRESSION"
+        elif cur["alloc_peak_bytes"] > alloc_limit:
+            status = "ALLOC"
+        elif speed > 1.0 + tolerance:
+            status = "faster"
+        else:
+            status = "ok"
+        rows.append({
+            "case": name,
+            "status": status,
+            "speed_ratio": round(speed, 3),
+            "alloc_peak_bytes": cur["alloc_peak_bytes"],
+            "baseline_alloc_peak_bytes": base["alloc_peak_bytes"],
+        })
+    return rows
+
+
+def _print_results(report: Dict[str, Any], comparison: Optional[List[Dict[str, Any]]]) -> None:
+    by_case = {row["case"]: row for row in comparison or []}
+    print("calibration: %.0f ops/s (python %s)" % (report["calibration_ops_per_sec"], report["python"]))
+    print("%-48s %12s %11s %10s %12s  %s" % ("case", "ops/s", "us/op", "norm", "alloc_peak", "vs baseline" if comparison else ""))
+    for name, r in report["results"].items():
+        row = by_case.get(name)
+        note = ""
+        if row:
+            note = row["status"] if "speed_ratio" not in row else "%s x%.2f" % (row["status"], row["speed_ratio"])
+        print("%-48s %12.1f %11.3f %10.4f %12d  %s" % (name, r["ops_per_sec"], r["us_per_op"], r["normalized"], r["alloc_peak_bytes"], note))
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Micro-benchmarks for the hot pure-Python kernels.")
+    ap.add_argument("--json", metavar="PATH", help="Write results (and comparison) as JSON")
+    ap.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON (default: benchmarks/baseline.json)")
+    ap.add_argument("--compare", action="store_true", help="Compare with the baseline; exit 1 on regression")
+    ap.add_argument("--update-baseline", action="store_true", help="Write this run to the baseline file")
+    ap.add_argument("--filter", default="", help="Only cases whose name contains this substring")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed normalised slowdown (default 0.25)")
+    ap.add_argument("--alloc-tolerance", type=float, default=0.20, help="Allowed peak allocation growth (default 0.20)")
+    ap.add_argument("--quick", action="store_true", help="Shorter runs (noisier); for smoke checks")
+    args = ap.parse_args()
+
+    cases = [c for c in build_cases() if args.filter in c.name]
+    if not cases:
+        print("no benchmark cases selected", file=sys.stderr)
+        return 2
+    min_time, repeat = (0.05, 3) if args.quick else (0.2, 7)
+    report = run(cases, min_time, repeat)
+
+    comparison = None
+    if args.compare:
+        baseline_path = Path(args.baseline)
+        if not baseline_path.exists():
+            print("baseline %s not found; run with --update-baseline first" % baseline_path, file=sys.stderr)
+            return 2
+        comparison = compare(report, json.loads(baseline_path.read_text()), args.tolerance, args.alloc_tolerance)
+        report["comparison"] = comparison
+
+    _print_results(report, comparison)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2) + "\n")
+    if args.update_baseline:
+        Path(args.baseline).write_text(json.dumps({k: v for k, v in report.items() if k != "comparison"}, indent=2) + "\n")
+        print("baseline written to %s" % args.baseline)
+    if comparison and any(row["status"] in ("REGRESSION", "ALLOC") for row in comparison):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,471 @@
+"""
+Shared engine for the market_derived_metrics backfills
+(backfill_book_risk_l3.py, backfill_l1_backsize.py, backfill_ladder_levels.py, backfill_tier_a.py).
+
+Each script describes its work as a BackfillJob (candidate filter, output columns, compute function);
+the engine does the rest:
+- Candidates: keyset pagination on snapshot_id (WHERE snapshot_id > last ORDER BY snapshot_id LIMIT page).
+  Rows that are skipped (no metadata, short ladder) are never re-read, unlike LIMIT over "IS NULL".
+- Metadata: market_id -> {selection_id: HOME|AWAY|DRAW} cached for the whole run; each page loads only
+  the markets not seen yet, in one query.
+- Streaming (read_conn): instead of keyset pages, one server-side cursor joins snapshots, derived
+  metrics and metadata and yields large chunks (whole-history runs; used by backfill_tier_a).
+- Compute: raw_payload (as text) + metadata go to job.compute on a process pool (workers > 1) or inline.
+  JSON parsing happens in the workers. The next page is fetched while the current one computes.
+- Apply: one UPDATE ... FROM (VALUES ...) per page, committed together with the checkpoint row
+  (public.backfill_checkpoint), so an interrupted run resumes after the last committed page.
+  Use --reset-checkpoint to rescan from the start (e.g. after metadata for old markets was added).
+- In-place jobs also copy their columns into public.market_latest_metrics for the updated snapshots that are
+  a market's latest (latest_metrics.refresh_sql), in the same transaction.
+- Versioned jobs (job.calculation_version set) INSERT into the partitioned side table
+  public.market_derived_metrics_versions instead of updating market_derived_metrics (recompute_version.py).
+
+compute(raw_payload: dict, runner_metadata: dict) -> dict of column -> value, or None to skip the row.
+It must be a module-level function (picklable for the process pool).
+"""
+import argparse
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+
+import latest_metrics
+
+logger = logging.getLogger("backfill_engine")
+
+DEFAULT_PAGE_SIZE = 1000
+CHECKPOINT_TABLE = "public.backfill_checkpoint"
+
+# calculation_version labels: also used in partition table names
+VERSION_RE = re.compile(r"^[a-z0-9_]{1,40}$")
+
+STATUS_OK = "ok"
+STATUS_SKIP = "skip"
+STATUS_ERROR = "error"
+
+
+class BackfillJob:
+    """One backfill: which rows, which columns, how to compute them."""
+
+    def __init__(
+        self,
+        name: str,
+        columns: Sequence[str],
+        candidate_filter: str,
+        compute: Callable[[Dict, Dict], Optional[Dict[str, Any]]],
+        coalesce: bool = False,
+        column_type: str = "double precision",
+        column_types: Optional[Dict[str, str]] = None,
+        calculation_version: Optional[str] = None,
+    ):
+        self.name = name
+        self.columns = list(columns)
+        # SQL predicate on market_derived_metrics alias d, e.g. "d.home_book_risk_l3 IS NULL"
+        self.candidate_filter = candidate_filter
+        self.compute = compute
+        # coalesce=True: only fill NULL columns (existing non-NULL values are preserved)
+        self.coalesce = coalesce
+        self.column_type = column_type
+        self.column_types = column_types or {}
+        # Set: INSERT rows into public.market_derived_metrics_versions under this version (side-by-side
+        # recomputation, see recompute_version.py) instead of UPDATE-ing market_derived_metrics in place.
+        self.calculation_version = calculation_version
+
+    def type_of(self, column: str) -> str:
+        return self.column_types.get(column, self.column_type)
+
+
+class BackfillStats:
+    def __init__(self):
+        self.processed = 0
+        self.updated = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_snapshot_id = 0
+
+    def as_tuple(self) -> Tuple[int, int, int]:
+        return self.updated, self.skipped, self.errors
+
+
+def metadata_map_from_row(row: Dict) -> Optional[Dict[Any, str]]:
+    """selection_id -> HOME | AWAY | DRAW; None if any of the three selections is missing."""
+    if not row or row.get("home_selection_id") is None or row.get("away_selection_id") is None or row.get("draw_selection_id") is None:
+        return None
+    return {
+        row["home_selection_id"]: "HOME",
+        row["away_selection_id"]: "AWAY",
+        row["draw_selection_id"]: "DRAW",
+    }
+
+
+def payload_runners(raw: Dict, min_runners: int = 3) -> Optional[List]:
+    """raw_payload runners list (runners / Runners), or None if missing or fewer than min_runners."""
+    runners = raw.get("runners") or raw.get("Runners")
+    if not runners or not isinstance(runners, list) or len(runners) < min_runners:
+        return None
+    return runners
+
+
+class RunnerMetadataCache:
+    """market_id -> runner metadata map (or None if incomplete), loaded per batch of unseen markets."""
+
+    def __init__(self):
+        self._by_market: Dict[str, Optional[Dict[Any, str]]] = {}
+
+    def prefetch(self, conn, market_ids: Iterable[str]) -> None:
+        missing = sorted({m for m in market_ids if m not in self._by_market})
+        if not missing:
+            return
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(
+                """
+                SELECT market_id, home_selection_id, away_selection_id, draw_selection_id
+                FROM public.market_event_metadata WHERE market_id = ANY(%s)
+                """,
+                (missing,),
+            )
+            for row in cur.fetchall():
+                self._by_market[row["market_id"]] = metadata_map_from_row(row)
+        for m in missing:
+            self._by_market.setdefault(m, None)
+
+    def get(self, market_id: str) -> Optional[Dict[Any, str]]:
+        return self._by_market.get(market_id)
+
+    def __len__(self) -> int:
+        return len(self._by_market)
+
+
+def _compute_chunk(
+    compute: Callable[[Dict, Dict], Optional[Dict[str, Any]]],
+    columns: Sequence[str],
+    items: List[Tuple[int, Optional[str], Dict]],
+) -> List[Tuple[int, str, Any]]:
+    """
+    Worker: parse raw_payload text and run compute for each (snapshot_id, raw_text, metadata).
+    Returns (snapshot_id, status, values-tuple | error message) per item.
+    """
+    out = []
+    for snapshot_id, raw_text, meta in items:
+        if not raw_text:
+            out.append((snapshot_id, STATUS_SKIP, None))
+            continue
+        try:
+            raw = json.loads(raw_text)
+        except (TypeError, ValueError):
+            out.append((snapshot_id, STATUS_ERROR, "invalid JSON raw_payload"))
+            continue
+        if not isinstance(raw, dict):
+            out.append((snapshot_id, STATUS_SKIP, None))
+            continue
+        try:
+            metrics = compute(raw, meta)
+        except Exception as e:
+            out.append((snapshot_id, STATUS_ERROR, "%s: %s" % (type(e).__name__, e)))
+            continue
+        if not metrics:
+            out.append((snapshot_id, STATUS_SKIP, None))
+            continue
+        values = tuple(metrics.get(c) for c in columns)
+        if all(v is None for v in values):
+            out.append((snapshot_id, STATUS_SKIP, None))
+            continue
+        out.append((snapshot_id, STATUS_OK, values))
+    return out
+
+
+def build_update_sql(job: BackfillJob) -> Tuple[str, str]:
+    """(UPDATE ... FROM (VALUES %s) statement, execute_values template) for job.columns."""
+    if job.coalesce:
+        sets = ", ".join("%s = COALESCE(d.%s, v.%s)" % (c, c, c) for c in job.columns)
+        # Skip rows where every column is already filled (keeps rowcount = rows actually changed)
+        guard = " AND (" + " OR ".join("d.%s IS NULL" % c for c in job.columns) + ")"
+    else:
+        sets = ", ".join("%s = v.%s" % (c, c) for c in job.columns)
+        guard = ""
+    sql = (
+        "UPDATE public.market_derived_metrics AS d SET %s "
+        "FROM (VALUES %%s) AS v(snapshot_id, %s) "
+        "WHERE d.snapshot_id = v.snapshot_id%s"
+    ) % (sets, ", ".join(job.columns), guard)
+    return sql, _values_template(job)
+
+
+def _values_template(job: BackfillJob) -> str:
+    return "(%s::bigint" + "".join(", %%s::%s" % job.type_of(c) for c in job.columns) + ")"
+
+
+def build_insert_sql(job: BackfillJob) -> Tuple[str, str]:
+    """
+    (INSERT ... SELECT FROM (VALUES %s) statement, template) into market_derived_metrics_versions for
+    job.calculation_version. snapshot_at/market_id come from market_book_snapshots. Idempotent (upsert),
+    so a resumed run may safely rewrite its last page.
+    """
+    cols = ", ".join(job.columns)
+    sql = (
+        "INSERT INTO public.market_derived_metrics_versions "
+        "(calculation_version, snapshot_id, snapshot_at, market_id, %s) "
+        "SELECT %s, v.snapshot_id, m.snapshot_at, m.market_id, %s "
+        "FROM (VALUES %%s) AS v(snapshot_id, %s) "
+        "INNER JOIN public.market_book_snapshots m ON m.snapshot_id = v.snapshot_id "
+        "ON CONFLICT (calculation_version, snapshot_id) DO UPDATE SET %s"
+    ) % (
+        cols,
+        _sql_literal(job.calculation_version),
+        ", ".join("v.%s" % c for c in job.columns),
+        cols,
+        ", ".join("%s = EXCLUDED.%s" % (c, c) for c in job.columns),
+    )
+    return sql, _values_template(job)
+
+
+def _sql_literal(value: str) -> str:
+    """Quote a validated version label as an SQL string literal."""
+    if not VERSION_RE.match(value or ""):
+        raise ValueError("invalid calculation_version %r" % value)
+    return "'%s'" % value
+
+
+def build_write_sql(job: BackfillJob) -> Tuple[str, str]:
+    return build_insert_sql(job) if job.calculation_version else build_update_sql(job)
+
+
+def ensure_checkpoint_table(conn) -> bool:
+    """Create public.backfill_checkpoint if missing. False (logged) if the role may not create it."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                CREATE TABLE IF NOT EXISTS public.backfill_checkpoint (
+                    job_name TEXT PRIMARY KEY,
+                    last_snapshot_id BIGINT NOT NULL,
+                    updated_rows BIGINT NOT NULL DEFAULT 0,
+                    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                )
+                """
+            )
+        conn.commit()
+        return True
+    except psycopg2.Error as e:
+        conn.rollback()
+        logger.warning("Checkpointing disabled (cannot create %s: %s)", CHECKPOINT_TABLE, e)
+        return False
+
+
+def load_checkpoint(conn, job_name: str) -> int:
+    with conn.cursor() as cur:
+        cur.execute("SELECT last_snapshot_id FROM public.backfill_checkpoint WHERE job_name = %s", (job_name,))
+        row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def reset_checkpoint(conn, job_name: str) -> None:
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM public.backfill_checkpoint WHERE job_name = %s", (job_name,))
+    conn.commit()
+
+
+def _save_checkpoint(cur, job_name: str, last_snapshot_id: int, updated_rows: int) -> None:
+    cur.execute(
+        """
+        INSERT INTO public.backfill_checkpoint (job_name, last_snapshot_id, updated_rows, updated_at)
+        VALUES (%s, %s, %s, now())
+        ON CONFLICT (job_name) DO UPDATE SET
+            last_snapshot_id = EXCLUDED.last_snapshot_id,
+            updated_rows = public.backfill_checkpoint.updated_rows + EXCLUDED.updated_rows,
+            updated_at = now()
+        """,
+        (job_name, last_snapshot_id, updated_rows),
+    )
+
+
+def fetch_candidate_page(conn, job: BackfillJob, after_snapshot_id: int, page_size: int) -> List[Tuple[int, str, Optional[str]]]:
+    """Next page of (snapshot_id, market_id, raw_payload text) after after_snapshot_id (keyset)."""
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT d.snapshot_id, d.market_id, m.raw_payload::text
+            FROM public.market_derived_metrics d
+            INNER JOIN public.market_book_snapshots m ON m.snapshot_id = d.snapshot_id
+            WHERE d.snapshot_id > %%s AND (%s)
+            ORDER BY d.snapshot_id
+            LIMIT %%s
+            """ % job.candidate_filter,
+            (after_snapshot_id, page_size),
+        )
+        return cur.fetchall()
+
+
+def stream_candidates(read_conn, job: BackfillJob, after_snapshot_id: int, limit: Optional[int], chunk_size: int):
+    """
+    Yield chunks of (snapshot_id, market_id, raw_payload text, home/away/draw selection ids) from ONE
+    server-side-cursor query joining market_derived_metrics, market_book_snapshots and
+    market_event_metadata. read_conn should be a dedicated (read-only) connection: the cursor lives in its
+    transaction while updates are committed on the writer connection.
+    """
+    sql = """
+        SELECT d.snapshot_id, d.market_id, m.raw_payload::text,
+               e.home_selection_id, e.away_selection_id, e.draw_selection_id
+        FROM public.market_derived_metrics d
+        INNER JOIN public.market_book_snapshots m ON m.snapshot_id = d.snapshot_id
+        LEFT JOIN public.market_event_metadata e ON e.market_id = d.market_id
+        WHERE d.snapshot_id > %%s AND (%s)
+        ORDER BY d.snapshot_id
+    """ % job.candidate_filter
+    params: Tuple = (after_snapshot_id,)
+    if limit is not None:
+        sql += " LIMIT %s"
+        params += (limit,)
+    with read_conn.cursor(name="backfill_%s" % job.name) as cur:
+        cur.itersize = chunk_size
+        cur.execute(sql, params)
+        while True:
+            chunk = cur.fetchmany(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _keyset_pages(conn, job: BackfillJob, after: int, limit: Optional[int], page_size: int, metadata: "RunnerMetadataCache"):
+    """Pages of (snapshot_id, raw_text, metadata or None) via keyset queries + cached metadata map."""
+    consumed = 0
+    while limit is None or consumed < limit:
+        size = page_size if limit is None else min(page_size, limit - consumed)
+        page = fetch_candidate_page(conn, job, after, size)
+        if not page:
+            return
+        metadata.prefetch(conn, (r[1] for r in page))
+        consumed += len(page)
+        after = page[-1][0]
+        yield [(snapshot_id, raw_text, metadata.get(market_id)) for snapshot_id, market_id, raw_text in page]
+
+
+def _streamed_pages(read_conn, job: BackfillJob, after: int, limit: Optional[int], page_size: int):
+    """Pages of (snapshot_id, raw_text, metadata or None) from the single streaming join."""
+    maps: Dict[Tuple, Optional[Dict[Any, str]]] = {}
+    for chunk in stream_candidates(read_conn, job, after, limit, page_size):
+        page = []
+        for snapshot_id, _market_id, raw_text, home, away, draw in chunk:
+            key = (home, away, draw)
+            if key not in maps:
+                maps[key] = metadata_map_from_row(
+                    {"home_selection_id": home, "away_selection_id": away, "draw_selection_id": draw}
+                )
+            page.append((snapshot_id, raw_text, maps[key]))
+        yield page
+
+
+def _split(items: List, parts: int) -> List[List]:
+    n = max(1, -(-len(items) // max(1, parts)))
+    return [items[i:i + n] for i in range(0, len(items), n)]
+
+
+def run_job(
+    conn,
+    job: BackfillJob,
+    limit: Optional[int] = None,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    workers: int = 1,
+    dry_run: bool = False,
+    checkpoint: bool = True,
+    reset: bool = False,
+    read_conn=None,
+) -> BackfillStats:
+    """
+    Run job over all candidates (or the first `limit`). Resumes from the stored checkpoint unless
+    reset=True. Dry run computes and logs but writes nothing (including the checkpoint).
+    With read_conn, candidates come from one streaming server-side cursor (stream_candidates) instead of
+    keyset page queries; updates and checkpoints still go through conn.
+    """
+    stats = BackfillStats()
+    page_size = max(1, page_size)
+    use_checkpoint = checkpoint and not dry_run and ensure_checkpoint_table(conn)
+    if use_checkpoint and reset:
+        reset_checkpoint(conn, job.name)
+    after = load_checkpoint(conn, job.name) if use_checkpoint else 0
+    if after:
+        logger.info("%s: resuming after snapshot_id=%s", job.name, after)
+    update_sql, template = build_write_sql(job)
+    # In-place updates also refresh the rows of market_latest_metrics that point at the updated snapshots
+    latest_sql = None
+    if not job.calculation_version and not dry_run:
+        latest_sql = latest_metrics.refresh_sql(job.columns)
+        if latest_sql and not latest_metrics.table_exists(conn):
+            latest_sql = None
+    metadata = RunnerMetadataCache()
+    if read_conn is not None:
+        pages = _streamed_pages(read_conn, job, after, limit, page_size)
+    else:
+        pages = _keyset_pages(conn, job, after, limit, page_size, metadata)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    try:
+        page = next(pages, None)
+        while page:
+            items = [item for item in page if item[2] is not None]
+            no_meta = len(page) - len(items)
+            page_last = page[-1][0]
+            if pool:
+                futures = [pool.submit(_compute_chunk, job.compute, job.columns, chunk) for chunk in _split(items, workers * 2)]
+                # Overlap: fetch the next page while workers compute this one
+                upcoming = next(pages, None)
+                results = []
+                for f in futures:
+                    results.extend(f.result())
+            else:
+                results = _compute_chunk(job.compute, job.columns, items)
+                upcoming = None
+
+            rows = []
+            for snapshot_id, status, value in results:
+                if status == STATUS_OK:
+                    rows.append((snapshot_id,) + value)
+                elif status == STATUS_ERROR:
+                    logger.warning("snapshot_id=%s: %s", snapshot_id, value)
+                    stats.errors += 1
+                else:
+                    stats.skipped += 1
+            stats.skipped += no_meta
+            stats.processed += len(page)
+
+            if dry_run:
+                for r in rows:
+                    logger.info("dry-run: snapshot_id=%s -> %s", r[0], dict(zip(job.columns, r[1:])))
+                stats.updated += len(rows)
+            else:
+                with conn.cursor() as cur:
+                    if rows:
+                        execute_values(cur, update_sql, rows, template=template, page_size=len(rows))
+                        stats.updated += max(0, cur.rowcount)
+                        if latest_sql:
+                            cur.execute(latest_sql, ([r[0] for r in rows],))
+                    if use_checkpoint:
+                        _save_checkpoint(cur, job.name, page_last, len(rows))
+                conn.commit()
+            stats.last_snapshot_id = page_last
+            logger.info(
+                "%s progress: %s processed, %s updated, %s skipped, %s errors (last snapshot_id=%s)",
+                job.name, stats.processed, stats.updated, stats.skipped, stats.errors, page_last,
+            )
+            page = upcoming if pool else next(pages, None)
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        pages.close()
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    return stats
+
+
+def add_engine_args(ap: argparse.ArgumentParser, default_batch_size: int = DEFAULT_PAGE_SIZE) -> None:
+    """Common CLI flags (--batch-size is the keyset page size = rows per UPDATE/commit)."""
+    ap.add_argument("--batch-size", type=int, default=default_batch_size, help="Rows per page / batched UPDATE (default %d)" % default_batch_size)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Compute processes (default: CPU count; 1 = inline)")
+    ap.add_argument("--reset-checkpoint", action="store_true", help="Ignore the stored checkpoint and rescan from the start")
+    ap.add_argument("--no-checkpoint", action="store_true", help="Do not read or write public.backfill_checkpoint")
@@ -5,33 +5,36 @@ Tier A Backfill: Recompute Book Risk L3 and L1 sizes from raw_payload.
 Imbalance and Impedance indices removed (MVP). Only backfills book_risk_l3 and L1 size columns.
 
 Usage:
-    python3 backfill_tier_a.py [--batch-size N] [--limit M] [--dry-run]
+    python3 backfill_tier_a.py [--batch-size N] [--limit M] [--workers W] [--dry-run]
+
+Runs on backfill_engine: keyset pages, batched UPDATE, process pool, resumable checkpoint.
 """
 
 import argparse
-import json
 import logging
 import sys
 from typing import Any, Dict, List, Optional
 
 try:
     import psycopg2
-    from psycopg2.extras import RealDictCursor
-    from psycopg2.extras import Json as PsycopgJson
 except ImportError:
     print("ERROR: psycopg2 not installed. Install with: pip install psycopg2-binary")
     sys.exit(1)
 
 # Import production logic (assumes script runs from betfair-rest-client directory)
 try:
+    from ladder_core import parse_book
     from risk import compute_book_risk_l3
     from main import _runner_best_prices, _safe_float, DEPTH_LIMIT
+    from backfill_engine import BackfillJob, add_engine_args, run_job
 except ImportError:
     import os
     import sys
     sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from ladder_core import parse_book
     from risk import compute_book_risk_l3
     from main import _runner_best_prices, _safe_float, DEPTH_LIMIT
+    from backfill_engine import BackfillJob, add_engine_args, run_job
 
 logging.basicConfig(
     level=logging.INFO,
@@ -57,45 +60,11 @@ def get_conn():
     return psycopg2.connect(**_get_db_config())
 
 
-def get_runner_metadata(conn, market_id: str) -> Optional[Dict]:
-    """Get runner metadata (selectionId -> HOME/AWAY/DRAW) for a market."""
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT home_selection_id, away_selection_id, draw_selection_id
-            FROM market_event_metadata
-            WHERE market_id = %s
-            """,
-            (market_id,),
-        )
-        row = cur.fetchone()
-        if not row or row["home_selection_id"] is None or row["away_selection_id"] is None or row["draw_selection_id"] is None:
-            return None
-        return {
-            row["home_selection_id"]: "HOME",
-            row["away_selection_id"]: "AWAY",
-            row["draw_selection_id"]: "DRAW",
-        }
-
-
-def load_raw_payload(conn, snapshot_id: int) -> Optional[Dict]:
-    """Load raw_payload JSONB for a snapshot."""
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        cur.execute(
-            """
-            SELECT raw_payload
-            FROM market_book_snapshots
-            WHERE snapshot_id = %s
-            """,
-            (snapshot_id,),
-        )
-        row = cur.fetchone()
-        if not row or not row["raw_payload"]:
-            return None
-        payload = row["raw_payload"]
-        if isinstance(payload, str):
-            return json.loads(payload)
-        return payload
+def get_read_conn():
+    """Dedicated read-only connection for the streaming candidate cursor."""
+    conn = psycopg2.connect(**_get_db_config())
+    conn.set_session(readonly=True)
+    return conn
 
 
 def recompute_metrics(raw_payload: Dict, runner_metadata: Dict, snapshot_at: Any) -> Optional[Dict]:
@@ -108,14 +77,17 @@ def recompute_metrics(raw_payload: Dict, runner_metadata: Dict, snapshot_at: Any
         logger.warning("Skipping: insufficient runners in raw_payload")
         return None
 
+    # Ladders parsed once, shared by both metrics
+    parsed = parse_book(runners)
+
     # L1 sizes (best back/lay at level 1)
-    best_prices = _runner_best_prices(runners, runner_metadata)
+    best_prices = _runner_best_prices(parsed, runner_metadata)
     if not best_prices:
         logger.warning("Skipping: could not extract best prices")
         return None
 
     # Book Risk L3
-    book_risk_l3 = compute_book_risk_l3(runners, runner_metadata, depth_limit=DEPTH_LIMIT)
+    book_risk_l3 = compute_book_risk_l3(parsed, runner_metadata, depth_limit=DEPTH_LIMIT)
     if not book_risk_l3:
         logger.warning("Skipping: could not compute book_risk_l3")
         return None
@@ -141,129 +113,82 @@ def recompute_metrics(raw_payload: Dict, runner_metadata: Dict, snapshot_at: Any
     return metrics
 
 
-def update_metrics(conn, snapshot_id: int, metrics: Dict, dry_run: bool = False):
-    """Update market_derived_metrics with recomputed values (only NULL fields). COALESCE preserves existing non-NULL values."""
-    if dry_run:
-        logger.info(f"[DRY RUN] Would update snapshot_id={snapshot_id} with metrics: {json.dumps({k: v for k, v in metrics.items() if v != 0}, indent=2)}")
-        return
-
-    with conn.cursor() as cur:
-        # Build UPDATE SET clause: COALESCE(col, val) only updates if col is NULL
-        updates = []
-        values = []
-        for col, val in metrics.items():
-            updates.append(f"{col} = COALESCE({col}, %s)")
-            values.append(val)
-
-        if not updates:
-            return
-
-        values.append(snapshot_id)
-        cur.execute(
-            f"""
-            UPDATE market_derived_metrics
-            SET {', '.join(updates)}
-            WHERE snapshot_id = %s
-            """,
-            values,
-        )
-    conn.commit()
+TIER_A_COLUMNS = [
+    "home_best_back_size_l1", "away_best_back_size_l1", "draw_best_back_size_l1",
+    "home_best_lay_size_l1", "away_best_lay_size_l1", "draw_best_lay_size_l1",
+    "home_book_risk_l3", "away_book_risk_l3", "draw_book_risk_l3",
+    "total_volume",
+]
+
 
+def compute_row(raw_payload: Dict, runner_metadata: Dict) -> Optional[Dict]:
+    """Engine entry point (module-level so the process pool can pickle it)."""
+    return recompute_metrics(raw_payload, runner_metadata, None)
 
-def backfill_batch(conn, batch_size: int = 500, limit: Optional[int] = None, dry_run: bool = False):
+
+# COALESCE: only NULL columns are filled, existing non-NULL values are preserved
+JOB = BackfillJob(
+    name="tier_a",
+    columns=TIER_A_COLUMNS,
+    candidate_filter="d.home_book_risk_l3 IS NULL OR d.home_best_back_size_l1 IS NULL",
+    compute=compute_row,
+    coalesce=True,
+)
+
+
+def backfill_batch(
+    conn,
+    batch_size: int = 500,
+    limit: Optional[int] = None,
+    dry_run: bool = False,
+    workers: int = 1,
+    checkpoint: bool = True,
+    reset: bool = False,
+    read_conn=None,
+):
     """
-    Process backfill in batches.
-    Selects rows where any new column is NULL and recomputes from raw_payload.
+    Process backfill in chunks of batch_size (see backfill_engine).
+    Selects rows where book_risk_l3 or L1 size is NULL and recomputes from raw_payload.
+    With read_conn, snapshot_id + raw_payload + selection ids stream from one server-side-cursor join
+    (no per-snapshot metadata/payload queries); otherwise keyset pages are used.
     """
-    processed = 0
-    updated = 0
-    skipped = 0
-    errors = 0
-
-    with conn.cursor(cursor_factory=RealDictCursor) as cur:
-        # Find rows needing backfill (book_risk_l3 or L1 sizes NULL)
-        query = """
-            SELECT d.snapshot_id, d.market_id, d.snapshot_at
-            FROM market_derived_metrics d
-            WHERE (
-                d.home_book_risk_l3 IS NULL OR
-                d.home_best_back_size_l1 IS NULL
-            )
-            ORDER BY d.snapshot_at ASC
-        """
-        if limit:
-            query += f" LIMIT {limit}"
-        cur.execute(query)
-        rows = cur.fetchall()
-
-        total_rows = len(rows)
-        logger.info(f"Found {total_rows} rows needing backfill")
-
-        for i, row in enumerate(rows, 1):
-            snapshot_id = row["snapshot_id"]
-            market_id = row["market_id"]
-            snapshot_at = row["snapshot_at"]
-
-            try:
-                # Load runner metadata
-                runner_metadata = get_runner_metadata(conn, market_id)
-                if not runner_metadata:
-                    logger.warning(f"Snapshot {snapshot_id}: No runner metadata, skipping")
-                    skipped += 1
-                    continue
-
-                # Load raw_payload
-                raw_payload = load_raw_payload(conn, snapshot_id)
-                if not raw_payload:
-                    logger.warning(f"Snapshot {snapshot_id}: No raw_payload, skipping")
-                    skipped += 1
-                    continue
-
-                # Recompute metrics
-                metrics = recompute_metrics(raw_payload, runner_metadata, snapshot_at)
-                if not metrics:
-                    logger.warning(f"Snapshot {snapshot_id}: Could not recompute metrics, skipping")
-                    skipped += 1
-                    continue
-
-                # Update database
-                update_metrics(conn, snapshot_id, metrics, dry_run=dry_run)
-                updated += 1
-                processed += 1
-
-                if i % batch_size == 0:
-                    logger.info(f"Progress: {i}/{total_rows} processed, {updated} updated, {skipped} skipped, {errors} errors")
-                    conn.commit()
-
-            except Exception as e:
-                logger.error(f"Snapshot {snapshot_id}: Error: {e}", exc_info=True)
-                errors += 1
-                processed += 1
-
-        conn.commit()
-
-    logger.info(f"Backfill complete: {processed} processed, {updated} updated, {skipped} skipped, {errors} errors")
-    return processed, updated, skipped, errors
+    stats = run_job(
+        conn, JOB, limit=limit, page_size=batch_size, workers=workers,
+        dry_run=dry_run, checkpoint=checkpoint, reset=reset, read_conn=read_conn,
+    )
+    logger.info(
+        f"Backfill complete: {stats.processed} processed, {stats.updated} updated, "
+        f"{stats.skipped} skipped, {stats.errors} errors"
+    )
+    return stats.processed, stats.updated, stats.skipped, stats.errors
 
 
 def main():
     parser = argparse.ArgumentParser(description="Tier A backfill: Full deterministic reconstruction from raw_payload")
-    parser.add_argument("--batch-size", type=int, default=500, help="Batch size for processing (default: 500)")
+    add_engine_args(parser, default_batch_size=2000)
+    parser.add_argument("--no-stream", action="store_true", help="Keyset page queries instead of one streaming cursor")
     parser.add_argument("--limit", type=int, help="Limit number of rows to process (for testing)")
     parser.add_argument("--dry-run", action="store_true", help="Dry run mode (no database updates)")
     args = parser.parse_args()
 
     logger.info("Starting Tier A backfill")
-    logger.info(f"Batch size: {args.batch_size}, Limit: {args.limit}, Dry run: {args.dry_run}")
+    logger.info(f"Batch size: {args.batch_size}, Limit: {args.limit}, Workers: {args.workers}, Dry run: {args.dry_run}")
 
     try:
         conn = get_conn()
+        read_conn = None if args.no_stream else get_read_conn()
         processed, updated, skipped, errors = backfill_batch(
             conn,
             batch_size=args.batch_size,
             limit=args.limit,
             dry_run=args.dry_run,
+            workers=args.workers,
+            checkpoint=not args.no_checkpoint,
+            reset=args.reset_checkpoint,
+            read_conn=read_conn,
         )
+        if read_conn is not None:
+            read_conn.close()
         conn.close()
 
         logger.info("Backfill completed successfully")
@@ -30,6 +30,9 @@ MARKET_TYPE_CODES_FT = ["MATCH_ODDS", "OVER_UNDER_2_5", "NEXT_GOAL"]
 # Exclude any type containing these (case-insensitive)
 HT_KEYWORDS = ("HALF_TIME", "HALF_TIME_SCORE", "HALF_TIME_FULL_TIME", "FIRST_HALF", "_HT", "HT_")
 
+# Set in main(); used to re-fetch the token on INVALID_SESSION
+_session_provider = None
+
 # Normalise to internal FT naming for DB (stream client uses MATCH_ODDS_FT, OVER_UNDER_25_FT, NEXT_GOAL)
 def _normalise_market_type(bt: Optional[str]) -> Optional[str]:
     if not bt:
@@ -485,6 +488,8 @@ def run_discovery(trading, conn) -> Dict[str, Any]:
     Competition-driven discovery: for each Soccer competition, fetch catalogue
     (MATCH_ODDS, OVER_UNDER_2_5, NEXT_GOAL). Deduplicate by market_id. Persist events + markets.
     """
+    import session_provider
+
     run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
     logger.info("=== DISCOVERY DIAGNOSTICS START run_id=%s ===", run_id)
     logger.info("Discovery mode: competition-driven (Variant B)")
@@ -571,6 +576,8 @@ def run_discovery(trading, conn) -> Dict[str, Any]:
             competitions_failed += 1
             logger.error("[DIAG] run_id=%s comp=%d/%d comp_id=%s catalogue_call=ERROR err=%s",
                         run_id, comp_index, competitions_total, comp_id, str(e))
+            # INVALID_SESSION: re-fetch token so the remaining competitions use a fresh session
+            session_provider.refresh_on_invalid_session(e, trading, _session_provider)
 
     logger.info("[DIAG] catalogue_call END count=%d (succeeded=%d failed=%d)",
                 competitions_succeeded + competitions_failed, competitions_succeeded, competitions_failed)
@@ -824,10 +831,12 @@ def main() -> int:
     app_key = os.environ.get("BF_APP_KEY") or os.environ.get("BETFAIR_APP_KEY")
     cert_path = os.environ.get("BF_CERT_PATH", "/app/certs/client-2048.crt")
     key_path = os.environ.get("BF_KEY_PATH", "/app/certs/client-2048.key")
-    if not all([username, password, app_key]):
+    import session_provider
+    direct_login = session_provider.needs_direct_login()
+    if not app_key or (direct_login and not all([username, password])):
         logger.error("Missing BF_USERNAME, BF_PASSWORD, BF_APP_KEY")
         return 1
-    if not os.path.isfile(cert_path) or not os.path.isfile(key_path):
+    if direct_login and (not os.path.isfile(cert_path) or not os.path.isfile(key_path)):
         logger.error("Certificate missing: %s / %s", cert_path, key_path)
         return 1
     host = os.environ.get("POSTGRES_HOST") or os.environ.get("BF_POSTGRES_HOST", "postgres")
@@ -839,11 +848,11 @@ def main() -> int:
         logger.error("POSTGRES_PASSWORD required for discovery persistence")
         return 1
     import betfairlightweight
-    trading = betfairlightweight.APIClient(username=username, password=password, app_key=app_key, cert_files=(cert_path, key_path), lightweight=True)
-    try:
-        trading.login()
-    except Exception as e:
-        logger.exception("Login failed: %s", e)
+    trading = betfairlightweight.APIClient(username=username or "", password=password or "", app_key=app_key, cert_files=(cert_path, key_path), lightweight=True)
+    global _session_provider
+    _session_provider = session_provider.provider_from_env(trading)
+    if not session_provider.apply_session(trading, _session_provider):
+        logger.error("Login failed (session provider: %s)", _session_provider.name)
         return 1
     conn = psycopg2.connect(host=host, port=port, dbname=dbname, user=user, password=password_db, connect_timeout=10)
     try:
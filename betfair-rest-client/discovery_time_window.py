@@ -45,6 +45,9 @@ _raw = float(os.environ.get("DISCOVERY_MATCH_ODDS_HORIZON_HOURS", "24"))
 MATCH_ODDS_HORIZON_HOURS = min(24, _raw) if _raw > 24 else _raw
 DISCOVERY_STALE_WARNING_MINUTES = int(os.environ.get("DISCOVERY_STALE_WARNING_MINUTES", "45"))
 
+# Set in main(); used to re-fetch the token on INVALID_SESSION
+_session_provider = None
+
 # Legacy (unused): kept only for env reference; discovery is event-driven only
 MAX_RESULTS = int(os.environ.get("DISCOVERY_MAX_RESULTS", "200"))
 
@@ -81,8 +84,11 @@ MAX_RETRIES_TRANSIENT = 3
 BACKOFF_BASE_SEC = 2
 
 
-def _retry_with_backoff(fn, *args, _max_retries=MAX_RETRIES_TRANSIENT, _backoff_base=BACKOFF_BASE_SEC, **kwargs):
-    """Run fn(*args, **kwargs); on transient failure retry with exponential backoff. Reraises TOO_MUCH_DATA."""
+def _retry_with_backoff(fn, *args, _max_retries=MAX_RETRIES_TRANSIENT, _backoff_base=BACKOFF_BASE_SEC, _trading=None, **kwargs):
+    """Run fn(*args, **kwargs); on transient failure retry with exponential backoff. Reraises TOO_MUCH_DATA.
+    On INVALID_SESSION (and _trading given) the token is re-fetched via the session provider before retrying."""
+    import session_provider
+
     last_exc = None
     for attempt in range(_max_retries):
         try:
@@ -91,6 +97,8 @@ def _retry_with_backoff(fn, *args, _max_retries=MAX_RETRIES_TRANSIENT, _backoff_
             last_exc = e
             if getattr(e, "error_code", None) == TOO_MUCH_DATA_CODE:
                 raise
+            if attempt < _max_retries - 1 and _trading is not None and session_provider.refresh_on_invalid_session(e, _trading, _session_provider):
+                continue
             if attempt == _max_retries - 1:
                 raise
             delay = _backoff_base * (2 ** attempt)
@@ -135,7 +143,7 @@ def _fetch_events_time_window(trading, conn, lookback_minutes: int, horizon_hour
             market_start_time=time_range,
         )
         try:
-            result = _retry_with_backoff(trading.betting.list_events, filter=market_filter)
+            result = _retry_with_backoff(trading.betting.list_events, filter=market_filter, _trading=trading)
         except Exception as e:
             logger.exception("listEvents failed for window %s–%s: %s", t0, t1, e)
             t0 = t1
@@ -211,7 +219,7 @@ def _fetch_catalogue_by_event_ids(
             idx += current_batch_size
             continue
         try:
-            chunk = _retry_with_backoff(_fetch_catalogue_for_event_batch, trading, batch, max_results)
+            chunk = _retry_with_backoff(_fetch_catalogue_for_event_batch, trading, batch, max_results, _trading=trading)
             all_catalogues.extend(chunk)
             idx += len(batch)
             current_batch_size = batch_size  # reset after success in case we had halved
@@ -648,10 +656,12 @@ def main() -> int:
     app_key = os.environ.get("BF_APP_KEY") or os.environ.get("BETFAIR_APP_KEY")
     cert_path = os.environ.get("BF_CERT_PATH", "/app/certs/client-2048.crt")
     key_path = os.environ.get("BF_KEY_PATH", "/app/certs/client-2048.key")
-    if not all([username, password, app_key]):
+    import session_provider
+    direct_login = session_provider.needs_direct_login()
+    if not app_key or (direct_login and not all([username, password])):
         logger.error("Missing BF_USERNAME, BF_PASSWORD, BF_APP_KEY")
         return 1
-    if not os.path.isfile(cert_path) or not os.path.isfile(key_path):
+    if direct_login and (not os.path.isfile(cert_path) or not os.path.isfile(key_path)):
         logger.error("Certificate missing: %s / %s", cert_path, key_path)
         return 1
     host = os.environ.get("POSTGRES_HOST") or os.environ.get("BF_POSTGRES_HOST", "postgres")
@@ -663,11 +673,11 @@ def main() -> int:
         logger.error("POSTGRES_PASSWORD required")
         return 1
     import betfairlightweight
-    trading = betfairlightweight.APIClient(username=username, password=password, app_key=app_key, cert_files=(cert_path, key_path), lightweight=True)
-    try:
-        trading.login()
-    except Exception as e:
-        logger.exception("Login failed: %s", e)
+    trading = betfairlightweight.APIClient(username=username or "", password=password or "", app_key=app_key, cert_files=(cert_path, key_path), lightweight=True)
+    global _session_provider
+    _session_provider = session_provider.provider_from_env(trading)
+    if not session_provider.apply_session(trading, _session_provider):
+        logger.error("Login failed (session provider: %s)", _session_provider.name)
         return 1
     conn = psycopg2.connect(host=host, port=port, dbname=dbname, user=user, password=password_db, connect_timeout=10)
     try:
@@ -0,0 +1,419 @@
+"""
+Shared ladder parsing and Book Risk kernels for the REST client and the Risk Analytics API.
+
+betfair-rest-client/ladder_core.py is the source; risk-analytics-ui/api/app/ladder_core.py is a verbatim copy
+(the two services have separate Docker build contexts) and the API tests fail if the copies differ.
+Standard library only.
+
+Each runner is parsed once into a ParsedRunner (selection id, back and lay Ladder as parallel float lists).
+Book Risk, best prices and L1-L3 levels all read the parsed ladders, so the dict/attribute probing of
+listMarketBook runners happens once per runner and book instead of once per metric and level.
+Every metric function accepts either a raw runners list or a parsed book (parse_book output).
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+SelectionId = Union[int, str]
+
+ROLES = ("HOME", "AWAY", "DRAW")
+RISK_CURVE_SERIES = ("risk", "back_size", "back_liability", "lay_size", "lay_liability")
+BOOK_RISK_KEYS = ("home_book_risk_l3", "away_book_risk_l3", "draw_book_risk_l3")
+
+
+def _safe_float(val: Any) -> float:
+    """Sanitize None or non-numeric to 0.0."""
+    if val is None:
+        return 0.0
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _price_size(level: Any) -> Tuple[float, float]:
+    """(price, size) from a [price, size] pair or {"price", "size"} dict; (0.0, 0.0) otherwise."""
+    if isinstance(level, (list, tuple)):
+        if len(level) >= 2:
+            return _safe_float(level[0]), _safe_float(level[1])
+        if level:
+            return _safe_float(level[0]), 0.0
+        return 0.0, 0.0
+    if isinstance(level, dict):
+        return _safe_float(level.get("price") or level.get("Price")), _safe_float(level.get("size") or level.get("Size"))
+    return 0.0, 0.0
+
+
+class Ladder:
+    """One side of a runner's book as parallel price/size lists, in ladder order (index 0 = best)."""
+
+    __slots__ = ("prices", "sizes")
+
+    def __init__(self, levels: Optional[List[Any]] = None):
+        levels = levels or ()
+        try:
+            # Common case: [[price, size], ...] pairs of numbers
+            self.prices = [float(price) for price, _ in levels]
+            self.sizes = [float(size) for _, size in levels]
+        except (TypeError, ValueError):
+            # {"price", "size"} dicts, None values, short pairs
+            pairs = [_price_size(level) for level in levels]
+            self.prices = [p for p, _ in pairs]
+            self.sizes = [s for _, s in pairs]
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def level(self, i: int) -> Tuple[float, float]:
+        """(price, size) at index i; (0.0, 0.0) past the end."""
+        if i < len(self.prices):
+            return self.prices[i], self.sizes[i]
+        return 0.0, 0.0
+
+    def cumulative(self, max_depth: int) -> Tuple[List[float], List[float]]:
+        """
+        One pass over the first max_depth levels: (cumulative size, cumulative size * (price - 1) counting
+        only size > 0). Index d-1 holds depth d; a shorter ladder carries its last value forward.
+        """
+        sizes = [0.0] * max_depth
+        liabilities = [0.0] * max_depth
+        size_total = 0.0
+        liability_total = 0.0
+        n = min(len(self.prices), max_depth)
+        for i in range(n):
+            size = self.sizes[i]
+            size_total += size
+            if size > 0:
+                liability_total += size * (self.prices[i] - 1.0)
+            sizes[i] = size_total
+            liabilities[i] = liability_total
+        for i in range(n, max_depth):
+            sizes[i] = size_total
+            liabilities[i] = liability_total
+        return sizes, liabilities
+
+
+class ParsedRunner:
+    """A listMarketBook runner reduced to what the metrics read."""
+
+    __slots__ = ("selection_id", "back", "lay", "total_matched")
+
+    def __init__(self, selection_id: Optional[SelectionId], back: Ladder, lay: Ladder, total_matched: float = 0.0):
+        self.selection_id = selection_id
+        self.back = back
+        self.lay = lay
+        self.total_matched = total_matched
+
+
+ParsedBook = Dict[SelectionId, ParsedRunner]
+
+
+def _ex_side(ex: Any, camel: str, snake: str) -> Any:
+    if isinstance(ex, dict):
+        return ex.get(camel)
+    return getattr(ex, camel, None) or getattr(ex, snake, None)
+
+
+def parse_runner(runner: Any) -> ParsedRunner:
+    """Parse one runner (dict from the JSON API or a betfairlightweight-style object)."""
+    if isinstance(runner, dict):
+        sid = runner.get("selectionId") or runner.get("selection_id")
+        ex = runner.get("ex")
+        total_matched = runner.get("totalMatched")
+    else:
+        sid = getattr(runner, "selectionId", None) or getattr(runner, "selection_id", None)
+        ex = getattr(runner, "ex", None)
+        total_matched = getattr(runner, "totalMatched", None) or getattr(runner, "total_matched", None)
+    if ex:
+        back = Ladder(_ex_side(ex, "availableToBack", "available_to_back"))
+        lay = Ladder(_ex_side(ex, "availableToLay", "available_to_lay"))
+    else:
+        back, lay = Ladder(), Ladder()
+    return ParsedRunner(sid, back, lay, _safe_float(total_matched))
+
+
+def parse_book(runners: Any) -> ParsedBook:
+    """selectionId -> ParsedRunner for a book's runners (later duplicates win). A parsed book is returned as is."""
+    if isinstance(runners, dict):
+        return runners
+    book: ParsedBook = {}
+    for r in runners or ():
+        parsed = parse_runner(r)
+        if parsed.selection_id is not None:
+            book[parsed.selection_id] = parsed
+    return book
+
+
+def role_runners(runners: Any, runner_metadata: Optional[Dict[SelectionId, str]]) -> Dict[str, ParsedRunner]:
+    """HOME/AWAY/DRAW -> ParsedRunner for the roles present in both metadata and book."""
+    book = parse_book(runners)
+    out: Dict[str, ParsedRunner] = {}
+    for sid_key, role in (runner_metadata or {}).items():
+        role_upper = (role or "").upper()
+        if role_upper in ROLES and sid_key in book:
+            out[role_upper] = book[sid_key]
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Levels and best prices
+# -----------------------------------------------------------------------------
+
+
+def back_level_at(runner: ParsedRunner, level: int) -> Tuple[float, float]:
+    """(price, size) of availableToBack[level] (0=L1); (0.0, 0.0) if missing or invalid (price <= 1 or size <= 0)."""
+    price, size = runner.back.level(level)
+    if price <= 1 or size <= 0:
+        return 0.0, 0.0
+    return price, size
+
+
+def best_back_lay(runner: ParsedRunner) -> Tuple[float, float, float, float]:
+    """
+    (best_back, best_lay, best_back_size_l1, best_lay_size_l1) from the first level of each side; 0.0 if missing.
+    A size is 0.0 when its level is invalid (price <= 1 or size <= 0); the price is reported as is.
+    """
+    best_back, back_size = runner.back.level(0)
+    best_lay, lay_size = runner.lay.level(0)
+    if best_back <= 1 or back_size <= 0:
+        back_size = 0.0
+    if best_lay <= 1 or lay_size <= 0:
+        lay_size = 0.0
+    return best_back, best_lay, back_size, lay_size
+
+
+# -----------------------------------------------------------------------------
+# Book Risk: R[o] = W[o] - L[o] for o in {HOME, AWAY, DRAW} over the first d back levels, where
+# W[o] = Σ S[o,i] * (O[o,i] - 1) (size > 0 only) and L[o] = Σ_{p≠o} Σ S[p,i].
+# The curve holds every depth 1..N: back_size[o][d-1], back_liability[o][d-1] (= W[o] at depth d),
+# lay_size / lay_liability likewise from availableToLay, risk[o][d-1] = R[o] at depth d.
+# -----------------------------------------------------------------------------
+
+
+def compute_book_risk_curve(
+    runners: Any,
+    runner_metadata: Dict[SelectionId, str],
+    max_depth: int = 10,
+    include_lay: bool = True,
+) -> Optional[Dict[str, Dict[str, List[float]]]]:
+    """
+    Book Risk curve for depths 1..max_depth: {"HOME"|"AWAY"|"DRAW": {series: [value per depth]}} with
+    series risk, back_size, back_liability and (include_lay) lay_size, lay_liability.
+    Each ladder side is scanned once. None if not all three roles are present or max_depth < 1.
+    """
+    if max_depth < 1:
+        return None
+    by_role = role_runners(runners, runner_metadata)
+    if len(by_role) != len(ROLES):
+        return None
+
+    curve: Dict[str, Dict[str, List[float]]] = {}
+    for role in ROLES:
+        runner = by_role[role]
+        back_size, back_liability = runner.back.cumulative(max_depth)
+        entry = {"back_size": back_size, "back_liability": back_liability}
+        if include_lay:
+            entry["lay_size"], entry["lay_liability"] = runner.lay.cumulative(max_depth)
+        curve[role] = entry
+
+    home_s, away_s, draw_s = (curve[r]["back_size"] for r in ROLES)
+    curve["HOME"]["risk"] = [w - (a + d) for w, a, d in zip(curve["HOME"]["back_liability"], away_s, draw_s)]
+    curve["AWAY"]["risk"] = [w - (h + d) for w, h, d in zip(curve["AWAY"]["back_liability"], home_s, draw_s)]
+    curve["DRAW"]["risk"] = [w - (h + a) for w, h, a in zip(curve["DRAW"]["back_liability"], home_s, away_s)]
+    return curve
+
+
+def book_risk_at_depth(curve: Optional[Dict[str, Dict[str, List[float]]]], depth: int) -> Optional[Dict[str, float]]:
+    """home/away/draw_book_risk_l3 keys read from a curve at `depth` (clamped to the curve length)."""
+    if not curve:
+        return None
+    i = max(1, min(depth, len(curve["HOME"]["risk"]))) - 1
+    return {key: curve[role]["risk"][i] for key, role in zip(BOOK_RISK_KEYS, ROLES)}
+
+
+def _rounded(values: List[float], ndigits: int) -> List[float]:
+    # Half away from zero via int() (builtin round() is several times slower); depths past the end of the
+    # ladders repeat the last value, so that plateau is rounded once
+    if not values:
+        return []
+    scale = 10.0 ** ndigits
+    last = values[-1]
+    start = values.index(last)
+    plateau = len(values) - start
+    if values.count(last) != plateau:
+        start, plateau = len(values), 0
+    out = [int(v * scale + (0.5 if v >= 0 else -0.5)) / scale for v in values[:start]]
+    if plateau:
+        out.extend([int(last * scale + (0.5 if last >= 0 else -0.5)) / scale] * plateau)
+    return out
+
+
+def book_risk_curve_payload(curve: Optional[Dict[str, Dict[str, List[float]]]], ndigits: int = 2) -> Optional[Dict[str, Any]]:
+    """Compact JSON form for storage (market_derived_metrics.book_risk_curve): lowercase roles, rounded."""
+    if not curve:
+        return None
+    out: Dict[str, Any] = {"depth": len(curve["HOME"]["risk"])}
+    for role in ROLES:
+        out[role.lower()] = {k: _rounded(curve[role][k], ndigits) for k in RISK_CURVE_SERIES if k in curve[role]}
+    return out
+
+
+def compute_book_risk_l3(
+    runners: Any,
+    runner_metadata: Dict[SelectionId, str],
+    depth_limit: int = 3,
+) -> Optional[Dict[str, float]]:
+    """
+    3-way Book Risk (exposure) per snapshot from the first `depth_limit` back levels (fewer if the ladder is
+    shorter). Returns home_book_risk_l3, away_book_risk_l3, draw_book_risk_l3; or None if not all three roles.
+    """
+    if depth_limit < 1:
+        if len(role_runners(runners, runner_metadata)) != len(ROLES):
+            return None
+        return dict.fromkeys(BOOK_RISK_KEYS, 0.0)
+    curve = compute_book_risk_curve(runners, runner_metadata, max_depth=depth_limit, include_lay=False)
+    return book_risk_at_depth(curve, depth_limit)
+
+
+# -----------------------------------------------------------------------------
+# Incremental Book Risk: per-market running W[o] and stake totals updated from level deltas
+# (stream_ingest.ladder_levels rows, or the levels that differ between two consecutive REST books).
+# A level change inside the depth window is an O(1) adjustment of that runner's totals; only a level
+# appearing/disappearing (size 0 <-> > 0, which shifts deeper levels into or out of the window) rescans
+# that one runner's ladder. Same semantics as compute_book_risk_l3 on the zero-filtered ladder.
+# -----------------------------------------------------------------------------
+
+
+class BookRiskState:
+    """Running 3-way Book Risk for one market. Feed level updates, read risk() after each change."""
+
+    def __init__(self, runner_metadata: Dict[SelectionId, str], depth_limit: int = 3):
+        self.depth_limit = depth_limit
+        self._role_of: Dict[SelectionId, str] = {}
+        for sid, role in runner_metadata.items():
+            role_upper = (role or "").upper()
+            if role_upper in ROLES:
+                self._role_of[sid] = role_upper
+        # Back ladder per selection by level slot (size 0 = empty slot)
+        self._ladders: Dict[SelectionId, List[Tuple[float, float]]] = {}
+        # Per selection: winners net payout and stake over the window, and the slot index of the last level
+        # in the window (None when the ladder has fewer than depth_limit non-empty levels)
+        self._payout: Dict[SelectionId, float] = {}
+        self._stake: Dict[SelectionId, float] = {}
+        self._window_end: Dict[SelectionId, Optional[int]] = {}
+        self.changes = 0
+
+    def _rescan(self, sid: SelectionId) -> None:
+        payout = stake = 0.0
+        counted = 0
+        window_end = None
+        for i, (price, size) in enumerate(self._ladders[sid]):
+            if size <= 0:
+                continue
+            payout += size * (price - 1.0)
+            stake += size
+            counted += 1
+            if counted == self.depth_limit:
+                window_end = i
+                break
+        self._payout[sid] = payout
+        self._stake[sid] = stake
+        self._window_end[sid] = window_end
+
+    def apply_level(self, selection_id: SelectionId, side: str, level: int, price: float, size: float) -> bool:
+        """
+        Apply one level update (level = slot index, size 0 clears it). Lay side and unmapped selections
+        are ignored. Returns True if the risk inputs changed.
+        """
+        if side not in ("B", "b") or selection_id not in self._role_of or level < 0:
+            return False
+        price, size = _safe_float(price), _safe_float(size)
+        ladder = self._ladders.get(selection_id)
+        if ladder is None:
+            ladder = self._ladders[selection_id] = []
+            self._rescan(selection_id)
+        if level >= len(ladder):
+            ladder.extend([(0.0, 0.0)] * (level + 1 - len(ladder)))
+        old_price, old_size = ladder[level]
+        ladder[level] = (price, size)
+        if (old_price, old_size) == (price, size):
+            return False
+
+        window_end = self._window_end[selection_id]
+        if old_size > 0 and size > 0:
+            if window_end is not None and level > window_end:
+                return False  # below the window
+            # Same slot stays counted: adjust totals in place
+            self._payout[selection_id] += size * (price - 1.0) - old_size * (old_price - 1.0)
+            self._stake[selection_id] += size - old_size
+        elif old_size <= 0 and size <= 0:
+            return False
+        elif window_end is not None and level > window_end:
+            return False  # level appeared/vanished below a full window
+        else:
+            self._rescan(selection_id)
+        self.changes += 1
+        return True
+
+    def apply_book(self, runners: Any) -> int:
+        """
+        Diff a REST book (runners list or parsed book) against the current state and apply only the back
+        levels that differ within the depth window. Returns the number of levels applied.
+        """
+        applied = 0
+        for sid, runner in parse_book(runners).items():
+            if sid not in self._role_of:
+                continue
+            if sid not in self._ladders:
+                self._ladders[sid] = []
+                self._rescan(sid)
+            back = runner.back
+            old_levels = self._ladders[sid]
+            for i in range(min(self.depth_limit, max(len(back), len(old_levels)))):
+                new = back.level(i)
+                old = old_levels[i] if i < len(old_levels) else (0.0, 0.0)
+                if new != old:
+                    self.apply_level(sid, "B", i, new[0], new[1])
+                    applied += 1
+        return applied
+
+    def risk(self) -> Optional[Dict[str, float]]:
+        """home/away/draw_book_risk_l3 from the running totals; None until all three roles have been seen."""
+        by_role: Dict[str, SelectionId] = {}
+        for sid, role in self._role_of.items():
+            if sid in self._ladders:
+                by_role[role] = sid
+        if len(by_role) != len(ROLES):
+            return None
+        stake = {role: self._stake[sid] for role, sid in by_role.items()}
+        total_stake = stake["HOME"] + stake["AWAY"] + stake["DRAW"]
+        return {key: self._payout[by_role[role]] - (total_stake - stake[role]) for key, role in zip(BOOK_RISK_KEYS, ROLES)}
+
+
+def book_risk_from_level_updates(
+    updates: Iterable[Tuple[Any, SelectionId, str, int, float, float]],
+    runner_metadata: Dict[SelectionId, str],
+    depth_limit: int = 3,
+    baseline: Optional[Iterable[Tuple[SelectionId, str, int, float, float]]] = None,
+):
+    """
+    Tick-resolution Book Risk from ladder level updates ordered by time.
+    updates: iterable of (publish_time, selection_id, side, level, price, size); baseline: level state
+    (selection_id, side, level, price, size) at the start. Yields (publish_time, risk dict) once per
+    publish_time whose updates changed the risk inputs.
+    """
+    state = BookRiskState(runner_metadata, depth_limit=depth_limit)
+    for sid, side, level, price, size in baseline or ():
+        state.apply_level(sid, side, level, price, size)
+    current_time = None
+    dirty = False
+    for publish_time, sid, side, level, price, size in updates:
+        if publish_time != current_time:
+            if dirty:
+                out = state.risk()
+                if out is not None:
+                    yield current_time, out
+            current_time, dirty = publish_time, False
+        dirty = state.apply_level(sid, side, level, price, size) or dirty
+    if dirty:
+        out = state.risk()
+        if out is not None:
+            yield current_time, out
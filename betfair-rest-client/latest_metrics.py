@@ -0,0 +1,118 @@
+"""
+market_latest_metrics: the newest market_derived_metrics row per market, maintained on write.
+
+The league and book-risk-focus lists of the risk-analytics API need only each market's latest snapshot. Selecting
+it with DISTINCT ON (market_id) ... ORDER BY snapshot_at DESC scans the whole derived-metrics history on every
+request; this table keeps one row per market instead:
+- ensure_table creates it and, in the same transaction, seeds it and grants SELECT to the API reader role (once; the
+  API only reads the table when it exists and it may SELECT from it, so it is never served half-filled).
+- upsert (UPSERT_SQL) runs next to every market_derived_metrics INSERT of the REST writer, in its transaction; a row
+  only replaces an older-or-equal snapshot_at, so out-of-order writes cannot move a market back in time.
+- Backfills that UPDATE market_derived_metrics in place copy the changed columns that this table also carries
+  (refresh_sql, used by backfill_engine) for the snapshots that are some market's latest.
+
+Only the in-place (v1) metrics are mirrored; recomputed versions (market_derived_metrics_versions) are read as before.
+"""
+from typing import Iterable, Optional
+
+TABLE = "public.market_latest_metrics"
+
+# Columns copied from market_derived_metrics (besides market_id), in table order
+COLUMNS = (
+    "snapshot_id", "snapshot_at",
+    "home_best_back", "away_best_back", "draw_best_back",
+    "home_best_lay", "away_best_lay", "draw_best_lay",
+    "total_volume", "depth_limit", "calculation_version",
+    "home_book_risk_l3", "away_book_risk_l3", "draw_book_risk_l3",
+)
+
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS public.market_latest_metrics (
+    market_id TEXT PRIMARY KEY,
+    snapshot_id BIGINT NOT NULL,
+    snapshot_at TIMESTAMPTZ NOT NULL,
+    home_best_back DOUBLE PRECISION NULL, away_best_back DOUBLE PRECISION NULL, draw_best_back DOUBLE PRECISION NULL,
+    home_best_lay DOUBLE PRECISION NULL, away_best_lay DOUBLE PRECISION NULL, draw_best_lay DOUBLE PRECISION NULL,
+    total_volume DOUBLE PRECISION NULL,
+    depth_limit INTEGER NULL,
+    calculation_version TEXT NULL,
+    home_book_risk_l3 DOUBLE PRECISION NULL, away_book_risk_l3 DOUBLE PRECISION NULL, draw_book_risk_l3 DOUBLE PRECISION NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+"""
+
+# The API reads as this role; a table it cannot SELECT from would fail the list endpoints (the API probes the privilege)
+READER_ROLE = "netbet_analytics_reader"
+
+# Skipped when the role does not exist (local databases) or the writer does not own the table
+GRANT_SQL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = '""" + READER_ROLE + """') THEN
+        GRANT SELECT ON public.market_latest_metrics TO """ + READER_ROLE + """;
+    END IF;
+EXCEPTION WHEN insufficient_privilege THEN
+    RAISE NOTICE 'cannot grant SELECT on market_latest_metrics to """ + READER_ROLE + """';
+END $$;
+"""
+
+_SETS = ", ".join("%s = EXCLUDED.%s" % (c, c) for c in COLUMNS) + ", updated_at = NOW()"
+
+SEED_SQL = (
+    "INSERT INTO public.market_latest_metrics (market_id, %s) "
+    "SELECT DISTINCT ON (d.market_id) d.market_id, %s FROM public.market_derived_metrics d "
+    "ORDER BY d.market_id, d.snapshot_at DESC "
+    "ON CONFLICT (market_id) DO UPDATE SET %s "
+    "WHERE market_latest_metrics.snapshot_at <= EXCLUDED.snapshot_at"
+) % (", ".join(COLUMNS), ", ".join("d.%s" % c for c in COLUMNS), _SETS)
+
+# Named parameters: market_id plus COLUMNS (the params dict of main._insert_derived_metrics)
+UPSERT_SQL = (
+    "INSERT INTO public.market_latest_metrics (market_id, %s) VALUES (%%(market_id)s, %s) "
+    "ON CONFLICT (market_id) DO UPDATE SET %s "
+    "WHERE market_latest_metrics.snapshot_at <= EXCLUDED.snapshot_at"
+) % (", ".join(COLUMNS), ", ".join("%%(%s)s" % c for c in COLUMNS), _SETS)
+
+_ready = False
+
+
+def ensure_table(conn) -> None:
+    """Create and seed market_latest_metrics if missing, and grant the API reader SELECT (once per process). Commits."""
+    global _ready
+    if _ready:
+        return
+    exists = table_exists(conn)
+    with conn.cursor() as cur:
+        if not exists:
+            cur.execute(CREATE_SQL)
+            cur.execute(SEED_SQL)
+        cur.execute(GRANT_SQL)
+    conn.commit()
+    _ready = True
+
+
+def upsert(cur, params) -> None:
+    """Upsert the market's latest row from one market_derived_metrics row (caller commits)."""
+    cur.execute(UPSERT_SQL, params)
+
+
+def refresh_sql(columns: Iterable[str]) -> Optional[str]:
+    """
+    UPDATE copying `columns` from market_derived_metrics into the latest rows of the snapshots in %s
+    (a list of snapshot_id), or None when the table carries none of them.
+    """
+    shared = [c for c in columns if c in COLUMNS]
+    if not shared:
+        return None
+    return (
+        "UPDATE public.market_latest_metrics AS l SET %s "
+        "FROM public.market_derived_metrics d "
+        "WHERE d.snapshot_id = l.snapshot_id AND l.snapshot_id = ANY(%%s)"
+    ) % ", ".join("%s = d.%s" % (c, c) for c in shared)
+
+
+def table_exists(conn) -> bool:
+    """True when market_latest_metrics exists."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (TABLE,))
+        return bool(cur.fetchone()[0])
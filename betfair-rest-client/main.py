@@ -15,6 +15,10 @@ from datetime import datetime, timezone, timedelta
 from pathlib import Path
 from typing import Any, Dict, Optional
 
+import latest_metrics
+from ladder_core import back_level_at, best_back_lay, parse_book, role_runners
+from risk import book_risk_at_depth, book_risk_curve_payload, compute_book_risk_curve, compute_book_risk_l3
+
 # -----------------------------------------------------------------------------
 # Configuration from environment only
 # -----------------------------------------------------------------------------
@@ -33,6 +37,8 @@ LOOKBACK_MINUTES = int(os.environ.get("BF_LOOKBACK_MINUTES", "60"))
 BACKOFF_BASE = [10, 30, 60]  # jitter 0.8–1.2 applied per delay
 MARKET_BOOK_TOP_N = int(os.environ.get("BF_MARKET_BOOK_TOP_N", "10"))
 DEPTH_LIMIT = int(os.environ.get("BF_DEPTH_LIMIT", "3"))
+# Book Risk curve depth stored per snapshot (market_derived_metrics.book_risk_curve); 0 disables
+RISK_CURVE_DEPTH = int(os.environ.get("BF_RISK_CURVE_DEPTH", "10"))
 SINGLE_SHOT = os.environ.get("BF_SINGLE_SHOT", "").lower() in ("1", "true", "yes")
 DEBUG_MARKET_SAMPLE_PATH = os.environ.get("DEBUG_MARKET_SAMPLE_PATH", "/opt/netbet/betfair-rest-client/debug_market_sample.json")
 
@@ -62,6 +68,7 @@ logger = logging.getLogger("betfair_rest_client")
 
 _shutdown_requested = False
 _trading_client = None
+_session_provider = None
 _tick_id = 0
 _sleep_event = threading.Event()
 
@@ -110,30 +117,31 @@ def is_session_error(ex: Exception) -> bool:
     return False
 
 
-def _ensure_session(trading):
-    if getattr(trading, "session_expired", True):
-        logger.info("Session expired or missing, performing login...")
-        try:
-            trading.login()
-        except Exception as e:
-            logger.exception("Login failed: %s", e)
-            return False
-    else:
-        try:
-            trading.keep_alive()
-        except Exception as e:
-            logger.warning("keep_alive failed (%s), will re-login", e)
-            try:
-                trading.login()
-            except Exception as e2:
-                logger.exception("Re-login after keep_alive failed: %s", e2)
-                return False
+def _ensure_session(trading, force_refresh: bool = False):
+    """Inject a valid session token (auth-service or direct login, see session_provider). force_refresh after INVALID_SESSION."""
+    import session_provider
+
+    global _session_provider
+    if _session_provider is None:
+        _session_provider = session_provider.provider_from_env(trading)
+    if not session_provider.apply_session(trading, _session_provider, force_refresh=force_refresh):
+        return False
     if getattr(trading, "session_expired", True):
         logger.error("Session still expired after login.")
         return False
     return True
 
 
+def _recover_session(trading, err: Exception) -> bool:
+    """
+    Session after a failed call: a new token only on INVALID_SESSION; other session errors (e.g. TIMEOUT) keep the
+    current one (keep_alive in login mode), so network timeouts do not trigger repeated cert logins.
+    """
+    import session_provider
+
+    return _ensure_session(trading, force_refresh=session_provider.is_invalid_session(err))
+
+
 def _backoff_delays():
     return [max(1, int(d * random.uniform(0.8, 1.2))) for d in BACKOFF_BASE]
 
@@ -198,87 +206,27 @@ def _fetch_market_books(trading, market_ids, start_ts: float):
     )
 
 
-def _back_level_at(runner: Any, level: int) -> tuple:
-    """Extract (price, size) from availableToBack level index (0=L1, 1=L2, 2=L3). Returns (0.0, 0.0) if missing or invalid."""
-    ex = runner.get("ex") if isinstance(runner, dict) else getattr(runner, "ex", None)
-    if not ex:
-        return 0.0, 0.0
-    atb = ex.get("availableToBack") if isinstance(ex, dict) else getattr(ex, "availableToBack", None) or getattr(ex, "available_to_back", None)
-    if not atb or level >= len(atb):
-        return 0.0, 0.0
-    lev = atb[level]
-    if isinstance(lev, (list, tuple)) and len(lev) >= 2:
-        price = _safe_float(lev[0])
-        size = _safe_float(lev[1])
-    elif isinstance(lev, dict):
-        price = _safe_float(lev.get("price") or lev.get("Price"))
-        size = _safe_float(lev.get("size") or lev.get("Size") or 0)
-    else:
-        return 0.0, 0.0
-    if price <= 1 or size <= 0:
-        return 0.0, 0.0
-    return price, size
-
-
-def _best_back_lay(runner: Any) -> tuple:
-    """First-level best back and best lay from runner.ex. Returns (best_back, best_lay, best_back_size_l1, best_lay_size_l1); 0.0 if missing or invalid (price <= 1 or size <= 0)."""
-    ex = runner.get("ex") if isinstance(runner, dict) else getattr(runner, "ex", None)
-    if not ex:
-        return 0.0, 0.0, 0.0, 0.0
-    atb = ex.get("availableToBack") if isinstance(ex, dict) else getattr(ex, "availableToBack", None) or getattr(ex, "available_to_back", None)
-    atl = ex.get("availableToLay") if isinstance(ex, dict) else getattr(ex, "availableToLay", None) or getattr(ex, "available_to_lay", None)
-    best_back, best_lay = 0.0, 0.0
-    best_back_size_l1, best_lay_size_l1 = 0.0, 0.0
-    if atb and len(atb) > 0:
-        lev = atb[0]
-        if isinstance(lev, (list, tuple)) and len(lev) >= 1:
-            best_back = _safe_float(lev[0])
-            best_back_size_l1 = _safe_float(lev[1]) if len(lev) >= 2 else 0.0
-        elif isinstance(lev, dict):
-            best_back = _safe_float(lev.get("price") or lev.get("Price"))
-            best_back_size_l1 = _safe_float(lev.get("size") or lev.get("Size") or 0)
-        if best_back <= 1 or best_back_size_l1 <= 0:
-            best_back_size_l1 = 0.0
-    if atl and len(atl) > 0:
-        lev = atl[0]
-        if isinstance(lev, (list, tuple)) and len(lev) >= 1:
-            best_lay = _safe_float(lev[0])
-            best_lay_size_l1 = _safe_float(lev[1]) if len(lev) >= 2 else 0.0
-        elif isinstance(lev, dict):
-            best_lay = _safe_float(lev.get("price") or lev.get("Price"))
-            best_lay_size_l1 = _safe_float(lev.get("size") or lev.get("Size") or 0)
-        if best_lay <= 1 or best_lay_size_l1 <= 0:
-            best_lay_size_l1 = 0.0
-    return best_back, best_lay, best_back_size_l1, best_lay_size_l1
-
-
-def _runner_best_prices(runners: list, runner_metadata: Dict) -> Dict[str, float]:
-    """Build role -> best_back, best_lay and L1 sizes from runners and metadata. Keys: home_best_back, away_best_back, ..., home_best_back_size_l1, ..., home_best_lay_size_l1, ..."""
-    by_sid = {}
-    for r in runners:
-        sid = r.get("selectionId") if isinstance(r, dict) else getattr(r, "selectionId", None) or getattr(r, "selection_id", None)
-        if sid is not None:
-            by_sid[sid] = r
+_BEST_PRICE_FIELDS = (
+    "best_back", "best_lay", "best_back_size_l1", "best_lay_size_l1",
+    "back_odds_l2", "back_size_l2", "back_odds_l3", "back_size_l3",
+)
+_BEST_PRICE_KEYS = {role: tuple(f"{role.lower()}_{field}" for field in _BEST_PRICE_FIELDS) for role in ("HOME", "AWAY", "DRAW")}
+
+
+def _runner_best_prices(runners: Any, runner_metadata: Dict) -> Dict[str, float]:
+    """
+    Build role -> best_back, best_lay and L1 sizes from runners (raw list or ladder_core.parse_book output) and
+    metadata. Keys: home_best_back, away_best_back, ..., home_best_back_size_l1, ..., home_best_lay_size_l1, ...
+    L2/L3 back odds and sizes are None when the level is missing or invalid.
+    """
     out = {}
-    for sid_key, role in (runner_metadata or {}).items():
-        role_lower = (role or "").lower()
-        if role_lower not in ("home", "away", "draw"):
-            continue
-        r = by_sid.get(sid_key)
-        if not r:
-            continue
-        best_back, best_lay, best_back_size_l1, best_lay_size_l1 = _best_back_lay(r)
-        out[f"{role_lower}_best_back"] = best_back
-        out[f"{role_lower}_best_lay"] = best_lay
-        out[f"{role_lower}_best_back_size_l1"] = best_back_size_l1
-        out[f"{role_lower}_best_lay_size_l1"] = best_lay_size_l1
-        # L2 and L3 back levels
-        odds_l2, size_l2 = _back_level_at(r, 1)
-        odds_l3, size_l3 = _back_level_at(r, 2)
-        out[f"{role_lower}_back_odds_l2"] = odds_l2 if odds_l2 > 0 else None
-        out[f"{role_lower}_back_size_l2"] = size_l2 if size_l2 > 0 else None
-        out[f"{role_lower}_back_odds_l3"] = odds_l3 if odds_l3 > 0 else None
-        out[f"{role_lower}_back_size_l3"] = size_l3 if size_l3 > 0 else None
+    for role, r in role_runners(runners, runner_metadata).items():
+        odds_l2, size_l2 = back_level_at(r, 1)
+        odds_l3, size_l3 = back_level_at(r, 2)
+        out.update(zip(_BEST_PRICE_KEYS[role], (
+            *best_back_lay(r),
+            odds_l2 or None, size_l2 or None, odds_l3 or None, size_l3 or None,
+        )))
     return out
 
 
@@ -449,7 +397,24 @@ def _ensure_three_layer_tables(conn):
                 END $$;
                 """
             )
+        cur.execute(
+            """
+            DO $$ BEGIN
+                ALTER TABLE market_derived_metrics ADD COLUMN book_risk_curve JSONB NULL;
+            EXCEPTION WHEN duplicate_column THEN NULL;
+            END $$;
+            """
+        )
     conn.commit()
+    latest_metrics.ensure_table(conn)
+
+
+def _book_risk_metrics(runners: Any, runner_metadata: Dict, depth_limit: int = DEPTH_LIMIT) -> Dict[str, Any]:
+    """Book Risk L3 + curve (depths 1..RISK_CURVE_DEPTH) from one pass over each runner's ladder."""
+    if RISK_CURVE_DEPTH <= 0:
+        return {**(compute_book_risk_l3(runners, runner_metadata, depth_limit=depth_limit) or {}), "book_risk_curve": None}
+    curve = compute_book_risk_curve(runners, runner_metadata, max_depth=max(RISK_CURVE_DEPTH, depth_limit))
+    return {**(book_risk_at_depth(curve, depth_limit) or {}), "book_risk_curve": book_risk_curve_payload(curve)}
 
 
 def _upsert_metadata(conn, row: Dict):
@@ -540,7 +505,12 @@ def _insert_raw_snapshot(
 
 
 def _insert_derived_metrics(conn, snapshot_id: int, snapshot_at, market_id: str, metrics: Dict):
-    """Insert one row into market_derived_metrics. Imbalance and Impedance indices removed (MVP)."""
+    """
+    Insert one row into market_derived_metrics and upsert the market's row in market_latest_metrics (same
+    transaction). Imbalance and Impedance indices removed (MVP).
+    """
+    from psycopg2.extras import Json
+
     params = {
         "snapshot_id": snapshot_id, "snapshot_at": snapshot_at, "market_id": market_id,
         "total_volume": metrics["total_volume"],
@@ -573,6 +543,7 @@ def _insert_derived_metrics(conn, snapshot_id: int, snapshot_at, market_id: str,
         "draw_back_size_l2": metrics.get("draw_back_size_l2"),
         "draw_back_odds_l3": metrics.get("draw_back_odds_l3"),
         "draw_back_size_l3": metrics.get("draw_back_size_l3"),
+        "book_risk_curve": Json(metrics["book_risk_curve"]) if metrics.get("book_risk_curve") else None,
     }
     with conn.cursor() as cur:
         cur.execute(
@@ -588,7 +559,8 @@ def _insert_derived_metrics(conn, snapshot_id: int, snapshot_at, market_id: str,
                 home_best_lay_size_l1, away_best_lay_size_l1, draw_best_lay_size_l1,
                 home_back_odds_l2, home_back_size_l2, home_back_odds_l3, home_back_size_l3,
                 away_back_odds_l2, away_back_size_l2, away_back_odds_l3, away_back_size_l3,
-                draw_back_odds_l2, draw_back_size_l2, draw_back_odds_l3, draw_back_size_l3
+                draw_back_odds_l2, draw_back_size_l2, draw_back_odds_l3, draw_back_size_l3,
+                book_risk_curve
             )
             VALUES (
                 %(snapshot_id)s, %(snapshot_at)s, %(market_id)s, %(total_volume)s,
@@ -601,11 +573,13 @@ def _insert_derived_metrics(conn, snapshot_id: int, snapshot_at, market_id: str,
                 %(home_best_lay_size_l1)s, %(away_best_lay_size_l1)s, %(draw_best_lay_size_l1)s,
                 %(home_back_odds_l2)s, %(home_back_size_l2)s, %(home_back_odds_l3)s, %(home_back_size_l3)s,
                 %(away_back_odds_l2)s, %(away_back_size_l2)s, %(away_back_odds_l3)s, %(away_back_size_l3)s,
-                %(draw_back_odds_l2)s, %(draw_back_size_l2)s, %(draw_back_odds_l3)s, %(draw_back_size_l3)s
+                %(draw_back_odds_l2)s, %(draw_back_size_l2)s, %(draw_back_odds_l3)s, %(draw_back_size_l3)s,
+                %(book_risk_curve)s
             )
             """,
             params,
         )
+        latest_metrics.upsert(cur, params)
     conn.commit()
 
 
@@ -706,7 +680,7 @@ def _tick_from_db_tracked(trading) -> bool:
         try:
             success, books_result = _run_with_backoff(_fetch_market_books, trading, batch, start_ts)
         except Exception as session_err:
-            if not _ensure_session(trading):
+            if not _recover_session(trading, session_err):
                 break
             success, books_result = _run_with_backoff(_fetch_market_books, trading, batch, start_ts)
         if not success or not books_result:
@@ -723,7 +697,6 @@ def _tick_from_db_tracked(trading) -> bool:
         if dropped:
             logger.info("[Tracked] dropped_not_found=%s market_ids=%s", dropped, batch[:3])
 
-    from risk import compute_book_risk_l3
     snapshot_at = now_utc
     markets_persisted = 0
     try:
@@ -760,8 +733,9 @@ def _tick_from_db_tracked(trading) -> bool:
             )
             if snapshot_id is None:
                 continue
-            book_risk_l3 = compute_book_risk_l3(runners, runner_metadata, depth_limit=DEPTH_LIMIT)
-            best_prices = _runner_best_prices(runners, runner_metadata)
+            parsed = parse_book(runners)  # parsed once, shared by every metric below
+            book_risk = _book_risk_metrics(parsed, runner_metadata)
+            best_prices = _runner_best_prices(parsed, runner_metadata)
             def _spread(back, lay):
                 return float(lay) - float(back) if back is not None and lay is not None else None
             metrics = {
@@ -770,9 +744,10 @@ def _tick_from_db_tracked(trading) -> bool:
                 "home_spread": _spread(best_prices.get("home_best_back"), best_prices.get("home_best_lay")),
                 "away_spread": _spread(best_prices.get("away_best_back"), best_prices.get("away_best_lay")),
                 "draw_spread": _spread(best_prices.get("draw_best_back"), best_prices.get("draw_best_lay")),
-                "home_book_risk_l3": (book_risk_l3 or {}).get("home_book_risk_l3"),
-                "away_book_risk_l3": (book_risk_l3 or {}).get("away_book_risk_l3"),
-                "draw_book_risk_l3": (book_risk_l3 or {}).get("draw_book_risk_l3"),
+                "home_book_risk_l3": book_risk.get("home_book_risk_l3"),
+                "away_book_risk_l3": book_risk.get("away_book_risk_l3"),
+                "draw_book_risk_l3": book_risk.get("draw_book_risk_l3"),
+                "book_risk_curve": book_risk.get("book_risk_curve"),
             }
             _insert_derived_metrics(conn, snapshot_id, snapshot_at, market_id, metrics)
             markets_persisted += 1
@@ -894,28 +869,29 @@ def _run_single_shot(trading) -> bool:
                 total_matched=market_total_matched, inplay=inplay, status=status, depth_limit=DEPTH_LIMIT,
             )
             if snapshot_id is not None and len(runners) >= 3:
-                from risk import compute_book_risk_l3
                 runner_metadata = _runner_metadata_from_metadata_table(conn, first_market_id)
                 if runner_metadata:
                     total_volume = _safe_float(market_total_matched) if market_total_matched is not None else sum(
                         _safe_float(r.get("totalMatched") if isinstance(r, dict) else getattr(r, "totalMatched", None) or getattr(r, "total_matched", None))
                         for r in runners
                     )
-                    best_prices = _runner_best_prices(runners, runner_metadata)
+                    parsed = parse_book(runners)
+                    best_prices = _runner_best_prices(parsed, runner_metadata)
                     def _s(b, l):
                         return float(l) - float(b) if b is not None and l is not None else None
                     home_spread = _s(best_prices.get("home_best_back"), best_prices.get("home_best_lay"))
                     away_spread = _s(best_prices.get("away_best_back"), best_prices.get("away_best_lay"))
                     draw_spread = _s(best_prices.get("draw_best_back"), best_prices.get("draw_best_lay"))
-                    book_risk_l3 = compute_book_risk_l3(runners, runner_metadata, depth_limit=DEPTH_LIMIT)
+                    book_risk = _book_risk_metrics(parsed, runner_metadata)
                     metrics = {
                         "total_volume": total_volume,
                         "depth_limit": DEPTH_LIMIT, "calculation_version": "v1",
                         **best_prices,
                         "home_spread": home_spread, "away_spread": away_spread, "draw_spread": draw_spread,
-                        "home_book_risk_l3": (book_risk_l3 or {}).get("home_book_risk_l3"),
-                        "away_book_risk_l3": (book_risk_l3 or {}).get("away_book_risk_l3"),
-                        "draw_book_risk_l3": (book_risk_l3 or {}).get("draw_book_risk_l3"),
+                        "home_book_risk_l3": book_risk.get("home_book_risk_l3"),
+                        "away_book_risk_l3": book_risk.get("away_book_risk_l3"),
+                        "draw_book_risk_l3": book_risk.get("draw_book_risk_l3"),
+                        "book_risk_curve": book_risk.get("book_risk_curve"),
                     }
                     _insert_derived_metrics(conn, snapshot_id, snapshot_at, first_market_id, metrics)
             conn.close()
@@ -975,25 +951,33 @@ def _warn_if_discovery_stale(conn):
 
 
 def main() -> int:
-    if not all([USERNAME, PASSWORD, APP_KEY]):
-        missing = [k for k, v in [("BF_USERNAME/BETFAIR_USERNAME", USERNAME), ("BF_PASSWORD/BETFAIR_PASSWORD", PASSWORD), ("BF_APP_KEY/BETFAIR_APP_KEY", APP_KEY)] if not v]
+    import session_provider
+
+    direct_login = session_provider.needs_direct_login()
+    required = [("BF_APP_KEY/BETFAIR_APP_KEY", APP_KEY)]
+    if direct_login:
+        required = [("BF_USERNAME/BETFAIR_USERNAME", USERNAME), ("BF_PASSWORD/BETFAIR_PASSWORD", PASSWORD)] + required
+    missing = [k for k, v in required if not v]
+    if missing:
         logger.error("Missing required env: %s.", ", ".join(missing))
         return 1
 
-    if not os.path.isfile(CERT_PATH) or not os.path.isfile(KEY_PATH):
+    if direct_login and (not os.path.isfile(CERT_PATH) or not os.path.isfile(KEY_PATH)):
         logger.error("Certificate or key file missing. CERT_PATH=%s KEY_PATH=%s", CERT_PATH, KEY_PATH)
         return 1
 
     import betfairlightweight
 
-    global _trading_client
+    global _trading_client, _session_provider
     _trading_client = betfairlightweight.APIClient(
-        username=USERNAME,
-        password=PASSWORD,
+        username=USERNAME or "",
+        password=PASSWORD or "",
         app_key=APP_KEY,
         cert_files=(CERT_PATH, KEY_PATH),
         lightweight=True,
     )
+    _session_provider = session_provider.provider_from_env(_trading_client)
+    logger.info("Session provider: %s", _session_provider.name)
 
     signal.signal(signal.SIGTERM, _request_shutdown)
     signal.signal(signal.SIGINT, _request_shutdown)
@@ -1007,11 +991,7 @@ def main() -> int:
         except Exception as e:
             logger.exception("Single-shot failed: %s", e)
         logger.info("Shutting down (single-shot), closing Betfair session...")
-        try:
-            _trading_client.logout()
-            logger.info("Logout completed.")
-        except Exception as e:
-            logger.warning("Logout failed: %s", e)
+        session_provider.release_session(_trading_client, _session_provider)
         return 0
 
     tick_fn = _tick_from_db_tracked
@@ -1037,11 +1017,7 @@ def main() -> int:
             logger.exception("Cycle failed (non-fatal): %s", e)
 
     logger.info("Shutting down, closing Betfair session...")
-    try:
-        _trading_client.logout()
-        logger.info("Logout completed.")
-    except Exception as e:
-        logger.warning("Logout failed: %s", e)
+    session_provider.release_session(_trading_client, _session_provider)
     return 0
 
 
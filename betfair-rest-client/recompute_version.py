@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Side-by-side metric recomputation under a new calculation_version.
+
+Instead of an in-place UPDATE backfill of market_derived_metrics (hot rows, long locks), the full derived
+row is recomputed from raw_payload with the current production code and written into its own partition of
+public.market_derived_metrics_versions (see scripts/create_market_derived_metrics_versions.sql).
+Reads stream from a read-only connection; compute runs on a process pool (backfill_engine).
+The API serves whatever public.metric_version_pointer names; `activate` flips it in one UPDATE.
+
+Usage (same env as the backfill scripts):
+  python recompute_version.py run --version v2 [--workers N] [--batch-size 2000] [--limit M] [--depth-limit 3]
+  python recompute_version.py activate --version v2      # serve v2 (requires status ready)
+  python recompute_version.py activate --version v1      # back to in-place market_derived_metrics
+  python recompute_version.py status
+  python recompute_version.py drop --version v2          # DROP the partition (not while served)
+
+`run` resumes from its checkpoint; re-run it to pick up snapshots ingested since the last run. Re-running a ready
+(even served) version keeps it ready. The daemon only writes v1: while a recomputed version is served, the API
+serves snapshots newer than its built range (built_through_snapshot_id) from market_derived_metrics.
+"""
+import argparse
+import functools
+import json
+import logging
+import os
+import sys
+from typing import Any, Dict, Optional
+
+import psycopg2
+
+from backfill_engine import VERSION_RE, BackfillJob, add_engine_args, load_checkpoint, payload_runners, run_job
+from ladder_core import parse_book
+from main import _book_risk_metrics, _runner_best_prices, _safe_float, DEPTH_LIMIT
+
+POSTGRES_HOST = os.environ.get("POSTGRES_HOST") or os.environ.get("BF_POSTGRES_HOST", "postgres")
+POSTGRES_PORT = int(os.environ.get("POSTGRES_PORT") or os.environ.get("BF_POSTGRES_PORT", "5432"))
+POSTGRES_DB = os.environ.get("POSTGRES_DB", "netbet")
+POSTGRES_USER = os.environ.get("POSTGRES_USER", "netbet")
+POSTGRES_PASSWORD = os.environ.get("POSTGRES_PASSWORD", "")
+PGOPTIONS = os.environ.get("PGOPTIONS", "-c search_path=public")
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+logger = logging.getLogger("recompute_version")
+
+# Version served by the in-place table (daemon writes calculation_version 'v1')
+BASELINE_VERSION = "v1"
+SERVED_SLOT = "served"
+SCHEMA_SQL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts", "create_market_derived_metrics_versions.sql")
+
+VERSION_COLUMNS = [
+    "total_volume",
+    "home_best_back", "away_best_back", "draw_best_back",
+    "home_best_lay", "away_best_lay", "draw_best_lay",
+    "home_spread", "away_spread", "draw_spread",
+    "depth_limit",
+    "home_book_risk_l3", "away_book_risk_l3", "draw_book_risk_l3",
+    "home_best_back_size_l1", "away_best_back_size_l1", "draw_best_back_size_l1",
+    "home_best_lay_size_l1", "away_best_lay_size_l1", "draw_best_lay_size_l1",
+    "home_back_odds_l2", "home_back_size_l2", "home_back_odds_l3", "home_back_size_l3",
+    "away_back_odds_l2", "away_back_size_l2", "away_back_odds_l3", "away_back_size_l3",
+    "draw_back_odds_l2", "draw_back_size_l2", "draw_back_odds_l3", "draw_back_size_l3",
+    "book_risk_curve",
+]
+
+
+def get_conn(readonly: bool = False):
+    kwargs = {
+        "host": POSTGRES_HOST,
+        "port": POSTGRES_PORT,
+        "dbname": POSTGRES_DB,
+        "user": POSTGRES_USER,
+        "password": POSTGRES_PASSWORD,
+        "connect_timeout": 10,
+    }
+    if PGOPTIONS:
+        kwargs["options"] = PGOPTIONS
+    conn = psycopg2.connect(**kwargs)
+    if readonly:
+        conn.set_session(readonly=True)
+    return conn
+
+
+def compute_row(raw: Dict, runner_metadata: Dict, depth_limit: int = DEPTH_LIMIT) -> Optional[Dict[str, Any]]:
+    """Full derived row for one raw_payload, same formulas as main.py ingestion (None = skip)."""
+    runners = payload_runners(raw)
+    if not runners:
+        return None
+    parsed = parse_book(runners)
+    best_prices = _runner_best_prices(parsed, runner_metadata)
+    if not best_prices:
+        return None
+    book_risk = _book_risk_metrics(parsed, runner_metadata, depth_limit=depth_limit)
+    total_matched = raw.get("totalMatched") or raw.get("total_matched")
+    total_volume = _safe_float(total_matched) if total_matched is not None else sum(
+        _safe_float(r.get("totalMatched") if isinstance(r, dict) else None) for r in runners
+    )
+
+    def _spread(back, lay):
+        return float(lay) - float(back) if back is not None and lay is not None else None
+
+    return {
+        "total_volume": total_volume,
+        "depth_limit": depth_limit,
+        **best_prices,
+        "home_spread": _spread(best_prices.get("home_best_back"), best_prices.get("home_best_lay")),
+        "away_spread": _spread(best_prices.get("away_best_back"), best_prices.get("away_best_lay")),
+        "draw_spread": _spread(best_prices.get("draw_best_back"), best_prices.get("draw_best_lay")),
+        "home_book_risk_l3": book_risk.get("home_book_risk_l3"),
+        "away_book_risk_l3": book_risk.get("away_book_risk_l3"),
+        "draw_book_risk_l3": book_risk.get("draw_book_risk_l3"),
+        # jsonb column: shipped as text through the VALUES list
+        "book_risk_curve": json.dumps(book_risk["book_risk_curve"]) if book_risk.get("book_risk_curve") else None,
+    }
+
+
+def version_job(version: str, depth_limit: int = DEPTH_LIMIT) -> BackfillJob:
+    return BackfillJob(
+        name="recompute_%s" % version,
+        columns=VERSION_COLUMNS,
+        candidate_filter="TRUE",
+        compute=functools.partial(compute_row, depth_limit=depth_limit),
+        column_types={"depth_limit": "integer", "book_risk_curve": "jsonb"},
+        calculation_version=version,
+    )
+
+
+def partition_name(version: str) -> str:
+    return "market_derived_metrics_ver_%s" % version
+
+
+def validate_version(version: str) -> str:
+    version = (version or "").strip().lower()
+    if not VERSION_RE.match(version):
+        raise SystemExit("--version must match [a-z0-9_]{1,40}, got %r" % version)
+    return version
+
+
+def ensure_schema(conn) -> None:
+    with open(SCHEMA_SQL, encoding="utf-8") as f:
+        ddl = f.read()
+    with conn.cursor() as cur:
+        cur.execute(ddl)
+    conn.commit()
+
+
+def ensure_partition(conn, version: str, notes: Optional[str] = None) -> None:
+    """
+    Create the version's partition and registry row. A new version starts as 'building'; re-running an existing
+    one only marks the run (run_status), so a version that is ready (possibly served) stays ready meanwhile.
+    """
+    table = partition_name(version)
+    with conn.cursor() as cur:
+        cur.execute(
+            "CREATE TABLE IF NOT EXISTS public.%s PARTITION OF public.market_derived_metrics_versions FOR VALUES IN (%%s)" % table,
+            (version,),
+        )
+        cur.execute(
+            """
+            INSERT INTO public.metric_calculation_versions
+                (calculation_version, table_name, status, notes, run_status, run_started_at)
+            VALUES (%s, %s, 'building', %s, 'running', now())
+            ON CONFLICT (calculation_version) DO UPDATE SET run_status = 'running', run_started_at = now(),
+                notes = COALESCE(EXCLUDED.notes, public.metric_calculation_versions.notes)
+            """,
+            (version, table, notes),
+        )
+    conn.commit()
+
+
+def mark_ready(conn, version: str, built_through_snapshot_id: int) -> int:
+    """Status ready after a complete run; snapshots up to built_through_snapshot_id are now in the partition."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM public.market_derived_metrics_versions WHERE calculation_version = %s", (version,))
+        row_count = cur.fetchone()[0]
+        cur.execute(
+            """
+            UPDATE public.metric_calculation_versions
+            SET status = 'ready', row_count = %s, completed_at = now(), run_status = 'done',
+                built_through_snapshot_id = GREATEST(COALESCE(built_through_snapshot_id, 0), %s)
+            WHERE calculation_version = %s
+            """,
+            (row_count, built_through_snapshot_id, version),
+        )
+    conn.commit()
+    return row_count
+
+
+def mark_run(conn, version: str, run_status: str) -> None:
+    """Record how an incomplete run ended (status, and a ready version's built range, are left as they were)."""
+    with conn.cursor() as cur:
+        cur.execute(
+            "UPDATE public.metric_calculation_versions SET run_status = %s WHERE calculation_version = %s",
+            (run_status, version),
+        )
+    conn.commit()
+
+
+def activate(conn, version: str) -> None:
+    """Atomic pointer flip: the API serves `version` from its next pointer refresh."""
+    with conn.cursor() as cur:
+        if version != BASELINE_VERSION:
+            cur.execute("SELECT status FROM public.metric_calculation_versions WHERE calculation_version = %s", (version,))
+            row = cur.fetchone()
+            if not row or row[0] != "ready":
+                raise SystemExit("Version %s is not ready (status=%s); run it to completion first" % (version, row[0] if row else None))
+        cur.execute(
+            """
+            INSERT INTO public.metric_version_pointer (slot, calculation_version, switched_at)
+            VALUES (%s, %s, now())
+            ON CONFLICT (slot) DO UPDATE SET calculation_version = EXCLUDED.calculation_version, switched_at = now()
+            """,
+            (SERVED_SLOT, version),
+        )
+    conn.commit()
+    logger.info("Now serving calculation_version=%s", version)
+
+
+def served_version(conn) -> str:
+    with conn.cursor() as cur:
+        cur.execute("SELECT calculation_version FROM public.metric_version_pointer WHERE slot = %s", (SERVED_SLOT,))
+        row = cur.fetchone()
+    return row[0] if row else BASELINE_VERSION
+
+
+def drop(conn, version: str) -> None:
+    if version == BASELINE_VERSION:
+        raise SystemExit("v1 is the in-place table; nothing to drop")
+    if served_version(conn) == version:
+        raise SystemExit("Version %s is currently served; activate another version first" % version)
+    with conn.cursor() as cur:
+        cur.execute("DROP TABLE IF EXISTS public.%s" % partition_name(version))
+        cur.execute("DELETE FROM public.metric_calculation_versions WHERE calculation_version = %s", (version,))
+        cur.execute("DELETE FROM public.backfill_checkpoint WHERE job_name = %s", ("recompute_%s" % version,))
+    conn.commit()
+    logger.info("Dropped calculation_version=%s", version)
+
+
+def status(conn) -> None:
+    logger.info("Served: %s", served_version(conn))
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT calculation_version, status, row_count, created_at, completed_at, built_through_snapshot_id,
+                   run_status, notes
+            FROM public.metric_calculation_versions ORDER BY created_at
+            """
+        )
+        for version, st, rows, created, completed, built_through, run_status, notes in cur.fetchall():
+            logger.info(
+                "  %s: %s rows=%s created=%s completed=%s built_through=%s last_run=%s %s",
+                version, st, rows, created, completed, built_through, run_status, notes or "",
+            )
+
+
+def run(args) -> int:
+    version = validate_version(args.version)
+    if version == BASELINE_VERSION:
+        raise SystemExit("v1 is written in place by the daemon; pick a new version label")
+    conn = get_conn()
+    read_conn = get_conn(readonly=True)
+    try:
+        ensure_schema(conn)
+        ensure_partition(conn, version, notes=args.notes)
+        job = version_job(version, depth_limit=args.depth_limit)
+        stats = run_job(
+            conn, job,
+            limit=args.limit or None, page_size=args.batch_size, workers=args.workers,
+            dry_run=args.dry_run, checkpoint=not args.no_checkpoint, reset=args.reset_checkpoint,
+            read_conn=read_conn,
+        )
+        logger.info(
+            "Recompute %s: processed=%s written=%s skipped=%s errors=%s",
+            version, stats.processed, stats.updated, stats.skipped, stats.errors,
+        )
+        if not args.dry_run and not args.limit and stats.errors == 0:
+            built_through = stats.last_snapshot_id
+            if not args.no_checkpoint:
+                built_through = max(built_through, load_checkpoint(conn, job.name))
+            logger.info("Version %s ready (%s rows)", version, mark_ready(conn, version, built_through))
+        else:
+            mark_run(conn, version, "partial")
+        return 0 if stats.errors == 0 else 1
+    finally:
+        read_conn.close()
+        conn.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Recompute market_derived_metrics side-by-side under a new calculation_version")
+    sub = ap.add_subparsers(dest="command", required=True)
+    p_run = sub.add_parser("run", help="Recompute all snapshots into the version's partition (resumable)")
+    p_run.add_argument("--version", required=True)
+    p_run.add_argument("--limit", type=int, default=0, help="Max snapshots (testing; version is not marked ready)")
+    p_run.add_argument("--depth-limit", type=int, default=DEPTH_LIMIT, help="Book Risk depth (default BF_DEPTH_LIMIT)")
+    p_run.add_argument("--notes", help="Free text stored in metric_calculation_versions (e.g. formula change)")
+    p_run.add_argument("--dry-run", action="store_true")
+    add_engine_args(p_run, default_batch_size=2000)
+    for name, help_text in (("activate", "Serve this version (atomic pointer flip)"), ("drop", "Drop this version's partition")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--version", required=True)
+    sub.add_parser("status", help="Served version and registry")
+    args = ap.parse_args()
+    if not POSTGRES_PASSWORD:
+        logger.error("POSTGRES_PASSWORD not set")
+        sys.exit(1)
+
+    if args.command == "run":
+        sys.exit(run(args))
+    conn = get_conn()
+    try:
+        ensure_schema(conn)
+        if args.command == "activate":
+            activate(conn, validate_version(args.version))
+        elif args.command == "drop":
+            drop(conn, validate_version(args.version))
+        else:
+            status(conn)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
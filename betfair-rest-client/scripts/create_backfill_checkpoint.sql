@@ -0,0 +1,13 @@
+-- Backfill progress per job (backfill_engine.py): resume after the last committed keyset page.
+-- Run once: psql -U netbet -d netbet -f scripts/create_backfill_checkpoint.sql
+-- Or created on first run by backfill_engine.ensure_checkpoint_table (needs CREATE on public).
+
+CREATE TABLE IF NOT EXISTS public.backfill_checkpoint (
+    job_name TEXT PRIMARY KEY,
+    last_snapshot_id BIGINT NOT NULL,
+    updated_rows BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Writer role used by the backfill scripts on VPS
+-- GRANT SELECT, INSERT, UPDATE, DELETE ON public.backfill_checkpoint TO netbet_rest_writer;
@@ -0,0 +1,67 @@
+-- Side-by-side metric recomputation (recompute_version.py).
+-- Each calculation_version lives in its own LIST partition of market_derived_metrics_versions
+-- (market_derived_metrics_ver_<version>), written without touching the hot market_derived_metrics table.
+-- The API serves the version named in metric_version_pointer (slot 'served'); switching is one UPDATE.
+-- 'v1' (or no pointer row) = the in-place market_derived_metrics table written by the daemon.
+-- Run once: psql -U netbet -d netbet -f scripts/create_market_derived_metrics_versions.sql
+-- Or created on first run by recompute_version.py (needs CREATE on public).
+
+CREATE TABLE IF NOT EXISTS public.market_derived_metrics_versions (
+    calculation_version TEXT NOT NULL,
+    snapshot_id BIGINT NOT NULL,
+    snapshot_at TIMESTAMPTZ NOT NULL,
+    market_id TEXT NOT NULL,
+    total_volume DOUBLE PRECISION NOT NULL,
+    home_best_back DOUBLE PRECISION NULL, away_best_back DOUBLE PRECISION NULL, draw_best_back DOUBLE PRECISION NULL,
+    home_best_lay DOUBLE PRECISION NULL, away_best_lay DOUBLE PRECISION NULL, draw_best_lay DOUBLE PRECISION NULL,
+    home_spread DOUBLE PRECISION NULL, away_spread DOUBLE PRECISION NULL, draw_spread DOUBLE PRECISION NULL,
+    depth_limit INTEGER NULL,
+    home_book_risk_l3 DOUBLE PRECISION NULL, away_book_risk_l3 DOUBLE PRECISION NULL, draw_book_risk_l3 DOUBLE PRECISION NULL,
+    home_best_back_size_l1 DOUBLE PRECISION NULL, away_best_back_size_l1 DOUBLE PRECISION NULL, draw_best_back_size_l1 DOUBLE PRECISION NULL,
+    home_best_lay_size_l1 DOUBLE PRECISION NULL, away_best_lay_size_l1 DOUBLE PRECISION NULL, draw_best_lay_size_l1 DOUBLE PRECISION NULL,
+    home_back_odds_l2 DOUBLE PRECISION NULL, home_back_size_l2 DOUBLE PRECISION NULL,
+    home_back_odds_l3 DOUBLE PRECISION NULL, home_back_size_l3 DOUBLE PRECISION NULL,
+    away_back_odds_l2 DOUBLE PRECISION NULL, away_back_size_l2 DOUBLE PRECISION NULL,
+    away_back_odds_l3 DOUBLE PRECISION NULL, away_back_size_l3 DOUBLE PRECISION NULL,
+    draw_back_odds_l2 DOUBLE PRECISION NULL, draw_back_size_l2 DOUBLE PRECISION NULL,
+    draw_back_odds_l3 DOUBLE PRECISION NULL, draw_back_size_l3 DOUBLE PRECISION NULL,
+    book_risk_curve JSONB NULL,
+    PRIMARY KEY (calculation_version, snapshot_id)
+) PARTITION BY LIST (calculation_version);
+
+-- Added after the first release of this table (tables created earlier lack it)
+ALTER TABLE public.market_derived_metrics_versions ADD COLUMN IF NOT EXISTS book_risk_curve JSONB NULL;
+
+CREATE INDEX IF NOT EXISTS idx_mdmv_market_snapshot ON public.market_derived_metrics_versions (market_id, snapshot_at);
+
+-- Registry: one row per recomputed version (status building -> ready)
+CREATE TABLE IF NOT EXISTS public.metric_calculation_versions (
+    calculation_version TEXT PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'building',
+    row_count BIGINT NULL,
+    notes TEXT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    completed_at TIMESTAMPTZ NULL
+);
+
+-- Added later. built_through_snapshot_id: every snapshot up to this id has been recomputed; the API serves newer
+-- snapshots from market_derived_metrics until the next run. run_status / run_started_at: progress of the latest
+-- `run` (running, done, partial), kept apart from status so re-running a ready version does not unready it.
+ALTER TABLE public.metric_calculation_versions ADD COLUMN IF NOT EXISTS built_through_snapshot_id BIGINT NULL;
+ALTER TABLE public.metric_calculation_versions ADD COLUMN IF NOT EXISTS run_status TEXT NULL;
+ALTER TABLE public.metric_calculation_versions ADD COLUMN IF NOT EXISTS run_started_at TIMESTAMPTZ NULL;
+
+-- Pointer: which version the API serves
+CREATE TABLE IF NOT EXISTS public.metric_version_pointer (
+    slot TEXT PRIMARY KEY,
+    calculation_version TEXT NOT NULL,
+    switched_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Example partition (recompute_version.py creates these):
+-- CREATE TABLE public.market_derived_metrics_ver_v2 PARTITION OF public.market_derived_metrics_versions FOR VALUES IN ('v2');
+
+-- API reader role
+-- GRANT SELECT ON public.market_derived_metrics_versions, public.metric_calculation_versions, public.metric_version_pointer TO netbet_analytics_reader;
+-- ALTER DEFAULT PRIVILEGES IN SCHEMA public GRANT SELECT ON TABLES TO netbet_analytics_reader;
@@ -0,0 +1,49 @@
+-- Latest derived-metrics row per market (see latest_metrics.py).
+-- Depends on market_derived_metrics. The REST client creates and seeds it on its first persist cycle; run this
+-- only to build it ahead of a deploy: psql -U netbet -d netbet -f create_market_latest_metrics.sql
+-- Idempotent: re-running refreshes each market to its newest snapshot.
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.market_latest_metrics (
+    market_id TEXT PRIMARY KEY,
+    snapshot_id BIGINT NOT NULL,
+    snapshot_at TIMESTAMPTZ NOT NULL,
+    home_best_back DOUBLE PRECISION NULL, away_best_back DOUBLE PRECISION NULL, draw_best_back DOUBLE PRECISION NULL,
+    home_best_lay DOUBLE PRECISION NULL, away_best_lay DOUBLE PRECISION NULL, draw_best_lay DOUBLE PRECISION NULL,
+    total_volume DOUBLE PRECISION NULL,
+    depth_limit INTEGER NULL,
+    calculation_version TEXT NULL,
+    home_book_risk_l3 DOUBLE PRECISION NULL, away_book_risk_l3 DOUBLE PRECISION NULL, draw_book_risk_l3 DOUBLE PRECISION NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO public.market_latest_metrics (
+    market_id, snapshot_id, snapshot_at,
+    home_best_back, away_best_back, draw_best_back,
+    home_best_lay, away_best_lay, draw_best_lay,
+    total_volume, depth_limit, calculation_version,
+    home_book_risk_l3, away_book_risk_l3, draw_book_risk_l3
+)
+SELECT DISTINCT ON (d.market_id)
+    d.market_id, d.snapshot_id, d.snapshot_at,
+    d.home_best_back, d.away_best_back, d.draw_best_back,
+    d.home_best_lay, d.away_best_lay, d.draw_best_lay,
+    d.total_volume, d.depth_limit, d.calculation_version,
+    d.home_book_risk_l3, d.away_book_risk_l3, d.draw_book_risk_l3
+FROM public.market_derived_metrics d
+ORDER BY d.market_id, d.snapshot_at DESC
+ON CONFLICT (market_id) DO UPDATE SET
+    snapshot_id = EXCLUDED.snapshot_id, snapshot_at = EXCLUDED.snapshot_at,
+    home_best_back = EXCLUDED.home_best_back, away_best_back = EXCLUDED.away_best_back, draw_best_back = EXCLUDED.draw_best_back,
+    home_best_lay = EXCLUDED.home_best_lay, away_best_lay = EXCLUDED.away_best_lay, draw_best_lay = EXCLUDED.draw_best_lay,
+    total_volume = EXCLUDED.total_volume, depth_limit = EXCLUDED.depth_limit, calculation_version = EXCLUDED.calculation_version,
+    home_book_risk_l3 = EXCLUDED.home_book_risk_l3, away_book_risk_l3 = EXCLUDED.away_book_risk_l3,
+    draw_book_risk_l3 = EXCLUDED.draw_book_risk_l3,
+    updated_at = NOW()
+WHERE market_latest_metrics.snapshot_at <= EXCLUDED.snapshot_at;
+
+-- API reader role (required: the API switches to this table as soon as it may SELECT from it)
+GRANT SELECT ON public.market_latest_metrics TO netbet_analytics_reader;
+
+COMMIT;
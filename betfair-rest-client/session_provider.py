@@ -0,0 +1,251 @@
+"""
+Betfair session provider for the REST client scripts (main.py, discovery_hourly.py, discovery_time_window.py).
+
+Same contract as the streaming client's SessionProvider: hand out a valid SSOID before any API call.
+- auth_service: token comes from auth-service (GET /token or the shared token file /data/ssoid),
+  which already does cert login + keepAlive. No login round trip per run/worker.
+- login: direct cert login via betfairlightweight (legacy behaviour).
+On INVALID_SESSION callers ask for a forced refresh; the token is re-fetched from auth-service.
+Direct login fallback (when auth-service has no token) is optional.
+
+Config (env):
+  BF_SESSION_PROVIDER          auth_service | login (default: auth_service if BF_AUTH_TOKEN_URL or
+                               BF_AUTH_TOKEN_FILE is set, else login)
+  BF_AUTH_TOKEN_URL            e.g. http://auth-service:8080/token
+  BF_AUTH_TOKEN_FILE           e.g. /data/ssoid (shared volume with auth-service)
+  BF_AUTH_TOKEN_MAX_AGE_SECONDS  re-read token from auth-service after this many seconds (default 600)
+  BF_SESSION_LOGIN_FALLBACK    1/0 (default 1): cert login when auth-service cannot provide a token
+                               (auth-service is then not retried for BF_AUTH_TOKEN_MAX_AGE_SECONDS)
+"""
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger("betfair_rest_client.session")
+
+AUTH_TOKEN_URL = os.environ.get("BF_AUTH_TOKEN_URL", "")
+AUTH_TOKEN_FILE = os.environ.get("BF_AUTH_TOKEN_FILE", "")
+AUTH_TOKEN_MAX_AGE_SECONDS = int(os.environ.get("BF_AUTH_TOKEN_MAX_AGE_SECONDS", "600"))
+LOGIN_FALLBACK = os.environ.get("BF_SESSION_LOGIN_FALLBACK", "1").lower() in ("1", "true", "yes")
+FETCH_TIMEOUT_SECONDS = 5
+FETCH_RETRIES = 3
+FETCH_RETRY_DELAY_SECONDS = 2
+
+
+class SessionError(Exception):
+    """Raised when a valid session token cannot be obtained."""
+
+
+class SessionProvider:
+    """Returns a valid session token (SSOID). Subclasses implement _fetch()."""
+
+    name = "base"
+    # True if the token is owned by another process (auth-service): callers must not logout() it.
+    shared = False
+
+    def __init__(self, max_age_seconds: Optional[int] = None):
+        self._token: Optional[str] = None
+        self._fetched_at = 0.0
+        self._max_age = max_age_seconds
+
+    def get_valid_session(self, force_refresh: bool = False) -> str:
+        """Cached token unless force_refresh or older than max age. Raises SessionError."""
+        age = time.monotonic() - self._fetched_at
+        if self._token and not force_refresh and (self._max_age is None or age < self._max_age):
+            return self._token
+        token = self._fetch(force_refresh)
+        if not token or not token.strip():
+            raise SessionError("%s provider returned no session token" % self.name)
+        self._token = token.strip()
+        self._fetched_at = time.monotonic()
+        return self._token
+
+    def invalidate(self) -> None:
+        self._token = None
+        self._fetched_at = 0.0
+
+    def _fetch(self, force_refresh: bool) -> Optional[str]:
+        raise NotImplementedError
+
+
+class AuthServiceSessionProvider(SessionProvider):
+    """Token from auth-service: HTTP /token first, then the shared token file."""
+
+    name = "auth_service"
+    shared = True
+
+    def __init__(
+        self,
+        token_url: Optional[str] = None,
+        token_file: Optional[str] = None,
+        max_age_seconds: Optional[int] = AUTH_TOKEN_MAX_AGE_SECONDS,
+    ):
+        super().__init__(max_age_seconds=max_age_seconds)
+        self.token_url = token_url or None
+        self.token_file = Path(token_file) if token_file else None
+        if not self.token_url and not self.token_file:
+            raise ValueError("AuthServiceSessionProvider needs token_url or token_file")
+
+    def _fetch_url(self) -> Optional[str]:
+        for attempt in range(1, FETCH_RETRIES + 1):
+            try:
+                with urllib.request.urlopen(self.token_url, timeout=FETCH_TIMEOUT_SECONDS) as resp:
+                    body = json.loads(resp.read().decode("utf-8"))
+                if body.get("status") == "valid" and body.get("ssoid"):
+                    return body["ssoid"]
+                logger.warning("auth-service token invalid (attempt %d/%d): status=%s", attempt, FETCH_RETRIES, body.get("status"))
+            except urllib.error.HTTPError as e:
+                # 503 = auth-service up but no session yet
+                logger.warning("auth-service token fetch HTTP %s (attempt %d/%d)", e.code, attempt, FETCH_RETRIES)
+            except (urllib.error.URLError, OSError, ValueError) as e:
+                logger.warning("auth-service token fetch failed (attempt %d/%d): %s - %s", attempt, FETCH_RETRIES, self.token_url, e)
+            if attempt < FETCH_RETRIES:
+                time.sleep(FETCH_RETRY_DELAY_SECONDS)
+        return None
+
+    def _fetch_file(self) -> Optional[str]:
+        try:
+            token = self.token_file.read_text(encoding="utf-8").strip()
+        except OSError as e:
+            logger.warning("Could not read token file %s: %s", self.token_file, e)
+            return None
+        return token or None
+
+    def _fetch(self, force_refresh: bool) -> Optional[str]:
+        token = None
+        if self.token_url:
+            token = self._fetch_url()
+        if not token and self.token_file:
+            token = self._fetch_file()
+        if token:
+            logger.info("Session token obtained from auth-service (%s).", "refresh" if force_refresh else "fetch")
+        return token
+
+
+class LoginSessionProvider(SessionProvider):
+    """Direct cert login on the given APIClient (keep_alive while the session is fresh)."""
+
+    name = "login"
+
+    def __init__(self, trading: Any):
+        super().__init__(max_age_seconds=0)
+        self._trading = trading
+
+    def _fetch(self, force_refresh: bool) -> Optional[str]:
+        trading = self._trading
+        if force_refresh or getattr(trading, "session_expired", True):
+            logger.info("Session expired or missing, performing login...")
+            trading.login()
+        else:
+            try:
+                trading.keep_alive()
+            except Exception as e:
+                logger.warning("keep_alive failed (%s), will re-login", e)
+                trading.login()
+        if getattr(trading, "session_expired", True):
+            return None
+        return trading.session_token
+
+
+class FallbackSessionProvider(SessionProvider):
+    """
+    Try primary (auth-service); on SessionError use fallback (direct login). After a fallback the primary is not
+    probed again for cooldown_seconds (default: the primary's max age), so an auth-service outage costs its fetch
+    retries once per cooldown rather than on every call.
+    """
+
+    def __init__(self, primary: SessionProvider, fallback: SessionProvider, cooldown_seconds: Optional[float] = None):
+        super().__init__(max_age_seconds=0)
+        self.primary = primary
+        self.fallback = fallback
+        self.name = "%s+%s" % (primary.name, fallback.name)
+        self._active: SessionProvider = primary
+        if cooldown_seconds is None:
+            cooldown_seconds = primary._max_age if primary._max_age is not None else AUTH_TOKEN_MAX_AGE_SECONDS
+        self._cooldown = float(cooldown_seconds)
+        self._fallback_until = 0.0
+
+    @property
+    def shared(self) -> bool:
+        return self._active.shared
+
+    def _fetch(self, force_refresh: bool) -> Optional[str]:
+        if time.monotonic() < self._fallback_until:
+            return self.fallback.get_valid_session(force_refresh=force_refresh)
+        try:
+            token = self.primary.get_valid_session(force_refresh=force_refresh)
+            self._active = self.primary
+            return token
+        except SessionError as e:
+            logger.warning("%s; falling back to direct login for %.0fs.", e, self._cooldown)
+        self._fallback_until = time.monotonic() + self._cooldown
+        self._active = self.fallback
+        return self.fallback.get_valid_session(force_refresh=force_refresh)
+
+
+def provider_kind_from_env() -> str:
+    kind = (os.environ.get("BF_SESSION_PROVIDER") or "").strip().lower()
+    if kind in ("auth_service", "login"):
+        return kind
+    return "auth_service" if (AUTH_TOKEN_URL or AUTH_TOKEN_FILE) else "login"
+
+
+def needs_direct_login() -> bool:
+    """True if cert credentials are required (login provider, or auth-service with login fallback)."""
+    return provider_kind_from_env() == "login" or LOGIN_FALLBACK
+
+
+def provider_from_env(trading: Any) -> SessionProvider:
+    """Build the configured provider for this APIClient."""
+    if provider_kind_from_env() == "login":
+        return LoginSessionProvider(trading)
+    primary = AuthServiceSessionProvider(AUTH_TOKEN_URL, AUTH_TOKEN_FILE)
+    if LOGIN_FALLBACK:
+        return FallbackSessionProvider(primary, LoginSessionProvider(trading))
+    return primary
+
+
+def is_invalid_session(ex: Exception) -> bool:
+    """True if a Betfair call failed because the session token is no longer valid."""
+    code = getattr(ex, "error_code", None)
+    if code in ("INVALID_SESSION_INFORMATION", "NO_SESSION", "SESSION_EXPIRED"):
+        return True
+    msg = str(ex).upper()
+    return "INVALID_SESSION" in msg or "NO_SESSION" in msg or "SESSION_EXPIRED" in msg
+
+
+def refresh_on_invalid_session(ex: Exception, trading: Any, provider: Optional[SessionProvider]) -> bool:
+    """If ex is INVALID_SESSION, re-fetch the token and re-inject it. Returns True if refreshed."""
+    if provider is None or not is_invalid_session(ex):
+        return False
+    logger.warning("Invalid session (%s); re-fetching token via %s.", ex, provider.name)
+    provider.invalidate()
+    return apply_session(trading, provider, force_refresh=True)
+
+
+def apply_session(trading: Any, provider: SessionProvider, force_refresh: bool = False) -> bool:
+    """Inject a valid token into the APIClient. Returns False (logged) if none can be obtained."""
+    try:
+        token = provider.get_valid_session(force_refresh=force_refresh)
+    except Exception as e:
+        logger.error("Could not obtain session (%s): %s", provider.name, e)
+        return False
+    trading.set_session_token(token)
+    return True
+
+
+def release_session(trading: Any, provider: SessionProvider) -> None:
+    """Logout only if this process owns the session; never logout a shared auth-service token."""
+    if provider.shared:
+        logger.info("Shared auth-service session; skipping logout.")
+        return
+    try:
+        trading.logout()
+        logger.info("Logout completed.")
+    except Exception as e:
+        logger.warning("Logout failed: %s", e)
@@ -0,0 +1,169 @@
+"""
+Unit tests for backfill_engine (pure parts: compute chunk, batched UPDATE SQL, metadata map).
+No database: run_job itself is exercised by the backfill scripts against Postgres.
+"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import backfill_engine as be
+from backfill_book_risk_l3 import JOB as BOOK_RISK_JOB
+from backfill_l1_backsize import JOB as L1_JOB
+
+META = {1001: "HOME", 1002: "AWAY", 1003: "DRAW"}
+
+
+def _payload(runners_atb):
+    return json.dumps({
+        "runners": [
+            {"selectionId": sid, "totalMatched": 0.0, "ex": {"availableToBack": atb}}
+            for sid, atb in runners_atb
+        ]
+    })
+
+
+def test_compute_chunk_statuses():
+    good = _payload([
+        (1001, [[2.96, 321.0], [2.98, 103.0], [3.00, 583.0]]),
+        (1002, [[2.32, 813.0], [2.34, 1105.0], [2.36, 153.0]]),
+        (1003, [[3.85, 138.0], [3.90, 82.0], [3.95, 21.0]]),
+    ])
+    two_runners = _payload([(1001, [[2.0, 10.0]]), (1002, [[3.0, 10.0]])])
+    items = [(1, good, META), (2, "{not json", META), (3, None, META), (4, two_runners, META)]
+    out = be._compute_chunk(BOOK_RISK_JOB.compute, BOOK_RISK_JOB.columns, items)
+    by_id = {sid: (status, value) for sid, status, value in out}
+    assert by_id[1][0] == be.STATUS_OK
+    assert abs(by_id[1][1][0] - (-312.90)) < 0.02  # home_book_risk_l3, same as test_risk golden example
+    assert by_id[2][0] == be.STATUS_ERROR
+    assert by_id[3][0] == be.STATUS_SKIP
+    assert by_id[4][0] == be.STATUS_SKIP
+
+
+def test_compute_chunk_all_none_is_skipped():
+    payload = _payload([(1001, []), (1002, []), (1003, [])])
+    out = be._compute_chunk(L1_JOB.compute, L1_JOB.columns, [(7, payload, META)])
+    assert out == [(7, be.STATUS_SKIP, None)]
+
+
+def test_build_update_sql_set_and_coalesce():
+    sql, template = be.build_update_sql(BOOK_RISK_JOB)
+    assert "FROM (VALUES %s) AS v(snapshot_id, home_book_risk_l3, away_book_risk_l3, draw_book_risk_l3)" in sql
+    assert "home_book_risk_l3 = v.home_book_risk_l3" in sql
+    assert template == "(%s::bigint, %s::double precision, %s::double precision, %s::double precision)"
+    sql, _ = be.build_update_sql(L1_JOB)
+    assert "home_best_back_size_l1 = COALESCE(d.home_best_back_size_l1, v.home_best_back_size_l1)" in sql
+    assert "AND (d.home_best_back_size_l1 IS NULL OR" in sql
+
+
+def test_metadata_map_requires_all_three_selections():
+    row = {"home_selection_id": 1, "away_selection_id": 2, "draw_selection_id": 3}
+    assert be.metadata_map_from_row(row) == {1: "HOME", 2: "AWAY", 3: "DRAW"}
+    assert be.metadata_map_from_row(dict(row, draw_selection_id=None)) is None
+
+
+class _NamedCursor:
+    """Stand-in for a psycopg2 server-side cursor: records the query, serves rows via fetchmany."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.itersize = None
+        self.sql = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params):
+        self.sql = sql
+
+    def fetchmany(self, n):
+        out, self.rows = self.rows[:n], self.rows[n:]
+        return out
+
+
+class _ReadConn:
+    def __init__(self, rows):
+        self.cur = _NamedCursor(rows)
+        self.cursor_name = None
+
+    def cursor(self, name=None):
+        self.cursor_name = name
+        return self.cur
+
+
+def test_streamed_pages_single_join_query_in_chunks():
+    rows = [
+        (1, "1.1", "{}", 1001, 1002, 1003),
+        (2, "1.1", "{}", 1001, 1002, 1003),
+        (3, "1.2", "{}", None, None, None),
+    ]
+    read_conn = _ReadConn(rows)
+    pages = list(be._streamed_pages(read_conn, L1_JOB, 0, None, 2))
+    assert read_conn.cursor_name == "backfill_l1_backsize"  # named = server-side cursor
+    assert "LEFT JOIN public.market_event_metadata" in read_conn.cur.sql
+    assert [len(p) for p in pages] == [2, 1]
+    assert pages[0][0] == (1, "{}", META)
+    assert pages[1][0] == (3, "{}", None)  # no metadata -> skipped by run_job
+
+
+def test_versioned_job_inserts_into_side_table():
+    from recompute_version import version_job
+
+    job = version_job("v2", depth_limit=3)
+    sql, template = be.build_write_sql(job)
+    assert sql.startswith("INSERT INTO public.market_derived_metrics_versions")
+    assert "SELECT 'v2', v.snapshot_id, m.snapshot_at, m.market_id" in sql
+    assert "ON CONFLICT (calculation_version, snapshot_id) DO UPDATE" in sql
+    assert "%s::integer" in template  # depth_limit
+    payload = _payload([(1001, [[2.0, 10.0]]), (1002, [[3.0, 10.0]]), (1003, [[4.0, 10.0]])])
+    [(sid, status, values)] = be._compute_chunk(job.compute, job.columns, [(9, payload, META)])
+    row = dict(zip(job.columns, values))
+    assert status == be.STATUS_OK and row["depth_limit"] == 3 and row["home_best_back"] == 2.0
+
+
+class _RecordingConn:
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self):
+        conn = self
+
+        class _Cur:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params=None):
+                conn.executed.append((" ".join(sql.split()), params))
+
+            def fetchone(self):
+                return (42,)
+
+        return _Cur()
+
+    def commit(self):
+        pass
+
+
+def test_rerun_keeps_ready_version_ready():
+    import recompute_version as rv
+
+    conn = _RecordingConn()
+    rv.ensure_partition(conn, "v2")
+    upsert = conn.executed[1][0]
+    assert "VALUES (%s, %s, 'building', %s, 'running', now())" in upsert  # new versions start building
+    on_conflict = upsert.split("ON CONFLICT")[1]
+    assert "run_status = 'running'" in on_conflict and "status = 'building'" not in on_conflict
+    rv.mark_run(conn, "v2", "partial")
+    assert conn.executed[-1] == (
+        "UPDATE public.metric_calculation_versions SET run_status = %s WHERE calculation_version = %s", ("partial", "v2"),
+    )
+    assert rv.mark_ready(conn, "v2", 9000) == 42
+    assert "GREATEST(COALESCE(built_through_snapshot_id, 0), %s)" in conn.executed[-1][0]
+    assert conn.executed[-1][1] == (42, 9000, "v2")
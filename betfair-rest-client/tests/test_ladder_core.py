@@ -0,0 +1,40 @@
+"""
+Unit tests for ladder_core parsing (shared with the Risk Analytics API) and the writer metrics built on it.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ladder_core import Ladder, back_level_at, best_back_lay, parse_book, role_runners
+from main import _runner_best_prices
+
+META = {1: "HOME", 2: "AWAY", 3: "DRAW"}
+
+
+def test_ladder_parses_pairs_dicts_and_malformed_levels():
+    ladder = Ladder([[2.0, 10], {"price": 2.1, "size": 5}, [2.2, None], [2.3], None, (2.4, "7")])
+    assert ladder.prices == [2.0, 2.1, 2.2, 2.3, 0.0, 2.4]
+    assert ladder.sizes == [10.0, 5.0, 0.0, 0.0, 0.0, 7.0]
+    assert ladder.level(9) == (0.0, 0.0)
+    assert ladder.cumulative(3) == ([10.0, 15.0, 15.0], [10.0, 15.5, 15.5])
+
+
+def test_parse_book_levels_and_best_prices():
+    runners = [
+        {"selectionId": 1, "ex": {"availableToBack": [[2.0, 100.0], [1.98, 0.0], [1.96, 20.0]], "availableToLay": [[2.02, 50.0]]}},
+        {"selectionId": 2, "ex": {"availableToBack": [[1.0, 30.0]], "availableToLay": []}},
+        {"selectionId": 3},
+    ]
+    book = parse_book(runners)
+    assert parse_book(book) is book
+    assert set(role_runners(book, META)) == {"HOME", "AWAY", "DRAW"}
+    assert best_back_lay(book[1]) == (2.0, 2.02, 100.0, 50.0)
+    assert best_back_lay(book[2]) == (1.0, 0.0, 0.0, 0.0)  # price <= 1: size dropped, price kept
+    assert back_level_at(book[1], 1) == (0.0, 0.0)  # size 0 is not a level
+    assert back_level_at(book[1], 2) == (1.96, 20.0)
+
+    prices = _runner_best_prices(book, META)
+    assert prices == _runner_best_prices(runners, META)
+    assert prices["home_back_odds_l3"] == 1.96 and prices["home_back_size_l2"] is None
+    assert prices["draw_best_back"] == 0.0 and prices["draw_back_odds_l2"] is None
@@ -0,0 +1,83 @@
+"""
+Unit tests for latest_metrics (market_latest_metrics SQL) and its upsert in main._insert_derived_metrics.
+No database: statements are recorded by a fake connection.
+"""
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import latest_metrics
+import main
+
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((sql, params))
+
+    def fetchone(self):
+        return (self.conn.table_exists,)
+
+
+class _Conn:
+    def __init__(self, table_exists=False):
+        self.table_exists = table_exists
+        self.executed = []
+        self.commits = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_upsert_only_moves_forward():
+    sql = latest_metrics.UPSERT_SQL
+    assert sql.startswith("INSERT INTO public.market_latest_metrics (market_id, snapshot_id, snapshot_at,")
+    assert "%(home_book_risk_l3)s" in sql and "snapshot_id = EXCLUDED.snapshot_id" in sql
+    assert sql.endswith("WHERE market_latest_metrics.snapshot_at <= EXCLUDED.snapshot_at")
+    assert "DISTINCT ON (d.market_id)" in latest_metrics.SEED_SQL
+
+
+def test_refresh_sql_copies_shared_columns_only():
+    sql = latest_metrics.refresh_sql(["home_book_risk_l3", "away_book_risk_l3", "home_best_back_size_l1"])
+    assert "SET home_book_risk_l3 = d.home_book_risk_l3, away_book_risk_l3 = d.away_book_risk_l3 FROM" in sql
+    assert sql.endswith("l.snapshot_id = ANY(%s)")
+    assert latest_metrics.refresh_sql(["home_best_back_size_l1"]) is None
+
+
+def test_ensure_table_creates_and_seeds_once(monkeypatch):
+    monkeypatch.setattr(latest_metrics, "_ready", False)
+    conn = _Conn(table_exists=False)
+    latest_metrics.ensure_table(conn)
+    latest_metrics.ensure_table(conn)
+    statements = [sql for sql, _ in conn.executed]
+    assert statements[1:] == [latest_metrics.CREATE_SQL, latest_metrics.SEED_SQL, latest_metrics.GRANT_SQL]
+    assert "GRANT SELECT ON public.market_latest_metrics TO netbet_analytics_reader" in latest_metrics.GRANT_SQL
+    monkeypatch.setattr(latest_metrics, "_ready", False)
+    conn = _Conn(table_exists=True)
+    latest_metrics.ensure_table(conn)
+    # Existing table is not reseeded, but the reader grant is (re)applied
+    assert [sql for sql, _ in conn.executed][1:] == [latest_metrics.GRANT_SQL]
+
+
+def test_insert_derived_metrics_upserts_latest_in_same_transaction():
+    conn = _Conn()
+    snapshot_at = datetime(2026, 2, 14, 12, tzinfo=timezone.utc)
+    metrics = {"total_volume": 1000.0, "home_best_back": 2.1, "depth_limit": 3, "home_book_risk_l3": -12.5}
+    main._insert_derived_metrics(conn, 42, snapshot_at, "1.234", metrics)
+    (insert_sql, params), (upsert_sql, upsert_params) = conn.executed
+    assert "INSERT INTO market_derived_metrics" in insert_sql and upsert_sql == latest_metrics.UPSERT_SQL
+    assert upsert_params is params and conn.commits == 1
+    assert all(c in params for c in ("market_id",) + latest_metrics.COLUMNS)
@@ -14,7 +14,7 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 import pytest
-from risk import compute_book_risk_l3
+from risk import BookRiskState, book_risk_at_depth, book_risk_from_level_updates, book_risk_curve_payload, compute_book_risk_curve, compute_book_risk_l3
 
 
 def _runner(selection_id: int, total_matched: float, available_to_back: list) -> dict:
@@ -77,3 +77,90 @@ def test_book_risk_l3_missing_role_returns_none():
     metadata = {1: "HOME", 2: "AWAY"}  # no DRAW
     out = compute_book_risk_l3(runners, metadata, depth_limit=3)
     assert out is None
+
+
+# --- Book Risk curve (all depths in one pass) ---
+
+
+def test_book_risk_curve_matches_l3_at_every_depth():
+    runners = [
+        _runner(1001, 0.0, [[2.96, 321.0], [2.98, 103.0], [3.00, 583.0]]),
+        _runner(1002, 0.0, [[2.32, 813.0], [2.34, 1105.0], [2.36, 153.0]]),
+        _runner(1003, 0.0, [[3.85, 138.0], [3.90, 82.0], [3.95, 21.0]]),
+    ]
+    metadata = {1001: "HOME", 1002: "AWAY", 1003: "DRAW"}
+    curve = compute_book_risk_curve(runners, metadata, max_depth=5)
+    assert len(curve["HOME"]["risk"]) == 5
+    for depth in range(1, 6):
+        assert book_risk_at_depth(curve, depth) == compute_book_risk_l3(runners, metadata, depth_limit=depth)
+    # Ladders have 3 levels: depths 4 and 5 carry depth 3 forward
+    assert curve["AWAY"]["back_size"][2:] == [2071.0, 2071.0, 2071.0]
+    assert abs(curve["HOME"]["risk"][2] - (-312.90)) < 0.02
+
+
+def test_book_risk_curve_lay_side_and_payload():
+    runners = [
+        {"selectionId": 1, "ex": {"availableToBack": [[2.0, 100.0]], "availableToLay": [[2.1, 40.0], [2.2, 10.0]]}},
+        {"selectionId": 2, "ex": {"availableToBack": [[3.0, 50.0]], "availableToLay": []}},
+        {"selectionId": 3, "ex": {"availableToBack": [], "availableToLay": [[4.0, 0.0]]}},
+    ]
+    metadata = {1: "HOME", 2: "AWAY", 3: "DRAW"}
+    curve = compute_book_risk_curve(runners, metadata, max_depth=2)
+    assert curve["HOME"]["lay_size"] == [40.0, 50.0]
+    assert curve["HOME"]["lay_liability"] == pytest.approx([44.0, 56.0])
+    assert curve["DRAW"]["lay_liability"] == [0.0, 0.0]
+    payload = book_risk_curve_payload(curve)
+    assert payload["depth"] == 2
+    assert set(payload) == {"depth", "home", "away", "draw"}
+    assert payload["home"]["risk"] == [50.0, 50.0]  # 100*(2-1) - 50
+    assert compute_book_risk_curve(runners, {1: "HOME", 2: "AWAY"}, max_depth=2) is None
+
+
+# --- Incremental Book Risk (level deltas) ---
+
+
+def test_book_risk_state_level_deltas_match_full_recompute():
+    metadata = {1001: "HOME", 1002: "AWAY", 1003: "DRAW"}
+    ladders = {
+        1001: [[2.96, 321.0], [2.98, 103.0], [3.00, 583.0]],
+        1002: [[2.32, 813.0], [2.34, 1105.0], [2.36, 153.0]],
+        1003: [[3.85, 138.0], [3.90, 82.0], [3.95, 21.0]],
+    }
+    state = BookRiskState(metadata, depth_limit=3)
+    for sid, atb in ladders.items():
+        for level, (price, size) in enumerate(atb):
+            state.apply_level(sid, "B", level, price, size)
+    assert abs(state.risk()["home_book_risk_l3"] - (-312.90)) < 0.02
+
+    # In-window size change, level vanishing (deeper level shifts in), lay update ignored
+    assert state.apply_level(1001, "B", 1, 2.98, 200.0)
+    assert state.apply_level(1002, "B", 3, 2.38, 40.0) is False  # below a full window
+    assert state.apply_level(1002, "B", 0, 2.32, 0.0)
+    assert state.apply_level(1003, "L", 0, 4.0, 500.0) is False
+    ladders[1001][1] = [2.98, 200.0]
+    ladders[1002] = [[2.34, 1105.0], [2.36, 153.0], [2.38, 40.0]]
+    runners = [_runner(sid, 0.0, atb) for sid, atb in ladders.items()]
+    expected = compute_book_risk_l3(runners, metadata, depth_limit=3)
+    assert state.risk() == pytest.approx(expected)
+
+
+def test_book_risk_state_rest_books_and_tick_series():
+    metadata = {1: "HOME", 2: "AWAY", 3: "DRAW"}
+    state = BookRiskState(metadata, depth_limit=3)
+    assert state.risk() is None
+    book = [_runner(1, 0.0, [[2.0, 100.0]]), _runner(2, 0.0, [[3.0, 50.0], [3.1, 50.0]]), _runner(3, 0.0, [])]
+    state.apply_book(book)
+    assert state.risk() == pytest.approx(compute_book_risk_l3(book, metadata, depth_limit=3))
+    book[2] = _runner(3, 0.0, [[4.0, 10.0]])
+    assert state.apply_book(book) == 1  # only the changed level is applied
+
+    updates = [
+        ("t1", 1, "B", 0, 2.0, 100.0),
+        ("t1", 2, "B", 0, 3.0, 50.0),
+        ("t2", 2, "L", 0, 3.2, 10.0),  # lay only: no point emitted
+        ("t3", 3, "B", 0, 4.0, 10.0),
+    ]
+    baseline = [(3, "B", 0, 4.0, 0.0)]
+    series = list(book_risk_from_level_updates(updates, metadata, baseline=baseline))
+    assert [t for t, _ in series] == ["t1", "t3"]
+    assert series[-1][1]["home_book_risk_l3"] == pytest.approx(100.0 - 60.0)
@@ -0,0 +1,130 @@
+"""
+Unit tests for session_provider (shared auth-service token, INVALID_SESSION refresh, login fallback).
+No network: auth-service is read from a token file; the APIClient is a stub.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+import session_provider as sp
+
+
+class _StubClient:
+    """Minimal stand-in for betfairlightweight.APIClient session handling."""
+
+    def __init__(self):
+        self.session_token = None
+        self.session_expired = True
+        self.login_calls = 0
+        self.logout_calls = 0
+
+    def set_session_token(self, token):
+        self.session_token = token
+        self.session_expired = False
+
+    def login(self):
+        self.login_calls += 1
+        self.set_session_token("direct-login-token")
+
+    def keep_alive(self):
+        pass
+
+    def logout(self):
+        self.logout_calls += 1
+
+
+class _InvalidSession(Exception):
+    error_code = "INVALID_SESSION_INFORMATION"
+
+
+def test_token_file_injected_and_cached(tmp_path):
+    token_file = tmp_path / "ssoid"
+    token_file.write_text("tok-1\n", encoding="utf-8")
+    provider = sp.AuthServiceSessionProvider(token_file=str(token_file), max_age_seconds=600)
+    client = _StubClient()
+    assert sp.apply_session(client, provider)
+    assert client.session_token == "tok-1"
+    # Cached: file change not seen until refresh
+    token_file.write_text("tok-2", encoding="utf-8")
+    assert provider.get_valid_session() == "tok-1"
+    assert provider.get_valid_session(force_refresh=True) == "tok-2"
+
+
+def test_invalid_session_refetches_token(tmp_path):
+    token_file = tmp_path / "ssoid"
+    token_file.write_text("old", encoding="utf-8")
+    provider = sp.AuthServiceSessionProvider(token_file=str(token_file))
+    client = _StubClient()
+    sp.apply_session(client, provider)
+    token_file.write_text("rotated", encoding="utf-8")
+    assert sp.refresh_on_invalid_session(_InvalidSession("INVALID_SESSION_INFORMATION"), client, provider)
+    assert client.session_token == "rotated"
+    # Non-session errors are left to the caller
+    assert not sp.refresh_on_invalid_session(ValueError("TOO_MUCH_DATA"), client, provider)
+
+
+def test_missing_token_falls_back_to_login(tmp_path):
+    client = _StubClient()
+    primary = sp.AuthServiceSessionProvider(token_file=str(tmp_path / "missing"))
+    provider = sp.FallbackSessionProvider(primary, sp.LoginSessionProvider(client))
+    assert sp.apply_session(client, provider)
+    assert client.session_token == "direct-login-token"
+    assert client.login_calls == 1
+    assert not provider.shared
+
+
+def test_fallback_skips_primary_during_cooldown(tmp_path, monkeypatch):
+    client = _StubClient()
+    token_file = tmp_path / "ssoid"
+    primary = sp.AuthServiceSessionProvider(token_file=str(token_file), max_age_seconds=600)
+    probes = []
+    real_fetch = primary._fetch
+    monkeypatch.setattr(primary, "_fetch", lambda force: probes.append(force) or real_fetch(force))
+    provider = sp.FallbackSessionProvider(primary, sp.LoginSessionProvider(client))
+    now = [1000.0]
+    monkeypatch.setattr(sp.time, "monotonic", lambda: now[0])
+    assert provider.get_valid_session() == "direct-login-token"
+    token_file.write_text("auth-token", encoding="utf-8")
+    # Within the primary's max age: direct login only, auth-service is not probed again
+    now[0] += 599
+    assert provider.get_valid_session() == "direct-login-token"
+    assert provider.get_valid_session(force_refresh=True) == "direct-login-token"
+    assert len(probes) == 1 and not provider.shared
+    # Cooldown over: back on the shared token
+    now[0] += 2
+    assert provider.get_valid_session() == "auth-token"
+    assert len(probes) == 2 and provider.shared
+
+
+def test_no_fallback_fails_without_login(tmp_path):
+    client = _StubClient()
+    provider = sp.AuthServiceSessionProvider(token_file=str(tmp_path / "missing"))
+    assert not sp.apply_session(client, provider)
+    assert client.login_calls == 0
+    with pytest.raises(sp.SessionError):
+        provider.get_valid_session()
+
+
+def test_shared_session_is_not_logged_out(tmp_path):
+    token_file = tmp_path / "ssoid"
+    token_file.write_text("shared", encoding="utf-8")
+    provider = sp.AuthServiceSessionProvider(token_file=str(token_file))
+    client = _StubClient()
+    sp.apply_session(client, provider)
+    sp.release_session(client, provider)
+    assert client.logout_calls == 0
+    sp.release_session(client, sp.LoginSessionProvider(client))
+    assert client.logout_calls == 1
+
+
+def test_failed_fetch_forces_new_token_only_on_invalid_session(monkeypatch):
+    import main
+
+    forced = []
+    monkeypatch.setattr(main, "_ensure_session", lambda trading, force_refresh=False: forced.append(force_refresh) or True)
+    assert main._recover_session(_StubClient(), TimeoutError("Read TIMEOUT on listMarketBook"))
+    assert main._recover_session(_StubClient(), _InvalidSession("INVALID_SESSION_INFORMATION"))
+    # A timeout is a session error for the backoff, but only INVALID_SESSION replaces the token
+    assert main.is_session_error(TimeoutError("TIMEOUT")) and forced == [False, True]
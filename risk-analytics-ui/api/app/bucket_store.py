@@ -0,0 +1,328 @@
+"""
+Materialized 15-minute stream buckets: public.stream_bucket_metrics (sql/migrations/2026-10-19_create_stream_bucket_metrics.sql).
+
+Each closed bucket of each active market is computed once, with the same code as the endpoints
+(stream_data._bulk_bucket_enrichment at effective_end = bucket_end, i.e. _compute_median_from_rows semantics),
+and stored keyed by (market_id, bucket_start). The timeseries and event-aware buckets endpoints read closed buckets
+from the table and compute only the live bucket (and any closed bucket not stored yet).
+
+Worker: runs in the API process (daemon thread, like the partition provisioner) every BUCKET_STORE_INTERVAL_SECONDS.
+It writes the buckets that closed since its watermark (bucket end + BUCKET_STORE_GRACE_SECONDS for late ticks),
+for markets with ladder updates in the STALE_MINUTES before the bucket end. Advisory lock: one writer across
+replicas. Needs POSTGRES_BUCKET_STORE_USER / POSTGRES_BUCKET_STORE_PASSWORD (INSERT/UPDATE on the two tables);
+without them the worker does not start and the endpoints compute every bucket as before.
+
+Usage (same env as the API):
+  python -m app.bucket_store run-once
+  python -m app.bucket_store backfill --from 2026-02-01T00:00:00Z --to 2026-02-15T00:00:00Z [--market 1.234 ...]
+  python -m app.bucket_store check --from 2026-02-14T00:00:00Z --to 2026-02-15T00:00:00Z [--market 1.234 ...]
+
+backfill is idempotent (upsert) and also repairs buckets that received ticks after they were stored;
+check recomputes stored rows on the fly and exits 1 on any difference.
+"""
+import argparse
+import logging
+import math
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from psycopg2.extras import execute_values
+
+from app.stream_data import (
+    BUCKET_METRICS_VERSION,
+    STALE_MINUTES,
+    STORED_BUCKET_COLUMNS,
+    _activity_watermark,
+    _bucket_15_utc,
+    _bucket_times_in_range,
+    _bulk_bucket_enrichment,
+    _index_stored_buckets,
+    _latest_publish_by_market,
+    _stored_bucket_row,
+)
+from app.writer_worker import WriterWorker, _writer_conn
+
+logger = logging.getLogger(__name__)
+
+BUCKET_STORE_LOCK_ID = 1234567890123457
+INTERVAL_SECONDS = float(os.environ.get("BUCKET_STORE_INTERVAL_SECONDS", "60"))
+GRACE_SECONDS = float(os.environ.get("BUCKET_STORE_GRACE_SECONDS", "60"))
+# After a long outage the worker resumes from at most this many buckets back; older ones need `backfill`.
+MAX_CATCHUP_BUCKETS = int(os.environ.get("BUCKET_STORE_MAX_CATCHUP_BUCKETS", "96"))
+BUCKET = timedelta(minutes=15)
+
+_SQL_ACTIVE_MARKETS = """
+    WITH active AS (
+        SELECT DISTINCT market_id
+        FROM stream_ingest.ladder_levels
+        WHERE publish_time >= %s AND publish_time < %s
+    )
+    SELECT m.market_id, m.home_selection_id, m.away_selection_id, m.draw_selection_id
+    FROM active a
+    JOIN market_event_metadata m ON m.market_id = a.market_id
+"""
+_SQL_MARKETS = """
+    SELECT market_id, home_selection_id, away_selection_id, draw_selection_id
+    FROM market_event_metadata
+    WHERE market_id = ANY(%s)
+"""
+_SQL_LAST_PUBLISH = """
+    SELECT market_id, MAX(publish_time) AS t
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = ANY(%s) AND publish_time <= %s
+    GROUP BY market_id
+"""
+_SQL_BUCKET_TICKS = """
+    SELECT market_id,
+           COUNT(*) AS ticks,
+           COUNT(*) FILTER (WHERE side = 'B' AND level = 0) AS tick_count
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = ANY(%s) AND publish_time >= %s AND publish_time < %s
+    GROUP BY market_id
+"""
+_SQL_UPSERT = """
+    INSERT INTO stream_bucket_metrics (market_id, bucket_start, calculation_version, bucket_end, {cols})
+    VALUES %s
+    ON CONFLICT (market_id, bucket_start) DO UPDATE SET
+        calculation_version = EXCLUDED.calculation_version,
+        bucket_end = EXCLUDED.bucket_end,
+        {updates},
+        computed_at = now()
+""".format(
+    cols=", ".join(STORED_BUCKET_COLUMNS),
+    updates=", ".join(f"{c} = EXCLUDED.{c}" for c in STORED_BUCKET_COLUMNS),
+)
+
+
+def last_closed_bucket(now: Optional[datetime] = None) -> datetime:
+    """Start of the latest bucket whose end is at least GRACE_SECONDS in the past."""
+    now = now or datetime.now(timezone.utc)
+    return _bucket_15_utc(now - timedelta(seconds=GRACE_SECONDS)) - BUCKET
+
+
+def compute_closed_bucket(
+    cur: Any,
+    bucket_start: datetime,
+    market_ids: Optional[Sequence[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    stream_bucket_metrics rows (STORED_BUCKET_COLUMNS) of one closed bucket: market_id -> row.
+    Markets: market_ids, or those with ladder updates in the STALE_MINUTES before the bucket end. A market gets a row
+    when it has a ladder update at or before bucket_start or inside the bucket (event-aware buckets rule).
+    6 queries whatever the number of markets (up to 8 when the last update comes from the market activity tables), plus
+    ACTIVITY_PROBE_QUERIES + KEYFRAME_PROBE_QUERIES when the watermark probes are due.
+    """
+    bucket_end = bucket_start + BUCKET
+    if market_ids is None:
+        cur.execute(_SQL_ACTIVE_MARKETS, (bucket_end - timedelta(minutes=STALE_MINUTES), bucket_end))
+    else:
+        cur.execute(_SQL_MARKETS, (list(market_ids),))
+    meta_rows = cur.fetchall()
+    ids = [m["market_id"] for m in meta_rows]
+    if not ids:
+        return {}
+    watermark = _activity_watermark(cur)
+    if watermark is not None:
+        last_pt_by_market = _latest_publish_by_market(cur, ids, bucket_start, watermark)
+    else:
+        cur.execute(_SQL_LAST_PUBLISH, (ids, bucket_start))
+        last_pt_by_market = {r["market_id"]: r["t"] for r in cur.fetchall() if r.get("t")}
+    cur.execute(_SQL_BUCKET_TICKS, (ids, bucket_start, bucket_end))
+    ticks_by_market = {r["market_id"]: r for r in cur.fetchall()}
+
+    selections = {}
+    for m in meta_rows:
+        mid = m["market_id"]
+        if mid in last_pt_by_market or (ticks_by_market.get(mid) or {}).get("ticks"):
+            selections[mid] = (m.get("home_selection_id"), m.get("away_selection_id"), m.get("draw_selection_id"))
+    enrichment = _bulk_bucket_enrichment(cur, selections, bucket_start, bucket_end)
+    out = {}
+    for mid, e in enrichment.items():
+        last_pt = last_pt_by_market.get(mid)
+        if last_pt is not None and last_pt.tzinfo is None:
+            last_pt = last_pt.replace(tzinfo=timezone.utc)
+        tick_count = int((ticks_by_market.get(mid) or {}).get("tick_count") or 0)
+        out[mid] = _stored_bucket_row(e, last_pt, tick_count)
+    return out
+
+
+def write_bucket(cur: Any, bucket_start: datetime, rows: Dict[str, Dict[str, Any]]) -> int:
+    """Upsert one bucket's rows; returns the row count."""
+    if not rows:
+        return 0
+    bucket_end = bucket_start + BUCKET
+    values = [
+        (mid, bucket_start, BUCKET_METRICS_VERSION, bucket_end, *(row[c] for c in STORED_BUCKET_COLUMNS))
+        for mid, row in rows.items()
+    ]
+    execute_values(cur, _SQL_UPSERT, values, page_size=500)
+    return len(values)
+
+
+def _read_watermark(cur: Any) -> Optional[datetime]:
+    cur.execute(
+        "SELECT bucket_start FROM stream_bucket_metrics_watermark WHERE calculation_version = %s",
+        (BUCKET_METRICS_VERSION,),
+    )
+    row = cur.fetchone()
+    return row["bucket_start"] if row else None
+
+
+def _write_watermark(cur: Any, bucket_start: datetime) -> None:
+    cur.execute(
+        """
+        INSERT INTO stream_bucket_metrics_watermark (calculation_version, bucket_start)
+        VALUES (%s, %s)
+        ON CONFLICT (calculation_version) DO UPDATE SET bucket_start = EXCLUDED.bucket_start, updated_at = now()
+        """,
+        (BUCKET_METRICS_VERSION, bucket_start),
+    )
+
+
+def pending_buckets(watermark: Optional[datetime], last_closed: datetime) -> List[datetime]:
+    """Closed buckets after the watermark, oldest first, at most MAX_CATCHUP_BUCKETS (only the last one on first run)."""
+    first = watermark + BUCKET if watermark is not None else last_closed
+    first = max(first, last_closed - BUCKET * (MAX_CATCHUP_BUCKETS - 1))
+    return _bucket_times_in_range(first, last_closed + timedelta(seconds=1))
+
+
+def store_pending(cur: Any, now: Optional[datetime] = None) -> int:
+    """Write every bucket closed since the watermark (one transaction per bucket). Returns buckets written."""
+    conn = cur.connection
+    written = 0
+    for bucket_start in pending_buckets(_read_watermark(cur), last_closed_bucket(now)):
+        rows = write_bucket(cur, bucket_start, compute_closed_bucket(cur, bucket_start))
+        _write_watermark(cur, bucket_start)
+        conn.commit()
+        written += 1
+        _worker.count(buckets_written_total=1, rows_written_total=rows)
+        _worker.set(watermark=bucket_start)
+    return written
+
+
+_worker = WriterWorker(
+    "bucket store",
+    BUCKET_STORE_LOCK_ID,
+    store_pending,
+    INTERVAL_SECONDS,
+    {"buckets_written_total": 0, "rows_written_total": 0, "watermark": None},
+)
+
+
+def run_cycle(now: Optional[datetime] = None) -> int:
+    """store_pending() under the advisory lock. Returns buckets written; 0 if another instance holds the lock."""
+    return _worker.run_cycle(now) or 0
+
+
+def worker_status() -> Dict[str, Any]:
+    """Counters and watermark for /metrics."""
+    return _worker.status()
+
+
+def start_background_worker() -> None:
+    """Start the bucket store worker in a daemon thread when writer credentials are configured."""
+    _worker.start("buckets computed on the fly")
+
+
+def _parse_utc(s: str) -> datetime:
+    dt = datetime.fromisoformat(s.replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def backfill(from_dt: datetime, to_dt: datetime, market_ids: Optional[List[str]] = None) -> int:
+    """Compute and upsert closed buckets with bucket_start in [from_dt, to_dt). Returns rows written."""
+    last_closed = last_closed_bucket()
+    buckets = [b for b in _bucket_times_in_range(from_dt, to_dt) if b <= last_closed]
+    conn = _writer_conn()
+    total = 0
+    try:
+        cur = conn.cursor()
+        for i, bucket_start in enumerate(buckets, 1):
+            total += write_bucket(cur, bucket_start, compute_closed_bucket(cur, bucket_start, market_ids))
+            conn.commit()
+            if i % 96 == 0 or i == len(buckets):
+                logger.info("backfill %d/%d buckets (up to %s), %d rows", i, len(buckets), bucket_start.isoformat(), total)
+    finally:
+        conn.close()
+    return total
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, float) and isinstance(b, float):
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+    return a == b
+
+
+def diff_rows(stored: Dict[str, Any], computed: Optional[Dict[str, Any]]) -> List[str]:
+    """Columns where a stored row differs from the on-the-fly result."""
+    if computed is None:
+        return ["no longer computed for this bucket"]
+    return [
+        f"{c}: stored={stored.get(c)!r} computed={computed.get(c)!r}"
+        for c in STORED_BUCKET_COLUMNS
+        if not _same(stored.get(c), computed.get(c))
+    ]
+
+
+def check(from_dt: datetime, to_dt: datetime, market_ids: Optional[List[str]] = None) -> int:
+    """Recompute stored rows in [from_dt, to_dt) on the fly (reader connection). Returns the number of differing rows."""
+    from app.db import cursor
+
+    sql = """
+        SELECT market_id, bucket_start, {cols}
+        FROM stream_bucket_metrics
+        WHERE calculation_version = %s AND bucket_start >= %s AND bucket_start < %s
+    """.format(cols=", ".join(STORED_BUCKET_COLUMNS))
+    params: List[Any] = [BUCKET_METRICS_VERSION, from_dt, to_dt]
+    if market_ids:
+        sql += " AND market_id = ANY(%s)"
+        params.append(market_ids)
+    checked = bad = 0
+    with cursor() as cur:
+        cur.execute(sql, params)
+        by_bucket: Dict[datetime, Dict[str, Dict[str, Any]]] = {}
+        for r in cur.fetchall():
+            for bucket_start, row in _index_stored_buckets([r]).items():
+                by_bucket.setdefault(bucket_start, {})[r["market_id"]] = row
+        for bucket_start in sorted(by_bucket):
+            stored_rows = by_bucket[bucket_start]
+            computed = compute_closed_bucket(cur, bucket_start, list(stored_rows))
+            for mid, stored in sorted(stored_rows.items()):
+                checked += 1
+                diffs = diff_rows(stored, computed.get(mid))
+                if diffs:
+                    bad += 1
+                    logger.warning("mismatch %s %s: %s", mid, bucket_start.isoformat(), "; ".join(diffs))
+    logger.info("check: %d stored rows, %d differ from the on-the-fly result", checked, bad)
+    return bad
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    ap = argparse.ArgumentParser(description="Materialized 15-minute stream buckets (stream_bucket_metrics)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("run-once", help="One worker cycle: buckets closed since the watermark")
+    for name, help_text in (
+        ("backfill", "Compute and upsert closed buckets in a range"),
+        ("check", "Compare stored buckets in a range with the on-the-fly computation (exit 1 on differences)"),
+    ):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--from", dest="from_ts", required=True, help="ISO 8601 UTC, first bucket_start included")
+        p.add_argument("--to", dest="to_ts", required=True, help="ISO 8601 UTC, exclusive")
+        p.add_argument("--market", action="append", help="Restrict to market id(s); repeatable")
+    args = ap.parse_args()
+
+    if args.command == "run-once":
+        logger.info("wrote %d bucket(s)", run_cycle())
+        return
+    from_dt, to_dt = _parse_utc(args.from_ts), _parse_utc(args.to_ts)
+    if args.command == "backfill":
+        logger.info("backfill wrote %d rows", backfill(from_dt, to_dt, args.market))
+    else:
+        sys.exit(1 if check(from_dt, to_dt, args.market) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Column-oriented JSON for the chart endpoints (timeseries, buckets, ticks).
+
+Those endpoints return lists of wide objects that repeat the same 10-40 keys on every row. A client that asks for
+the columnar layout, with `Accept: application/vnd.netbet.columnar+json` or `?layout=columnar`, gets the keys once
+and one array per field instead:
+
+    {"layout": "columnar", "length": 2, "columns": {"snapshot_at": ["...", "..."], "home_best_back": [2.1, 2.12]}}
+
+Row i is {k: columns[k][i] for k in columns}. Keys are in first-seen order over all rows; a row without a key has
+null there. Nested values (bucket runners) stay as they are in the row layout. With `float32=true` every float is
+rounded to float32 precision (7 significant digits), which shortens the numbers' text; prices and sizes keep their
+exchange precision. The default response is unchanged.
+
+Both layouts are serialized once with orjson (app.fast_json), without a jsonable_encoder pass over the rows; cached
+stream results also keep the rendered body (stream_router._respond).
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.responses import Response
+
+from app.fast_json import dumps
+
+COLUMNAR_MEDIA_TYPE = "application/vnd.netbet.columnar+json"
+
+
+def wants_columnar(layout: Optional[str], accept: Optional[str]) -> bool:
+    """Columnar when ?layout=columnar, or when the Accept header names the columnar media type and no layout is given."""
+    if layout:
+        return layout == "columnar"
+    return bool(accept) and COLUMNAR_MEDIA_TYPE in accept
+
+
+def round_float32(value: Any) -> Any:
+    """value with every float (also in lists / dicts) rounded to 7 significant digits."""
+    if isinstance(value, float):
+        return float("%.7g" % value)
+    if isinstance(value, list):
+        return [round_float32(v) for v in value]
+    if isinstance(value, dict):
+        return {k: round_float32(v) for k, v in value.items()}
+    return value
+
+
+def to_columns(rows: Iterable[Dict[str, Any]], float32: bool = False) -> Dict[str, Any]:
+    """{"layout": "columnar", "length": n, "columns": {key: [value per row]}}."""
+    rows = list(rows)
+    keys: Dict[str, None] = {}
+    for r in rows:
+        for k in r:
+            keys.setdefault(k, None)
+    columns: Dict[str, List[Any]] = {k: [r.get(k) for r in rows] for k in keys}
+    if float32:
+        columns = {k: round_float32(v) for k, v in columns.items()}
+    return {"layout": "columnar", "length": len(rows), "columns": columns}
+
+
+def negotiate(
+    rows: List[Dict[str, Any]], layout: Optional[str], accept: Optional[str], float32: bool = False
+) -> Tuple[Any, str]:
+    """(payload, media_type) of rows in the negotiated layout (float32-rounded when asked)."""
+    if wants_columnar(layout, accept):
+        return to_columns(rows, float32), COLUMNAR_MEDIA_TYPE
+    return (round_float32(rows) if float32 else rows), "application/json"
+
+
+def rows_response(rows: List[Dict[str, Any]], layout: Optional[str], accept: Optional[str], float32: bool = False) -> Response:
+    """rows in the negotiated layout, serialized with orjson."""
+    payload, media_type = negotiate(rows, layout, accept, float32)
+    return Response(dumps(payload), media_type=media_type)
@@ -1,8 +1,27 @@
-"""Read-only PostgreSQL connection for Risk Analytics API."""
+"""
+Read-only PostgreSQL connection for Risk Analytics API.
+
+cursor() borrows a connection from a thread-safe pool (POSTGRES_POOL_MIN..POSTGRES_POOL_MAX), commits on exit
+and returns it. Waiting for a free connection is bounded by POSTGRES_POOL_WAIT_SECONDS (PoolTimeout).
+Connections get statement_timeout (POSTGRES_STATEMENT_TIMEOUT_MS) when opened; a connection idle for longer than
+POSTGRES_POOL_HEALTHCHECK_SECONDS is checked with SELECT 1 before reuse, and broken ones are discarded.
+POSTGRES_POOL_MAX=0 disables pooling (one new connection per cursor(), as before).
+
+Per-request pinning: inside request_scope() (RequestConnectionMiddleware, POSTGRES_PIN_PER_REQUEST=1) every
+cursor() of the request reuses one connection, checked out on first use and returned when the response is sent.
+pool_stats() exposes checkouts, wait time, timeouts and usage for /metrics.
+"""
 import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
 import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 from psycopg2.extras import RealDictCursor
-from contextlib import contextmanager
 
 POSTGRES_HOST = os.environ.get("POSTGRES_HOST", "localhost")
 POSTGRES_PORT = int(os.environ.get("POSTGRES_PORT", "5432"))
@@ -15,6 +34,14 @@ POSTGRES_PASSWORD = os.environ.get("POSTGRES_ANALYTICS_READER_PASSWORD") or os.e
     "POSTGRES_PASSWORD", ""
 )
 
+POOL_MIN = int(os.environ.get("POSTGRES_POOL_MIN", "1"))
+POOL_MAX = int(os.environ.get("POSTGRES_POOL_MAX", "10"))
+POOL_WAIT_SECONDS = float(os.environ.get("POSTGRES_POOL_WAIT_SECONDS", "10"))
+POOL_HEALTHCHECK_SECONDS = float(os.environ.get("POSTGRES_POOL_HEALTHCHECK_SECONDS", "30"))
+POOL_MAX_IDLE_SECONDS = float(os.environ.get("POSTGRES_POOL_MAX_IDLE_SECONDS", "300"))
+STATEMENT_TIMEOUT_MS = int(os.environ.get("POSTGRES_STATEMENT_TIMEOUT_MS", "30000"))
+PIN_PER_REQUEST = os.environ.get("POSTGRES_PIN_PER_REQUEST", "1").strip().lower() in ("1", "true", "yes")
+
 
 def get_conn_kwargs():
     return {
@@ -27,11 +54,282 @@ def get_conn_kwargs():
     }
 
 
+def _connect() -> Any:
+    conn = psycopg2.connect(**get_conn_kwargs(), cursor_factory=RealDictCursor)
+    if STATEMENT_TIMEOUT_MS > 0:
+        with conn.cursor() as cur:
+            cur.execute("SET statement_timeout = %s", (STATEMENT_TIMEOUT_MS,))
+        conn.commit()
+    return conn
+
+
+class PoolTimeout(Exception):
+    """No pooled connection became free within the wait timeout."""
+
+
+class ConnectionPool:
+    """
+    Blocking, thread-safe pool of up to maxconn connections (LIFO reuse).
+    Idle connections above minconn are closed after max_idle_seconds; stats() feeds /metrics.
+    """
+
+    def __init__(
+        self,
+        minconn: int,
+        maxconn: int,
+        wait_seconds: float,
+        healthcheck_seconds: float = POOL_HEALTHCHECK_SECONDS,
+        max_idle_seconds: float = POOL_MAX_IDLE_SECONDS,
+        connect: Callable[[], Any] = _connect,
+    ):
+        self.minconn = max(0, min(minconn, maxconn))
+        self.maxconn = maxconn
+        self.wait_seconds = wait_seconds
+        self.healthcheck_seconds = healthcheck_seconds
+        self.max_idle_seconds = max_idle_seconds
+        self._connect = connect
+        self._cond = threading.Condition()
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._opened = 0
+        self._discarded = 0
+        self._healthcheck_failures = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def getconn(self) -> Any:
+        start = time.monotonic()
+        deadline = start + self.wait_seconds
+        with self._cond:
+            while True:
+                self._prune_idle_locked()
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    conn, idle_since = None, None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(f"no database connection free within {self.wait_seconds}s (pool max {self.maxconn})")
+                self._cond.wait(remaining)
+            waited = time.monotonic() - start
+            self._checkouts += 1
+            self._in_use += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        try:
+            if conn is not None and not self._healthy(conn, idle_since):
+                self._close_quietly(conn)
+                with self._cond:
+                    self._discarded += 1
+                conn = None
+            if conn is None:
+                conn = self._connect()
+                with self._cond:
+                    self._opened += 1
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def putconn(self, conn: Any, discard: bool = False) -> None:
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+        discard = discard or bool(conn.closed)
+        if discard:
+            self._close_quietly(conn)
+        with self._cond:
+            self._in_use -= 1
+            if discard:
+                self._size -= 1
+                self._discarded += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self) -> None:
+        with self._cond:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._close_quietly(conn)
+                self._size -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "min": self.minconn,
+                "max": self.maxconn,
+                "checkouts_total": self._checkouts,
+                "timeouts_total": self._timeouts,
+                "opened_total": self._opened,
+                "discarded_total": self._discarded,
+                "healthcheck_failures_total": self._healthcheck_failures,
+                "wait_seconds_total": round(self._wait_total, 6),
+                "wait_seconds_max": round(self._wait_max, 6),
+            }
+
+    def _healthy(self, conn: Any, idle_since: Optional[float]) -> bool:
+        if conn.closed:
+            return False
+        if idle_since is None or time.monotonic() - idle_since < self.healthcheck_seconds:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._healthcheck_failures += 1
+            return False
+
+    def _prune_idle_locked(self) -> None:
+        # Oldest idle connections sit at the left; keep at least minconn open.
+        now = time.monotonic()
+        while len(self._idle) > self.minconn and now - self._idle[0][1] > self.max_idle_seconds:
+            conn, _ = self._idle.popleft()
+            self._close_quietly(conn)
+            self._size -= 1
+
+    @staticmethod
+    def _close_quietly(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[ConnectionPool]:
+    """Process-wide pool, created on first use; None when pooling is disabled (POSTGRES_POOL_MAX=0)."""
+    global _pool
+    if POOL_MAX <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(POOL_MIN, POOL_MAX, POOL_WAIT_SECONDS)
+    return _pool
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    return _pool.stats() if _pool is not None else None
+
+
+class _RequestConnection:
+    """Connection pinned to one request: checked out on first cursor(), returned by release()."""
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.conn: Any = None
+        self.broken = False
+        self.released = False
+        self._lock = threading.Lock()
+
+    def acquire(self) -> Any:
+        with self._lock:
+            if self.conn is None:
+                self.conn = self.pool.getconn()
+            return self.conn
+
+    def release(self) -> None:
+        with self._lock:
+            self.released = True
+            if self.conn is not None:
+                self.pool.putconn(self.conn, discard=self.broken)
+                self.conn = None
+
+
+_request_connection: ContextVar[Optional[_RequestConnection]] = ContextVar("request_connection", default=None)
+
+
+@contextmanager
+def request_scope():
+    """Pin one pooled connection to everything inside (a request); no-op when pooling is disabled."""
+    pool = get_pool()
+    if pool is None:
+        yield
+        return
+    pinned = _RequestConnection(pool)
+    token = _request_connection.set(pinned)
+    try:
+        yield
+    finally:
+        _request_connection.reset(token)
+        pinned.release()
+
+
+class RequestConnectionMiddleware:
+    """ASGI middleware: one request_scope() per HTTP request, released after the full (possibly streamed) response."""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_scope():
+            await self.app(scope, receive, send)
+
+
 @contextmanager
 def cursor():
-    conn = psycopg2.connect(**get_conn_kwargs(), cursor_factory=RealDictCursor)
+    pinned = _request_connection.get()
+    if pinned is not None and not pinned.released:
+        conn = pinned.acquire()
+        try:
+            with conn.cursor() as cur:
+                yield cur
+            conn.commit()
+        except BaseException:
+            try:
+                conn.rollback()
+            except Exception:
+                pinned.broken = True
+            raise
+        return
+
+    pool = get_pool()
+    if pool is None:
+        conn = _connect()
+        try:
+            yield conn.cursor()
+            conn.commit()
+        finally:
+            conn.close()
+        return
+
+    conn = pool.getconn()
+    broken = False
     try:
-        yield conn.cursor()
+        with conn.cursor() as cur:
+            yield cur
         conn.commit()
+    except BaseException:
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
+        raise
     finally:
-        conn.close()
+        pool.putconn(conn, discard=broken)
@@ -0,0 +1,101 @@
+"""
+Async PostgreSQL access for the heavy Risk Analytics endpoints (psycopg 3 AsyncConnectionPool).
+
+Same connection settings and statement_timeout as app.db; rows are dicts (like RealDictCursor) and the SQL uses the
+same %s placeholders, so queries are shared with the sync code in app.stream_data. Each fetch borrows its own pooled
+connection (autocommit, read-only use), so independent queries of one request can run concurrently:
+
+    meta, ticks = await asyncio.gather(fetchone(SQL_META, (mid,)), fetchall(SQL_TICKS, (mid, ...)))
+
+Pool size: POSTGRES_ASYNC_POOL_MIN / POSTGRES_ASYNC_POOL_MAX; wait bounded by POSTGRES_POOL_WAIT_SECONDS.
+The pool is opened on first use and closed on shutdown; async_pool_stats() feeds /metrics.
+
+Exports stream large results with iter_rows() (server-side cursor, itersize rows per round trip), which holds its
+pooled connection until the rows are consumed or the iteration is closed.
+"""
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+from app.db import POOL_WAIT_SECONDS, STATEMENT_TIMEOUT_MS, get_conn_kwargs
+
+ASYNC_POOL_MIN = int(os.environ.get("POSTGRES_ASYNC_POOL_MIN", "2"))
+ASYNC_POOL_MAX = int(os.environ.get("POSTGRES_ASYNC_POOL_MAX", "20"))
+
+_pool: Any = None
+_pool_lock = asyncio.Lock()
+
+
+async def _configure(conn: Any) -> None:
+    if STATEMENT_TIMEOUT_MS > 0:
+        # SET does not take bind parameters; set_config does.
+        await conn.execute("SELECT set_config('statement_timeout', %s, false)", (str(STATEMENT_TIMEOUT_MS),))
+
+
+async def get_async_pool() -> Any:
+    """Process-wide AsyncConnectionPool, opened on first use."""
+    global _pool
+    if _pool is None:
+        async with _pool_lock:
+            if _pool is None:
+                from psycopg.rows import dict_row
+                from psycopg_pool import AsyncConnectionPool
+
+                pool = AsyncConnectionPool(
+                    kwargs={**get_conn_kwargs(), "autocommit": True, "row_factory": dict_row},
+                    min_size=min(ASYNC_POOL_MIN, ASYNC_POOL_MAX),
+                    max_size=ASYNC_POOL_MAX,
+                    timeout=POOL_WAIT_SECONDS,
+                    configure=_configure,
+                    check=AsyncConnectionPool.check_connection,
+                    name="risk-analytics-async",
+                    open=False,
+                )
+                await pool.open()
+                _pool = pool
+    return _pool
+
+
+async def close_async_pool() -> None:
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.close()
+
+
+def async_pool_stats() -> Optional[Dict[str, int]]:
+    return _pool.get_stats() if _pool is not None else None
+
+
+@asynccontextmanager
+async def acursor():
+    """Async cursor on a pooled connection (dict rows), returned to the pool on exit."""
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        async with conn.cursor() as cur:
+            yield cur
+
+
+async def fetchall(sql: str, params: Sequence[Any] = ()) -> List[Dict[str, Any]]:
+    async with acursor() as cur:
+        await cur.execute(sql, params)
+        return await cur.fetchall()
+
+
+async def fetchone(sql: str, params: Sequence[Any] = ()) -> Optional[Dict[str, Any]]:
+    async with acursor() as cur:
+        await cur.execute(sql, params)
+        return await cur.fetchone()
+
+
+async def iter_rows(sql: str, params: Sequence[Any] = (), itersize: int = 2000) -> AsyncIterator[Dict[str, Any]]:
+    """Rows of sql from a server-side cursor (inside a transaction), fetched itersize at a time."""
+    pool = await get_async_pool()
+    async with pool.connection() as conn:
+        async with conn.transaction():
+            async with conn.cursor(name="iter_rows") as cur:
+                cur.itersize = itersize
+                await cur.execute(sql, params)
+                async for row in cur:
+                    yield row
@@ -0,0 +1,73 @@
+"""
+orjson rendering for the heavy endpoints, with precompressed bodies and ETags for cached results.
+
+render() serializes a result once with orjson (datetimes as ISO 8601, Decimal as float) and keeps it gzip-compressed
+when it is at least GZIP_MIN_BYTES (the GZipMiddleware threshold), with a weak ETag over the uncompressed body.
+Results of the stream response cache keep their rendering next to the cached value (ResponseCache.rendered), so a
+hit is served without encoding or compressing again, and a poll whose If-None-Match carries the ETag gets a 304.
+
+respond() picks the representation: 304 on a matching If-None-Match, the stored gzip body when the client accepts
+gzip (GZipMiddleware leaves responses with a Content-Encoding alone), otherwise the decompressed body.
+Cache-Control: no-cache makes browsers revalidate every poll instead of reusing a stale copy.
+"""
+import gzip
+import hashlib
+from decimal import Decimal
+from typing import Any, Mapping, NamedTuple, Optional
+
+import orjson
+from fastapi.responses import Response
+
+GZIP_MIN_BYTES = 500
+GZIP_LEVEL = 6
+
+
+class Rendered(NamedTuple):
+    content: bytes  # gzip-compressed when gzipped
+    gzipped: bool
+    etag: str
+    media_type: str
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError("Type is not JSON serializable: %s" % type(obj).__name__)
+
+
+def dumps(value: Any) -> bytes:
+    """JSON bytes of value (orjson; non-str dict keys are converted to str)."""
+    return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def render(value: Any, media_type: str = "application/json") -> Rendered:
+    body = dumps(value)
+    etag = 'W/"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+    if len(body) >= GZIP_MIN_BYTES:
+        return Rendered(gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0), True, etag, media_type)
+    return Rendered(body, False, etag, media_type)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison (RFC 9110): W/ prefixes are ignored; * matches any."""
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+
+def respond(rendered: Rendered, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Response for rendered given the request headers (If-None-Match, Accept-Encoding)."""
+    headers = headers or {}
+    out = {"ETag": rendered.etag, "Cache-Control": "no-cache", "Vary": "Accept, Accept-Encoding"}
+    if_none_match = headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, rendered.etag):
+        return Response(status_code=304, headers=out)
+    if not rendered.gzipped:
+        return Response(rendered.content, media_type=rendered.media_type, headers=out)
+    if "gzip" in (headers.get("accept-encoding") or "").lower():
+        out["Content-Encoding"] = "gzip"
+        return Response(rendered.content, media_type=rendered.media_type, headers=out)
+    return Response(gzip.decompress(rendered.content), media_type=rendered.media_type, headers=out)
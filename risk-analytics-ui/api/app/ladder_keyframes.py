@@ -0,0 +1,211 @@
+"""
+Ladder keyframes: periodic full-ladder checkpoints of stream_ingest.ladder_levels per market
+(sql/migrations/2026-10-19_create_stream_ladder_keyframes.sql).
+
+stream_ladder_keyframes holds, for every grid point k (every LADDER_KEYFRAME_INTERVAL_MINUTES on the UTC grid; the
+interval divides 15, so every bucket boundary is a keyframe) and every market with ladder rows in (k - interval, k],
+the market's latest row per (selection, side, level) at or before k, with its original publish_time. A market
+without rows in an interval keeps its previous keyframe, so "latest keyframe at or before k" is its state at k.
+stream_data reconstructs the ladder at t from that keyframe (k = floor(t)) plus the rows in (k, t]
+(_SQL_LADDER_STATE_FROM_KEYFRAME): the read is bounded by the interval instead of by the market's age.
+
+Each keyframe is built incrementally from the previous one plus the rows of one interval, in one transaction
+together with the watermark row (interval_minutes, built_from, built_until). The first run starts from an empty
+ladder before the oldest row (ladder_levels_initial, else the oldest daily partition); readers use only keyframes in
+[built_from, built_until]. Grid points are built LADDER_KEYFRAME_GRACE_SECONDS after they pass (late rows); rows
+inserted later with an older publish_time are not in the keyframes. The interval of an existing watermark row wins
+over the environment (changing it needs emptying both tables).
+
+When the oldest daily partition is dropped (and ladder_levels_initial is gone), keyframes before it are pruned: each
+market keeps its latest keyframe at or before the new start, markets with no later rows are removed.
+
+Worker: daemon thread in the API process every LADDER_KEYFRAME_WORKER_INTERVAL_SECONDS, advisory lock, same writer
+credentials as the bucket store (POSTGRES_BUCKET_STORE_USER / PASSWORD); without them it does not start and ladder
+states are read from the full history.
+
+Usage (same env as the API):
+  python -m app.ladder_keyframes run-once
+"""
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from app.ladder_stats import _SQL_LEGACY_PRESENT, partition_days
+from app.stream_data import _keyframe_floor
+from app.writer_worker import WriterWorker
+
+logger = logging.getLogger(__name__)
+
+LADDER_KEYFRAMES_LOCK_ID = 1234567890123460
+INTERVAL_MINUTES = int(os.environ.get("LADDER_KEYFRAME_INTERVAL_MINUTES", "5"))
+WORKER_INTERVAL_SECONDS = float(os.environ.get("LADDER_KEYFRAME_WORKER_INTERVAL_SECONDS", "60"))
+GRACE_SECONDS = float(os.environ.get("LADDER_KEYFRAME_GRACE_SECONDS", "60"))
+MAX_KEYFRAMES_PER_CYCLE = int(os.environ.get("LADDER_KEYFRAME_MAX_PER_CYCLE", "288"))
+SOURCE = "ladder_levels"
+
+_SQL_WATERMARK = """
+    SELECT interval_minutes, built_from, built_until
+    FROM stream_ladder_keyframe_watermark
+    WHERE source = %s
+"""
+_SQL_LEGACY_OLDEST = "SELECT MIN(publish_time) AS t FROM stream_ingest.ladder_levels_initial"
+_SQL_OLDEST_IN = "SELECT MIN(publish_time) AS t FROM stream_ingest.ladder_levels WHERE publish_time >= %s AND publish_time < %s"
+# Keyframe k of the markets with rows in (prev, k]: their previous keyframe overlaid with those rows
+_SQL_BUILD = """
+    WITH changed AS (
+        SELECT DISTINCT market_id
+        FROM stream_ingest.ladder_levels
+        WHERE publish_time > %(prev)s AND publish_time <= %(k)s
+    ), previous AS (
+        SELECT f.market_id, MAX(f.keyframe_time) AS keyframe_time
+        FROM stream_ladder_keyframes f
+        JOIN changed c ON c.market_id = f.market_id
+        WHERE f.keyframe_time <= %(prev)s
+        GROUP BY f.market_id
+    )
+    INSERT INTO stream_ladder_keyframes (market_id, keyframe_time, selection_id, side, level, price, size, publish_time)
+    SELECT DISTINCT ON (market_id, selection_id, side, level)
+        market_id, %(k)s, selection_id, side, level, price, size, publish_time
+    FROM (
+        SELECT f.market_id, f.selection_id, f.side, f.level, f.price, f.size, f.publish_time
+        FROM stream_ladder_keyframes f
+        JOIN previous p ON p.market_id = f.market_id AND p.keyframe_time = f.keyframe_time
+        UNION ALL
+        SELECT market_id, selection_id, side, level, price, size, publish_time
+        FROM stream_ingest.ladder_levels
+        WHERE publish_time > %(prev)s AND publish_time <= %(k)s
+    ) s
+    ORDER BY market_id, selection_id, side, level, publish_time DESC
+    ON CONFLICT DO NOTHING
+"""
+_SQL_SET_WATERMARK = """
+    INSERT INTO stream_ladder_keyframe_watermark (source, interval_minutes, built_from, built_until)
+    VALUES (%(source)s, %(interval_minutes)s, %(built_from)s, %(k)s)
+    ON CONFLICT (source) DO UPDATE SET built_until = EXCLUDED.built_until, updated_at = now()
+"""
+_SQL_HAS_PRUNABLE = "SELECT built_from < %s AS prunable FROM stream_ladder_keyframe_watermark WHERE source = %s"
+# Retention: keep each market's latest keyframe at or before the new start (its state there)
+_SQL_PRUNE = """
+    DELETE FROM stream_ladder_keyframes f
+    USING (
+        SELECT market_id, MAX(keyframe_time) AS keyframe_time
+        FROM stream_ladder_keyframes
+        WHERE keyframe_time <= %(start)s
+        GROUP BY market_id
+    ) keep
+    WHERE f.market_id = keep.market_id AND f.keyframe_time < keep.keyframe_time;
+    DELETE FROM stream_ladder_keyframes f
+    WHERE f.keyframe_time <= %(start)s
+      AND NOT EXISTS (
+          SELECT 1 FROM stream_ladder_keyframes g WHERE g.market_id = f.market_id AND g.keyframe_time > %(start)s
+      )
+      AND NOT EXISTS (
+          SELECT 1 FROM stream_ingest.ladder_levels l WHERE l.market_id = f.market_id AND l.publish_time > %(start)s
+      );
+    UPDATE stream_ladder_keyframe_watermark SET built_from = %(start)s, updated_at = now() WHERE source = %(source)s;
+"""
+
+
+def build_keyframe(cur: Any, k: datetime, interval_minutes: int, built_from: datetime) -> None:
+    """Keyframe at k from the previous one and the rows of (k - interval, k]; moves the watermark (caller commits)."""
+    cur.execute(_SQL_BUILD, {"prev": k - timedelta(minutes=interval_minutes), "k": k})
+    cur.execute(_SQL_SET_WATERMARK, {
+        "source": SOURCE, "interval_minutes": interval_minutes, "built_from": built_from, "k": k,
+    })
+
+
+def _first_grid_point(cur: Any, oldest_start: datetime, legacy: bool, interval_minutes: int) -> datetime:
+    """Grid point strictly before the oldest ladder row: the ladder is empty there."""
+    if legacy:
+        cur.execute(_SQL_LEGACY_OLDEST)
+    else:
+        cur.execute(_SQL_OLDEST_IN, (oldest_start, oldest_start + timedelta(days=1)))
+    oldest = (cur.fetchone() or {}).get("t") or oldest_start
+    return _keyframe_floor(oldest, interval_minutes) - timedelta(minutes=interval_minutes)
+
+
+def refresh(cur: Any, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    One maintenance pass: prune keyframes before a dropped partition, then build keyframes up to now - grace
+    (commits per keyframe). Returns {"keyframes", "pruned", "built_until"}.
+    """
+    now = now or datetime.now(timezone.utc)
+    conn = cur.connection
+    parts = partition_days(cur)
+    if not parts:
+        return {"keyframes": 0, "pruned": False, "built_until": None}
+    oldest = min(parts)
+    oldest_start = datetime(oldest.year, oldest.month, oldest.day, tzinfo=timezone.utc)
+    cur.execute(_SQL_LEGACY_PRESENT)
+    legacy = bool(cur.fetchone()["present"])
+
+    pruned = False
+    if not legacy:
+        cur.execute(_SQL_HAS_PRUNABLE, (oldest_start, SOURCE))
+        row = cur.fetchone()
+        pruned = bool(row and row["prunable"])
+        if pruned:
+            cur.execute(_SQL_PRUNE, {"start": oldest_start, "source": SOURCE})
+            conn.commit()
+
+    cur.execute(_SQL_WATERMARK, (SOURCE,))
+    row = cur.fetchone()
+    if row:
+        interval_minutes, built_from, built_until = int(row["interval_minutes"]), row["built_from"], row["built_until"]
+        if interval_minutes != INTERVAL_MINUTES:
+            logger.warning("ladder keyframes: keeping the stored interval %s min (configured %s)", interval_minutes, INTERVAL_MINUTES)
+    else:
+        interval_minutes = INTERVAL_MINUTES if INTERVAL_MINUTES > 0 and 15 % INTERVAL_MINUTES == 0 else 5
+        built_from = built_until = _first_grid_point(cur, oldest_start, legacy, interval_minutes)
+
+    step = timedelta(minutes=interval_minutes)
+    upper = now - timedelta(seconds=GRACE_SECONDS)
+    built = 0
+    while built < MAX_KEYFRAMES_PER_CYCLE and built_until + step <= upper:
+        built_until += step
+        build_keyframe(cur, built_until, interval_minutes, built_from)
+        conn.commit()
+        built += 1
+    _worker.count(keyframes_total=built)
+    _worker.set(built_until=built_until)
+    return {"keyframes": built, "pruned": pruned, "built_until": built_until}
+
+
+_worker = WriterWorker(
+    "ladder keyframes",
+    LADDER_KEYFRAMES_LOCK_ID,
+    refresh,
+    WORKER_INTERVAL_SECONDS,
+    {"keyframes_total": 0, "built_until": None},
+    worth_logging=lambda r: r["keyframes"] > 1 or r["pruned"],
+)
+
+
+def run_cycle(now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """refresh() under the advisory lock on a writer connection; None if another instance holds the lock."""
+    return _worker.run_cycle(now)
+
+
+def worker_status() -> Dict[str, Any]:
+    """Counters and watermark for /metrics."""
+    return _worker.status()
+
+
+def start_background_worker() -> None:
+    """Start the ladder keyframe worker in a daemon thread when writer credentials are configured."""
+    _worker.start("ladder states read the history")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    ap = argparse.ArgumentParser(description="Full-ladder keyframes of stream_ingest.ladder_levels (stream_ladder_keyframes)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("run-once", help="One worker cycle: prune before dropped partitions, build pending keyframes")
+    ap.parse_args()
+    logger.info("ladder keyframes: %s", run_cycle())
+
+
+if __name__ == "__main__":
+    main()
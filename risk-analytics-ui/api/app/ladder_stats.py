@@ -0,0 +1,293 @@
+"""
+Daily stats of stream_ingest.ladder_levels: public.ladder_levels_daily_stats
+(sql/migrations/2026-10-19_create_ladder_levels_daily_stats.sql).
+
+One row per daily partition (ladder_levels_YYYYMMDD): rows, distinct markets, min/max publish_time.
+stream_data.get_data_horizon reads this table (one row per day) instead of scanning ladder_levels.
+
+- Open day (today, and yesterday until its end + LADDER_STATS_GRACE_SECONDS): counted incrementally from its
+  counted_until watermark up to now - grace; the BRIN index on publish_time limits each count to the new blocks.
+  Distinct markets come from ladder_levels_daily_markets (day, market_id), filled from the same ranges.
+- Closed day: recounted once over its whole partition (exact, including late rows), marked is_final and not
+  touched again; its daily_markets rows are deleted. At most LADDER_STATS_MAX_FINALIZE_PER_CYCLE per cycle, so the
+  first run over existing history is spread out.
+- Days whose partition was dropped (retention) are deleted.
+- History before daily partitioning (ladder_levels_initial) is counted once per day, final, while that partition
+  exists.
+
+Worker: daemon thread in the API process every LADDER_STATS_INTERVAL_SECONDS, advisory lock, same writer credentials
+as the bucket store (POSTGRES_BUCKET_STORE_USER / PASSWORD); without them it does not start and the data horizon
+falls back to scanning ladder_levels.
+
+Usage (same env as the API):
+  python -m app.ladder_stats run-once
+  python -m app.ladder_stats recount --day 2026-02-14
+"""
+import argparse
+import logging
+import os
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from app.writer_worker import WriterWorker, _writer_conn
+
+logger = logging.getLogger(__name__)
+
+LADDER_STATS_LOCK_ID = 1234567890123458
+INTERVAL_SECONDS = float(os.environ.get("LADDER_STATS_INTERVAL_SECONDS", "60"))
+GRACE_SECONDS = float(os.environ.get("LADDER_STATS_GRACE_SECONDS", "60"))
+MAX_FINALIZE_PER_CYCLE = int(os.environ.get("LADDER_STATS_MAX_FINALIZE_PER_CYCLE", "7"))
+PARTITION_PREFIX = "ladder_levels_"
+LEGACY_PARTITION = "ladder_levels_initial"
+
+_SQL_PARTITIONS = """
+    SELECT c.relname
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    JOIN pg_class p ON p.oid = i.inhparent
+    JOIN pg_namespace n ON n.oid = p.relnamespace
+    WHERE n.nspname = 'stream_ingest' AND p.relname = 'ladder_levels'
+"""
+_SQL_STATS_STATE = "SELECT day, partition_name, counted_until, is_final FROM ladder_levels_daily_stats"
+_SQL_LEGACY_PRESENT = "SELECT to_regclass('stream_ingest.ladder_levels_initial') IS NOT NULL AS present"
+# Pre-partitioning history: closed, counted per UTC day in one pass
+_SQL_COUNT_LEGACY = """
+    SELECT (publish_time AT TIME ZONE 'UTC')::date AS day,
+           COUNT(*) AS ladder_rows, COUNT(DISTINCT market_id) AS markets,
+           MIN(publish_time) AS min_pt, MAX(publish_time) AS max_pt
+    FROM stream_ingest.ladder_levels_initial
+    GROUP BY 1
+"""
+_SQL_DELETE_DAYS = """
+    DELETE FROM ladder_levels_daily_stats WHERE day = ANY(%(days)s);
+    DELETE FROM ladder_levels_daily_markets WHERE day = ANY(%(days)s);
+"""
+# Incremental: rows and markets published in [counted_until, upper)
+_SQL_COUNT_RANGE = """
+    SELECT COUNT(*) AS ladder_rows, MIN(publish_time) AS min_pt, MAX(publish_time) AS max_pt
+    FROM stream_ingest.ladder_levels
+    WHERE publish_time >= %s AND publish_time < %s
+"""
+_SQL_ADD_MARKETS = """
+    INSERT INTO ladder_levels_daily_markets (day, market_id)
+    SELECT DISTINCT %s::date, market_id
+    FROM stream_ingest.ladder_levels
+    WHERE publish_time >= %s AND publish_time < %s
+    ON CONFLICT DO NOTHING
+"""
+_SQL_ADVANCE = """
+    INSERT INTO ladder_levels_daily_stats
+        (day, partition_name, ladder_rows, markets, min_publish_time, max_publish_time, counted_until, is_final)
+    VALUES (
+        %(day)s, %(partition_name)s, %(ladder_rows)s,
+        (SELECT COUNT(*) FROM ladder_levels_daily_markets WHERE day = %(day)s),
+        %(min_pt)s, %(max_pt)s, %(upper)s, false
+    )
+    ON CONFLICT (day) DO UPDATE SET
+        ladder_rows = ladder_levels_daily_stats.ladder_rows + EXCLUDED.ladder_rows,
+        markets = EXCLUDED.markets,
+        min_publish_time = LEAST(ladder_levels_daily_stats.min_publish_time, EXCLUDED.min_publish_time),
+        max_publish_time = GREATEST(ladder_levels_daily_stats.max_publish_time, EXCLUDED.max_publish_time),
+        counted_until = EXCLUDED.counted_until,
+        updated_at = now()
+"""
+# Closed day: exact recount of the whole partition, replaces the incremental values
+_SQL_COUNT_DAY = """
+    SELECT COUNT(*) AS ladder_rows, COUNT(DISTINCT market_id) AS markets,
+           MIN(publish_time) AS min_pt, MAX(publish_time) AS max_pt
+    FROM stream_ingest.ladder_levels
+    WHERE publish_time >= %s AND publish_time < %s
+"""
+_SQL_FINALIZE = """
+    INSERT INTO ladder_levels_daily_stats
+        (day, partition_name, ladder_rows, markets, min_publish_time, max_publish_time, counted_until, is_final)
+    VALUES (%(day)s, %(partition_name)s, %(ladder_rows)s, %(markets)s, %(min_pt)s, %(max_pt)s, %(upper)s, true)
+    ON CONFLICT (day) DO UPDATE SET
+        partition_name = EXCLUDED.partition_name,
+        ladder_rows = EXCLUDED.ladder_rows,
+        markets = EXCLUDED.markets,
+        min_publish_time = EXCLUDED.min_publish_time,
+        max_publish_time = EXCLUDED.max_publish_time,
+        counted_until = EXCLUDED.counted_until,
+        is_final = true,
+        updated_at = now();
+    DELETE FROM ladder_levels_daily_markets WHERE day = %(day)s;
+"""
+
+
+def _day_start(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=timezone.utc)
+
+
+def partition_days(cur: Any) -> Dict[date, str]:
+    """Daily partitions of stream_ingest.ladder_levels: day -> partition name (other children ignored)."""
+    cur.execute(_SQL_PARTITIONS)
+    out: Dict[date, str] = {}
+    for r in cur.fetchall():
+        name = r["relname"] or ""
+        if name.startswith(PARTITION_PREFIX) and len(name) == len(PARTITION_PREFIX) + 8:
+            try:
+                out[datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()] = name
+            except ValueError:
+                continue
+    return out
+
+
+def advance_day(cur: Any, day: date, partition_name: str, counted_until: datetime, upper: datetime) -> None:
+    """Add rows and markets published in [counted_until, upper) to the day's stats."""
+    cur.execute(_SQL_COUNT_RANGE, (counted_until, upper))
+    counts = cur.fetchone() or {}
+    cur.execute(_SQL_ADD_MARKETS, (day, counted_until, upper))
+    cur.execute(_SQL_ADVANCE, {
+        "day": day,
+        "partition_name": partition_name,
+        "ladder_rows": int(counts.get("ladder_rows") or 0),
+        "min_pt": counts.get("min_pt"),
+        "max_pt": counts.get("max_pt"),
+        "upper": upper,
+    })
+
+
+def finalize_day(cur: Any, day: date, partition_name: str) -> None:
+    """Exact recount of a closed day; frozen afterwards."""
+    start = _day_start(day)
+    end = start + timedelta(days=1)
+    cur.execute(_SQL_COUNT_DAY, (start, end))
+    counts = cur.fetchone() or {}
+    cur.execute(_SQL_FINALIZE, {
+        "day": day,
+        "partition_name": partition_name,
+        "ladder_rows": int(counts.get("ladder_rows") or 0),
+        "markets": int(counts.get("markets") or 0),
+        "min_pt": counts.get("min_pt"),
+        "max_pt": counts.get("max_pt"),
+        "upper": end,
+    })
+
+
+def count_legacy(cur: Any) -> int:
+    """Final per-day rows of ladder_levels_initial; returns the day count."""
+    cur.execute(_SQL_COUNT_LEGACY)
+    rows = cur.fetchall()
+    for counts in rows:
+        cur.execute(_SQL_FINALIZE, {
+            "day": counts["day"],
+            "partition_name": LEGACY_PARTITION,
+            "ladder_rows": int(counts["ladder_rows"] or 0),
+            "markets": int(counts["markets"] or 0),
+            "min_pt": counts["min_pt"],
+            "max_pt": counts["max_pt"],
+            "upper": _day_start(counts["day"]) + timedelta(days=1),
+        })
+    return len(rows)
+
+
+def refresh(cur: Any, now: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    One maintenance pass (commits per day): drop stats of dropped partitions, finalize closed days,
+    advance open ones. Returns {"advanced", "finalized", "deleted"} day counts.
+    """
+    now = now or datetime.now(timezone.utc)
+    conn = cur.connection
+    upper = now - timedelta(seconds=GRACE_SECONDS)
+    parts = partition_days(cur)
+    cur.execute(_SQL_STATS_STATE)
+    state = {r["day"]: r for r in cur.fetchall()}
+    cur.execute(_SQL_LEGACY_PRESENT)
+    legacy = bool(cur.fetchone()["present"])
+
+    gone = sorted(
+        d for d, r in state.items()
+        if d not in parts and not (legacy and r["partition_name"] == LEGACY_PARTITION)
+    )
+    if gone:
+        cur.execute(_SQL_DELETE_DAYS, {"days": gone})
+        conn.commit()
+    if legacy and not any(r["partition_name"] == LEGACY_PARTITION for r in state.values()):
+        logger.info("ladder stats: counted %d days of %s", count_legacy(cur), LEGACY_PARTITION)
+        conn.commit()
+
+    advanced = finalized = 0
+    for day, partition_name in sorted(parts.items()):
+        start = _day_start(day)
+        if start > now:
+            continue  # provisioned ahead, empty
+        row = state.get(day)
+        if row is not None and row["is_final"]:
+            continue
+        if start + timedelta(days=1) <= upper:
+            if finalized >= MAX_FINALIZE_PER_CYCLE:
+                continue
+            finalize_day(cur, day, partition_name)
+            conn.commit()
+            finalized += 1
+        else:
+            counted_until = row["counted_until"] if row is not None else start
+            if counted_until >= upper:
+                continue
+            advance_day(cur, day, partition_name, counted_until, upper)
+            conn.commit()
+            advanced += 1
+            _worker.set(counted_until=upper)
+    _worker.count(days_finalized_total=finalized)
+    return {"advanced": advanced, "finalized": finalized, "deleted": len(gone)}
+
+
+_worker = WriterWorker(
+    "ladder stats",
+    LADDER_STATS_LOCK_ID,
+    refresh,
+    INTERVAL_SECONDS,
+    {"days_finalized_total": 0, "counted_until": None},
+    worth_logging=lambda r: bool(r["finalized"] or r["deleted"]),
+)
+
+
+def run_cycle(now: Optional[datetime] = None) -> Optional[Dict[str, int]]:
+    """refresh() under the advisory lock on a writer connection; None if another instance holds the lock."""
+    return _worker.run_cycle(now)
+
+
+def worker_status() -> Dict[str, Any]:
+    """Counters and incremental watermark for /metrics."""
+    return _worker.status()
+
+
+def start_background_worker() -> None:
+    """Start the ladder_levels daily stats worker in a daemon thread when writer credentials are configured."""
+    _worker.start("data horizon scans ladder_levels")
+
+
+def recount(day: date) -> None:
+    """Exact recount of one closed day (e.g. after rows were loaded into its partition)."""
+    if _day_start(day) + timedelta(days=1, seconds=GRACE_SECONDS) > datetime.now(timezone.utc):
+        raise SystemExit(f"{day.isoformat()} is not closed yet; the worker counts it incrementally")
+    conn = _writer_conn()
+    try:
+        cur = conn.cursor()
+        name = partition_days(cur).get(day)
+        if name is None:
+            raise SystemExit(f"no ladder_levels partition for {day.isoformat()}")
+        finalize_day(cur, day, name)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    ap = argparse.ArgumentParser(description="Daily stats of stream_ingest.ladder_levels (ladder_levels_daily_stats)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("run-once", help="One worker cycle: advance the open day, finalize closed days")
+    p = sub.add_parser("recount", help="Exact recount of one closed day")
+    p.add_argument("--day", required=True, help="UTC date YYYY-MM-DD")
+    args = ap.parse_args()
+
+    if args.command == "run-once":
+        logger.info("ladder stats: %s", run_cycle())
+    else:
+        recount(datetime.strptime(args.day, "%Y-%m-%d").date())
+
+
+if __name__ == "__main__":
+    main()
@@ -15,11 +15,17 @@ from urllib.parse import unquote
 
 logger = logging.getLogger(__name__)
 
-from fastapi import FastAPI, Query, HTTPException, Response
+from fastapi import FastAPI, Header, Query, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 
-from app.db import cursor
+from app.book_risk_l3 import book_risk_curve_payload, compute_book_risk_curve, curve_payload_at_depth
+from app.bucket_store import start_background_worker, worker_status
+from app.db import PIN_PER_REQUEST, RequestConnectionMiddleware, cursor, get_pool, pool_stats
+from app.db_async import async_pool_stats, close_async_pool
+from app import columnar, ladder_keyframes, ladder_stats, market_activity
+from app.metric_versions import UnknownVersionError, derived_metrics_source, latest_metrics_source
+from app.response_cache import stream_cache
 from app.stream_router import stream_router
 from app.partition_provisioner import (
     start_background_provisioner,
@@ -38,6 +44,42 @@ app.include_router(stream_router, prefix="/stream")
 def startup_partition_provisioner():
     """Start partition provisioner (stream_ingest.ladder_levels) on startup + every 12h."""
     start_background_provisioner()
+
+
+@app.on_event("startup")
+def startup_bucket_store():
+    """Start the stream_bucket_metrics worker (closed 15-min buckets) when its writer credentials are set."""
+    start_background_worker()
+
+
+@app.on_event("startup")
+def startup_ladder_stats():
+    """Start the ladder_levels daily stats worker (data horizon) when the bucket store writer credentials are set."""
+    ladder_stats.start_background_worker()
+
+
+@app.on_event("startup")
+def startup_market_activity():
+    """Start the per-market stream activity worker (staleness / has-data checks) when the writer credentials are set."""
+    market_activity.start_background_worker()
+
+
+@app.on_event("startup")
+def startup_ladder_keyframes():
+    """Start the ladder keyframe worker (point-in-time ladder states) when the writer credentials are set."""
+    ladder_keyframes.start_background_worker()
+
+
+@app.on_event("shutdown")
+async def shutdown_db_pools():
+    pool = get_pool()
+    if pool is not None:
+        pool.closeall()
+    await close_async_pool()
+
+
+if PIN_PER_REQUEST:
+    app.add_middleware(RequestConnectionMiddleware)
 app.add_middleware(GZipMiddleware, minimum_size=500)
 app.add_middleware(
     CORSMiddleware,
@@ -48,6 +90,22 @@ app.add_middleware(
 )
 
 
+def _mdm_source(calculation_version: Optional[str]) -> str:
+    """FROM-item for REST derived metrics (served version unless one is requested); 400 if unknown."""
+    try:
+        return derived_metrics_source(calculation_version)
+    except UnknownVersionError:
+        raise HTTPException(status_code=400, detail=f"calculation_version {calculation_version!r} is not available")
+
+
+def _latest_source(calculation_version: Optional[str]) -> str:
+    """FROM-item with each market's latest REST derived-metrics row (market_latest_metrics for v1); 400 if unknown."""
+    try:
+        return latest_metrics_source(calculation_version)
+    except UnknownVersionError:
+        raise HTTPException(status_code=400, detail=f"calculation_version {calculation_version!r} is not available")
+
+
 def _parse_ts(s: Optional[str], default: datetime) -> datetime:
     if not s:
         return default
@@ -243,12 +301,71 @@ def health():
 
 @app.get("/metrics")
 def metrics():
-    """Lightweight metrics for partition horizon (alert if ladder_levels_partition_horizon_days < 7)."""
+    """Lightweight metrics: partition horizon (alert if ladder_levels_partition_horizon_days < 7) and DB pool usage."""
     horizon_days = get_horizon_for_health()
     value = round(horizon_days, 1) if horizon_days is not None else -1.0
     body = "# HELP ladder_levels_partition_horizon_days Days of partition coverage ahead (stream_ingest.ladder_levels). Alert if < 7.\n"
     body += "# TYPE ladder_levels_partition_horizon_days gauge\n"
     body += f"ladder_levels_partition_horizon_days {value}\n"
+    stats = pool_stats()
+    if stats is not None:
+        body += "# HELP db_pool_connections Database pool connections by state.\n"
+        body += "# TYPE db_pool_connections gauge\n"
+        body += f'db_pool_connections{{state="in_use"}} {stats["in_use"]}\n'
+        body += f'db_pool_connections{{state="idle"}} {stats["idle"]}\n'
+        body += f'db_pool_connections{{state="max"}} {stats["max"]}\n'
+        for name in ("checkouts_total", "timeouts_total", "opened_total", "discarded_total", "healthcheck_failures_total", "wait_seconds_total"):
+            body += f"# TYPE db_pool_{name} counter\n"
+            body += f"db_pool_{name} {stats[name]}\n"
+        body += "# HELP db_pool_wait_seconds_max Longest wait for a pooled connection since start.\n"
+        body += "# TYPE db_pool_wait_seconds_max gauge\n"
+        body += f"db_pool_wait_seconds_max {stats['wait_seconds_max']}\n"
+    astats = async_pool_stats()
+    if astats is not None:
+        # psycopg_pool counters (pool_size, pool_available, requests_num, requests_waiting, requests_wait_ms, ...)
+        for name, value in sorted(astats.items()):
+            body += f"db_async_{name} {value}\n"
+    bstats = worker_status()
+    if bstats["runs_total"] or bstats["errors_total"]:
+        for name in ("runs_total", "buckets_written_total", "rows_written_total", "errors_total"):
+            body += f"# TYPE bucket_store_{name} counter\n"
+            body += f"bucket_store_{name} {bstats[name]}\n"
+        if bstats["watermark"] is not None:
+            body += "# HELP bucket_store_watermark_timestamp_seconds Start of the last materialized bucket (UTC epoch).\n"
+            body += f"bucket_store_watermark_timestamp_seconds {bstats['watermark'].timestamp():.0f}\n"
+    lstats = ladder_stats.worker_status()
+    if lstats["runs_total"] or lstats["errors_total"]:
+        for name in ("runs_total", "days_finalized_total", "errors_total"):
+            body += f"# TYPE ladder_stats_{name} counter\n"
+            body += f"ladder_stats_{name} {lstats[name]}\n"
+        if lstats["counted_until"] is not None:
+            body += "# HELP ladder_stats_counted_until_timestamp_seconds Open day counted up to (UTC epoch).\n"
+            body += f"ladder_stats_counted_until_timestamp_seconds {lstats['counted_until'].timestamp():.0f}\n"
+    mstats = market_activity.worker_status()
+    if mstats["runs_total"] or mstats["errors_total"]:
+        for name in ("runs_total", "chunks_total", "errors_total"):
+            body += f"# TYPE market_activity_{name} counter\n"
+            body += f"market_activity_{name} {mstats[name]}\n"
+        if mstats["counted_until"] is not None:
+            body += "# HELP market_activity_counted_until_timestamp_seconds Ladder rows counted up to (UTC epoch).\n"
+            body += f"market_activity_counted_until_timestamp_seconds {mstats['counted_until'].timestamp():.0f}\n"
+    kstats = ladder_keyframes.worker_status()
+    if kstats["runs_total"] or kstats["errors_total"]:
+        for name in ("runs_total", "keyframes_total", "errors_total"):
+            body += f"# TYPE ladder_keyframes_{name} counter\n"
+            body += f"ladder_keyframes_{name} {kstats[name]}\n"
+        if kstats["built_until"] is not None:
+            body += "# HELP ladder_keyframes_built_until_timestamp_seconds Latest built keyframe (UTC epoch).\n"
+            body += f"ladder_keyframes_built_until_timestamp_seconds {kstats['built_until'].timestamp():.0f}\n"
+    cstats = stream_cache.stats()
+    body += "# HELP stream_cache_entries Entries in the stream response cache (LRU, bounded by max).\n"
+    body += "# TYPE stream_cache_entries gauge\n"
+    body += f'stream_cache_entries{{state="used"}} {cstats["entries"]}\n'
+    body += f'stream_cache_entries{{state="max"}} {cstats["max_entries"]}\n'
+    for name in ("hits", "misses", "evictions"):
+        body += f"# TYPE stream_cache_{name}_total counter\n"
+        for endpoint, counts in cstats["endpoints"].items():
+            body += f'stream_cache_{name}_total{{endpoint="{endpoint}"}} {counts[name]}\n'
     return Response(content=body, media_type="text/plain; charset=utf-8")
 
 
@@ -322,6 +439,7 @@ def get_league_events(
     in_play_lookback_hours: float = Query(2.0, ge=0, le=168, description="When include_in_play, look back this many hours (default 2h)"),
     limit: int = Query(100, ge=1, le=200, description="Max events to return"),
     offset: int = Query(0, ge=0, description="Offset for pagination"),
+    calculation_version: Optional[str] = Query(None, description="Serve this calculation_version (default: metric_version_pointer)"),
 ):
     """Events in the league with latest snapshot. Default: current and upcoming only (now to now+48h UTC), ORDER BY event_open_date ASC."""
     league_decoded = unquote(league_name)
@@ -334,23 +452,11 @@ def get_league_events(
     else:
         from_effective = from_dt
 
+    latest = _latest_source(calculation_version)
     with cursor() as cur:
         cur.execute(
             """
-            WITH latest AS (
-                SELECT DISTINCT ON (d.market_id)
-                    d.market_id,
-                    d.snapshot_id,
-                    d.snapshot_at,
-                    d.home_best_back, d.away_best_back, d.draw_best_back,
-                    d.home_best_lay, d.away_best_lay, d.draw_best_lay,
-                    d.total_volume,
-                    d.depth_limit,
-                    d.calculation_version,
-                    d.home_book_risk_l3, d.away_book_risk_l3, d.draw_book_risk_l3
-                FROM market_derived_metrics d
-                ORDER BY d.market_id, d.snapshot_at DESC
-            )
+            WITH latest AS (SELECT * FROM """ + latest + """ x)
             SELECT
                 e.market_id,
                 e.event_id,
@@ -411,6 +517,7 @@ def get_book_risk_focus_events(
     require_book_risk: bool = Query(True, description="Only return rows where all three book_risk_l3 are non-NULL"),
     limit: int = Query(500, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    calculation_version: Optional[str] = Query(None, description="Serve this calculation_version (default: metric_version_pointer)"),
 ):
     """All events in the time window with latest metrics including Book Risk L3. Default: current and upcoming only (now to now+48h UTC)."""
     now = datetime.now(timezone.utc)
@@ -422,23 +529,11 @@ def get_book_risk_focus_events(
     else:
         from_effective = from_dt
 
+    latest = _latest_source(calculation_version)
     with cursor() as cur:
         cur.execute(
             """
-            WITH latest AS (
-                SELECT DISTINCT ON (d.market_id)
-                    d.market_id,
-                    d.snapshot_id,
-                    d.snapshot_at,
-                    d.home_book_risk_l3, d.away_book_risk_l3, d.draw_book_risk_l3,
-                    d.home_best_back, d.away_best_back, d.draw_best_back,
-                    d.home_best_lay, d.away_best_lay, d.draw_best_lay,
-                    d.total_volume,
-                    d.depth_limit,
-                    d.calculation_version
-                FROM market_derived_metrics d
-                ORDER BY d.market_id, d.snapshot_at DESC
-            )
+            WITH latest AS (SELECT * FROM """ + latest + """ x)
             SELECT
                 e.market_id,
                 e.event_id,
@@ -493,6 +588,7 @@ def get_book_risk_focus_events(
 @app.get("/events/by-date-snapshots")
 def get_events_by_date_snapshots(
     date: str = Query(..., description="UTC date YYYY-MM-DD"),
+    calculation_version: Optional[str] = Query(None, description="Serve this calculation_version (default: metric_version_pointer)"),
 ):
     """
     Snapshot-driven calendar: all events for the given UTC day that have at least one
@@ -504,23 +600,11 @@ def get_events_by_date_snapshots(
         raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
     to_dt = from_dt + timedelta(days=1)
 
+    latest = _latest_source(calculation_version)
     with cursor() as cur:
         cur.execute(
             """
-            WITH latest AS (
-                SELECT DISTINCT ON (d.market_id)
-                    d.market_id,
-                    d.snapshot_id,
-                    d.snapshot_at,
-                    d.home_book_risk_l3, d.away_book_risk_l3, d.draw_book_risk_l3,
-                    d.home_best_back, d.away_best_back, d.draw_best_back,
-                    d.home_best_lay, d.away_best_lay, d.draw_best_lay,
-                    d.total_volume,
-                    d.depth_limit,
-                    d.calculation_version
-                FROM market_derived_metrics d
-                ORDER BY d.market_id, d.snapshot_at DESC
-            )
+            WITH latest AS (SELECT * FROM """ + latest + """ x)
             SELECT
                 e.market_id,
                 e.event_id,
@@ -576,10 +660,15 @@ def get_event_timeseries(
     from_ts: Optional[str] = Query(None),
     to_ts: Optional[str] = Query(None),
     interval_minutes: int = Query(15, ge=1, le=60),
+    calculation_version: Optional[str] = Query(None, description="Serve this calculation_version (default: metric_version_pointer)"),
+    layout: Optional[str] = Query(None, pattern="^(rows|columnar)$", description="rows | columnar (one array per field)"),
+    float32: bool = Query(False, description="Round floats to float32 precision"),
+    accept: Optional[str] = Header(None),
 ):
     """
     Time series for one event: 15-min buckets, latest point per bucket.
     Returns snapshot_at, best_back, best_lay, book_risk_l3, total_volume. Imbalance/Impedance removed (MVP).
+    layout=columnar (or Accept: application/vnd.netbet.columnar+json): one array per field, see app.columnar.
     """
     now = datetime.now(timezone.utc)
     to_dt = _parse_ts(to_ts, now)
@@ -588,6 +677,7 @@ def get_event_timeseries(
     _l1_size_cols = ", home_best_back_size_l1, away_best_back_size_l1, draw_best_back_size_l1, home_best_lay_size_l1, away_best_lay_size_l1, draw_best_lay_size_l1"
     _l2_l3_cols = ", home_back_odds_l2, home_back_size_l2, home_back_odds_l3, home_back_size_l3, away_back_odds_l2, away_back_size_l2, away_back_odds_l3, away_back_size_l3, draw_back_odds_l2, draw_back_size_l2, draw_back_odds_l3, draw_back_size_l3"
 
+    mdm = _mdm_source(calculation_version)
     with cursor() as cur:
         cur.execute(
             """
@@ -603,7 +693,7 @@ def get_event_timeseries(
                     calculation_version
                     """ + _l1_size_cols + """
                     """ + _l2_l3_cols + """
-                FROM market_derived_metrics
+                FROM """ + mdm + """ mdm
                 WHERE market_id = %s
                   AND snapshot_at >= %s
                   AND snapshot_at <= %s
@@ -675,7 +765,69 @@ def get_event_timeseries(
             "draw_back_size_l3": _opt_float(r.get("draw_back_size_l3")),
         }
 
-    return [_serialize(r) for r in rows]
+    return columnar.rows_response([_serialize(r) for r in rows], layout, accept, float32)
+
+
+# Depth of curves recomputed on the fly for snapshots written before book_risk_curve existed
+BOOK_RISK_CURVE_DEPTH = int(os.environ.get("BOOK_RISK_CURVE_DEPTH", "10"))
+
+
+@app.get("/events/{market_id}/book-risk-curve")
+def get_event_book_risk_curve(
+    market_id: str,
+    from_ts: Optional[str] = Query(None),
+    to_ts: Optional[str] = Query(None),
+    depth: Optional[int] = Query(None, ge=1, le=50, description="Return values at this depth only"),
+    limit: int = Query(500, ge=1, le=5000),
+    calculation_version: Optional[str] = Query(None, description="Serve this calculation_version (default: metric_version_pointer)"),
+):
+    """
+    Book Risk per depth (1..N) for each REST snapshot: risk, back/lay size and liability per outcome.
+    Reads the stored market_derived_metrics.book_risk_curve; older rows without it are computed from
+    raw_payload with the same kernel as the REST writer.
+    """
+    now = datetime.now(timezone.utc)
+    to_dt = _parse_ts(to_ts, now)
+    from_dt = _parse_ts(from_ts, now - timedelta(hours=24))
+    mdm = _mdm_source(calculation_version)
+    with cursor() as cur:
+        cur.execute(
+            """
+            SELECT mdm.snapshot_at, mdm.calculation_version, mdm.book_risk_curve,
+                   CASE WHEN mdm.book_risk_curve IS NULL THEN s.raw_payload END AS raw_payload,
+                   e.home_selection_id, e.away_selection_id, e.draw_selection_id
+            FROM """ + mdm + """ mdm
+            LEFT JOIN market_book_snapshots s ON s.snapshot_id = mdm.snapshot_id
+            LEFT JOIN market_event_metadata e ON e.market_id = mdm.market_id
+            WHERE mdm.market_id = %s
+              AND mdm.snapshot_at >= %s
+              AND mdm.snapshot_at <= %s
+            ORDER BY mdm.snapshot_at ASC
+            LIMIT %s
+            """,
+            (market_id, from_dt, to_dt, limit),
+        )
+        rows = cur.fetchall()
+
+    def _curve(r: Any) -> Optional[dict]:
+        payload = r.get("book_risk_curve")
+        if payload is None and isinstance(r.get("raw_payload"), dict):
+            sids = (r.get("home_selection_id"), r.get("away_selection_id"), r.get("draw_selection_id"))
+            if all(sid is not None for sid in sids):
+                metadata = dict(zip(sids, ("HOME", "AWAY", "DRAW")))
+                payload = book_risk_curve_payload(
+                    compute_book_risk_curve(r["raw_payload"].get("runners") or [], metadata, max_depth=BOOK_RISK_CURVE_DEPTH)
+                )
+        return curve_payload_at_depth(payload, depth) if depth is not None else payload
+
+    return [
+        {
+            "snapshot_at": r["snapshot_at"].isoformat() if r.get("snapshot_at") else None,
+            "calculation_version": r.get("calculation_version"),
+            "curve": _curve(r),
+        }
+        for r in rows
+    ]
 
 
 def _truncate_raw_payload(payload: Any) -> tuple[Any, bool, int]:
@@ -811,6 +963,7 @@ def get_market_snapshots(
     from_ts: Optional[str] = Query(None),
     to_ts: Optional[str] = Query(None),
     limit: int = Query(500, ge=1, le=500, description="Max rows (default 500)"),
+    calculation_version: Optional[str] = Query(None, description="Serve this calculation_version (default: metric_version_pointer)"),
 ):
     """
     Full snapshot summary: all scalar columns from market_book_snapshots + market_derived_metrics + metadata.
@@ -823,6 +976,7 @@ def get_market_snapshots(
     max_window = timedelta(days=7)
     if to_dt - from_dt > max_window:
         from_dt = to_dt - max_window
+    mdm = _mdm_source(calculation_version)
     with cursor() as cur:
         cur.execute(
             """
@@ -853,7 +1007,7 @@ def get_market_snapshots(
                 e.market_name AS meta_market_name,
                 e.home_selection_id, e.away_selection_id, e.draw_selection_id
             FROM market_book_snapshots m
-            JOIN market_derived_metrics d ON d.snapshot_id = m.snapshot_id
+            JOIN """ + mdm + """ d ON d.snapshot_id = m.snapshot_id
             LEFT JOIN market_event_metadata e ON e.market_id = m.market_id
             WHERE m.market_id = %s
               AND m.snapshot_at >= %s
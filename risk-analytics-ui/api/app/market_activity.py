@@ -0,0 +1,202 @@
+"""
+Per-market stream activity index over stream_ingest.ladder_levels
+(sql/migrations/2026-10-19_create_stream_market_activity.sql):
+
+- stream_market_activity: first / last publish_time and level-0 back tick count per market;
+- stream_market_activity_daily: the same per (market, UTC day), plus ladder rows;
+- stream_market_selection_prices: last level-0 price / size per (market, selection, side);
+- stream_market_activity_watermark: everything published before counted_until is counted.
+
+stream_data answers "when did this market last tick" / "which markets have data on this day" from these tables
+plus a bounded ladder_levels read of [counted_until, ...), instead of unbounded scans (see _latest_publish_by_market).
+
+The worker advances the watermark in chunks of MARKET_ACTIVITY_CHUNK_MINUTES up to now - MARKET_ACTIVITY_GRACE_SECONDS
+(at most MARKET_ACTIVITY_MAX_CHUNKS_PER_CYCLE per cycle); each chunk is one transaction together with its watermark,
+so a failed cycle never counts a range twice. The first run starts at the oldest ladder row (ladder_levels_initial,
+the history before daily partitioning, else the oldest daily partition); readers ignore the tables until the
+watermark is within MARKET_ACTIVITY_MAX_LAG_SECONDS of now. Rows of days whose partition was dropped are pruned.
+Rows inserted with a publish_time already behind the watermark (later than the grace) are not counted.
+
+Worker: daemon thread in the API process every MARKET_ACTIVITY_INTERVAL_SECONDS, advisory lock, same writer
+credentials as the bucket store (POSTGRES_BUCKET_STORE_USER / PASSWORD); without them it does not start and the
+checks keep scanning ladder_levels.
+
+Usage (same env as the API):
+  python -m app.market_activity run-once
+"""
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from app.ladder_stats import _SQL_LEGACY_PRESENT, partition_days
+from app.writer_worker import WriterWorker
+
+logger = logging.getLogger(__name__)
+
+MARKET_ACTIVITY_LOCK_ID = 1234567890123459
+INTERVAL_SECONDS = float(os.environ.get("MARKET_ACTIVITY_INTERVAL_SECONDS", "60"))
+GRACE_SECONDS = float(os.environ.get("MARKET_ACTIVITY_GRACE_SECONDS", "60"))
+CHUNK_MINUTES = float(os.environ.get("MARKET_ACTIVITY_CHUNK_MINUTES", "60"))
+MAX_CHUNKS_PER_CYCLE = int(os.environ.get("MARKET_ACTIVITY_MAX_CHUNKS_PER_CYCLE", "24"))
+SOURCE = "ladder_levels"
+
+_SQL_WATERMARK = "SELECT counted_until FROM stream_market_activity_watermark WHERE source = %s"
+_SQL_LEGACY_OLDEST = "SELECT MIN(publish_time) AS t FROM stream_ingest.ladder_levels_initial"
+# Per (market, day) and per market in one statement; counts add up, first / last widen
+_SQL_ADD_CHUNK = """
+    WITH chunk AS (
+        SELECT market_id,
+               (publish_time AT TIME ZONE 'UTC')::date AS day,
+               MIN(publish_time) AS first_pt,
+               MAX(publish_time) AS last_pt,
+               COUNT(*) AS ladder_rows,
+               COUNT(*) FILTER (WHERE side = 'B' AND level = 0) AS ticks
+        FROM stream_ingest.ladder_levels
+        WHERE publish_time >= %(lo)s AND publish_time < %(hi)s
+        GROUP BY 1, 2
+    ), daily AS (
+        INSERT INTO stream_market_activity_daily AS d
+            (market_id, day, first_publish_time, last_publish_time, ladder_rows, ticks)
+        SELECT market_id, day, first_pt, last_pt, ladder_rows, ticks FROM chunk
+        ON CONFLICT (market_id, day) DO UPDATE SET
+            first_publish_time = LEAST(d.first_publish_time, EXCLUDED.first_publish_time),
+            last_publish_time = GREATEST(d.last_publish_time, EXCLUDED.last_publish_time),
+            ladder_rows = d.ladder_rows + EXCLUDED.ladder_rows,
+            ticks = d.ticks + EXCLUDED.ticks
+    )
+    INSERT INTO stream_market_activity AS a (market_id, first_publish_time, last_publish_time, ticks)
+    SELECT market_id, MIN(first_pt), MAX(last_pt), SUM(ticks) FROM chunk GROUP BY market_id
+    ON CONFLICT (market_id) DO UPDATE SET
+        first_publish_time = LEAST(a.first_publish_time, EXCLUDED.first_publish_time),
+        last_publish_time = GREATEST(a.last_publish_time, EXCLUDED.last_publish_time),
+        ticks = a.ticks + EXCLUDED.ticks,
+        updated_at = now()
+"""
+_SQL_ADD_PRICES = """
+    INSERT INTO stream_market_selection_prices AS p (market_id, selection_id, side, price, size, publish_time)
+    SELECT DISTINCT ON (market_id, selection_id, side) market_id, selection_id, side, price, size, publish_time
+    FROM stream_ingest.ladder_levels
+    WHERE publish_time >= %(lo)s AND publish_time < %(hi)s AND level = 0
+    ORDER BY market_id, selection_id, side, publish_time DESC
+    ON CONFLICT (market_id, selection_id, side) DO UPDATE SET
+        price = EXCLUDED.price,
+        size = EXCLUDED.size,
+        publish_time = EXCLUDED.publish_time
+    WHERE p.publish_time <= EXCLUDED.publish_time
+"""
+_SQL_SET_WATERMARK = """
+    INSERT INTO stream_market_activity_watermark (source, counted_until)
+    VALUES (%(source)s, %(hi)s)
+    ON CONFLICT (source) DO UPDATE SET counted_until = EXCLUDED.counted_until, updated_at = now()
+"""
+_SQL_HAS_PRUNABLE = "SELECT EXISTS (SELECT 1 FROM stream_market_activity_daily WHERE day < %s) AS prunable"
+# Retention: per-market rows are rebuilt from the remaining days
+_SQL_PRUNE = """
+    DELETE FROM stream_market_activity_daily WHERE day < %(day)s;
+    DELETE FROM stream_market_selection_prices WHERE publish_time < %(start)s;
+    DELETE FROM stream_market_activity a
+    WHERE a.first_publish_time < %(start)s
+      AND NOT EXISTS (SELECT 1 FROM stream_market_activity_daily d WHERE d.market_id = a.market_id);
+    UPDATE stream_market_activity a
+    SET first_publish_time = d.first_publish_time, ticks = d.ticks, updated_at = now()
+    FROM (
+        SELECT market_id, MIN(first_publish_time) AS first_publish_time, SUM(ticks) AS ticks
+        FROM stream_market_activity_daily
+        GROUP BY market_id
+    ) d
+    WHERE a.market_id = d.market_id AND a.first_publish_time < %(start)s;
+"""
+
+
+def add_chunk(cur: Any, lo: datetime, hi: datetime) -> None:
+    """Count ladder rows published in [lo, hi) and move the watermark to hi (caller commits)."""
+    params = {"lo": lo, "hi": hi, "source": SOURCE}
+    cur.execute(_SQL_ADD_CHUNK, params)
+    cur.execute(_SQL_ADD_PRICES, params)
+    cur.execute(_SQL_SET_WATERMARK, params)
+
+
+def refresh(cur: Any, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """
+    One maintenance pass: prune days of dropped partitions, then add chunks up to now - grace (commits per chunk).
+    Returns {"chunks", "pruned", "counted_until"}.
+    """
+    now = now or datetime.now(timezone.utc)
+    conn = cur.connection
+    upper = now - timedelta(seconds=GRACE_SECONDS)
+    parts = partition_days(cur)
+    if not parts:
+        return {"chunks": 0, "pruned": False, "counted_until": None}
+    oldest = min(parts)
+    oldest_start = datetime(oldest.year, oldest.month, oldest.day, tzinfo=timezone.utc)
+    cur.execute(_SQL_LEGACY_PRESENT)
+    legacy = bool(cur.fetchone()["present"])
+
+    # While ladder_levels_initial exists nothing older than the daily partitions was dropped
+    pruned = False
+    if not legacy:
+        cur.execute(_SQL_HAS_PRUNABLE, (oldest,))
+        pruned = bool(cur.fetchone()["prunable"])
+        if pruned:
+            cur.execute(_SQL_PRUNE, {"day": oldest, "start": oldest_start})
+            conn.commit()
+
+    cur.execute(_SQL_WATERMARK, (SOURCE,))
+    row = cur.fetchone()
+    if row:
+        counted_until = row["counted_until"]
+    else:
+        counted_until = oldest_start
+        if legacy:
+            cur.execute(_SQL_LEGACY_OLDEST)
+            counted_until = min(counted_until, (cur.fetchone() or {}).get("t") or counted_until)
+    chunks = 0
+    while chunks < MAX_CHUNKS_PER_CYCLE and counted_until < upper:
+        hi = min(counted_until + timedelta(minutes=CHUNK_MINUTES), upper)
+        add_chunk(cur, counted_until, hi)
+        conn.commit()
+        counted_until = hi
+        chunks += 1
+    _worker.count(chunks_total=chunks)
+    _worker.set(counted_until=counted_until)
+    return {"chunks": chunks, "pruned": pruned, "counted_until": counted_until}
+
+
+_worker = WriterWorker(
+    "market activity",
+    MARKET_ACTIVITY_LOCK_ID,
+    refresh,
+    INTERVAL_SECONDS,
+    {"chunks_total": 0, "counted_until": None},
+    worth_logging=lambda r: r["chunks"] > 1 or r["pruned"],
+)
+
+
+def run_cycle(now: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+    """refresh() under the advisory lock on a writer connection; None if another instance holds the lock."""
+    return _worker.run_cycle(now)
+
+
+def worker_status() -> Dict[str, Any]:
+    """Counters and watermark for /metrics."""
+    return _worker.status()
+
+
+def start_background_worker() -> None:
+    """Start the market activity worker in a daemon thread when writer credentials are configured."""
+    _worker.start("checks scan ladder_levels")
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+    ap = argparse.ArgumentParser(description="Per-market stream activity index (stream_market_activity*)")
+    sub = ap.add_subparsers(dest="command", required=True)
+    sub.add_parser("run-once", help="One worker cycle: prune dropped days, advance the watermark")
+    ap.parse_args()
+    logger.info("market activity: %s", run_cycle())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Which calculation_version of the REST derived metrics the API serves.
+
+'v1' is the in-place market_derived_metrics table written by the REST daemon. Recomputed versions
+(betfair-rest-client/recompute_version.py) live in partitions of market_derived_metrics_versions; the
+served one is named by metric_version_pointer (slot 'served'). Switching is a single UPDATE of the
+pointer; the API picks it up within METRIC_VERSION_POINTER_TTL_SECONDS. Endpoints may also request a
+specific ready version (?calculation_version=v2) to compare side by side.
+
+The daemon keeps writing only v1. A recomputed version covers the snapshots up to its built_through_snapshot_id
+(set by each complete `run`); newer snapshots are read from market_derived_metrics, so a served version never
+freezes at its last run.
+
+List endpoints that need only each market's latest row read it through latest_metrics_source: for v1 that is
+market_latest_metrics (one row per market, upserted by the REST writer; betfair-rest-client/latest_metrics.py)
+when the API's role may SELECT from it and LATEST_METRICS_READ is on, otherwise DISTINCT ON over the version's full history.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Set
+
+from app.db import cursor
+
+logger = logging.getLogger(__name__)
+
+BASELINE_VERSION = "v1"
+SERVED_SLOT = "served"
+POINTER_TTL_SECONDS = float(os.environ.get("METRIC_VERSION_POINTER_TTL_SECONDS", "30"))
+_VERSION_RE = re.compile(r"^[a-z0-9_]{1,40}$")
+LATEST_METRICS_READ = os.environ.get("LATEST_METRICS_READ", "1").strip().lower() in ("1", "true", "yes")
+
+# Columns of market_latest_metrics, also selected by the DISTINCT ON fallback
+LATEST_COLUMNS = (
+    "market_id", "snapshot_id", "snapshot_at",
+    "home_best_back", "away_best_back", "draw_best_back", "home_best_lay", "away_best_lay", "draw_best_lay",
+    "total_volume", "depth_limit", "calculation_version", "home_book_risk_l3", "away_book_risk_l3", "draw_book_risk_l3",
+)
+
+# Columns of market_derived_metrics_versions; the v1 tail of a recomputed version selects the same from
+# market_derived_metrics
+VERSION_TABLE_COLUMNS = (
+    "calculation_version", "snapshot_id", "snapshot_at", "market_id", "total_volume",
+    "home_best_back", "away_best_back", "draw_best_back", "home_best_lay", "away_best_lay", "draw_best_lay",
+    "home_spread", "away_spread", "draw_spread", "depth_limit",
+    "home_book_risk_l3", "away_book_risk_l3", "draw_book_risk_l3",
+    "home_best_back_size_l1", "away_best_back_size_l1", "draw_best_back_size_l1",
+    "home_best_lay_size_l1", "away_best_lay_size_l1", "draw_best_lay_size_l1",
+    "home_back_odds_l2", "home_back_size_l2", "home_back_odds_l3", "home_back_size_l3",
+    "away_back_odds_l2", "away_back_size_l2", "away_back_odds_l3", "away_back_size_l3",
+    "draw_back_odds_l2", "draw_back_size_l2", "draw_back_odds_l3", "draw_back_size_l3",
+    "book_risk_curve",
+)
+
+_lock = threading.Lock()
+_state: Dict[str, object] = {
+    "served": BASELINE_VERSION, "ready": set(), "built_through": {}, "latest_table": False, "loaded_at": 0.0,
+}
+
+
+class UnknownVersionError(ValueError):
+    """Requested calculation_version is not a ready recomputed version."""
+
+
+def _refresh() -> None:
+    served, ready, built_through, latest_table = BASELINE_VERSION, set(), {}, False
+    try:
+        with cursor() as cur:
+            # Readable, not just present: the REST writer creates it (and grants SELECT); NULL oid -> not present
+            cur.execute(
+                "SELECT COALESCE(has_table_privilege(current_user, to_regclass('public.market_latest_metrics'), 'SELECT'), "
+                "false) AS readable"
+            )
+            latest_table = bool(cur.fetchone()["readable"])
+            cur.execute("SELECT to_regclass('public.metric_version_pointer') IS NOT NULL AS present")
+            if cur.fetchone()["present"]:
+                cur.execute("SELECT calculation_version FROM metric_version_pointer WHERE slot = %s", (SERVED_SLOT,))
+                row = cur.fetchone()
+                if row and row["calculation_version"]:
+                    served = row["calculation_version"]
+                # Through to_jsonb: registries created before built_through_snapshot_id existed still load
+                cur.execute(
+                    "SELECT calculation_version, (to_jsonb(v) ->> 'built_through_snapshot_id')::bigint AS built_through "
+                    "FROM metric_calculation_versions v WHERE status = 'ready'"
+                )
+                rows = cur.fetchall()
+                ready = {r["calculation_version"] for r in rows}
+                built_through = {r["calculation_version"]: r["built_through"] for r in rows if r["built_through"]}
+    except Exception as e:
+        # Keep serving the last known version if the pointer cannot be read
+        logger.warning("metric version pointer refresh failed: %s", e)
+        with _lock:
+            _state["loaded_at"] = time.monotonic()
+        return
+    if served != BASELINE_VERSION and served not in ready:
+        logger.warning("Pointer names %s but it is not ready; serving %s", served, BASELINE_VERSION)
+        served = BASELINE_VERSION
+    with _lock:
+        if served != _state["served"]:
+            logger.info("Serving calculation_version=%s", served)
+        _state.update(
+            served=served, ready=ready, built_through=built_through, latest_table=latest_table, loaded_at=time.monotonic(),
+        )
+
+
+def _ensure_fresh() -> None:
+    with _lock:
+        stale = time.monotonic() - float(_state["loaded_at"]) >= POINTER_TTL_SECONDS
+    if stale:
+        _refresh()
+
+
+def served_version() -> str:
+    _ensure_fresh()
+    with _lock:
+        return str(_state["served"])
+
+
+def ready_versions() -> Set[str]:
+    _ensure_fresh()
+    with _lock:
+        return set(_state["ready"]) | {BASELINE_VERSION}
+
+
+def derived_metrics_source(requested: Optional[str] = None) -> str:
+    """
+    SQL FROM-item (alias it in the query) for the derived metrics of `requested` or the served version: a recomputed
+    version's partition plus the v1 rows ingested after its built range. Raises UnknownVersionError for a version
+    that is not ready.
+    """
+    version = (requested or "").strip().lower() or served_version()
+    if version == BASELINE_VERSION:
+        return "market_derived_metrics"
+    if not _VERSION_RE.match(version) or version not in ready_versions():
+        raise UnknownVersionError(version)
+    with _lock:
+        built_through = _state["built_through"].get(version)
+    # Literal (validated above) so the planner prunes to the version's partition
+    if not built_through:
+        return "(SELECT * FROM market_derived_metrics_versions WHERE calculation_version = '%s')" % version
+    columns = ", ".join(VERSION_TABLE_COLUMNS)
+    return (
+        "(SELECT %s FROM market_derived_metrics_versions WHERE calculation_version = '%s' "
+        "UNION ALL SELECT %s FROM market_derived_metrics WHERE snapshot_id > %d)"
+    ) % (columns, version, columns, int(built_through))
+
+
+def latest_metrics_source(requested: Optional[str] = None) -> str:
+    """
+    SQL FROM-item (alias it in the query) with each market's latest derived-metrics row (LATEST_COLUMNS) for
+    `requested` or the served version. Raises UnknownVersionError like derived_metrics_source.
+    """
+    source = derived_metrics_source(requested)
+    if source == "market_derived_metrics" and LATEST_METRICS_READ:
+        with _lock:
+            latest_table = bool(_state["latest_table"])
+        if latest_table:
+            return "market_latest_metrics"
+    return "(SELECT DISTINCT ON (d.market_id) %s FROM %s d ORDER BY d.market_id, d.snapshot_at DESC)" % (
+        ", ".join("d." + c for c in LATEST_COLUMNS), source,
+    )
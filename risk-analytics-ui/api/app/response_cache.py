@@ -0,0 +1,192 @@
+"""
+In-process response cache for the stream endpoints (stream_router), bounded LRU.
+
+Results whose buckets are all closed (bucket end + BUCKET_STORE_GRACE_SECONDS for late ticks) or whose UTC day has
+settled never change and are kept until evicted. Results that touch the open bucket expire at the next bucket
+boundary, and are dropped earlier when the market (or, for the by-date lists, the stream) has a newer publish_time
+than when they were cached: each hit on such an entry runs one small validator query instead of the computation.
+
+The timeseries endpoints drop buckets whose latest update is older than STALE_MINUTES, so their result keeps
+changing until the whole window is past that horizon; within it they follow the open-bucket rule (a dropped point
+can remain visible until the next boundary).
+
+STREAM_RESPONSE_CACHE_MAX_ENTRIES bounds the entry count (0 disables caching). Per-endpoint hits / misses /
+evictions are exported on /metrics; POST /stream/cache/purge drops entries.
+
+An entry also keeps the response bodies rendered from its value (app.fast_json: orjson, gzip, ETag), one per
+representation (layout), and drops them with the value.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from app.bucket_store import GRACE_SECONDS, last_closed_bucket
+from app.stream_data import STALE_MINUTES, _bucket_15_utc
+
+MAX_ENTRIES = int(os.environ.get("STREAM_RESPONSE_CACHE_MAX_ENTRIES", "512"))
+# A past UTC day is final once its late markets are settled and past the staleness horizon
+PAST_DATE_SETTLE_HOURS = float(os.environ.get("STREAM_RESPONSE_CACHE_PAST_DATE_SETTLE_HOURS", "12"))
+BUCKET = timedelta(minutes=15)
+
+# Validators: newest publish_time since the open bucket started (None when nothing arrived yet)
+SQL_MARKET_PUBLISHED_SINCE = """
+    SELECT max(publish_time) AS t
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = %s AND publish_time >= %s
+"""
+# By-date lists span every market of the day; liquidity history has a publish_time index (ladder_levels does not)
+SQL_STREAM_PUBLISHED_SINCE = """
+    SELECT max(publish_time) AS t
+    FROM stream_ingest.market_liquidity_history
+    WHERE publish_time >= %s
+"""
+
+# (expires_at, validator_sql, validator_params); expires_at None = never expires, validator_sql None = no validation
+Policy = Tuple[Optional[datetime], Optional[str], tuple]
+
+
+def _now(now: Optional[datetime]) -> datetime:
+    return now or datetime.now(timezone.utc)
+
+
+def _open_policy(now: datetime, sql: str, params: tuple) -> Policy:
+    """
+    Until the next bucket boundary, or until the validator sees a newer publish_time. Within the late-tick grace
+    after a boundary, until the grace ends (the previous bucket may still receive ticks published before now).
+    """
+    boundary = _bucket_15_utc(now)
+    grace_end = boundary + timedelta(seconds=GRACE_SECONDS)
+    return (grace_end if now < grace_end else boundary + BUCKET), sql, params
+
+
+def buckets_policy(market_id: str, bucket_times: List[datetime], now: Optional[datetime] = None) -> Policy:
+    """Bulk buckets: closed window kept, otherwise open-bucket rule."""
+    now = _now(now)
+    if bucket_times[-1] <= last_closed_bucket(now):
+        return None, None, ()
+    return _open_policy(now, SQL_MARKET_PUBLISHED_SINCE, (market_id, _bucket_15_utc(now)))
+
+
+def timeseries_policy(market_id: str, bucket_times: List[datetime], now: Optional[datetime] = None) -> Policy:
+    """Timeseries / snapshots: final once the last bucket is past the staleness horizon (every bucket is dropped)."""
+    now = _now(now)
+    if bucket_times[-1] < now - timedelta(minutes=STALE_MINUTES):
+        return None, None, ()
+    return _open_policy(now, SQL_MARKET_PUBLISHED_SINCE, (market_id, _bucket_15_utc(now)))
+
+
+def event_buckets_policy(market_id: str, now: Optional[datetime] = None) -> Policy:
+    """
+    Event-aware buckets cover the market's whole history, but an update after caching lands in the open bucket (or,
+    within the grace, the one before it): the bounded validator of the open-bucket rule sees it.
+    """
+    now = _now(now)
+    return _open_policy(now, SQL_MARKET_PUBLISHED_SINCE, (market_id, _bucket_15_utc(now) - BUCKET))
+
+
+def by_date_policy(date_str: str, now: Optional[datetime] = None) -> Policy:
+    """By-date lists: a settled past day is kept, other days follow the open-bucket rule."""
+    now = _now(now)
+    try:
+        day = datetime.strptime(date_str.strip(), "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    except ValueError:
+        return None, None, ()  # invalid date: constant empty result
+    if day + timedelta(days=1, hours=PAST_DATE_SETTLE_HOURS) <= now:
+        return None, None, ()
+    return _open_policy(now, SQL_STREAM_PUBLISHED_SINCE, (_bucket_15_utc(now),))
+
+
+def ttl_policy(seconds: float, now: Optional[datetime] = None) -> Policy:
+    """Plain time-to-live, no validation (data-horizon)."""
+    return _now(now) + timedelta(seconds=seconds), None, ()
+
+
+class ResponseCache:
+    """
+    LRU of endpoint results keyed by (endpoint, key). Each entry keeps its expiry and the validator value
+    (publish_time) seen when it was stored; a lookup with a different validator value is a miss. Rendered bodies of
+    the value are attached with attach_rendered() and read with rendered().
+    Thread-safe: sync endpoints run in the threadpool.
+    """
+
+    def __init__(self, max_entries: int = MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # (endpoint, key) -> (value, expires_at, validator, market_id, rendered bodies by variant)
+        self._entries: "OrderedDict[Tuple[str, Hashable], Tuple[Any, Optional[datetime], Any, Optional[str], Dict[Hashable, Any]]]" = OrderedDict()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, endpoint: str, name: str) -> None:
+        stats = self._stats.setdefault(endpoint, {"hits": 0, "misses": 0, "evictions": 0})
+        stats[name] += 1
+
+    def get(self, endpoint: str, key: Hashable, validator: Any = None, now: Optional[datetime] = None) -> Tuple[bool, Any]:
+        """(True, value) on a hit; expired or invalidated entries are dropped and count as misses."""
+        with self._lock:
+            entry = self._entries.get((endpoint, key))
+            if entry is not None:
+                value, expires_at, cached_validator = entry[:3]
+                if (expires_at is None or _now(now) < expires_at) and cached_validator == validator:
+                    self._entries.move_to_end((endpoint, key))
+                    self._count(endpoint, "hits")
+                    return True, value
+                del self._entries[(endpoint, key)]
+            self._count(endpoint, "misses")
+            return False, None
+
+    def put(
+        self,
+        endpoint: str,
+        key: Hashable,
+        value: Any,
+        expires_at: Optional[datetime],
+        validator: Any = None,
+        market_id: Optional[str] = None,
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[(endpoint, key)] = (value, expires_at, validator, market_id, {})
+            self._entries.move_to_end((endpoint, key))
+            while len(self._entries) > self.max_entries:
+                (evicted_endpoint, _), _ = self._entries.popitem(last=False)
+                self._count(evicted_endpoint, "evictions")
+
+    def rendered(self, endpoint: str, key: Hashable, variant: Hashable, value: Any) -> Any:
+        """Body rendered for variant from value, if value is still the entry's value; else None."""
+        with self._lock:
+            entry = self._entries.get((endpoint, key))
+            if entry is None or entry[0] is not value:
+                return None
+            return entry[4].get(variant)
+
+    def attach_rendered(self, endpoint: str, key: Hashable, variant: Hashable, value: Any, rendered: Any) -> None:
+        """Keep rendered with the entry while value is its value (no-op when it was replaced or evicted)."""
+        with self._lock:
+            entry = self._entries.get((endpoint, key))
+            if entry is not None and entry[0] is value:
+                entry[4][variant] = rendered
+
+    def purge(self, endpoint: Optional[str] = None, market_id: Optional[str] = None) -> int:
+        """Drop the entries of one endpoint and/or market (all entries when both are None); returns the count."""
+        with self._lock:
+            doomed = [
+                k for k, entry in self._entries.items()
+                if (endpoint is None or k[0] == endpoint) and (market_id is None or entry[3] == market_id)
+            ]
+            for k in doomed:
+                del self._entries[k]
+            return len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "endpoints": {name: dict(s) for name, s in sorted(self._stats.items())},
+            }
+
+
+stream_cache = ResponseCache()
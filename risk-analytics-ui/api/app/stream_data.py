@@ -8,9 +8,13 @@ Bucket parameters: time-weighted medians of back_odds and back_size per 15-min U
 Uses carry-forward logic: baseline from before bucket_start, then segments for updates in bucket.
 """
 import logging
+import os
+import time
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timezone, timedelta
 from typing import Any, Dict, List, Optional, Tuple, Union
 
+from app.book_risk_l3 import book_risk_from_level_updates
 from app.db import cursor
 
 logger = logging.getLogger(__name__)
@@ -20,6 +24,18 @@ logger = logging.getLogger(__name__)
 STALE_MINUTES = 120
 DEPTH_LIMIT = 3  # Legacy: used only for ladder display compatibility, NOT for risk computation
 
+# Query budgets of the stream event lists (asserted in tests/test_stream_enrichment.py).
+# Market activity / ladder keyframe watermark probes when due (table present + watermark row), cached for their TTL.
+ACTIVITY_PROBE_QUERIES = 2
+KEYFRAME_PROBE_QUERIES = 2
+# _load_fresh_markets_enrichment: last update per market + keyframe probe + 3 bulk enrichment queries.
+LOADER_QUERY_BUDGET = 1 + KEYFRAME_PROBE_QUERIES + 3
+# get_stream_markets_with_ladder_for_date: activity probe + counted days + uncounted tail (or one ladder_levels scan).
+MARKETS_FOR_DATE_QUERY_BUDGET = ACTIVITY_PROBE_QUERIES + 2
+# snapshots: markets with ladder for the date + metadata + loader; league: metadata + loader.
+SNAPSHOTS_STREAM_QUERY_BUDGET = MARKETS_FOR_DATE_QUERY_BUDGET + 1 + LOADER_QUERY_BUDGET
+LEAGUE_EVENTS_QUERY_BUDGET = 1 + LOADER_QUERY_BUDGET
+
 
 def _bucket_15_utc(dt: datetime) -> datetime:
     """Floor to 15-min UTC: HH:00, HH:15, HH:30, HH:45."""
@@ -55,22 +71,7 @@ def _runners_from_ladder(
     Returns (runners_list, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl, total_volume).
     total_volume from market_liquidity_history at or before bucket_time.
     """
-    cur.execute(
-        """
-        WITH latest_per_level AS (
-            SELECT DISTINCT ON (selection_id, side, level)
-                selection_id, side, level, price, size
-            FROM stream_ingest.ladder_levels
-            WHERE market_id = %s AND publish_time <= %s
-            ORDER BY selection_id, side, level, publish_time DESC
-        )
-        SELECT selection_id, side, level, price, size
-        FROM latest_per_level
-        ORDER BY selection_id, side, level
-        """,
-        (market_id, bucket_time),
-    )
-    rows = cur.fetchall()
+    rows = _ladder_state_rows(cur, [market_id], bucket_time)
     # total_volume for this market at or before bucket_time
     cur.execute(
         """
@@ -84,7 +85,20 @@ def _runners_from_ladder(
     )
     tv_row = cur.fetchone()
     total_volume = float(tv_row["total_matched"]) if tv_row and tv_row.get("total_matched") is not None else None
+    runners, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl = _runners_from_level_rows(rows, home_sid, away_sid, draw_sid)
+    return runners, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl, total_volume
+
 
+def _runners_from_level_rows(
+    rows: List[Dict[str, Any]],
+    home_sid: Optional[int],
+    away_sid: Optional[int],
+    draw_sid: Optional[int],
+) -> Tuple[List[Dict], Optional[float], Optional[float], Optional[float], Optional[float], Optional[float], Optional[float]]:
+    """
+    Latest-per-level ladder rows (selection_id, side, level, price, size) of one market ->
+    (runners_list, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl). No DB.
+    """
     # Build per-selection back/lay ladders (level -> (price, size))
     by_sel: Dict[int, Dict[str, List[Tuple[float, float]]]] = {}
     for r in rows:
@@ -128,36 +142,274 @@ def _runners_from_ladder(
         elif sid == draw_sid:
             draw_bb, draw_bl = bb, bl
 
-    return runners, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl, total_volume
+    return runners, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl
 
 
-def _latest_publish_before(cur: Any, market_id: str, bucket_time: datetime) -> Optional[datetime]:
-    cur.execute(
-        """
-        SELECT MAX(publish_time) AS t
-        FROM stream_ingest.ladder_levels
-        WHERE market_id = %s AND publish_time <= %s
-        """,
-        (market_id, bucket_time),
-    )
+# Lower-bounded by the staleness cutoff: an older update counts as none, and the read stays within recent partitions
+_SQL_LATEST_PUBLISH_BEFORE = """
+    SELECT MAX(publish_time) AS t
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = %s AND publish_time >= %s AND publish_time <= %s
+"""
+
+
+def _latest_publish_before(cur: Any, market_id: str, since: datetime, bucket_time: datetime) -> Optional[datetime]:
+    """Latest update in [since, bucket_time], or None."""
+    cur.execute(_SQL_LATEST_PUBLISH_BEFORE, (market_id, since, bucket_time))
     row = cur.fetchone()
     return row["t"] if row and row.get("t") else None
 
 
-def _first_publish_in_bucket(
-    cur: Any, market_id: str, bucket_start: datetime, bucket_end: datetime
-) -> Optional[datetime]:
-    """Earliest publish_time in [bucket_start, bucket_end) for this market. Used to include buckets that have ticks only inside the bucket."""
-    cur.execute(
-        """
-        SELECT MIN(publish_time) AS t
+# Market activity (public.stream_market_activity*, maintained by app.market_activity): first / last publish_time
+# per market and per UTC day, counted for publish_time < watermark. "When did this market last tick" is answered
+# from it plus a bounded tail query on ladder_levels for [watermark, ...). Used only when the watermark is within
+# MARKET_ACTIVITY_MAX_LAG_SECONDS of now (worker running and caught up); otherwise the unbounded scans are used.
+MARKET_ACTIVITY_READ = os.environ.get("MARKET_ACTIVITY_READ", "1").strip().lower() in ("1", "true", "yes")
+MARKET_ACTIVITY_MAX_LAG_SECONDS = float(os.environ.get("MARKET_ACTIVITY_MAX_LAG_SECONDS", "900"))
+MARKET_ACTIVITY_PROBE_TTL_SECONDS = 60.0
+_SQL_ACTIVITY_PRESENT = "SELECT to_regclass('public.stream_market_activity_watermark') IS NOT NULL AS present"
+_SQL_ACTIVITY_WATERMARK = "SELECT counted_until FROM stream_market_activity_watermark WHERE source = 'ladder_levels'"
+# Per market: the latest activity day starting at or before t (its ticks bound the search for the last one <= t)
+_SQL_ACTIVITY_DAY_AT_OR_BEFORE = """
+    SELECT DISTINCT ON (market_id) market_id, first_publish_time, last_publish_time
+    FROM stream_market_activity_daily
+    WHERE market_id = ANY(%s) AND first_publish_time <= %s
+    ORDER BY market_id, day DESC
+"""
+_SQL_ACTIVITY_MARKET = """
+    SELECT first_publish_time, last_publish_time
+    FROM stream_market_activity
+    WHERE market_id = %s
+"""
+_SQL_ACTIVITY_MARKETS_ON_DAYS = """
+    SELECT DISTINCT market_id
+    FROM stream_market_activity_daily
+    WHERE day >= %s AND day < %s
+"""
+_SQL_LAST_PUBLISH_IN_RANGE = """
+    SELECT market_id, MAX(publish_time) AS t
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = ANY(%s) AND publish_time >= %s AND publish_time <= %s
+    GROUP BY market_id
+"""
+_SQL_PUBLISH_RANGE_SINCE = """
+    SELECT MIN(publish_time) AS min_pt, MAX(publish_time) AS max_pt
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = %s AND publish_time >= %s
+"""
+_SQL_MARKETS_WITH_LADDER = """
+    SELECT DISTINCT market_id
+    FROM stream_ingest.ladder_levels
+    WHERE publish_time >= %s AND publish_time < %s
+"""
+_activity_probe: Dict[str, Any] = {"watermark": None, "checked_at": None}
+
+
+def _activity_probe_due() -> bool:
+    checked_at = _activity_probe["checked_at"]
+    return MARKET_ACTIVITY_READ and (checked_at is None or time.monotonic() - checked_at > MARKET_ACTIVITY_PROBE_TTL_SECONDS)
+
+
+def _activity_record_probe(watermark: Optional[datetime]) -> None:
+    if watermark is not None and watermark.tzinfo is None:
+        watermark = watermark.replace(tzinfo=timezone.utc)
+    _activity_probe.update(watermark=watermark, checked_at=time.monotonic())
+
+
+def _activity_usable_watermark() -> Optional[datetime]:
+    """Cached watermark when recent enough to answer from the activity tables (an older cached value is still exact)."""
+    watermark = _activity_probe["watermark"]
+    if not MARKET_ACTIVITY_READ or watermark is None:
+        return None
+    if watermark < datetime.now(timezone.utc) - timedelta(seconds=MARKET_ACTIVITY_MAX_LAG_SECONDS):
+        return None
+    return watermark
+
+
+def _activity_watermark(cur: Any) -> Optional[datetime]:
+    """Activity watermark (probe cached MARKET_ACTIVITY_PROBE_TTL_SECONDS), or None to use the ladder_levels scans."""
+    if _activity_probe_due():
+        cur.execute(_SQL_ACTIVITY_PRESENT)
+        watermark = None
+        if cur.fetchone()["present"]:
+            cur.execute(_SQL_ACTIVITY_WATERMARK)
+            row = cur.fetchone()
+            watermark = row["counted_until"] if row else None
+        _activity_record_probe(watermark)
+    return _activity_usable_watermark()
+
+
+def _latest_publish_plan(
+    day_rows: List[Dict[str, Any]], t: datetime
+) -> Tuple[Dict[str, datetime], Dict[str, datetime]]:
+    """
+    From each market's latest activity day starting at or before t: (known, scan). known[m] is the exact last update
+    <= t (the whole day is <= t); scan[m] is the lower bound of a search in ladder_levels (the day runs past t).
+    Markets in neither have no counted update <= t. Exact for t below the watermark.
+    """
+    known: Dict[str, datetime] = {}
+    scan: Dict[str, datetime] = {}
+    for r in day_rows:
+        if r["last_publish_time"] <= t:
+            known[r["market_id"]] = r["last_publish_time"]
+        else:
+            scan[r["market_id"]] = r["first_publish_time"]
+    return known, scan
+
+
+def _latest_publish_by_market(
+    cur: Any, market_ids: List[str], t: Optional[datetime], watermark: datetime
+) -> Dict[str, datetime]:
+    """
+    Last ladder update at or before t (None: latest) per market, from the activity tables plus bounded ladder_levels
+    reads: the day that runs past t, and the uncounted tail [watermark, t]. At most 3 queries, all time-bounded.
+    """
+    if not market_ids:
+        return {}
+    t = t or datetime.now(timezone.utc) + timedelta(days=1)
+    cur.execute(_SQL_ACTIVITY_DAY_AT_OR_BEFORE, (market_ids, t))
+    out, scan = _latest_publish_plan(cur.fetchall(), t)
+    if scan:
+        cur.execute(_SQL_LAST_PUBLISH_IN_RANGE, (list(scan), min(scan.values()), t))
+        out.update({r["market_id"]: r["t"] for r in cur.fetchall() if r.get("t")})
+    if t >= watermark:
+        # Updates at or after the watermark are not counted yet; they are later than anything counted
+        cur.execute(_SQL_LAST_PUBLISH_IN_RANGE, (market_ids, watermark, t))
+        out.update({r["market_id"]: r["t"] for r in cur.fetchall() if r.get("t")})
+    return out
+
+
+def _market_publish_range(cur: Any, market_id: str) -> Optional[Tuple[datetime, datetime]]:
+    """(first, last) publish_time of a market's ladder updates, or None without any."""
+    watermark = _activity_watermark(cur)
+    if watermark is not None:
+        cur.execute(_SQL_ACTIVITY_MARKET, (market_id,))
+        counted = cur.fetchone() or {}
+        cur.execute(_SQL_PUBLISH_RANGE_SINCE, (market_id, watermark))
+        tail = cur.fetchone() or {}
+        min_pt = counted.get("first_publish_time") or tail.get("min_pt")
+        max_pt = tail.get("max_pt") or counted.get("last_publish_time")
+    else:
+        cur.execute(
+            """
+            SELECT MIN(publish_time) AS min_pt, MAX(publish_time) AS max_pt
+            FROM stream_ingest.ladder_levels
+            WHERE market_id = %s
+            """,
+            (market_id,),
+        )
+        row = cur.fetchone() or {}
+        min_pt, max_pt = row.get("min_pt"), row.get("max_pt")
+    if min_pt is None or max_pt is None:
+        return None
+    if min_pt.tzinfo is None:
+        min_pt = min_pt.replace(tzinfo=timezone.utc)
+    if max_pt.tzinfo is None:
+        max_pt = max_pt.replace(tzinfo=timezone.utc)
+    return min_pt, max_pt
+
+
+# Ladder keyframes (public.stream_ladder_keyframes, maintained by app.ladder_keyframes): the full ladder of each market
+# that changed, every interval_minutes on the UTC grid (bucket boundaries included). The ladder state at t is the
+# market's latest keyframe at or before the grid point k = floor(t) plus the ladder_levels rows in (k, t], instead of
+# DISTINCT ON over the market's whole history up to t. Used when k lies in the built range of the watermark row;
+# otherwise the history is scanned as before.
+LADDER_KEYFRAME_READ = os.environ.get("LADDER_KEYFRAME_READ", "1").strip().lower() in ("1", "true", "yes")
+LADDER_KEYFRAME_PROBE_TTL_SECONDS = 60.0
+_SQL_KEYFRAMES_PRESENT = "SELECT to_regclass('public.stream_ladder_keyframe_watermark') IS NOT NULL AS present"
+_SQL_KEYFRAMES_RANGE = """
+    SELECT interval_minutes, built_from, built_until
+    FROM stream_ladder_keyframe_watermark
+    WHERE source = 'ladder_levels'
+"""
+# Latest ladder row per (market, selection, side, level) at or before t
+_SQL_LADDER_STATE = """
+    SELECT DISTINCT ON (market_id, selection_id, side, level)
+        market_id, selection_id, side, level, price, size
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = ANY(%s) AND publish_time <= %s
+    ORDER BY market_id, selection_id, side, level, publish_time DESC
+"""
+# Same from the keyframes at k plus the rows in (k, t]; keyframe rows keep their publish_time (<= k)
+_SQL_LADDER_STATE_FROM_KEYFRAME = """
+    SELECT DISTINCT ON (market_id, selection_id, side, level)
+        market_id, selection_id, side, level, price, size
+    FROM (
+        SELECT f.market_id, f.selection_id, f.side, f.level, f.price, f.size, f.publish_time
+        FROM stream_ladder_keyframes f
+        JOIN (
+            SELECT market_id, MAX(keyframe_time) AS keyframe_time
+            FROM stream_ladder_keyframes
+            WHERE market_id = ANY(%s) AND keyframe_time <= %s
+            GROUP BY market_id
+        ) k USING (market_id, keyframe_time)
+        UNION ALL
+        SELECT market_id, selection_id, side, level, price, size, publish_time
         FROM stream_ingest.ladder_levels
-        WHERE market_id = %s AND publish_time >= %s AND publish_time < %s
-        """,
-        (market_id, bucket_start, bucket_end),
+        WHERE market_id = ANY(%s) AND publish_time > %s AND publish_time <= %s
+    ) s
+    ORDER BY market_id, selection_id, side, level, publish_time DESC
+"""
+_keyframe_probe: Dict[str, Any] = {"interval_minutes": None, "built_from": None, "built_until": None, "checked_at": None}
+
+
+def _keyframe_probe_due() -> bool:
+    checked_at = _keyframe_probe["checked_at"]
+    return LADDER_KEYFRAME_READ and (checked_at is None or time.monotonic() - checked_at > LADDER_KEYFRAME_PROBE_TTL_SECONDS)
+
+
+def _keyframe_record_probe(row: Optional[Dict[str, Any]]) -> None:
+    row = row or {}
+    _keyframe_probe.update(
+        interval_minutes=row.get("interval_minutes"),
+        built_from=row.get("built_from"),
+        built_until=row.get("built_until"),
+        checked_at=time.monotonic(),
     )
-    row = cur.fetchone()
-    return row["t"] if row and row.get("t") else None
+
+
+def _keyframe_floor(t: datetime, interval_minutes: int) -> datetime:
+    """Grid point at or before t (interval_minutes divides 15, so bucket starts are grid points)."""
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return t.replace(minute=(t.minute // interval_minutes) * interval_minutes, second=0, microsecond=0)
+
+
+def _usable_keyframe(t: datetime) -> Optional[datetime]:
+    """Keyframe time k = floor(t) when built (cached range), else None."""
+    interval_minutes = _keyframe_probe["interval_minutes"]
+    if not LADDER_KEYFRAME_READ or not interval_minutes or _keyframe_probe["built_until"] is None:
+        return None
+    k = _keyframe_floor(t, int(interval_minutes))
+    if _keyframe_probe["built_from"] <= k <= _keyframe_probe["built_until"]:
+        return k
+    return None
+
+
+def _keyframe_for(cur: Any, t: datetime) -> Optional[datetime]:
+    """Keyframe to reconstruct the ladder at t from (probe cached LADDER_KEYFRAME_PROBE_TTL_SECONDS), or None."""
+    if _keyframe_probe_due():
+        cur.execute(_SQL_KEYFRAMES_PRESENT)
+        row = None
+        if cur.fetchone()["present"]:
+            cur.execute(_SQL_KEYFRAMES_RANGE)
+            row = cur.fetchone()
+        _keyframe_record_probe(row)
+    return _usable_keyframe(t)
+
+
+def _ladder_state_query(market_ids: List[str], t: datetime, keyframe: Optional[datetime]) -> Tuple[str, Tuple[Any, ...]]:
+    """(sql, params) of the latest ladder row per (market, selection, side, level) at or before t."""
+    if keyframe is None:
+        return _SQL_LADDER_STATE, (market_ids, t)
+    return _SQL_LADDER_STATE_FROM_KEYFRAME, (market_ids, keyframe, market_ids, keyframe, t)
+
+
+def _ladder_state_rows(cur: Any, market_ids: List[str], t: datetime) -> List[Dict[str, Any]]:
+    """Ladder state at t of each market (market_id, selection_id, side, level, price, size rows)."""
+    cur.execute(*_ladder_state_query(market_ids, t, _keyframe_for(cur, t)))
+    return cur.fetchall()
+
 
 def compute_book_risk_from_medians(
     home_odds_median: Optional[float],
@@ -300,6 +552,19 @@ def _compute_median_from_rows(
     # Updates: rows with publish_time in (bucket_start, effective_end]
     update_rows = [(r[0], r[1], r[2]) for r in rows if bucket_start < r[0] <= effective_end]
     update_rows.sort(key=lambda x: x[0])
+    return _median_from_baseline_and_updates(baseline_row, update_rows, bucket_start, effective_end)
+
+
+def _median_from_baseline_and_updates(
+    baseline_row: Optional[Tuple[datetime, Optional[float], Optional[float]]],
+    update_rows: List[Tuple[datetime, Optional[float], Optional[float]]],
+    bucket_start: datetime,
+    effective_end: datetime,
+) -> Tuple[Optional[float], Optional[float], float, int]:
+    """
+    Segments and time-weighted medians of _compute_median_from_rows, given the carry-forward baseline (latest row at
+    or before bucket_start, or None) and the updates in (bucket_start, effective_end] in ascending time order.
+    """
     update_count = len(update_rows)
 
     baseline_odds = baseline_row[1] if baseline_row else None
@@ -494,18 +759,232 @@ def _compute_bucket_median_back_odds_and_size(
     return (median_odds, median_size, seconds_covered, update_count)
 
 
-def get_stream_markets_with_ladder_for_date(from_dt: datetime, to_dt: datetime) -> List[str]:
-    """Market IDs that have at least one ladder_levels row in [from_dt, to_dt] (for date filter)."""
-    with cursor() as cur:
-        cur.execute(
+def _bulk_bucket_enrichment(
+    cur: Any,
+    selections_by_market: Dict[str, Tuple[Optional[int], Optional[int], Optional[int]]],
+    bucket_start: datetime,
+    effective_end: datetime,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Stream enrichment of many markets at one bucket in 3 queries (instead of 8 per market; keyframe probe when due):
+    level-0 back ticks in (bucket_start, effective_end] plus each selection's baseline at bucket_start,
+    latest ladder state per level at bucket_start, and total_matched at or before bucket_start.
+    Medians, Book Risk and Impedance are computed in memory; values match
+    _compute_bucket_median_back_odds_and_size + _runners_from_ladder per market.
+
+    selections_by_market: market_id -> (home_sid, away_sid, draw_sid).
+    Returns market_id -> {runners, {role}_best_back/_best_lay, {role}_back_odds_median/_back_size_median,
+    {role}_seconds_covered/_update_count, total_volume, book_risk, impedance}.
+    """
+    if not selections_by_market:
+        return {}
+    results = []
+    keyframe = _keyframe_for(cur, bucket_start)
+    for sql, params in _bulk_enrichment_queries(selections_by_market, bucket_start, effective_end, keyframe):
+        cur.execute(sql, params)
+        results.append(cur.fetchall())
+    return _assemble_bucket_enrichment(selections_by_market, *results, bucket_start, effective_end)
+
+
+def _bulk_enrichment_queries(
+    selections_by_market: Dict[str, Tuple[Optional[int], Optional[int], Optional[int]]],
+    bucket_start: datetime,
+    effective_end: datetime,
+    keyframe: Optional[datetime] = None,
+) -> List[Tuple[str, Tuple[Any, ...]]]:
+    """
+    The 3 independent (sql, params) of _bulk_bucket_enrichment: back L0 ticks + baselines, ladder state (from the
+    keyframe at or before bucket_start when given), volume.
+    """
+    market_ids = list(selections_by_market)
+    pair_markets: List[str] = []
+    pair_sids: List[int] = []
+    for mid, sids in selections_by_market.items():
+        for sid in sids:
+            if sid is not None:
+                pair_markets.append(mid)
+                pair_sids.append(int(sid))
+    return [
+        # Level-0 back updates in the bucket + latest row at or before bucket_start per (market, selection)
+        (
             """
-            SELECT DISTINCT market_id
+            SELECT market_id, selection_id, publish_time, price, size
             FROM stream_ingest.ladder_levels
-            WHERE publish_time >= %s AND publish_time < %s
+            WHERE market_id = ANY(%s)
+              AND side = 'B'
+              AND level = 0
+              AND publish_time > %s
+              AND publish_time <= %s
+            UNION ALL
+            SELECT k.market_id, k.selection_id, b.publish_time, b.price, b.size
+            FROM unnest(%s::text[], %s::bigint[]) AS k(market_id, selection_id)
+            CROSS JOIN LATERAL (
+                SELECT l.publish_time, l.price, l.size
+                FROM stream_ingest.ladder_levels l
+                WHERE l.market_id = k.market_id
+                  AND l.selection_id = k.selection_id
+                  AND l.side = 'B'
+                  AND l.level = 0
+                  AND l.publish_time <= %s
+                ORDER BY l.publish_time DESC
+                LIMIT 1
+            ) b
             """,
-            (from_dt, to_dt),
+            (market_ids, bucket_start, effective_end, pair_markets, pair_sids, bucket_start),
+        ),
+        # Latest ladder state per (selection, side, level) at bucket_start
+        _ladder_state_query(market_ids, bucket_start, keyframe),
+        # total_matched at or before bucket_start
+        (
+            """
+            SELECT DISTINCT ON (market_id) market_id, total_matched
+            FROM stream_ingest.market_liquidity_history
+            WHERE market_id = ANY(%s) AND publish_time <= %s
+            ORDER BY market_id, publish_time DESC
+            """,
+            (market_ids, bucket_start),
+        ),
+    ]
+
+
+def _assemble_bucket_enrichment(
+    selections_by_market: Dict[str, Tuple[Optional[int], Optional[int], Optional[int]]],
+    tick_rows: List[Dict[str, Any]],
+    level_rows: List[Dict[str, Any]],
+    volume_rows: List[Dict[str, Any]],
+    bucket_start: datetime,
+    effective_end: datetime,
+) -> Dict[str, Dict[str, Any]]:
+    """In-memory part of _bulk_bucket_enrichment (shared with the async endpoints). No DB."""
+    ticks: Dict[Tuple[str, int], List[Tuple[datetime, Optional[float], Optional[float]]]] = {}
+    for r in tick_rows:
+        pt = r["publish_time"]
+        if pt.tzinfo is None:
+            pt = pt.replace(tzinfo=timezone.utc)
+        price = float(r["price"]) if r.get("price") is not None else None
+        size = float(r["size"]) if r.get("size") is not None else None
+        ticks.setdefault((r["market_id"], int(r["selection_id"])), []).append((pt, price, size))
+    levels_by_market: Dict[str, List[Dict[str, Any]]] = {}
+    for r in level_rows:
+        levels_by_market.setdefault(r["market_id"], []).append(r)
+    volume_by_market: Dict[str, Optional[float]] = {
+        r["market_id"]: float(r["total_matched"]) if r.get("total_matched") is not None else None
+        for r in volume_rows
+    }
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for mid, (home_sid, away_sid, draw_sid) in selections_by_market.items():
+        item: Dict[str, Any] = {}
+        medians: List[Optional[float]] = []
+        for role, sid in (("home", home_sid), ("away", away_sid), ("draw", draw_sid)):
+            odds_median = size_median = None
+            seconds_covered, update_count = 0.0, 0
+            if sid is not None:
+                odds_median, size_median, seconds_covered, update_count = _compute_median_from_rows(
+                    ticks.get((mid, int(sid)), []), bucket_start, effective_end
+                )
+            item[role + "_back_odds_median"] = odds_median
+            item[role + "_back_size_median"] = size_median
+            item[role + "_seconds_covered"] = seconds_covered
+            item[role + "_update_count"] = update_count
+            medians.extend((odds_median, size_median))
+        item["book_risk"] = compute_book_risk_from_medians(*medians)
+        item["impedance"] = compute_impedance_index_from_medians(*medians)
+        (
+            item["runners"],
+            item["home_best_back"], item["away_best_back"], item["draw_best_back"],
+            item["home_best_lay"], item["away_best_lay"], item["draw_best_lay"],
+        ) = _runners_from_level_rows(levels_by_market.get(mid, []), home_sid, away_sid, draw_sid)
+        item["total_volume"] = volume_by_market.get(mid)
+        out[mid] = item
+    return out
+
+
+def _load_fresh_markets_enrichment(
+    cur: Any,
+    meta_rows: List[Dict[str, Any]],
+    latest_bucket: datetime,
+    effective_end: datetime,
+    stale_cutoff: datetime,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Batch loader for the stream event lists: last ladder update at or before latest_bucket for all candidate
+    markets (1 query), staleness filter in memory, then _bulk_bucket_enrichment for the fresh ones (3 queries).
+    At most LOADER_QUERY_BUDGET queries on the caller's cursor, whatever the number of markets.
+    Returns market_id -> enrichment for markets that have ladder data and are not stale.
+    """
+    market_ids = [m["market_id"] for m in meta_rows]
+    if not market_ids:
+        return {}
+    # Updates before stale_cutoff are dropped below anyway: bounded on both sides, only recent partitions are read
+    cur.execute(_SQL_LAST_PUBLISH_IN_RANGE, (market_ids, stale_cutoff, latest_bucket))
+    last_pt_by_market = {r["market_id"]: r["t"] for r in cur.fetchall() if r.get("t")}
+    selections_by_market: Dict[str, Tuple[Optional[int], Optional[int], Optional[int]]] = {}
+    for m in meta_rows:
+        last_pt = last_pt_by_market.get(m["market_id"])
+        if last_pt is None or last_pt < stale_cutoff:
+            continue  # No ladder yet, or stale: no update in last STALE_MINUTES
+        selections_by_market[m["market_id"]] = (
+            m.get("home_selection_id"), m.get("away_selection_id"), m.get("draw_selection_id"),
         )
-        return [r["market_id"] for r in cur.fetchall()]
+    return _bulk_bucket_enrichment(cur, selections_by_market, latest_bucket, effective_end)
+
+
+def _stream_event_item(m: Dict[str, Any], latest_bucket: datetime, enrichment: Dict[str, Any]) -> Dict[str, Any]:
+    """EventItem for the stream event lists from a metadata row and its bulk enrichment."""
+    book_risk = enrichment["book_risk"]
+    impedance = enrichment["impedance"]
+    return {
+        "market_id": m["market_id"],
+        "event_id": m.get("event_id"),
+        "event_name": m.get("event_name"),
+        "event_open_date": m["event_open_date"].isoformat() if m.get("event_open_date") else None,
+        "competition_name": m.get("competition_name"),
+        "latest_snapshot_at": latest_bucket.isoformat(),
+        "home_best_back": enrichment["home_best_back"],
+        "away_best_back": enrichment["away_best_back"],
+        "draw_best_back": enrichment["draw_best_back"],
+        "home_best_lay": enrichment["home_best_lay"],
+        "away_best_lay": enrichment["away_best_lay"],
+        "draw_best_lay": enrichment["draw_best_lay"],
+        "total_volume": enrichment["total_volume"],
+        "depth_limit": DEPTH_LIMIT,
+        "calculation_version": "stream_15min",
+        "home_book_risk_l3": book_risk["home_book_risk_l3"] if book_risk else None,
+        "away_book_risk_l3": book_risk["away_book_risk_l3"] if book_risk else None,
+        "draw_book_risk_l3": book_risk["draw_book_risk_l3"] if book_risk else None,
+        "impedance_index_15m": impedance["impedance_index_15m"] if impedance else None,
+        "impedance_abs_diff_home": impedance["impedance_abs_diff_home"] if impedance else None,
+        "impedance_abs_diff_away": impedance["impedance_abs_diff_away"] if impedance else None,
+        "impedance_abs_diff_draw": impedance["impedance_abs_diff_draw"] if impedance else None,
+        "home_seconds_covered": enrichment["home_seconds_covered"],
+        "home_update_count": enrichment["home_update_count"],
+        "away_seconds_covered": enrichment["away_seconds_covered"],
+        "away_update_count": enrichment["away_update_count"],
+        "draw_seconds_covered": enrichment["draw_seconds_covered"],
+        "draw_update_count": enrichment["draw_update_count"],
+    }
+
+
+def get_stream_markets_with_ladder_for_date(from_dt: datetime, to_dt: datetime) -> List[str]:
+    """
+    Market IDs that have at least one ladder_levels row in [from_dt, to_dt) (for date filter).
+    UTC-day ranges are read from the activity days, plus the uncounted tail after the watermark.
+    At most MARKETS_FOR_DATE_QUERY_BUDGET queries.
+    """
+    with cursor() as cur:
+        watermark = _activity_watermark(cur)
+        midnight = {"hour": 0, "minute": 0, "second": 0, "microsecond": 0}
+        if watermark is None or from_dt != from_dt.replace(**midnight) or to_dt != to_dt.replace(**midnight):
+            cur.execute(_SQL_MARKETS_WITH_LADDER, (from_dt, to_dt))
+            return [r["market_id"] for r in cur.fetchall()]
+        cur.execute(_SQL_ACTIVITY_MARKETS_ON_DAYS, (from_dt.date(), to_dt.date()))
+        market_ids = [r["market_id"] for r in cur.fetchall()]
+        if to_dt > watermark:
+            cur.execute(_SQL_MARKETS_WITH_LADDER, (max(from_dt, watermark), to_dt))
+            seen = set(market_ids)
+            market_ids += [r["market_id"] for r in cur.fetchall() if r["market_id"] not in seen]
+        return market_ids
 
 
 # Market types shown in UI event list (same as active_markets_to_stream).
@@ -516,11 +995,56 @@ REST_EVENT_MARKET_TYPES = (
 )
 
 
+_SQL_DAILY_STATS_PRESENT = "SELECT to_regclass('public.ladder_levels_daily_stats') IS NOT NULL AS present"
+_SQL_DAILY_STATS = """
+    SELECT day, ladder_rows, markets, min_publish_time, max_publish_time
+    FROM ladder_levels_daily_stats
+    ORDER BY day DESC
+"""
+
+
+def _data_horizon_from_daily_stats(rows: List[Dict[str, Any]], include_days: bool, days_limit: int) -> Dict[str, Any]:
+    """get_data_horizon shape from ladder_levels_daily_stats rows (newest day first)."""
+    oldest = min((r["min_publish_time"] for r in rows if r.get("min_publish_time")), default=None)
+    newest = max((r["max_publish_time"] for r in rows if r.get("max_publish_time")), default=None)
+    total_rows = sum(int(r["ladder_rows"] or 0) for r in rows)
+    result: Dict[str, Any] = {
+        "oldest_tick": oldest.isoformat() if oldest else None,
+        "newest_tick": newest.isoformat() if newest else None,
+        "total_rows": total_rows,
+        "days": [],
+    }
+    if include_days and total_rows > 0:
+        first_day = (datetime.now(timezone.utc) - timedelta(days=days_limit)).date()
+        result["days"] = [
+            {"day": r["day"].strftime("%Y-%m-%d"), "ladder_rows": int(r["ladder_rows"]), "markets": int(r["markets"] or 0)}
+            for r in rows
+            if r["ladder_rows"] and r["day"] >= first_day
+        ][:days_limit]
+    return result
+
+
 def get_data_horizon(include_days: bool = True, days_limit: int = 90) -> Dict[str, Any]:
     """
     Returns streaming data horizon: oldest_tick, newest_tick, total_rows.
     Optional: days[] with ladder_rows and markets per day for calendar UX.
+    Reads ladder_levels_daily_stats (one row per day, maintained by app.ladder_stats; the open day lags by up to
+    LADDER_STATS_INTERVAL_SECONDS + LADDER_STATS_GRACE_SECONDS); scans ladder_levels while that table is missing or empty.
     """
+    with cursor() as cur:
+        cur.execute(_SQL_DAILY_STATS_PRESENT)
+        row = cur.fetchone()
+        rows: List[Dict[str, Any]] = []
+        if row and row["present"]:
+            cur.execute(_SQL_DAILY_STATS)
+            rows = cur.fetchall()
+    if rows:
+        return _data_horizon_from_daily_stats(rows, include_days, days_limit)
+    return _data_horizon_scan(include_days, days_limit)
+
+
+def _data_horizon_scan(include_days: bool, days_limit: int) -> Dict[str, Any]:
+    """get_data_horizon from ladder_levels itself (full scans); used while ladder_levels_daily_stats is empty."""
     with cursor() as cur:
         cur.execute(
             """
@@ -573,16 +1097,47 @@ def get_data_horizon(include_days: bool = True, days_limit: int = 90) -> Dict[st
     return result
 
 
-def get_events_by_date_rest_driven(date_str: str) -> List[Dict[str, Any]]:
-    """
-    REST as source of truth for event list. rest_events + rest_markets define existence.
-    Streaming is enrichment only: LEFT JOIN; no row excluded for missing stream or staleness.
-    Returns same EventItem shape; adds last_stream_update_at, is_stale.
-    """
+# by-date (REST-driven) queries; shared by get_events_by_date_rest_driven and its async variant.
+# Primary: rest_events + rest_markets by UTC date [from_dt, to_dt) and market type. No filter by ladder/snapshot.
+_SQL_REST_DRIVEN_PRIMARY = """
+    SELECT rm.market_id, rm.event_id, rm.market_type, rm.market_name,
+           rm.total_matched AS rest_total_matched,
+           re.event_name AS re_event_name, re.home_team, re.away_team,
+           re.open_date AS event_open_date, re.competition_name
+    FROM rest_markets rm
+    JOIN rest_events re ON re.event_id = rm.event_id
+    WHERE re.open_date >= %s AND re.open_date < %s
+      AND (""" + REST_EVENT_MARKET_TYPES + """)
+    ORDER BY COALESCE(re.open_date, '1970-01-01'::timestamp) ASC, rm.market_id
+"""
+_SQL_REST_DRIVEN_META = """
+    SELECT market_id, event_name, event_open_date, competition_name,
+           country_code, competition_id,
+           home_selection_id, away_selection_id, draw_selection_id
+    FROM market_event_metadata
+    WHERE market_id = ANY(%s)
+"""
+_SQL_REST_DRIVEN_LAST_STREAM = """
+    SELECT market_id, MAX(publish_time) AS last_pt
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = ANY(%s)
+    GROUP BY market_id
+"""
+# Latest total_matched from liquidity (for markets with liquidity but no ladder -> show volume)
+_SQL_REST_DRIVEN_LIQUIDITY = """
+    SELECT DISTINCT ON (market_id) market_id, total_matched
+    FROM stream_ingest.market_liquidity_history
+    WHERE market_id = ANY(%s) AND publish_time >= %s AND publish_time <= %s
+    ORDER BY market_id, publish_time DESC
+"""
+
+
+def _rest_driven_window(date_str: str) -> Optional[Dict[str, datetime]]:
+    """UTC day window and latest bucket for the by-date list; None for an invalid date."""
     try:
         from_dt = datetime.strptime(date_str.strip(), "%Y-%m-%d").replace(tzinfo=timezone.utc)
     except ValueError:
-        return []
+        return None
     to_dt = from_dt + timedelta(days=1)
     now = datetime.now(timezone.utc)
     effective_to_dt = min(to_dt, now)
@@ -591,89 +1146,64 @@ def get_events_by_date_rest_driven(date_str: str) -> List[Dict[str, Any]]:
         bucket_times = [_bucket_15_utc(from_dt)]
     latest_bucket = bucket_times[-1] if bucket_times else _bucket_15_utc(effective_to_dt - timedelta(seconds=1))
     bucket_end = latest_bucket + timedelta(minutes=15)
-    effective_end = min(bucket_end, now)
-    stale_cutoff = now - timedelta(minutes=STALE_MINUTES)
+    return {
+        "from_dt": from_dt,
+        "to_dt": to_dt,
+        "latest_bucket": latest_bucket,
+        "effective_end": min(bucket_end, now),
+        "stale_cutoff": now - timedelta(minutes=STALE_MINUTES),
+    }
 
-    # 1. Primary: rest_events + rest_markets, filtered by date and market type
-    # Uses UTC boundaries: [from_dt, to_dt). No filter by ladder/snapshot - REST defines list.
-    with cursor() as cur:
-        cur.execute(
-            """
-            SELECT rm.market_id, rm.event_id, rm.market_type, rm.market_name,
-                   rm.total_matched AS rest_total_matched,
-                   re.event_name AS re_event_name, re.home_team, re.away_team,
-                   re.open_date AS event_open_date, re.competition_name
-            FROM rest_markets rm
-            JOIN rest_events re ON re.event_id = rm.event_id
-            WHERE re.open_date >= %s AND re.open_date < %s
-              AND (""" + REST_EVENT_MARKET_TYPES + """)
-            ORDER BY COALESCE(re.open_date, '1970-01-01'::timestamp) ASC, rm.market_id
-            """,
-            (from_dt, to_dt),
+
+def _rest_driven_selections(
+    meta_by_market: Dict[str, Dict],
+    last_stream_by_market: Dict[str, Optional[datetime]],
+) -> Dict[str, Tuple[Optional[int], Optional[int], Optional[int]]]:
+    """Markets with ladder data -> (home_sid, away_sid, draw_sid) for the bulk enrichment."""
+    selections_by_market: Dict[str, Tuple[Optional[int], Optional[int], Optional[int]]] = {}
+    for market_id, last_pt in last_stream_by_market.items():
+        if last_pt is None:
+            continue
+        meta = meta_by_market.get(market_id) or {}
+        selections_by_market[market_id] = (
+            meta.get("home_selection_id"), meta.get("away_selection_id"), meta.get("draw_selection_id"),
         )
-        primary_rows = cur.fetchall()
-    logger.info(
-        "by_date_rest_driven date=%s from_dt=%s to_dt=%s primary_rows=%d",
-        date_str, from_dt, to_dt, len(primary_rows),
-    )
+    return selections_by_market
 
-    # 2. Batch-fetch metadata (LEFT JOIN semantics: may be missing)
-    market_ids = [r["market_id"] for r in primary_rows]
-    meta_by_market: Dict[str, Dict] = {}
-    if market_ids:
-        with cursor() as cur:
-            cur.execute(
-                """
-                SELECT market_id, event_name, event_open_date, competition_name,
-                       country_code, competition_id,
-                       home_selection_id, away_selection_id, draw_selection_id
-                FROM market_event_metadata
-                WHERE market_id = ANY(%s)
-                """,
-                (market_ids,),
-            )
-            for row in cur.fetchall():
-                meta_by_market[row["market_id"]] = dict(row)
 
-    # 3. Batch-fetch last_stream_update_at per market
-    last_stream_by_market: Dict[str, Optional[datetime]] = {}
-    if market_ids:
-        with cursor() as cur:
-            cur.execute(
-                """
-                SELECT market_id, MAX(publish_time) AS last_pt
-                FROM stream_ingest.ladder_levels
-                WHERE market_id = ANY(%s)
-                GROUP BY market_id
-                """,
-                (market_ids,),
-            )
-            for row in cur.fetchall():
-                last_stream_by_market[row["market_id"]] = row["last_pt"] if row.get("last_pt") else None
-        logger.info(
-            "by_date_rest_driven date=%s markets_requested=%d markets_with_ladder=%d",
-            date_str, len(market_ids), len(last_stream_by_market),
-        )
+def _last_stream_rows(last_pt_by_market: Dict[str, datetime]) -> List[Dict[str, Any]]:
+    """_SQL_REST_DRIVEN_LAST_STREAM rows from _latest_publish_by_market."""
+    return [{"market_id": market_id, "last_pt": last_pt} for market_id, last_pt in last_pt_by_market.items()]
 
-    # 4. Batch-fetch latest total_matched from liquidity (for markets with liquidity but no ladder → show volume)
-    liquidity_volume_by_market: Dict[str, Optional[float]] = {}
-    if market_ids:
-        with cursor() as cur:
-            cur.execute(
-                """
-                SELECT DISTINCT ON (market_id) market_id, total_matched
-                FROM stream_ingest.market_liquidity_history
-                WHERE market_id = ANY(%s) AND publish_time >= %s AND publish_time <= %s
-                ORDER BY market_id, publish_time DESC
-                """,
-                (market_ids, from_dt, effective_end),
-            )
-            for row in cur.fetchall():
-                v = row.get("total_matched")
-                liquidity_volume_by_market[row["market_id"]] = (
-                    float(v) if v is not None else None
-                )
 
+def _index_rest_driven_rows(
+    meta_rows: List[Dict[str, Any]],
+    last_stream_rows: List[Dict[str, Any]],
+    liquidity_rows: List[Dict[str, Any]],
+) -> Tuple[Dict[str, Dict], Dict[str, Optional[datetime]], Dict[str, Optional[float]]]:
+    """Batch query results -> (meta_by_market, last_stream_by_market, liquidity_volume_by_market)."""
+    meta_by_market: Dict[str, Dict] = {row["market_id"]: dict(row) for row in meta_rows}
+    last_stream_by_market: Dict[str, Optional[datetime]] = {
+        row["market_id"]: row["last_pt"] if row.get("last_pt") else None for row in last_stream_rows
+    }
+    liquidity_volume_by_market: Dict[str, Optional[float]] = {
+        row["market_id"]: float(row["total_matched"]) if row.get("total_matched") is not None else None
+        for row in liquidity_rows
+    }
+    return meta_by_market, last_stream_by_market, liquidity_volume_by_market
+
+
+def _rest_driven_assemble(
+    window: Dict[str, datetime],
+    primary_rows: List[Dict[str, Any]],
+    meta_by_market: Dict[str, Dict],
+    last_stream_by_market: Dict[str, Optional[datetime]],
+    liquidity_volume_by_market: Dict[str, Optional[float]],
+    enrichment_by_market: Dict[str, Dict[str, Any]],
+) -> List[Dict[str, Any]]:
+    """EventItems in primary (REST) order; stream fields only for markets in enrichment_by_market. No DB."""
+    latest_bucket = window["latest_bucket"]
+    stale_cutoff = window["stale_cutoff"]
     result: List[Dict[str, Any]] = []
     for m in primary_rows:
         market_id = m["market_id"]
@@ -696,10 +1226,6 @@ def get_events_by_date_rest_driven(date_str: str) -> List[Dict[str, Any]]:
         country_code = meta.get("country_code") if meta else None
         competition_id = meta.get("competition_id") if meta else None
 
-        home_sid = meta.get("home_selection_id") if meta else None
-        away_sid = meta.get("away_selection_id") if meta else None
-        draw_sid = meta.get("draw_selection_id") if meta else None
-
         # Enrichment: only when stream data exists
         home_bb = away_bb = draw_bb = None
         home_bl = away_bl = draw_bl = None
@@ -709,36 +1235,16 @@ def get_events_by_date_rest_driven(date_str: str) -> List[Dict[str, Any]]:
         home_seconds_covered = away_seconds_covered = draw_seconds_covered = 0.0
         home_update_count = away_update_count = draw_update_count = 0
 
-        if last_stream is not None:
-            with cursor() as cur:
-                home_odds_median, home_size_median = (None, None)
-                away_odds_median, away_size_median = (None, None)
-                draw_odds_median, draw_size_median = (None, None)
-                if home_sid is not None:
-                    home_odds_median, home_size_median, home_seconds_covered, home_update_count = _compute_bucket_median_back_odds_and_size(
-                        cur, market_id, home_sid, latest_bucket, bucket_end, effective_end
-                    )
-                if away_sid is not None:
-                    away_odds_median, away_size_median, away_seconds_covered, away_update_count = _compute_bucket_median_back_odds_and_size(
-                        cur, market_id, away_sid, latest_bucket, bucket_end, effective_end
-                    )
-                if draw_sid is not None:
-                    draw_odds_median, draw_size_median, draw_seconds_covered, draw_update_count = _compute_bucket_median_back_odds_and_size(
-                        cur, market_id, draw_sid, latest_bucket, bucket_end, effective_end
-                    )
-                book_risk = compute_book_risk_from_medians(
-                    home_odds_median, home_size_median,
-                    away_odds_median, away_size_median,
-                    draw_odds_median, draw_size_median,
-                )
-                impedance = compute_impedance_index_from_medians(
-                    home_odds_median, home_size_median,
-                    away_odds_median, away_size_median,
-                    draw_odds_median, draw_size_median,
-                )
-                _, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl, total_volume = _runners_from_ladder(
-                    cur, market_id, latest_bucket, home_sid, away_sid, draw_sid,
-                )
+        enrichment = enrichment_by_market.get(market_id)
+        if enrichment is not None:
+            book_risk = enrichment["book_risk"]
+            impedance = enrichment["impedance"]
+            home_bb, away_bb, draw_bb = enrichment["home_best_back"], enrichment["away_best_back"], enrichment["draw_best_back"]
+            home_bl, away_bl, draw_bl = enrichment["home_best_lay"], enrichment["away_best_lay"], enrichment["draw_best_lay"]
+            total_volume = enrichment["total_volume"]
+            home_seconds_covered, home_update_count = enrichment["home_seconds_covered"], enrichment["home_update_count"]
+            away_seconds_covered, away_update_count = enrichment["away_seconds_covered"], enrichment["away_update_count"]
+            draw_seconds_covered, draw_update_count = enrichment["draw_seconds_covered"], enrichment["draw_update_count"]
         # Fallback: show volume from liquidity when we have liquidity but no ladder
         if total_volume is None and market_id in liquidity_volume_by_market:
             total_volume = liquidity_volume_by_market[market_id]
@@ -790,86 +1296,202 @@ def get_events_by_date_rest_driven(date_str: str) -> List[Dict[str, Any]]:
     return result
 
 
-def get_events_by_date_volume(
-    date_str: str,
-    limit: int = 100,
-    offset: int = 0,
-    min_volume: float = 0.0,
-    sort: str = "volume_desc",
-) -> Dict[str, Any]:
-    """
-    Events for the selected day aggregated by volume for the Volume tab.
-    Event volume = SUM(total_volume) over all markets linked to that event in the day's dataset.
-    Same data source as by-date-snapshots (REST + stream enrichment). volume=null treated as 0 for
-    ranking; no theoretical latest_snapshot_at (return null).
-    """
-    try:
-        from_dt = datetime.strptime(date_str.strip(), "%Y-%m-%d").replace(tzinfo=timezone.utc)
-    except ValueError:
-        return {
-            "date": date_str.strip(),
-            "timezone": "UTC",
-            "sort": sort,
-            "items": [],
-            "paging": {"limit": limit, "offset": offset, "total": 0},
-        }
-
-    market_rows = get_events_by_date_rest_driven(date_str)
-    # Group by event_id (string for stable key)
-    by_event: Dict[str, Dict[str, Any]] = {}
-    for m in market_rows:
-        eid = str(m.get("event_id") or "")
-        vol = m.get("total_volume")
-        vol_num = float(vol) if vol is not None and not isinstance(vol, (str, bool)) else 0.0
-        if eid not in by_event:
-            by_event[eid] = {
-                "event_id": eid,
-                "event_name": m.get("event_name") or "Unknown",
-                "competition_name": m.get("competition_name"),
-                "competition_id": m.get("competition_id"),
-                "event_open_date": m.get("event_open_date"),
-                "volume_total": 0.0,
-                "markets": [],
-            }
-        by_event[eid]["volume_total"] += vol_num
-        by_event[eid]["markets"].append({
-            "market_id": m.get("market_id"),
-            "market_name": m.get("market_name"),
-            "volume": vol if vol is not None else None,
-        })
-
-    items = list(by_event.values())
-    # Filter: min_volume (events with volume_total < min_volume excluded)
-    if min_volume > 0:
-        items = [e for e in items if (e["volume_total"] or 0) >= min_volume]
-    total = len(items)
-    # Sort: volume_desc (default) or volume_asc; null/0 at end for desc, at start for asc
-    reverse = sort != "volume_asc"
-    items.sort(key=lambda e: (e["volume_total"] or 0), reverse=reverse)
-    # Paginate
-    items = items[offset : offset + limit]
-
-    # Do not emit theoretical latest_snapshot_at (per spec)
-    for e in items:
-        e["latest_snapshot_at"] = None
-
-    return {
-        "date": date_str.strip(),
-        "timezone": "UTC",
-        "sort": sort,
-        "items": items,
-        "paging": {"limit": limit, "offset": offset, "total": total},
-    }
 
 
-def get_events_by_date_snapshots_stream(date_str: str) -> List[Dict[str, Any]]:
+def get_events_by_date_rest_driven(date_str: str) -> List[Dict[str, Any]]:
     """
-    Same shape as REST get_events_by_date_snapshots but from stream_ingest.
-    Uses the latest 15-min bucket that falls inside the date as "latest_snapshot_at".
-    Staleness: exclude market if latest ladder update in that bucket is older than STALE_MINUTES.
+    REST as source of truth for event list. rest_events + rest_markets define existence.
+    Streaming is enrichment only: LEFT JOIN; no row excluded for missing stream or staleness.
+    Returns same EventItem shape; adds last_stream_update_at, is_stale.
+    Query count is constant (4 batch + 3 enrichment queries), independent of the number of markets.
     """
-    try:
-        from_dt = datetime.strptime(date_str.strip(), "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    window = _rest_driven_window(date_str)
+    if window is None:
+        return []
+    from_dt, to_dt = window["from_dt"], window["to_dt"]
+
+    # 1. Primary: rest_events + rest_markets, filtered by date and market type
+    with cursor() as cur:
+        cur.execute(_SQL_REST_DRIVEN_PRIMARY, (from_dt, to_dt))
+        primary_rows = cur.fetchall()
+    logger.info(
+        "by_date_rest_driven date=%s from_dt=%s to_dt=%s primary_rows=%d",
+        date_str, from_dt, to_dt, len(primary_rows),
+    )
+
+    # 2-4. Batch-fetch metadata, last_stream_update_at and liquidity volume (LEFT JOIN semantics: may be missing)
+    market_ids = [r["market_id"] for r in primary_rows]
+    meta_rows: List[Dict[str, Any]] = []
+    last_stream_rows: List[Dict[str, Any]] = []
+    liquidity_rows: List[Dict[str, Any]] = []
+    if market_ids:
+        with cursor() as cur:
+            cur.execute(_SQL_REST_DRIVEN_META, (market_ids,))
+            meta_rows = cur.fetchall()
+            watermark = _activity_watermark(cur)
+            if watermark is not None:
+                last_stream_rows = _last_stream_rows(_latest_publish_by_market(cur, market_ids, None, watermark))
+            else:
+                cur.execute(_SQL_REST_DRIVEN_LAST_STREAM, (market_ids,))
+                last_stream_rows = cur.fetchall()
+            cur.execute(_SQL_REST_DRIVEN_LIQUIDITY, (market_ids, from_dt, window["effective_end"]))
+            liquidity_rows = cur.fetchall()
+        logger.info(
+            "by_date_rest_driven date=%s markets_requested=%d markets_with_ladder=%d",
+            date_str, len(market_ids), len(last_stream_rows),
+        )
+
+    # 5. Stream enrichment for markets with ladder data: 3 bulk queries, independent of market count
+    meta_by_market, last_stream_by_market, liquidity_volume_by_market = _index_rest_driven_rows(
+        meta_rows, last_stream_rows, liquidity_rows
+    )
+    selections_by_market = _rest_driven_selections(meta_by_market, last_stream_by_market)
+    enrichment_by_market: Dict[str, Dict[str, Any]] = {}
+    if selections_by_market:
+        with cursor() as cur:
+            enrichment_by_market = _bulk_bucket_enrichment(
+                cur, selections_by_market, window["latest_bucket"], window["effective_end"]
+            )
+    return _rest_driven_assemble(
+        window, primary_rows, meta_by_market, last_stream_by_market, liquidity_volume_by_market, enrichment_by_market,
+    )
+
+
+# Volume tab: the same markets as _SQL_REST_DRIVEN_PRIMARY, each with its latest total_matched in the day window
+# (market_liquidity_history, bounded like _SQL_REST_DRIVEN_LIQUIDITY; rest_markets.total_matched when the stream has
+# none in the window), summed per event.
+# Event fields come from the event's first market in the by-date order, like the snapshots list. Filtering, sorting
+# and pagination run in SQL; the one row per call carries the total even when the page is empty.
+_SQL_BY_DATE_VOLUME = """
+    WITH markets AS (
+        SELECT rm.market_id, rm.event_id, rm.market_name,
+               COALESCE(
+                   NULLIF(e.event_name, ''), NULLIF(re.event_name, ''),
+                   CASE WHEN COALESCE(re.home_team, re.away_team) IS NOT NULL
+                        THEN COALESCE(NULLIF(re.home_team, ''), 'Home') || ' vs ' || COALESCE(NULLIF(re.away_team, ''), 'Away')
+                   END,
+                   'Unknown event'
+               ) AS event_name,
+               e.market_id IS NOT NULL AS has_meta,
+               e.event_open_date AS meta_open_date, re.open_date AS rest_open_date,
+               COALESCE(NULLIF(e.competition_name, ''), re.competition_name) AS competition_name,
+               e.competition_id,
+               COALESCE(l.total_matched, rm.total_matched)::double precision AS volume,
+               COALESCE(re.open_date, '1970-01-01'::timestamp) AS sort_open_date
+        FROM rest_markets rm
+        JOIN rest_events re ON re.event_id = rm.event_id
+        LEFT JOIN market_event_metadata e ON e.market_id = rm.market_id
+        LEFT JOIN LATERAL (
+            SELECT h.total_matched
+            FROM stream_ingest.market_liquidity_history h
+            WHERE h.market_id = rm.market_id AND h.publish_time >= %s AND h.publish_time <= %s
+            ORDER BY h.publish_time DESC
+            LIMIT 1
+        ) l ON true
+        WHERE re.open_date >= %s AND re.open_date < %s
+          AND (""" + REST_EVENT_MARKET_TYPES + """)
+    ),
+    events AS (
+        SELECT event_id,
+               (array_agg(event_name ORDER BY sort_open_date, market_id))[1] AS event_name,
+               (array_agg(has_meta ORDER BY sort_open_date, market_id))[1] AS has_meta,
+               (array_agg(meta_open_date ORDER BY sort_open_date, market_id))[1] AS meta_open_date,
+               (array_agg(rest_open_date ORDER BY sort_open_date, market_id))[1] AS rest_open_date,
+               (array_agg(competition_name ORDER BY sort_open_date, market_id))[1] AS competition_name,
+               (array_agg(competition_id ORDER BY sort_open_date, market_id))[1] AS competition_id,
+               COALESCE(SUM(volume), 0) AS volume_total,
+               json_agg(
+                   json_build_object('market_id', market_id, 'market_name', market_name, 'volume', volume)
+                   ORDER BY sort_open_date, market_id
+               ) AS markets,
+               MIN(sort_open_date) AS sort_open_date,
+               MIN(market_id) AS first_market_id
+        FROM markets
+        GROUP BY event_id
+    ),
+    matching AS (
+        SELECT * FROM events WHERE volume_total >= %s
+    )
+    SELECT c.total, p.*
+    FROM (SELECT COUNT(*) AS total FROM matching) c
+    LEFT JOIN LATERAL (
+        SELECT * FROM matching
+        ORDER BY volume_total {direction}, sort_open_date, first_market_id
+        LIMIT %s OFFSET %s
+    ) p ON true
+    ORDER BY p.volume_total {direction}, p.sort_open_date, p.first_market_id
+"""
+_SQL_BY_DATE_VOLUME_SORTED = {
+    "volume_desc": _SQL_BY_DATE_VOLUME.replace("{direction}", "DESC"),
+    "volume_asc": _SQL_BY_DATE_VOLUME.replace("{direction}", "ASC"),
+}
+
+
+def get_events_by_date_volume(
+    date_str: str,
+    limit: int = 100,
+    offset: int = 0,
+    min_volume: float = 0.0,
+    sort: str = "volume_desc",
+) -> Dict[str, Any]:
+    """
+    Events for the selected day aggregated by volume for the Volume tab.
+    Event volume = SUM over the event's markets (same markets as by-date-snapshots) of the latest total_matched
+    within the day window (from the day start to the window end), falling back to rest_markets.total_matched; volume=null counts as 0. One set-based
+    query (_SQL_BY_DATE_VOLUME) with the filter, sort and page in SQL: none of the snapshot enrichment (medians, Book
+    Risk, Impedance, ladder state) is computed. No theoretical latest_snapshot_at (return null).
+    """
+    window = _rest_driven_window(date_str)
+    empty = {
+        "date": date_str.strip(),
+        "timezone": "UTC",
+        "sort": sort,
+        "items": [],
+        "paging": {"limit": limit, "offset": offset, "total": 0},
+    }
+    if window is None:
+        return empty
+
+    sql = _SQL_BY_DATE_VOLUME_SORTED.get(sort, _SQL_BY_DATE_VOLUME_SORTED["volume_desc"])
+    with cursor() as cur:
+        cur.execute(
+            sql,
+            (
+                window["from_dt"], window["effective_end"], window["from_dt"], window["to_dt"],
+                max(min_volume, 0.0), limit, offset,
+            ),
+        )
+        rows = cur.fetchall()
+
+    items = []
+    for r in rows:
+        if r.get("event_id") is None:
+            continue  # count row of an empty page
+        event_open_date = r["meta_open_date"] if r.get("has_meta") else r.get("rest_open_date")
+        items.append({
+            "event_id": str(r["event_id"]),
+            "event_name": r.get("event_name") or "Unknown",
+            "competition_name": r.get("competition_name"),
+            "competition_id": str(r["competition_id"]) if r.get("competition_id") else None,
+            "event_open_date": event_open_date.isoformat() if event_open_date else None,
+            "volume_total": float(r["volume_total"] or 0),
+            "markets": r.get("markets") or [],
+            # Do not emit theoretical latest_snapshot_at (per spec)
+            "latest_snapshot_at": None,
+        })
+    total = int(rows[0]["total"]) if rows else 0
+    return {**empty, "items": items, "paging": {"limit": limit, "offset": offset, "total": total}}
+
+
+def get_events_by_date_snapshots_stream(date_str: str) -> List[Dict[str, Any]]:
+    """
+    Same shape as REST get_events_by_date_snapshots but from stream_ingest.
+    Uses the latest 15-min bucket that falls inside the date as "latest_snapshot_at".
+    Staleness: exclude market if latest ladder update in that bucket is older than STALE_MINUTES.
+    At most SNAPSHOTS_STREAM_QUERY_BUDGET queries, independent of the number of markets.
+    """
+    try:
+        from_dt = datetime.strptime(date_str.strip(), "%Y-%m-%d").replace(tzinfo=timezone.utc)
     except ValueError:
         return []
     to_dt = from_dt + timedelta(days=1)
@@ -883,13 +1505,14 @@ def get_events_by_date_snapshots_stream(date_str: str) -> List[Dict[str, Any]]:
     # Use the latest bucket up to current time as "latest" for each market
     latest_bucket = bucket_times[-1] if bucket_times else _bucket_15_utc(effective_to_dt - timedelta(seconds=1))
     stale_cutoff = latest_bucket - timedelta(minutes=STALE_MINUTES)
+    effective_end = min(latest_bucket + timedelta(minutes=15), now)
 
-    with cursor() as cur:
-        # Stream-first approach: get markets with streaming data in this date range
-        stream_markets = get_stream_markets_with_ladder_for_date(from_dt, to_dt)
-        if not stream_markets:
-            return []
+    # Stream-first approach: get markets with streaming data in this date range
+    stream_markets = get_stream_markets_with_ladder_for_date(from_dt, to_dt)
+    if not stream_markets:
+        return []
 
+    with cursor() as cur:
         # Left join to metadata - don't require event_open_date to be in the date range
         # This allows events that started earlier but are still receiving streaming data today
         cur.execute(
@@ -903,92 +1526,164 @@ def get_events_by_date_snapshots_stream(date_str: str) -> List[Dict[str, Any]]:
             (stream_markets,),
         )
         meta_rows = cur.fetchall()
+        enrichment_by_market = _load_fresh_markets_enrichment(cur, meta_rows, latest_bucket, effective_end, stale_cutoff)
+
+    return [
+        _stream_event_item(m, latest_bucket, enrichment_by_market[m["market_id"]])
+        for m in meta_rows
+        if m["market_id"] in enrichment_by_market
+    ]
+
+
+# Materialized closed buckets (public.stream_bucket_metrics, written by app.bucket_store). Rows hold the
+# _bulk_bucket_enrichment values at effective_end = bucket_end, plus tick_count and the last ladder update at or
+# before bucket_start; rows of another calculation_version are ignored (computed on the fly).
+BUCKET_METRICS_VERSION = "stream_15min"
+BUCKET_STORE_READ = os.environ.get("BUCKET_STORE_READ", "1").strip().lower() in ("1", "true", "yes")
+BUCKET_STORE_PROBE_TTL_SECONDS = 60.0
+STORED_BUCKET_COLUMNS = (
+    ["last_publish_time", "tick_count"]
+    + [f"{role}_{name}" for name in ("best_back", "best_lay") for role in ("home", "away", "draw")]
+    + [
+        f"{role}_{name}"
+        for role in ("home", "away", "draw")
+        for name in ("back_odds_median", "back_size_median", "seconds_covered", "update_count")
+    ]
+    + [f"{role}_book_risk_l3" for role in ("home", "away", "draw")]
+    + ["impedance_index_15m", "impedance_abs_diff_home", "impedance_abs_diff_away", "impedance_abs_diff_draw"]
+    + ["total_volume"]
+)
+_SQL_STORED_BUCKETS_PRESENT = "SELECT to_regclass('public.stream_bucket_metrics') IS NOT NULL AS present"
+_SQL_STORED_BUCKETS = f"""
+    SELECT bucket_start, {", ".join(STORED_BUCKET_COLUMNS)}
+    FROM stream_bucket_metrics
+    WHERE market_id = %s AND calculation_version = %s AND bucket_start >= %s AND bucket_start < %s
+"""
+_stored_buckets_probe: Dict[str, Any] = {"present": False, "checked_at": None}
 
-    result: List[Dict[str, Any]] = []
+
+def _stored_buckets_probe_due() -> bool:
+    """True when the table presence check should run (cached; no store reads when BUCKET_STORE_READ=0)."""
+    checked_at = _stored_buckets_probe["checked_at"]
+    return BUCKET_STORE_READ and (checked_at is None or time.monotonic() - checked_at > BUCKET_STORE_PROBE_TTL_SECONDS)
+
+
+def _stored_buckets_record_probe(present: bool) -> None:
+    _stored_buckets_probe.update(present=present, checked_at=time.monotonic())
+
+
+def _index_stored_buckets(rows: List[Dict[str, Any]]) -> Dict[datetime, Dict[str, Any]]:
+    out: Dict[datetime, Dict[str, Any]] = {}
+    for r in rows:
+        bt = r["bucket_start"]
+        if bt.tzinfo is None:
+            bt = bt.replace(tzinfo=timezone.utc)
+        lp = r.get("last_publish_time")
+        if lp is not None and lp.tzinfo is None:
+            r = {**r, "last_publish_time": lp.replace(tzinfo=timezone.utc)}
+        out[bt] = r
+    return out
+
+
+def _load_stored_buckets(cur: Any, market_id: str, from_dt: datetime, to_dt: datetime) -> Dict[datetime, Dict[str, Any]]:
+    """Stored closed buckets of one market with bucket_start in [from_dt, to_dt); {} when the store is absent or off."""
+    if _stored_buckets_probe_due():
+        cur.execute(_SQL_STORED_BUCKETS_PRESENT)
+        _stored_buckets_record_probe(bool(cur.fetchone()["present"]))
+    if not (BUCKET_STORE_READ and _stored_buckets_probe["present"]):
+        return {}
+    cur.execute(_SQL_STORED_BUCKETS, (market_id, BUCKET_METRICS_VERSION, from_dt, to_dt))
+    return _index_stored_buckets(cur.fetchall())
+
+
+def _stored_bucket_row(
+    enrichment: Dict[str, Any], last_publish_time: Optional[datetime], tick_count: int
+) -> Dict[str, Any]:
+    """Row of stream_bucket_metrics (STORED_BUCKET_COLUMNS) from a closed-bucket enrichment (_assemble_bucket_enrichment)."""
+    book_risk = enrichment["book_risk"] or {}
+    impedance = enrichment["impedance"] or {}
+    row: Dict[str, Any] = {"last_publish_time": last_publish_time, "tick_count": tick_count}
+    for col in STORED_BUCKET_COLUMNS[2:]:
+        if col.endswith("_book_risk_l3"):
+            row[col] = book_risk.get(col)
+        elif col.startswith("impedance_"):
+            row[col] = impedance.get(col)
+        else:
+            row[col] = enrichment[col]
+    return row
+
+
+def _enrichment_from_stored(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of _stored_bucket_row (without runners): the enrichment dict _timeseries_point expects."""
+    e = {col: row[col] for col in STORED_BUCKET_COLUMNS[2:]}
+    # Book Risk and Impedance are all-or-nothing (None or a dict with every value set)
+    e["book_risk"] = (
+        {k: row[k] for k in ("home_book_risk_l3", "away_book_risk_l3", "draw_book_risk_l3")}
+        if row["home_book_risk_l3"] is not None else None
+    )
+    e["impedance"] = (
+        {k: row[k] for k in ("impedance_index_15m", "impedance_abs_diff_home", "impedance_abs_diff_away", "impedance_abs_diff_draw")}
+        if row["impedance_index_15m"] is not None else None
+    )
+    return e
+
+
+_SQL_MARKET_SELECTIONS = """
+    SELECT home_selection_id, away_selection_id, draw_selection_id
+    FROM market_event_metadata
+    WHERE market_id = %s
+"""
+
+
+def _timeseries_window(
+    from_ts: Optional[datetime], to_ts: Optional[datetime]
+) -> Tuple[List[datetime], datetime, datetime]:
+    """(bucket_times, now, stale_cutoff_time) for the stream timeseries; to_ts capped at now."""
     now = datetime.now(timezone.utc)
-    for m in meta_rows:
-        market_id = m["market_id"]
-        with cursor() as c:
-            last_pt = _latest_publish_before(c, market_id, latest_bucket)
-        if last_pt is None:
-            continue
-        if last_pt < stale_cutoff:
-            continue  # Stale: no update in last STALE_MINUTES
-        
-        bucket_start = latest_bucket
-        bucket_end = latest_bucket + timedelta(minutes=15)
-        effective_end = min(bucket_end, now)
-        
-        with cursor() as cur:
-            home_odds_median, home_size_median = (None, None)
-            away_odds_median, away_size_median = (None, None)
-            draw_odds_median, draw_size_median = (None, None)
-            home_seconds_covered = away_seconds_covered = draw_seconds_covered = 0.0
-            home_update_count = away_update_count = draw_update_count = 0
-            if m.get("home_selection_id") is not None:
-                home_odds_median, home_size_median, home_seconds_covered, home_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, m["home_selection_id"], bucket_start, bucket_end, effective_end
-                )
-            if m.get("away_selection_id") is not None:
-                away_odds_median, away_size_median, away_seconds_covered, away_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, m["away_selection_id"], bucket_start, bucket_end, effective_end
-                )
-            if m.get("draw_selection_id") is not None:
-                draw_odds_median, draw_size_median, draw_seconds_covered, draw_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, m["draw_selection_id"], bucket_start, bucket_end, effective_end
-                )
-            book_risk = compute_book_risk_from_medians(
-                home_odds_median, home_size_median,
-                away_odds_median, away_size_median,
-                draw_odds_median, draw_size_median,
-            )
-            
-            # Compute Impedance Index (15m) from medians only
-            impedance = compute_impedance_index_from_medians(
-                home_odds_median, home_size_median,
-                away_odds_median, away_size_median,
-                draw_odds_median, draw_size_median,
-            )
-            
-            # Also get latest state for best_back/best_lay (for compatibility with existing API shape)
-            # Note: These are NOT used for risk computation, only for display compatibility
-            runners, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl, total_volume = _runners_from_ladder(
-                cur, market_id, latest_bucket,
-                m.get("home_selection_id"), m.get("away_selection_id"), m.get("draw_selection_id"),
-            )
+    to_dt = min(to_ts, now) if to_ts else now
+    from_dt = from_ts or (now - timedelta(hours=24))
+    # Ensure from_dt <= to_dt
+    if from_dt > to_dt:
+        from_dt = to_dt - timedelta(hours=24)
+    # For staleness check, use current time, not bucket time
+    return _bucket_times_in_range(from_dt, to_dt), now, now - timedelta(minutes=STALE_MINUTES)
 
-        result.append({
-            "market_id": market_id,
-            "event_id": m.get("event_id"),
-            "event_name": m.get("event_name"),
-            "event_open_date": m["event_open_date"].isoformat() if m.get("event_open_date") else None,
-            "competition_name": m.get("competition_name"),
-            "latest_snapshot_at": latest_bucket.isoformat(),
-            "home_best_back": home_bb,
-            "away_best_back": away_bb,
-            "draw_best_back": draw_bb,
-            "home_best_lay": home_bl,
-            "away_best_lay": away_bl,
-            "draw_best_lay": draw_bl,
-            "total_volume": total_volume,
-            "depth_limit": DEPTH_LIMIT,
-            "calculation_version": "stream_15min",
-            "home_book_risk_l3": book_risk["home_book_risk_l3"] if book_risk else None,
-            "away_book_risk_l3": book_risk["away_book_risk_l3"] if book_risk else None,
-            "draw_book_risk_l3": book_risk["draw_book_risk_l3"] if book_risk else None,
-            "impedance_index_15m": impedance["impedance_index_15m"] if impedance else None,
-            "impedance_abs_diff_home": impedance["impedance_abs_diff_home"] if impedance else None,
-            "impedance_abs_diff_away": impedance["impedance_abs_diff_away"] if impedance else None,
-            "impedance_abs_diff_draw": impedance["impedance_abs_diff_draw"] if impedance else None,
-            "home_seconds_covered": home_seconds_covered,
-            "home_update_count": home_update_count,
-            "away_seconds_covered": away_seconds_covered,
-            "away_update_count": away_update_count,
-            "draw_seconds_covered": draw_seconds_covered,
-            "draw_update_count": draw_update_count,
-        })
 
-    return result
+def _timeseries_point(bucket_time: datetime, e: Dict[str, Any]) -> Dict[str, Any]:
+    """One stream timeseries point from a bucket enrichment (_assemble_bucket_enrichment)."""
+    book_risk = e["book_risk"]
+    impedance = e["impedance"]
+    return {
+        "snapshot_at": bucket_time.isoformat(),
+        "home_best_back": e["home_best_back"],
+        "away_best_back": e["away_best_back"],
+        "draw_best_back": e["draw_best_back"],
+        "home_best_lay": e["home_best_lay"],
+        "away_best_lay": e["away_best_lay"],
+        "draw_best_lay": e["draw_best_lay"],
+        "home_back_odds_median": e["home_back_odds_median"],
+        "home_back_size_median": e["home_back_size_median"],
+        "away_back_odds_median": e["away_back_odds_median"],
+        "away_back_size_median": e["away_back_size_median"],
+        "draw_back_odds_median": e["draw_back_odds_median"],
+        "draw_back_size_median": e["draw_back_size_median"],
+        "home_seconds_covered": e["home_seconds_covered"],
+        "home_update_count": e["home_update_count"],
+        "away_seconds_covered": e["away_seconds_covered"],
+        "away_update_count": e["away_update_count"],
+        "draw_seconds_covered": e["draw_seconds_covered"],
+        "draw_update_count": e["draw_update_count"],
+        "home_book_risk_l3": book_risk["home_book_risk_l3"] if book_risk else None,
+        "away_book_risk_l3": book_risk["away_book_risk_l3"] if book_risk else None,
+        "draw_book_risk_l3": book_risk["draw_book_risk_l3"] if book_risk else None,
+        "impedance_index_15m": impedance["impedance_index_15m"] if impedance else None,
+        "impedance_abs_diff_home": impedance["impedance_abs_diff_home"] if impedance else None,
+        "impedance_abs_diff_away": impedance["impedance_abs_diff_away"] if impedance else None,
+        "impedance_abs_diff_draw": impedance["impedance_abs_diff_draw"] if impedance else None,
+        "total_volume": e["total_volume"],
+        "depth_limit": DEPTH_LIMIT,
+        "calculation_version": "stream_15min",
+    }
 
 
 def get_event_timeseries_stream(
@@ -999,20 +1694,63 @@ def get_event_timeseries_stream(
 ) -> List[Dict[str, Any]]:
     """
     Timeseries for one market from stream_ingest: 15-min buckets with time-weighted medians.
-    Same response shape as REST timeseries. interval_minutes forced to 15 for stream.
-    
+    Same response shape as REST timeseries. interval_minutes ignored: stream uses fixed 15-min UTC buckets.
+
     Uses time-weighted median for back_odds and back_size per bucket (carry-forward logic).
+    One connection; closed buckets come from stream_bucket_metrics when stored, the others are computed:
+    latest update before the bucket, then _bulk_bucket_enrichment (3 queries).
     """
-    now = datetime.now(timezone.utc)
-    to_dt = min(to_ts, now) if to_ts else now
-    from_dt = from_ts or (now - timedelta(hours=24))
-    # Ensure from_dt <= to_dt
-    if from_dt > to_dt:
-        from_dt = to_dt - timedelta(hours=24)
-    interval_minutes = 15  # Stream: fixed 15-min UTC buckets
-    bucket_times = _bucket_times_in_range(from_dt, to_dt)
-    stale_cutoff_minutes = STALE_MINUTES
+    bucket_times, now, stale_cutoff_time = _timeseries_window(from_ts, to_ts)
+
+    out: List[Dict[str, Any]] = []
+    with cursor() as cur:
+        cur.execute(_SQL_MARKET_SELECTIONS, (market_id,))
+        meta = cur.fetchone()
+        if not meta:
+            return []
+        selections = {market_id: (meta.get("home_selection_id"), meta.get("away_selection_id"), meta.get("draw_selection_id"))}
+        stored = _load_stored_buckets(cur, market_id, bucket_times[0], bucket_times[-1] + timedelta(minutes=15)) if bucket_times else {}
+
+        for bucket_time in bucket_times:
+            row = stored.get(bucket_time)
+            if row is not None:
+                if row["last_publish_time"] is not None and row["last_publish_time"] >= stale_cutoff_time:
+                    out.append(_timeseries_point(bucket_time, _enrichment_from_stored(row)))
+                continue
+            last_pt = _latest_publish_before(cur, market_id, stale_cutoff_time, bucket_time)
+            # Skip buckets without data, and buckets whose latest data is stale relative to NOW (not bucket_time)
+            if last_pt is None or last_pt < stale_cutoff_time:
+                continue
+            effective_end = min(bucket_time + timedelta(minutes=15), now)
+            enrichment = _bulk_bucket_enrichment(cur, selections, bucket_time, effective_end)
+            out.append(_timeseries_point(bucket_time, enrichment[market_id]))
+
+    return out
 
+
+# Back-side updates of the market's H/A/D selections in [from_dt, to_dt], in time order (book-risk ticks)
+_SQL_BOOK_RISK_UPDATES = """
+    SELECT publish_time, selection_id, side, level, price, size
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = %s AND side = 'B' AND publish_time >= %s AND publish_time <= %s
+      AND selection_id = ANY(%s)
+    ORDER BY publish_time ASC
+"""
+BOOK_RISK_TICKS_ITERSIZE = 2000
+
+
+def get_book_risk_ticks_stream(
+    market_id: str,
+    from_dt: datetime,
+    to_dt: datetime,
+    limit: int = 2000,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Tick-resolution Book Risk (depth DEPTH_LIMIT) from stream_ingest.ladder_levels back-side updates in
+    [from_dt, to_dt]. Ladder state at from_dt is the baseline; each update is applied incrementally
+    (BookRiskState), so one point per publish_time that changed the risk inputs, without per-tick
+    ladder rebuilds. None if the market has no metadata.
+    """
     with cursor() as cur:
         cur.execute(
             """
@@ -1023,103 +1761,53 @@ def get_event_timeseries_stream(
             (market_id,),
         )
         meta = cur.fetchone()
-    if not meta:
-        return []
-
-    home_sid = meta.get("home_selection_id")
-    away_sid = meta.get("away_selection_id")
-    draw_sid = meta.get("draw_selection_id")
-    out: List[Dict[str, Any]] = []
-    # For staleness check, use current time, not bucket time
-    now_for_staleness = datetime.now(timezone.utc)
-    stale_cutoff_time = now_for_staleness - timedelta(minutes=stale_cutoff_minutes)
-    
-    for bucket_time in bucket_times:
-        bucket_start = bucket_time
-        bucket_end = bucket_time + timedelta(minutes=15)
-        effective_end = min(bucket_end, now)
-        
-        with cursor() as cur:
-            last_pt = _latest_publish_before(cur, market_id, bucket_time)
-            if last_pt is None:
-                continue
-            # Check if last publish time is stale relative to NOW (not bucket_time)
-            # This allows showing historical buckets even if they're old
-            # Only skip if the latest data for this bucket is stale relative to current time
-            if last_pt < stale_cutoff_time:
-                continue
-            
-            # Compute time-weighted medians for back odds and size (and coverage)
-            home_odds_median, home_size_median = (None, None)
-            away_odds_median, away_size_median = (None, None)
-            draw_odds_median, draw_size_median = (None, None)
-            home_seconds_covered = away_seconds_covered = draw_seconds_covered = 0.0
-            home_update_count = away_update_count = draw_update_count = 0
-            if home_sid is not None:
-                home_odds_median, home_size_median, home_seconds_covered, home_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, home_sid, bucket_start, bucket_end, effective_end
-                )
-            if away_sid is not None:
-                away_odds_median, away_size_median, away_seconds_covered, away_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, away_sid, bucket_start, bucket_end, effective_end
-                )
-            if draw_sid is not None:
-                draw_odds_median, draw_size_median, draw_seconds_covered, draw_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, draw_sid, bucket_start, bucket_end, effective_end
-                )
-            
-            # Compute Book Risk strictly from medians
-            book_risk = compute_book_risk_from_medians(
-                home_odds_median, home_size_median,
-                away_odds_median, away_size_median,
-                draw_odds_median, draw_size_median,
-            )
-            
-            # Compute Impedance Index (15m) from medians only
-            impedance = compute_impedance_index_from_medians(
-                home_odds_median, home_size_median,
-                away_odds_median, away_size_median,
-                draw_odds_median, draw_size_median,
+        if not meta:
+            return None
+        sids = (meta.get("home_selection_id"), meta.get("away_selection_id"), meta.get("draw_selection_id"))
+        if any(sid is None for sid in sids):
+            return []
+        runner_metadata = {int(sid): role for sid, role in zip(sids, ("HOME", "AWAY", "DRAW"))}
+        selection_ids = list(runner_metadata)
+        # Back ladder just before from_dt (publish_time has microsecond resolution)
+        before = from_dt - timedelta(microseconds=1)
+        keyframe = _keyframe_for(cur, before)
+        if keyframe is not None:
+            cur.execute(_SQL_LADDER_STATE_FROM_KEYFRAME, ([market_id], keyframe, [market_id], keyframe, before))
+            state = [r for r in cur.fetchall() if r["side"] == "B" and int(r["selection_id"]) in runner_metadata]
+        else:
+            cur.execute(
+                """
+                SELECT DISTINCT ON (selection_id, level)
+                    selection_id, side, level, price, size
+                FROM stream_ingest.ladder_levels
+                WHERE market_id = %s AND side = 'B' AND publish_time < %s AND selection_id = ANY(%s)
+                ORDER BY selection_id, level, publish_time DESC
+                """,
+                (market_id, from_dt, selection_ids),
             )
-            
-            # Also get latest state for best_back/best_lay (for compatibility with existing API shape)
-            runners, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl, total_volume = _runners_from_ladder(
-                cur, market_id, bucket_time, home_sid, away_sid, draw_sid,
+            state = cur.fetchall()
+        baseline = [
+            (int(r["selection_id"]), r["side"], int(r["level"]), float(r["price"]), float(r["size"]))
+            for r in state
+        ]
+        # Server-side cursor: rows are fetched BOOK_RISK_TICKS_ITERSIZE at a time and reading stops once `limit`
+        # points are produced, so a long range does not load every update of the market into memory
+        updates_cur = cur.connection.cursor(name="book_risk_ticks")
+        try:
+            updates_cur.itersize = BOOK_RISK_TICKS_ITERSIZE
+            updates_cur.execute(_SQL_BOOK_RISK_UPDATES, (market_id, from_dt, to_dt, selection_ids))
+            updates = (
+                (r["publish_time"], int(r["selection_id"]), r["side"], int(r["level"]), float(r["price"]), float(r["size"]))
+                for r in updates_cur
             )
-
-        out.append({
-            "snapshot_at": bucket_time.isoformat(),
-            "home_best_back": home_bb,
-            "away_best_back": away_bb,
-            "draw_best_back": draw_bb,
-            "home_best_lay": home_bl,
-            "away_best_lay": away_bl,
-            "draw_best_lay": draw_bl,
-            "home_back_odds_median": home_odds_median,
-            "home_back_size_median": home_size_median,
-            "away_back_odds_median": away_odds_median,
-            "away_back_size_median": away_size_median,
-            "draw_back_odds_median": draw_odds_median,
-            "draw_back_size_median": draw_size_median,
-            "home_seconds_covered": home_seconds_covered,
-            "home_update_count": home_update_count,
-            "away_seconds_covered": away_seconds_covered,
-            "away_update_count": away_update_count,
-            "draw_seconds_covered": draw_seconds_covered,
-            "draw_update_count": draw_update_count,
-            "home_book_risk_l3": book_risk["home_book_risk_l3"] if book_risk else None,
-            "away_book_risk_l3": book_risk["away_book_risk_l3"] if book_risk else None,
-            "draw_book_risk_l3": book_risk["draw_book_risk_l3"] if book_risk else None,
-            "impedance_index_15m": impedance["impedance_index_15m"] if impedance else None,
-            "impedance_abs_diff_home": impedance["impedance_abs_diff_home"] if impedance else None,
-            "impedance_abs_diff_away": impedance["impedance_abs_diff_away"] if impedance else None,
-            "impedance_abs_diff_draw": impedance["impedance_abs_diff_draw"] if impedance else None,
-            "total_volume": total_volume,
-            "depth_limit": DEPTH_LIMIT,
-            "calculation_version": "stream_15min",
-        })
-
-    return out
+            points: List[Dict[str, Any]] = []
+            for publish_time, risk in book_risk_from_level_updates(updates, runner_metadata, DEPTH_LIMIT, baseline=baseline):
+                points.append({"publish_time": publish_time.isoformat(), **risk})
+                if len(points) >= limit:
+                    break
+        finally:
+            updates_cur.close()
+    return points
 
 
 def get_available_bucket_starts(market_id: str) -> List[datetime]:
@@ -1157,24 +1845,10 @@ def get_event_bucket_range(market_id: str) -> Optional[Tuple[datetime, datetime]
     Returns (earliest_bucket_start, latest_bucket_start) or None if no ticks.
     """
     with cursor() as cur:
-        cur.execute(
-            """
-            SELECT MIN(publish_time) AS min_pt, MAX(publish_time) AS max_pt
-            FROM stream_ingest.ladder_levels
-            WHERE market_id = %s
-            """,
-            (market_id,),
-        )
-        row = cur.fetchone()
-    if not row or row.get("min_pt") is None or row.get("max_pt") is None:
+        publish_range = _market_publish_range(cur, market_id)
+    if publish_range is None:
         return None
-    min_pt = row["min_pt"]
-    max_pt = row["max_pt"]
-    if min_pt.tzinfo is None:
-        min_pt = min_pt.replace(tzinfo=timezone.utc)
-    if max_pt.tzinfo is None:
-        max_pt = max_pt.replace(tzinfo=timezone.utc)
-    return (_bucket_15_utc(min_pt), _bucket_15_utc(max_pt))
+    return (_bucket_15_utc(publish_range[0]), _bucket_15_utc(publish_range[1]))
 
 
 def _tick_count_in_bucket(cur: Any, market_id: str, bucket_start: datetime, bucket_end: datetime) -> int:
@@ -1195,6 +1869,46 @@ def _tick_count_in_bucket(cur: Any, market_id: str, bucket_start: datetime, buck
     return int(row["cnt"]) if row and row.get("cnt") is not None else 0
 
 
+# Bulk buckets queries; shared by get_event_buckets_stream_bulk and its async variant. The ladder query takes
+# its selection ids from metadata in SQL, so the three queries are independent and can run concurrently.
+_SQL_BUCKETS_META = """
+    SELECT m.market_id, m.event_id, m.event_name, m.event_open_date, m.competition_name,
+           m.home_selection_id, m.away_selection_id, m.draw_selection_id
+    FROM market_event_metadata m
+    WHERE m.market_id = %s
+"""
+# Only top-of-book back (level 0, side B) for impedance + book risk
+_SQL_BUCKETS_BACK_L0 = """
+    SELECT l.publish_time, l.selection_id, l.price, l.size
+    FROM stream_ingest.ladder_levels l
+    WHERE l.market_id = %s
+      AND l.selection_id IN (
+          SELECT unnest(ARRAY[m.home_selection_id, m.away_selection_id, m.draw_selection_id])
+          FROM market_event_metadata m
+          WHERE m.market_id = %s
+      )
+      AND l.side = 'B'
+      AND l.level = 0
+      AND l.publish_time >= %s
+      AND l.publish_time <= %s
+    ORDER BY l.publish_time ASC
+"""
+# total_volume (total_matched) per bucket
+_SQL_BUCKETS_LIQUIDITY = """
+    SELECT publish_time, total_matched
+    FROM stream_ingest.market_liquidity_history
+    WHERE market_id = %s
+      AND publish_time >= %s
+      AND publish_time <= %s
+    ORDER BY publish_time ASC
+"""
+
+
+def _buckets_fetch_range(from_dt: datetime, to_dt: datetime) -> Tuple[datetime, datetime]:
+    """Extend range 15 min back for baseline of first bucket (and 15 min forward)."""
+    return from_dt - timedelta(minutes=15), to_dt + timedelta(minutes=15)
+
+
 def get_event_buckets_stream_bulk(
     market_id: str,
     from_dt: datetime,
@@ -1210,70 +1924,70 @@ def get_event_buckets_stream_bulk(
     - No lay prices or multiple levels required for these metrics.
     """
     db_count = 0
-
     with cursor() as cur:
-        cur.execute(
-            """
-            SELECT m.market_id, m.event_id, m.event_name, m.event_open_date, m.competition_name,
-                   m.home_selection_id, m.away_selection_id, m.draw_selection_id
-            FROM market_event_metadata m
-            WHERE m.market_id = %s
-            """,
-            (market_id,),
-        )
+        cur.execute(_SQL_BUCKETS_META, (market_id,))
         meta = cur.fetchone()
         db_count += 1
-    if not meta:
-        return [], db_count
-
-    home_sid = meta.get("home_selection_id")
-    away_sid = meta.get("away_selection_id")
-    draw_sid = meta.get("draw_selection_id")
-    selection_ids = [s for s in [home_sid, away_sid, draw_sid] if s is not None]
-    if not selection_ids:
-        return [], db_count
+        if not meta or all(meta.get(k) is None for k in ("home_selection_id", "away_selection_id", "draw_selection_id")):
+            return [], db_count
 
-    # Extend range 15 min back for baseline of first bucket
-    fetch_from = from_dt - timedelta(minutes=15)
-    fetch_to = to_dt + timedelta(minutes=15)
-    now = datetime.now(timezone.utc)
-
-    # Query 2: ladder_levels - only top-of-book back (level 0, side B) for impedance + book risk
-    with cursor() as cur:
-        cur.execute(
-            """
-            SELECT publish_time, selection_id, price, size
-            FROM stream_ingest.ladder_levels
-            WHERE market_id = %s
-              AND selection_id = ANY(%s)
-              AND side = 'B'
-              AND level = 0
-              AND publish_time >= %s
-              AND publish_time <= %s
-            ORDER BY publish_time ASC
-            """,
-            (market_id, selection_ids, fetch_from, fetch_to),
-        )
+        fetch_from, fetch_to = _buckets_fetch_range(from_dt, to_dt)
+        cur.execute(_SQL_BUCKETS_BACK_L0, (market_id, market_id, fetch_from, fetch_to))
         all_rows = cur.fetchall()
         db_count += 1
 
-    # Query 3: market_liquidity_history - total_volume (total_matched) per bucket
-    with cursor() as cur:
-        cur.execute(
-            """
-            SELECT publish_time, total_matched
-            FROM stream_ingest.market_liquidity_history
-            WHERE market_id = %s
-              AND publish_time >= %s
-              AND publish_time <= %s
-            ORDER BY publish_time ASC
-            """,
-            (market_id, fetch_from, fetch_to),
-        )
+        cur.execute(_SQL_BUCKETS_LIQUIDITY, (market_id, fetch_from, fetch_to))
         liq_rows = cur.fetchall()
         db_count += 1
 
-    # Build liquidity lookup: for each bucket_end, latest total_matched at or before bucket_end
+    return _buckets_from_rows(meta, all_rows, liq_rows, from_dt, to_dt), db_count
+
+
+def _selection_timeline(
+    rows: List[Tuple[datetime, Optional[float], Optional[float]]],
+) -> Tuple[List[Tuple[datetime, Optional[float], Optional[float]]], List[datetime], List[Tuple[datetime, float]], List[datetime]]:
+    """
+    One selection's ticks for the bucket sweep: rows sorted by time (stable) with their times, and the rows that
+    carry a price (time, price) with their times. Bisect on the time lists replaces per-bucket scans.
+    """
+    ordered = sorted(rows, key=lambda x: x[0])
+    priced = [(pt, price) for pt, price, _ in ordered if price is not None]
+    return ordered, [r[0] for r in ordered], priced, [r[0] for r in priced]
+
+
+def _latest_at_or_before(times: List[datetime], t: datetime) -> Optional[int]:
+    """Index of the latest time <= t in ascending times; the first of equal times (as max()/reverse sort pick). None if none."""
+    i = bisect_right(times, t)
+    if i == 0:
+        return None
+    return bisect_left(times, times[i - 1])
+
+
+def _buckets_from_rows(
+    meta: Dict[str, Any],
+    all_rows: List[Dict[str, Any]],
+    liq_rows: List[Dict[str, Any]],
+    from_dt: datetime,
+    to_dt: datetime,
+) -> List[Dict[str, Any]]:
+    """
+    Buckets of get_event_buckets_stream_bulk from its 3 result sets (shared with the async endpoint). No DB.
+    all_rows: level-0 back ticks (publish_time, selection_id, price, size) from from_dt - 15 min;
+    liq_rows: (publish_time, total_matched) ascending.
+
+    Sweep: each selection's ticks are sorted once; per bucket, the carry-forward baseline, the updates in the bucket,
+    the tick count and the best back come from bisect on the sorted times, and total_volume from bisect on the
+    liquidity times, so the cost is O(ticks log ticks + buckets log ticks) instead of O(buckets x ticks).
+    Medians are taken from each bucket's own segments (_median_from_baseline_and_updates); results are identical
+    to scanning every row per bucket with _compute_median_from_rows.
+    """
+    home_sid = meta.get("home_selection_id")
+    away_sid = meta.get("away_selection_id")
+    draw_sid = meta.get("draw_selection_id")
+    selection_ids = [s for s in [home_sid, away_sid, draw_sid] if s is not None]
+    now = datetime.now(timezone.utc)
+
+    # Liquidity: latest total_matched at or before each bucket's effective end (rows ascending by publish_time)
     liq_list: List[Tuple[datetime, Optional[float]]] = []
     for r in liq_rows:
         pt = r["publish_time"]
@@ -1281,15 +1995,15 @@ def get_event_buckets_stream_bulk(
             pt = pt.replace(tzinfo=timezone.utc)
         tv = float(r["total_matched"]) if r.get("total_matched") is not None else None
         liq_list.append((pt, tv))
+    liq_list.sort(key=lambda x: x[0])
+    liq_times = [pt for pt, _ in liq_list]
 
     def total_volume_at(bucket_end_ts: datetime) -> Optional[float]:
-        best = None
-        for pt, tv in liq_list:
-            if pt <= bucket_end_ts:
-                best = tv
-        return best
+        # Last row (in ascending order) with publish_time <= bucket_end_ts
+        i = bisect_right(liq_times, bucket_end_ts)
+        return liq_list[i - 1][1] if i else None
 
-    # Group by selection_id for efficient lookup
+    # Group by selection_id, then sort each selection once
     by_sel: Dict[int, List[Tuple[datetime, Optional[float], Optional[float]]]] = {}
     for sid in selection_ids:
         by_sel[sid] = []
@@ -1303,6 +2017,23 @@ def get_event_buckets_stream_bulk(
         price = float(r["price"]) if r.get("price") is not None else None
         size = float(r["size"]) if r.get("size") is not None else None
         by_sel[sid].append((pt, price, size))
+    timelines = {sid: _selection_timeline(rows) for sid, rows in by_sel.items()}
+
+    def median_in_bucket(sid: int, bucket_start: datetime, effective_end: datetime):
+        ordered, times, _, _ = timelines[sid]
+        if not ordered:
+            return (None, None, 0.0, 0)
+        b = _latest_at_or_before(times, bucket_start)
+        baseline_row = ordered[b] if b is not None else None
+        # Updates in (bucket_start, effective_end]; empty when effective_end <= bucket_start (future bucket)
+        update_rows = ordered[bisect_right(times, bucket_start):bisect_right(times, effective_end)]
+        return _median_from_baseline_and_updates(baseline_row, update_rows, bucket_start, effective_end)
+
+    def best_back_at(sid: int, bucket_time: datetime) -> Optional[float]:
+        # Latest priced row with publish_time <= bucket_time
+        _, _, priced, priced_times = timelines[sid]
+        i = _latest_at_or_before(priced_times, bucket_time)
+        return priced[i][1] if i is not None else None
 
     bucket_times = _bucket_times_in_range(from_dt, to_dt)
     out: List[Dict[str, Any]] = []
@@ -1315,9 +2046,8 @@ def get_event_buckets_stream_bulk(
         # Tick count: rows with publish_time in [bucket_start, bucket_end) for any selection
         tick_count = 0
         for sid in selection_ids:
-            for pt, _, _ in by_sel.get(sid, []):
-                if bucket_start <= pt < bucket_end:
-                    tick_count += 1
+            times = timelines[sid][1]
+            tick_count += bisect_left(times, bucket_end) - bisect_left(times, bucket_start)
 
         home_odds_median, home_size_median = (None, None)
         away_odds_median, away_size_median = (None, None)
@@ -1326,16 +2056,16 @@ def get_event_buckets_stream_bulk(
         home_update_count = away_update_count = draw_update_count = 0
 
         if home_sid is not None:
-            home_odds_median, home_size_median, home_seconds_covered, home_update_count = _compute_median_from_rows(
-                by_sel.get(home_sid, []), bucket_start, effective_end
+            home_odds_median, home_size_median, home_seconds_covered, home_update_count = median_in_bucket(
+                home_sid, bucket_start, effective_end
             )
         if away_sid is not None:
-            away_odds_median, away_size_median, away_seconds_covered, away_update_count = _compute_median_from_rows(
-                by_sel.get(away_sid, []), bucket_start, effective_end
+            away_odds_median, away_size_median, away_seconds_covered, away_update_count = median_in_bucket(
+                away_sid, bucket_start, effective_end
             )
         if draw_sid is not None:
-            draw_odds_median, draw_size_median, draw_seconds_covered, draw_update_count = _compute_median_from_rows(
-                by_sel.get(draw_sid, []), bucket_start, effective_end
+            draw_odds_median, draw_size_median, draw_seconds_covered, draw_update_count = median_in_bucket(
+                draw_sid, bucket_start, effective_end
             )
 
         book_risk = compute_book_risk_from_medians(
@@ -1350,16 +2080,9 @@ def get_event_buckets_stream_bulk(
         )
 
         # Best back at bucket_time: latest row with publish_time <= bucket_time
-        def best_back_at(sid: int) -> Optional[float]:
-            rows = [(pt, price) for pt, price, _ in by_sel.get(sid, [])
-                    if pt <= bucket_time and price is not None]
-            if not rows:
-                return None
-            return max(rows, key=lambda x: x[0])[1]
-
-        home_bb = best_back_at(home_sid) if home_sid else None
-        away_bb = best_back_at(away_sid) if away_sid else None
-        draw_bb = best_back_at(draw_sid) if draw_sid else None
+        home_bb = best_back_at(home_sid, bucket_time) if home_sid else None
+        away_bb = best_back_at(away_sid, bucket_time) if away_sid else None
+        draw_bb = best_back_at(draw_sid, bucket_time) if draw_sid else None
 
         out.append({
             "bucket_start": bucket_start.isoformat(),
@@ -1396,7 +2119,18 @@ def get_event_buckets_stream_bulk(
             "calculation_version": "stream_15min_bulk",
         })
 
-    return out, db_count
+    return out
+
+
+def _event_bucket_item(bucket_start: datetime, tick_count: int, e: Dict[str, Any]) -> Dict[str, Any]:
+    """One event-aware bucket (get_event_buckets_stream) from a bucket enrichment, computed or stored."""
+    item = {
+        "bucket_start": bucket_start.isoformat(),
+        "bucket_end": (bucket_start + timedelta(minutes=15)).isoformat(),
+        "tick_count": tick_count,
+    }
+    item.update(_timeseries_point(bucket_start, e))
+    return item
 
 
 def get_event_buckets_stream(market_id: str) -> List[Dict[str, Any]]:
@@ -1405,130 +2139,41 @@ def get_event_buckets_stream(market_id: str) -> List[Dict[str, Any]]:
     No date/window filter; no staleness filter. Ordered oldest first (ASC) for consistent
     chart (left→right) and table (top→bottom) chronology; latest = last element.
     Uses same medians/coverage/risk shape as timeseries for UI compatibility.
+    Closed buckets come from stream_bucket_metrics when stored; the others (the live bucket, buckets not yet
+    materialized) are computed: tick count, then _bulk_bucket_enrichment (3 queries).
     """
     with cursor() as cur:
-        cur.execute(
-            """
-            SELECT home_selection_id, away_selection_id, draw_selection_id
-            FROM market_event_metadata
-            WHERE market_id = %s
-            """,
-            (market_id,),
-        )
+        cur.execute(_SQL_MARKET_SELECTIONS, (market_id,))
         meta = cur.fetchone()
-    if not meta:
-        return []
-
-    with cursor() as cur:
-        cur.execute(
-            """
-            SELECT MIN(publish_time) AS min_pt, MAX(publish_time) AS max_pt
-            FROM stream_ingest.ladder_levels
-            WHERE market_id = %s
-            """,
-            (market_id,),
-        )
-        row = cur.fetchone()
-    if not row or row.get("min_pt") is None or row.get("max_pt") is None:
-        return []
-
-    min_pt = row["min_pt"]
-    max_pt = row["max_pt"]
-    if min_pt.tzinfo is None:
-        min_pt = min_pt.replace(tzinfo=timezone.utc)
-    if max_pt.tzinfo is None:
-        max_pt = max_pt.replace(tzinfo=timezone.utc)
-    from_dt = _bucket_15_utc(min_pt)
-    # Include bucket that contains max_pt
-    to_dt = max_pt + timedelta(minutes=1)
-    now = datetime.now(timezone.utc)
-    bucket_times = _bucket_times_in_range(from_dt, to_dt)
-
-    home_sid = meta.get("home_selection_id")
-    away_sid = meta.get("away_selection_id")
-    draw_sid = meta.get("draw_selection_id")
-    out: List[Dict[str, Any]] = []
+        if not meta:
+            return []
 
-    for bucket_time in bucket_times:
-        bucket_start = bucket_time
-        bucket_end = bucket_time + timedelta(minutes=15)
-        effective_end = min(bucket_end, now)
+        publish_range = _market_publish_range(cur, market_id)
+        if publish_range is None:
+            return []
 
-        with cursor() as cur:
-            last_pt = _latest_publish_before(cur, market_id, bucket_time)
-            if last_pt is None:
-                last_pt = _first_publish_in_bucket(cur, market_id, bucket_start, bucket_end)
-            if last_pt is None:
+        min_pt, max_pt = publish_range
+        from_dt = _bucket_15_utc(min_pt)
+        # Include bucket that contains max_pt
+        to_dt = max_pt + timedelta(minutes=1)
+        now = datetime.now(timezone.utc)
+        bucket_times = _bucket_times_in_range(from_dt, to_dt)
+        stored = _load_stored_buckets(cur, market_id, from_dt, to_dt) if bucket_times else {}
+        selections = {market_id: (meta.get("home_selection_id"), meta.get("away_selection_id"), meta.get("draw_selection_id"))}
+        out: List[Dict[str, Any]] = []
+
+        for bucket_time in bucket_times:
+            bucket_end = bucket_time + timedelta(minutes=15)
+            row = stored.get(bucket_time)
+            if row is not None:
+                out.append(_event_bucket_item(bucket_time, row["tick_count"], _enrichment_from_stored(row)))
                 continue
 
-            tick_count = _tick_count_in_bucket(cur, market_id, bucket_start, bucket_end)
-
-            home_odds_median, home_size_median = (None, None)
-            away_odds_median, away_size_median = (None, None)
-            draw_odds_median, draw_size_median = (None, None)
-            home_seconds_covered = away_seconds_covered = draw_seconds_covered = 0.0
-            home_update_count = away_update_count = draw_update_count = 0
-            if home_sid is not None:
-                home_odds_median, home_size_median, home_seconds_covered, home_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, home_sid, bucket_start, bucket_end, effective_end
-                )
-            if away_sid is not None:
-                away_odds_median, away_size_median, away_seconds_covered, away_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, away_sid, bucket_start, bucket_end, effective_end
-                )
-            if draw_sid is not None:
-                draw_odds_median, draw_size_median, draw_seconds_covered, draw_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, draw_sid, bucket_start, bucket_end, effective_end
-                )
-
-            book_risk = compute_book_risk_from_medians(
-                home_odds_median, home_size_median,
-                away_odds_median, away_size_median,
-                draw_odds_median, draw_size_median,
-            )
-            impedance = compute_impedance_index_from_medians(
-                home_odds_median, home_size_median,
-                away_odds_median, away_size_median,
-                draw_odds_median, draw_size_median,
-            )
-            runners, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl, total_volume = _runners_from_ladder(
-                cur, market_id, bucket_time, home_sid, away_sid, draw_sid,
-            )
-
-        out.append({
-            "bucket_start": bucket_start.isoformat(),
-            "bucket_end": bucket_end.isoformat(),
-            "tick_count": tick_count,
-            "snapshot_at": bucket_start.isoformat(),
-            "home_best_back": home_bb,
-            "away_best_back": away_bb,
-            "draw_best_back": draw_bb,
-            "home_best_lay": home_bl,
-            "away_best_lay": away_bl,
-            "draw_best_lay": draw_bl,
-            "home_back_odds_median": home_odds_median,
-            "home_back_size_median": home_size_median,
-            "away_back_odds_median": away_odds_median,
-            "away_back_size_median": away_size_median,
-            "draw_back_odds_median": draw_odds_median,
-            "draw_back_size_median": draw_size_median,
-            "home_seconds_covered": home_seconds_covered,
-            "home_update_count": home_update_count,
-            "away_seconds_covered": away_seconds_covered,
-            "away_update_count": away_update_count,
-            "draw_seconds_covered": draw_seconds_covered,
-            "draw_update_count": draw_update_count,
-            "home_book_risk_l3": book_risk["home_book_risk_l3"] if book_risk else None,
-            "away_book_risk_l3": book_risk["away_book_risk_l3"] if book_risk else None,
-            "draw_book_risk_l3": book_risk["draw_book_risk_l3"] if book_risk else None,
-            "impedance_index_15m": impedance["impedance_index_15m"] if impedance else None,
-            "impedance_abs_diff_home": impedance["impedance_abs_diff_home"] if impedance else None,
-            "impedance_abs_diff_away": impedance["impedance_abs_diff_away"] if impedance else None,
-            "impedance_abs_diff_draw": impedance["impedance_abs_diff_draw"] if impedance else None,
-            "total_volume": total_volume,
-            "depth_limit": DEPTH_LIMIT,
-            "calculation_version": "stream_15min",
-        })
+            # Every bucket of [bucket(first update), last update] has an update at or before its start or inside it
+            tick_count = _tick_count_in_bucket(cur, market_id, bucket_time, bucket_end)
+            effective_end = min(bucket_end, now)
+            enrichment = _bulk_bucket_enrichment(cur, selections, bucket_time, effective_end)
+            out.append(_event_bucket_item(bucket_time, tick_count, enrichment[market_id]))
 
     # Return oldest first (ASC): chart left→right, table top→bottom; latest = last
     return out
@@ -1603,11 +2248,15 @@ def get_league_events_stream(
     limit: int,
     offset: int,
 ) -> List[Dict[str, Any]]:
-    """Events in league with latest 15-min bucket from stream. Same shape as REST league events."""
+    """
+    Events in league with latest 15-min bucket from stream. Same shape as REST league events.
+    At most LEAGUE_EVENTS_QUERY_BUDGET queries, independent of the number of markets.
+    """
     # Latest bucket in range
     bucket_times = _bucket_times_in_range(from_dt, to_dt)
     latest_bucket = bucket_times[-1] if bucket_times else _bucket_15_utc(to_dt - timedelta(seconds=1))
     stale_cutoff = latest_bucket - timedelta(minutes=STALE_MINUTES)
+    effective_end = min(latest_bucket + timedelta(minutes=15), datetime.now(timezone.utc))
 
     with cursor() as cur:
         cur.execute(
@@ -1624,75 +2273,10 @@ def get_league_events_stream(
             (league_name, from_dt, to_dt, limit, offset),
         )
         meta_rows = cur.fetchall()
+        enrichment_by_market = _load_fresh_markets_enrichment(cur, meta_rows, latest_bucket, effective_end, stale_cutoff)
 
-    result: List[Dict[str, Any]] = []
-    now = datetime.now(timezone.utc)
-    for m in meta_rows:
-        market_id = m["market_id"]
-        bucket_start = latest_bucket
-        bucket_end = latest_bucket + timedelta(minutes=15)
-        effective_end = min(bucket_end, now)
-        
-        with cursor() as cur:
-            last_pt = _latest_publish_before(cur, market_id, latest_bucket)
-            if last_pt is None or last_pt < stale_cutoff:
-                continue
-            
-            home_seconds_covered = away_seconds_covered = draw_seconds_covered = 0.0
-            home_update_count = away_update_count = draw_update_count = 0
-            if m.get("home_selection_id") is not None:
-                home_odds_median, home_size_median, home_seconds_covered, home_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, m["home_selection_id"], bucket_start, bucket_end, effective_end
-                )
-            if m.get("away_selection_id") is not None:
-                away_odds_median, away_size_median, away_seconds_covered, away_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, m["away_selection_id"], bucket_start, bucket_end, effective_end
-                )
-            if m.get("draw_selection_id") is not None:
-                draw_odds_median, draw_size_median, draw_seconds_covered, draw_update_count = _compute_bucket_median_back_odds_and_size(
-                    cur, market_id, m["draw_selection_id"], bucket_start, bucket_end, effective_end
-                )
-            
-            book_risk = compute_book_risk_from_medians(
-                home_odds_median, home_size_median,
-                away_odds_median, away_size_median,
-                draw_odds_median, draw_size_median,
-            )
-            impedance = compute_impedance_index_from_medians(
-                home_odds_median, home_size_median,
-                away_odds_median, away_size_median,
-                draw_odds_median, draw_size_median,
-            )
-            runners, home_bb, away_bb, draw_bb, home_bl, away_bl, draw_bl, total_volume = _runners_from_ladder(
-                cur, market_id, latest_bucket,
-                m.get("home_selection_id"), m.get("away_selection_id"), m.get("draw_selection_id"),
-            )
-
-        result.append({
-            "market_id": market_id,
-            "event_id": m.get("event_id"),
-            "event_name": m.get("event_name"),
-            "event_open_date": m["event_open_date"].isoformat() if m.get("event_open_date") else None,
-            "competition_name": m.get("competition_name"),
-            "latest_snapshot_at": latest_bucket.isoformat(),
-            "home_best_back": home_bb, "away_best_back": away_bb, "draw_best_back": draw_bb,
-            "home_best_lay": home_bl, "away_best_lay": away_bl, "draw_best_lay": draw_bl,
-            "total_volume": total_volume,
-            "depth_limit": DEPTH_LIMIT,
-            "calculation_version": "stream_15min",
-            "home_book_risk_l3": book_risk["home_book_risk_l3"] if book_risk else None,
-            "away_book_risk_l3": book_risk["away_book_risk_l3"] if book_risk else None,
-            "draw_book_risk_l3": book_risk["draw_book_risk_l3"] if book_risk else None,
-            "impedance_index_15m": impedance["impedance_index_15m"] if impedance else None,
-            "impedance_abs_diff_home": impedance["impedance_abs_diff_home"] if impedance else None,
-            "impedance_abs_diff_away": impedance["impedance_abs_diff_away"] if impedance else None,
-            "impedance_abs_diff_draw": impedance["impedance_abs_diff_draw"] if impedance else None,
-            "home_seconds_covered": home_seconds_covered,
-            "home_update_count": home_update_count,
-            "away_seconds_covered": away_seconds_covered,
-            "away_update_count": away_update_count,
-            "draw_seconds_covered": draw_seconds_covered,
-            "draw_update_count": draw_update_count,
-        })
-
-    return result
+    return [
+        _stream_event_item(m, latest_bucket, enrichment_by_market[m["market_id"]])
+        for m in meta_rows
+        if m["market_id"] in enrichment_by_market
+    ]
@@ -0,0 +1,211 @@
+"""
+Async variants of the heavy stream_data reads (by-date list, bulk buckets, timeseries) on app.db_async.
+Same SQL and in-memory assembly as app.stream_data; independent queries of a request run concurrently
+(each on its own pooled connection), so results are identical to the sync functions.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.db_async import fetchall, fetchone
+from app import stream_data
+from app.stream_data import (
+    BUCKET_METRICS_VERSION,
+    _SQL_ACTIVITY_DAY_AT_OR_BEFORE,
+    _SQL_ACTIVITY_PRESENT,
+    _SQL_ACTIVITY_WATERMARK,
+    _SQL_KEYFRAMES_PRESENT,
+    _SQL_KEYFRAMES_RANGE,
+    _SQL_BUCKETS_BACK_L0,
+    _SQL_BUCKETS_LIQUIDITY,
+    _SQL_BUCKETS_META,
+    _SQL_LAST_PUBLISH_IN_RANGE,
+    _SQL_LATEST_PUBLISH_BEFORE,
+    _SQL_MARKET_SELECTIONS,
+    _SQL_REST_DRIVEN_LAST_STREAM,
+    _SQL_REST_DRIVEN_LIQUIDITY,
+    _SQL_REST_DRIVEN_META,
+    _SQL_REST_DRIVEN_PRIMARY,
+    _SQL_STORED_BUCKETS,
+    _SQL_STORED_BUCKETS_PRESENT,
+    _assemble_bucket_enrichment,
+    _buckets_fetch_range,
+    _buckets_from_rows,
+    _activity_probe_due,
+    _activity_record_probe,
+    _activity_usable_watermark,
+    _bulk_enrichment_queries,
+    _enrichment_from_stored,
+    _index_rest_driven_rows,
+    _index_stored_buckets,
+    _keyframe_probe_due,
+    _keyframe_record_probe,
+    _ladder_state_query,
+    _last_stream_rows,
+    _latest_publish_plan,
+    _rest_driven_assemble,
+    _rest_driven_selections,
+    _rest_driven_window,
+    _stored_buckets_probe_due,
+    _stored_buckets_record_probe,
+    _timeseries_point,
+    _timeseries_window,
+    _usable_keyframe,
+)
+
+# Timeseries buckets processed at once (each runs up to 3 concurrent queries).
+TIMESERIES_BUCKET_CONCURRENCY = 4
+
+
+async def keyframe_for(t: datetime) -> Optional[datetime]:
+    """Async stream_data._keyframe_for."""
+    if _keyframe_probe_due():
+        row = await fetchone(_SQL_KEYFRAMES_PRESENT)
+        _keyframe_record_probe(await fetchone(_SQL_KEYFRAMES_RANGE) if row["present"] else None)
+    return _usable_keyframe(t)
+
+
+async def ladder_state_rows(market_ids: List[str], t: datetime) -> List[Dict[str, Any]]:
+    """Async stream_data._ladder_state_rows."""
+    return await fetchall(*_ladder_state_query(market_ids, t, await keyframe_for(t)))
+
+
+async def bulk_bucket_enrichment(
+    selections_by_market: Dict[str, Tuple[Optional[int], Optional[int], Optional[int]]],
+    bucket_start: datetime,
+    effective_end: datetime,
+) -> Dict[str, Dict[str, Any]]:
+    """Async _bulk_bucket_enrichment: its 3 queries run concurrently."""
+    if not selections_by_market:
+        return {}
+    keyframe = await keyframe_for(bucket_start)
+    results = await asyncio.gather(*(
+        fetchall(sql, params)
+        for sql, params in _bulk_enrichment_queries(selections_by_market, bucket_start, effective_end, keyframe)
+    ))
+    return _assemble_bucket_enrichment(selections_by_market, *results, bucket_start, effective_end)
+
+
+async def load_stored_buckets(market_id: str, from_dt: datetime, to_dt: datetime) -> Dict[datetime, Dict[str, Any]]:
+    """Async stream_data._load_stored_buckets."""
+    if _stored_buckets_probe_due():
+        row = await fetchone(_SQL_STORED_BUCKETS_PRESENT)
+        _stored_buckets_record_probe(bool(row["present"]))
+    if not (stream_data.BUCKET_STORE_READ and stream_data._stored_buckets_probe["present"]):
+        return {}
+    return _index_stored_buckets(await fetchall(_SQL_STORED_BUCKETS, (market_id, BUCKET_METRICS_VERSION, from_dt, to_dt)))
+
+
+async def activity_watermark() -> Optional[datetime]:
+    """Async stream_data._activity_watermark."""
+    if _activity_probe_due():
+        row = await fetchone(_SQL_ACTIVITY_PRESENT)
+        watermark = None
+        if row["present"]:
+            row = await fetchone(_SQL_ACTIVITY_WATERMARK)
+            watermark = row["counted_until"] if row else None
+        _activity_record_probe(watermark)
+    return _activity_usable_watermark()
+
+
+async def latest_publish_by_market(
+    market_ids: List[str], t: Optional[datetime], watermark: datetime
+) -> Dict[str, datetime]:
+    """Async stream_data._latest_publish_by_market: the bounded ladder_levels reads run concurrently."""
+    if not market_ids:
+        return {}
+    t = t or datetime.now(timezone.utc) + timedelta(days=1)
+    out, scan = _latest_publish_plan(await fetchall(_SQL_ACTIVITY_DAY_AT_OR_BEFORE, (market_ids, t)), t)
+    reads = []
+    if scan:
+        reads.append(fetchall(_SQL_LAST_PUBLISH_IN_RANGE, (list(scan), min(scan.values()), t)))
+    if t >= watermark:
+        reads.append(fetchall(_SQL_LAST_PUBLISH_IN_RANGE, (market_ids, watermark, t)))
+    # Tail results last: updates at or after the watermark are later than anything counted
+    for rows in await asyncio.gather(*reads):
+        out.update({r["market_id"]: r["t"] for r in rows if r.get("t")})
+    return out
+
+
+async def _last_stream(market_ids: List[str]) -> List[Dict[str, Any]]:
+    watermark = await activity_watermark()
+    if watermark is not None:
+        return _last_stream_rows(await latest_publish_by_market(market_ids, None, watermark))
+    return await fetchall(_SQL_REST_DRIVEN_LAST_STREAM, (market_ids,))
+
+
+async def get_events_by_date_rest_driven(date_str: str) -> List[Dict[str, Any]]:
+    """Async stream_data.get_events_by_date_rest_driven: primary, then 3 batch queries, then 3 enrichment queries."""
+    window = _rest_driven_window(date_str)
+    if window is None:
+        return []
+    primary_rows = await fetchall(_SQL_REST_DRIVEN_PRIMARY, (window["from_dt"], window["to_dt"]))
+    market_ids = [r["market_id"] for r in primary_rows]
+    meta_rows: List[Dict[str, Any]] = []
+    last_stream_rows: List[Dict[str, Any]] = []
+    liquidity_rows: List[Dict[str, Any]] = []
+    if market_ids:
+        meta_rows, last_stream_rows, liquidity_rows = await asyncio.gather(
+            fetchall(_SQL_REST_DRIVEN_META, (market_ids,)),
+            _last_stream(market_ids),
+            fetchall(_SQL_REST_DRIVEN_LIQUIDITY, (market_ids, window["from_dt"], window["effective_end"])),
+        )
+    meta_by_market, last_stream_by_market, liquidity_volume_by_market = _index_rest_driven_rows(
+        meta_rows, last_stream_rows, liquidity_rows
+    )
+    enrichment_by_market = await bulk_bucket_enrichment(
+        _rest_driven_selections(meta_by_market, last_stream_by_market), window["latest_bucket"], window["effective_end"]
+    )
+    return _rest_driven_assemble(
+        window, primary_rows, meta_by_market, last_stream_by_market, liquidity_volume_by_market, enrichment_by_market,
+    )
+
+
+async def get_event_buckets_stream_bulk(
+    market_id: str,
+    from_dt: datetime,
+    to_dt: datetime,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Async stream_data.get_event_buckets_stream_bulk: metadata, ladder and liquidity queries run concurrently."""
+    fetch_from, fetch_to = _buckets_fetch_range(from_dt, to_dt)
+    meta, all_rows, liq_rows = await asyncio.gather(
+        fetchone(_SQL_BUCKETS_META, (market_id,)),
+        fetchall(_SQL_BUCKETS_BACK_L0, (market_id, market_id, fetch_from, fetch_to)),
+        fetchall(_SQL_BUCKETS_LIQUIDITY, (market_id, fetch_from, fetch_to)),
+    )
+    if not meta or all(meta.get(k) is None for k in ("home_selection_id", "away_selection_id", "draw_selection_id")):
+        return [], 3
+    return _buckets_from_rows(meta, all_rows, liq_rows, from_dt, to_dt), 3
+
+
+async def get_event_timeseries_stream(
+    market_id: str,
+    from_ts: Optional[datetime],
+    to_ts: Optional[datetime],
+) -> List[Dict[str, Any]]:
+    """Async stream_data.get_event_timeseries_stream: stored closed buckets are read, the others computed concurrently (bounded)."""
+    bucket_times, now, stale_cutoff_time = _timeseries_window(from_ts, to_ts)
+    meta = await fetchone(_SQL_MARKET_SELECTIONS, (market_id,))
+    if not meta:
+        return []
+    stored = await load_stored_buckets(market_id, bucket_times[0], bucket_times[-1] + timedelta(minutes=15)) if bucket_times else {}
+    selections = {market_id: (meta.get("home_selection_id"), meta.get("away_selection_id"), meta.get("draw_selection_id"))}
+    limiter = asyncio.Semaphore(TIMESERIES_BUCKET_CONCURRENCY)
+
+    async def point(bucket_time: datetime) -> Optional[Dict[str, Any]]:
+        row = stored.get(bucket_time)
+        if row is not None:
+            if row["last_publish_time"] is None or row["last_publish_time"] < stale_cutoff_time:
+                return None
+            return _timeseries_point(bucket_time, _enrichment_from_stored(row))
+        async with limiter:
+            row = await fetchone(_SQL_LATEST_PUBLISH_BEFORE, (market_id, stale_cutoff_time, bucket_time))
+            last_pt = row["t"] if row and row.get("t") else None
+            if last_pt is None or last_pt < stale_cutoff_time:
+                return None
+            effective_end = min(bucket_time + timedelta(minutes=15), now)
+            enrichment = await bulk_bucket_enrichment(selections, bucket_time, effective_end)
+        return _timeseries_point(bucket_time, enrichment[market_id])
+
+    points = await asyncio.gather(*(point(bt) for bt in bucket_times))
+    return [p for p in points if p is not None]
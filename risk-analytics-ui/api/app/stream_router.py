@@ -2,28 +2,37 @@
 Stream UI API: same shapes as REST but from stream_ingest with 15-min UTC buckets.
 Mount at prefix /stream. Staleness: STALE_MINUTES in stream_data.
 """
+import asyncio
+import csv
+import io
+import json
 import logging
 import time
 from datetime import datetime, timezone, timedelta
-from typing import Optional
-from fastapi import APIRouter, Query, HTTPException
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+from fastapi import APIRouter, Header, Query, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
+from app import columnar, fast_json, response_cache, stream_data_async
 from app.db import cursor
+from app.db_async import fetchall, fetchone, iter_rows
+from app.response_cache import stream_cache
 
 logger = logging.getLogger(__name__)
 from app.stream_data import (
-    get_events_by_date_rest_driven,
     get_events_by_date_volume,
     get_event_timeseries_stream,
-    get_event_buckets_stream_bulk,
     get_event_buckets_stream,
     get_data_horizon,
-    get_event_bucket_range,
     get_available_bucket_starts,
+    get_book_risk_ticks_stream,
+    _bucket_15_utc,
+    _bucket_times_in_range,
+    _market_publish_range,
 )
 
 DATA_HORIZON_CACHE_TTL_SEC = 60
-_data_horizon_cache: dict = {"value": None, "expires_at": 0}
 
 
 def _parse_ts_stream(s: Optional[str], default: datetime) -> datetime:
@@ -35,11 +44,79 @@ def _parse_ts_stream(s: Optional[str], default: datetime) -> datetime:
         return default
 
 
+def _cached_sync(
+    endpoint: str,
+    key: Hashable,
+    policy: response_cache.Policy,
+    compute: Callable[[], Any],
+    market_id: Optional[str] = None,
+) -> Any:
+    """compute() through stream_cache; the policy's validator query (if any) runs on every lookup."""
+    expires_at, validator_sql, validator_params = policy
+    validator = None
+    if validator_sql is not None:
+        with cursor() as cur:
+            cur.execute(validator_sql, validator_params)
+            row = cur.fetchone()
+        validator = row["t"] if row else None
+    hit, value = stream_cache.get(endpoint, key, validator)
+    if hit:
+        return value
+    value = compute()
+    stream_cache.put(endpoint, key, value, expires_at, validator, market_id)
+    return value
+
+
+async def _cached(
+    endpoint: str,
+    key: Hashable,
+    policy: response_cache.Policy,
+    compute: Callable[[], Awaitable[Any]],
+    market_id: Optional[str] = None,
+) -> Any:
+    """Async _cached_sync."""
+    expires_at, validator_sql, validator_params = policy
+    validator = None
+    if validator_sql is not None:
+        row = await fetchone(validator_sql, validator_params)
+        validator = row["t"] if row else None
+    hit, value = stream_cache.get(endpoint, key, validator)
+    if hit:
+        return value
+    value = await compute()
+    stream_cache.put(endpoint, key, value, expires_at, validator, market_id)
+    return value
+
+
+def _respond(
+    request: Optional[Request],
+    endpoint: Optional[str],
+    key: Hashable,
+    value: Any,
+    layout: Optional[str] = None,
+    accept: Optional[str] = None,
+    float32: bool = False,
+) -> Response:
+    """
+    value (a _cached / _cached_sync result) as an orjson response in the negotiated layout. The rendered, gzipped body
+    is kept with the cache entry (endpoint, key), so hits skip encoding; ETag / If-None-Match gives 304 to repeat polls.
+    endpoint None: not cached, rendered for this response only.
+    """
+    variant = (columnar.wants_columnar(layout, accept), float32)
+    rendered = stream_cache.rendered(endpoint, key, variant, value) if endpoint is not None else None
+    if rendered is None:
+        payload, media_type = columnar.negotiate(value, layout, accept, float32)
+        rendered = fast_json.render(payload, media_type)
+        if endpoint is not None:
+            stream_cache.attach_rendered(endpoint, key, variant, value, rendered)
+    return fast_json.respond(rendered, request.headers if request is not None else None)
+
+
 stream_router = APIRouter(tags=["stream"])
 
 
 @stream_router.get("/data-horizon")
-def stream_data_horizon():
+def stream_data_horizon(request: Request):
     """
     Streaming data horizon: oldest_tick, newest_tick, total_rows.
     Includes optional days[] for calendar UX (dates with ladder data).
@@ -52,31 +129,36 @@ def stream_data_horizon():
       curl -sS http://localhost:8000/api/stream/data-horizon | head
     The path the UI uses must match (getApiBase() + '/data-horizon' = /api/stream/data-horizon when on stream UI).
     """
-    now_ts = time.time()
-    if _data_horizon_cache["value"] is not None and now_ts < _data_horizon_cache["expires_at"]:
-        return _data_horizon_cache["value"]
-    result = get_data_horizon(include_days=True, days_limit=90)
-    _data_horizon_cache["value"] = result
-    _data_horizon_cache["expires_at"] = now_ts + DATA_HORIZON_CACHE_TTL_SEC
-    return result
+    horizon = _cached_sync(
+        "data_horizon", None, response_cache.ttl_policy(DATA_HORIZON_CACHE_TTL_SEC),
+        lambda: get_data_horizon(include_days=True, days_limit=90),
+    )
+    return _respond(request, "data_horizon", None, horizon)
 
 
 @stream_router.get("/events/by-date-snapshots")
-def stream_events_by_date_snapshots(
+async def stream_events_by_date_snapshots(
+    request: Request,
     date: str = Query(..., description="UTC date YYYY-MM-DD"),
 ):
     """
     REST as source of truth: rest_events + rest_markets define event list.
     Streaming enriches only (LEFT JOIN); no exclusion for missing stream or staleness.
     Returns last_stream_update_at, is_stale for UI to mark stale rows.
+    Cached (stream_cache): settled past days indefinitely, other days until the next bucket or newer stream data.
     """
-    events = get_events_by_date_rest_driven(date)
-    logger.info("by_date_snapshots date=%s returned_count=%d", date, len(events))
-    return events
+    async def compute():
+        events = await stream_data_async.get_events_by_date_rest_driven(date)
+        logger.info("by_date_snapshots date=%s returned_count=%d", date, len(events))
+        return events
+
+    events = await _cached("by_date_snapshots", date.strip(), response_cache.by_date_policy(date), compute)
+    return _respond(request, "by_date_snapshots", date.strip(), events)
 
 
 @stream_router.get("/events/by-date-volume")
 def stream_events_by_date_volume(
+    request: Request,
     date: str = Query(..., description="UTC date YYYY-MM-DD"),
     limit: int = Query(100, ge=1, le=500, description="Max events to return"),
     offset: int = Query(0, ge=0, description="Offset for pagination"),
@@ -85,13 +167,20 @@ def stream_events_by_date_volume(
 ):
     """
     Volume tab: events for the selected day ordered by traded volume (SUM of market volumes per event).
-    Same data source as by-date-snapshots. No theoretical timestamps.
+    Same markets as by-date-snapshots; volumes only (one aggregation query, no snapshot enrichment).
+    No theoretical timestamps.
     """
     if sort not in ("volume_desc", "volume_asc"):
         sort = "volume_desc"
-    result = get_events_by_date_volume(date, limit=limit, offset=offset, min_volume=min_volume, sort=sort)
-    logger.info("by_date_volume date=%s total=%d returned=%d", date, result["paging"]["total"], len(result["items"]))
-    return result
+
+    def compute():
+        result = get_events_by_date_volume(date, limit=limit, offset=offset, min_volume=min_volume, sort=sort)
+        logger.info("by_date_volume date=%s total=%d returned=%d", date, result["paging"]["total"], len(result["items"]))
+        return result
+
+    key = (date.strip(), limit, offset, min_volume, sort)
+    result = _cached_sync("by_date_volume", key, response_cache.by_date_policy(date), compute)
+    return _respond(request, "by_date_volume", key, result)
 
 
 # Default bucket window: last 180 minutes (12 buckets)
@@ -99,58 +188,100 @@ BUCKETS_DEFAULT_WINDOW_MINUTES = 180
 
 
 @stream_router.get("/events/{market_id}/buckets")
-def stream_event_buckets(
+async def stream_event_buckets(
     market_id: str,
+    request: Request,
     from_ts: Optional[str] = Query(None, description="Start time (ISO 8601 UTC). Default: now - 180 min"),
     to_ts: Optional[str] = Query(None, description="End time (ISO 8601 UTC). Default: now"),
     event_aware: bool = Query(False, description="If true, return only buckets that have tick data for this market (event-aware); ignores from_ts/to_ts default window."),
+    layout: Optional[str] = Query(None, pattern="^(rows|columnar)$", description="rows | columnar (one array per field)"),
+    float32: bool = Query(False, description="Round floats to float32 precision"),
+    accept: Optional[str] = Header(None),
 ):
     """
-    Bulk buckets: 3 DB queries total (metadata, ladder, liquidity). No per-bucket queries.
-    Default: last 180 min (12 buckets). Same response shape as before.
+    Bulk buckets: 3 concurrent DB queries (metadata, ladder, liquidity). No per-bucket queries.
+    Default: last 180 min (12 buckets), starting on a bucket boundary. Same response shape as before.
     When event_aware=true: returns all buckets that actually contain ticks for this market (no global time window).
+    Cached (stream_cache) per bucket window: closed windows indefinitely, the live one until the next bucket
+    or a newer tick of the market. layout=columnar (or Accept: application/vnd.netbet.columnar+json): app.columnar.
     """
     if event_aware:
-        buckets = get_event_buckets_stream(market_id)
-        logger.info("buckets_endpoint event_aware=true market_id=%s bucket_count=%d", market_id, len(buckets))
-        return buckets
-    t_start = time.perf_counter()
+        def compute_event_aware():
+            buckets = get_event_buckets_stream(market_id)
+            logger.info("buckets_endpoint event_aware=true market_id=%s bucket_count=%d", market_id, len(buckets))
+            return buckets
+
+        buckets = await run_in_threadpool(
+            _cached_sync, "buckets_event_aware", market_id, response_cache.event_buckets_policy(market_id),
+            compute_event_aware, market_id,
+        )
+        return _respond(request, "buckets_event_aware", market_id, buckets, layout, accept, float32)
     now = datetime.now(timezone.utc)
     to_dt = _parse_ts_stream(to_ts, now)
-    from_dt = _parse_ts_stream(from_ts, now - timedelta(minutes=BUCKETS_DEFAULT_WINDOW_MINUTES))
+    # Default window on a bucket boundary: the result only depends on the bucket window, so polls share cache entries
+    from_dt = _parse_ts_stream(
+        from_ts, _bucket_15_utc(now) - timedelta(minutes=BUCKETS_DEFAULT_WINDOW_MINUTES - 15),
+    )
     if from_dt > to_dt:
         from_dt = to_dt - timedelta(minutes=BUCKETS_DEFAULT_WINDOW_MINUTES)
-    buckets, db_count = get_event_buckets_stream_bulk(market_id, from_dt, to_dt)
-    t_end = time.perf_counter()
-    total_ms = (t_end - t_start) * 1000
-    try:
-        import json
-        payload_bytes = len(json.dumps(buckets).encode("utf-8"))
-    except Exception:
-        payload_bytes = 0
-    logger.info(
-        "buckets_endpoint market_id=%s bucket_count=%d db_query_count=%d total_ms=%.1f payload_bytes=%d",
-        market_id, len(buckets), db_count, total_ms, payload_bytes,
-    )
-    return buckets
+
+    computed: Dict[str, Any] = {}
+
+    async def compute():
+        t_start = time.perf_counter()
+        buckets, db_count = await stream_data_async.get_event_buckets_stream_bulk(market_id, from_dt, to_dt)
+        computed.update(db_count=db_count, total_ms=(time.perf_counter() - t_start) * 1000)
+        return buckets
+
+    bucket_times = _bucket_times_in_range(from_dt, to_dt)
+    if not bucket_times:
+        endpoint, key = None, None
+        buckets = await compute()
+    else:
+        # Rows past the last bucket are never read; from_dt sets the baseline lookback of the first bucket
+        endpoint, key = "buckets", (market_id, from_dt, bucket_times[-1])
+        buckets = await _cached(
+            endpoint, key, response_cache.buckets_policy(market_id, bucket_times, now), compute, market_id,
+        )
+    response = _respond(request, endpoint, key, buckets, layout, accept, float32)
+    if computed:
+        # Size of the body as sent (already rendered; gzipped when the client accepts it)
+        logger.info(
+            "buckets_endpoint market_id=%s bucket_count=%d db_query_count=%d total_ms=%.1f payload_bytes=%d",
+            market_id, len(buckets), computed["db_count"], computed["total_ms"], len(response.body),
+        )
+    return response
 
 
 @stream_router.get("/events/{market_id}/timeseries")
-def stream_event_timeseries(
+async def stream_event_timeseries(
     market_id: str,
+    request: Request,
     from_ts: Optional[str] = Query(None),
     to_ts: Optional[str] = Query(None),
     interval_minutes: int = Query(15, ge=1, le=60),
+    layout: Optional[str] = Query(None, pattern="^(rows|columnar)$", description="rows | columnar (one array per field)"),
+    float32: bool = Query(False, description="Round floats to float32 precision"),
+    accept: Optional[str] = Header(None),
 ):
-    """Timeseries from stream_ingest; fixed 15-min UTC buckets; last state in bucket."""
+    """Timeseries from stream_ingest; fixed 15-min UTC buckets; last state in bucket. layout=columnar: app.columnar."""
     now = datetime.now(timezone.utc)
     to_dt = min(_parse_ts_stream(to_ts, now), now)  # Cap to_dt at current time
     from_dt = _parse_ts_stream(from_ts, now - timedelta(hours=24))
     # Ensure from_dt <= to_dt
     if from_dt > to_dt:
         from_dt = to_dt - timedelta(hours=24)
-    points = get_event_timeseries_stream(market_id, from_dt, to_dt, interval_minutes)
-    return points
+    bucket_times = _bucket_times_in_range(from_dt, to_dt)
+    if not bucket_times:
+        points = await stream_data_async.get_event_timeseries_stream(market_id, from_dt, to_dt)
+        return _respond(request, None, None, points, layout, accept, float32)
+    # The result only depends on the bucket window (and the staleness horizon, see response_cache)
+    key = (market_id, bucket_times[0], bucket_times[-1])
+    points = await _cached(
+        "timeseries", key, response_cache.timeseries_policy(market_id, bucket_times, now),
+        lambda: stream_data_async.get_event_timeseries_stream(market_id, from_dt, to_dt), market_id,
+    )
+    return _respond(request, "timeseries", key, points, layout, accept, float32)
 
 
 @stream_router.get("/events/{market_id}/meta")
@@ -209,28 +340,16 @@ def stream_event_meta(market_id: str):
         except Exception as e:
             logger.warning("event meta: settlement lookup failed for market_id=%s (%s)", market_id, e)
 
-    # Last tick time for replay (max publish_time in ladder_levels for this market)
-    last_tick_time = None
+    # Last tick time for replay and event-aware bucket metadata: from actual tick data (not global time)
     with cursor() as cur:
-        cur.execute(
-            """
-            SELECT max(publish_time) AS last_tick_time
-            FROM stream_ingest.ladder_levels
-            WHERE market_id = %s
-            """,
-            (market_id,),
-        )
-        r = cur.fetchone()
-        if r and r.get("last_tick_time"):
-            last_tick_time = r["last_tick_time"].isoformat() if hasattr(r["last_tick_time"], "isoformat") else str(r["last_tick_time"])
-
-    # Event-aware bucket metadata: from actual tick data (not global time)
-    bucket_range = get_event_bucket_range(market_id)
+        publish_range = _market_publish_range(cur, market_id)
+    last_tick_time = None
     earliest_bucket_start = None
     latest_bucket_start = None
-    if bucket_range:
-        earliest_bucket_start = bucket_range[0].isoformat()
-        latest_bucket_start = bucket_range[1].isoformat()
+    if publish_range:
+        last_tick_time = publish_range[1].isoformat()
+        earliest_bucket_start = _bucket_15_utc(publish_range[0]).isoformat()
+        latest_bucket_start = _bucket_15_utc(publish_range[1]).isoformat()
 
     return {
         "market_id": row["market_id"],
@@ -276,8 +395,31 @@ def stream_event_available_buckets(market_id: str):
     }
 
 
+_SQL_REPLAY_SNAPSHOT_TIME_AT = """
+    SELECT publish_time
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = %s AND publish_time <= %s
+    ORDER BY publish_time DESC
+    LIMIT 1
+"""
+_SQL_REPLAY_SNAPSHOT_TIME_LATEST = """
+    SELECT publish_time
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = %s
+    ORDER BY publish_time DESC
+    LIMIT 1
+"""
+_SQL_REPLAY_LIQUIDITY_AT = """
+    SELECT total_matched
+    FROM stream_ingest.market_liquidity_history
+    WHERE market_id = %s AND publish_time <= %s
+    ORDER BY publish_time DESC
+    LIMIT 1
+"""
+
+
 @stream_router.get("/events/{market_id}/replay_snapshot")
-def stream_event_replay_snapshot(
+async def stream_event_replay_snapshot(
     market_id: str,
     at_ts: Optional[str] = Query(None, description="Point-in-time (ISO 8601 UTC); omit for latest"),
     mode: Optional[str] = Query(None, description="utc | local (formatting only)"),
@@ -285,63 +427,39 @@ def stream_event_replay_snapshot(
     """
     Reconstruct a market snapshot from stored stream ticks (ladder_levels).
     Returns latest available tick snapshot, or snapshot at or before at_ts.
-    No raw payload storage; snapshot is reconstructed from ladder + liquidity.
+    No raw payload storage; snapshot is reconstructed from ladder + liquidity: every level's latest row at or before
+    snapshot_time, read from the nearest ladder keyframe when built.
     """
     at_dt = _parse_ts_stream(at_ts, datetime.now(timezone.utc)) if at_ts else None
-    with cursor() as cur:
-        # 1) Resolve snapshot_time: max(publish_time) for market [at or before at_ts]
-        if at_dt is not None:
-            cur.execute(
-                """
-                SELECT publish_time
-                FROM stream_ingest.ladder_levels
-                WHERE market_id = %s AND publish_time <= %s
-                ORDER BY publish_time DESC
-                LIMIT 1
-                """,
-                (market_id, at_dt),
-            )
-        else:
-            cur.execute(
-                """
-                SELECT publish_time
-                FROM stream_ingest.ladder_levels
-                WHERE market_id = %s
-                ORDER BY publish_time DESC
-                LIMIT 1
-                """,
-                (market_id,),
-            )
-        row = cur.fetchone()
-        if not row or not row.get("publish_time"):
-            raise HTTPException(status_code=404, detail="No tick data available for market.")
-        snapshot_time = row["publish_time"]
+    # 1) Resolve snapshot_time: max(publish_time) for market [at or before at_ts]
+    snapshot_time = await _replay_snapshot_time(market_id, at_dt)
+    if not snapshot_time:
+        raise HTTPException(status_code=404, detail="No tick data available for market.")
 
-        # 2) All ladder rows at that snapshot_time
-        cur.execute(
-            """
-            SELECT selection_id, side, level, price, size
-            FROM stream_ingest.ladder_levels
-            WHERE market_id = %s AND publish_time = %s
-            """,
-            (market_id, snapshot_time),
-        )
-        ladder_rows = cur.fetchall()
+    # 2) Ladder state at snapshot_time (nearest keyframe + later rows) and 3) latest liquidity at or before it, concurrently
+    ladder_rows, liq_row = await asyncio.gather(
+        stream_data_async.ladder_state_rows([market_id], snapshot_time),
+        fetchone(_SQL_REPLAY_LIQUIDITY_AT, (market_id, snapshot_time)),
+    )
+    total_matched = float(liq_row["total_matched"]) if liq_row and liq_row.get("total_matched") is not None else None
+    return _replay_snapshot_payload(market_id, snapshot_time, ladder_rows, total_matched)
 
-        # 3) Latest liquidity at or before snapshot_time
-        cur.execute(
-            """
-            SELECT total_matched
-            FROM stream_ingest.market_liquidity_history
-            WHERE market_id = %s AND publish_time <= %s
-            ORDER BY publish_time DESC
-            LIMIT 1
-            """,
-            (market_id, snapshot_time),
-        )
-        liq_row = cur.fetchone()
-        total_matched = float(liq_row["total_matched"]) if liq_row and liq_row.get("total_matched") is not None else None
 
+async def _replay_snapshot_time(market_id: str, at_dt: Optional[datetime]) -> Optional[datetime]:
+    """Latest publish_time of the market at or before at_dt (None: latest overall); None without ticks."""
+    watermark = await stream_data_async.activity_watermark()
+    if watermark is not None:
+        return (await stream_data_async.latest_publish_by_market([market_id], at_dt, watermark)).get(market_id)
+    if at_dt is not None:
+        row = await fetchone(_SQL_REPLAY_SNAPSHOT_TIME_AT, (market_id, at_dt))
+    else:
+        row = await fetchone(_SQL_REPLAY_SNAPSHOT_TIME_LATEST, (market_id,))
+    return row["publish_time"] if row else None
+
+
+def _replay_snapshot_payload(
+    market_id: str, snapshot_time: datetime, ladder_rows: List[Dict[str, Any]], total_matched: Optional[float]
+) -> Dict[str, Any]:
     # Aggregate per selection: best back (side=B, level=0), best lay (side=L, level=0)
     by_sel: dict = {}
     for r in ladder_rows:
@@ -395,6 +513,199 @@ def stream_event_replay_snapshot(
     }
 
 
+REPLAY_MAX_FRAMES = 10000
+# Frames closer than this to the previous one are advanced with the ladder rows in between; farther ones are rebuilt
+# from the ladder state at their time (keyframe + rows) and sent as the difference
+REPLAY_WINDOW = timedelta(minutes=30)
+REPLAY_LEVEL_COLUMNS = ["selection_id", "side", "level", "price", "size"]
+_SQL_REPLAY_LADDER_BETWEEN = """
+    SELECT selection_id, side, level, price, size, publish_time
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = %s AND publish_time > %s AND publish_time <= %s
+    ORDER BY publish_time, selection_id, side, level
+"""
+_SQL_REPLAY_LIQUIDITY_BETWEEN = """
+    SELECT publish_time, total_matched
+    FROM stream_ingest.market_liquidity_history
+    WHERE market_id = %s AND publish_time > %s AND publish_time <= %s
+    ORDER BY publish_time
+"""
+
+
+def _replay_times(
+    at: Optional[List[str]], from_ts: Optional[str], to_ts: Optional[str], step_seconds: int
+) -> List[datetime]:
+    """Sorted, distinct frame times (UTC) from `at` or from from_ts..to_ts every step_seconds; HTTP 400 when invalid."""
+    if at:
+        times = []
+        for s in (v.strip() for item in at for v in item.split(",")):
+            if not s:
+                continue
+            try:
+                times.append(datetime.fromisoformat(s.replace("Z", "+00:00")))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid timestamp in at: %s" % s)
+    elif from_ts and to_ts:
+        from_dt = _parse_ts_stream(from_ts, datetime.now(timezone.utc))
+        to_dt = _parse_ts_stream(to_ts, datetime.now(timezone.utc))
+        if from_dt > to_dt:
+            raise HTTPException(status_code=400, detail="from_ts must be <= to_ts")
+        count = int((to_dt - from_dt).total_seconds() // step_seconds) + 1
+        if count > REPLAY_MAX_FRAMES:
+            raise HTTPException(status_code=400, detail="Too many frames (max %d); use a larger step_seconds" % REPLAY_MAX_FRAMES)
+        times = [from_dt + timedelta(seconds=step_seconds * i) for i in range(count)]
+    else:
+        raise HTTPException(status_code=400, detail="Pass at (timestamps) or from_ts and to_ts")
+    times = sorted({t if t.tzinfo else t.replace(tzinfo=timezone.utc) for t in times})
+    if not times:
+        raise HTTPException(status_code=400, detail="No timestamps")
+    if len(times) > REPLAY_MAX_FRAMES:
+        raise HTTPException(status_code=400, detail="Too many frames (max %d)" % REPLAY_MAX_FRAMES)
+    return times
+
+
+def _replay_level_key(r: Dict[str, Any]) -> tuple:
+    return (int(r["selection_id"]), (r.get("side") or "").upper(), int(r["level"]))
+
+
+def _replay_level_value(r: Dict[str, Any]) -> tuple:
+    return (
+        float(r["price"]) if r.get("price") is not None else None,
+        float(r["size"]) if r.get("size") is not None else None,
+    )
+
+
+def _replay_levels(items: Iterable[Tuple[tuple, tuple]]) -> List[List[Any]]:
+    """[[selection_id, side, level, price, size], ...] (REPLAY_LEVEL_COLUMNS) in key order."""
+    return [[k[0], k[1], k[2], v[0], v[1]] for k, v in sorted(items)]
+
+
+def _iso(t: Optional[datetime]) -> Optional[str]:
+    return t.isoformat() if t is not None else None
+
+
+def _replay_keyframe(
+    replay: Dict[str, Any], market_id: str, t: datetime, ladder_rows: List[Dict[str, Any]],
+    snapshot_time: Optional[datetime], total_matched: Optional[float],
+) -> Dict[str, Any]:
+    """Initialise the replay state at the first frame time; returns the keyframe line."""
+    replay["levels"] = {_replay_level_key(r): _replay_level_value(r) for r in ladder_rows}
+    replay["snapshot_time"] = snapshot_time
+    replay["total_matched"] = total_matched
+    return {
+        "type": "keyframe",
+        "market_id": market_id,
+        "t": t.isoformat(),
+        "snapshot_time": _iso(snapshot_time),
+        "total_matched": total_matched,
+        "columns": REPLAY_LEVEL_COLUMNS,
+        "levels": _replay_levels(replay["levels"].items()),
+    }
+
+
+def _replay_delta(
+    replay: Dict[str, Any], t: datetime, changed: Dict[tuple, tuple],
+    snapshot_time: Optional[datetime], total_matched: Optional[float],
+) -> Dict[str, Any]:
+    """Delta line of frame t: levels whose value differs from the previous frame; snapshot_time / total_matched when changed."""
+    levels = replay["levels"]
+    diff = {k: v for k, v in changed.items() if levels.get(k) != v}
+    levels.update(diff)
+    frame: Dict[str, Any] = {"type": "delta", "t": t.isoformat(), "levels": _replay_levels(diff.items())}
+    if snapshot_time != replay["snapshot_time"]:
+        replay["snapshot_time"] = snapshot_time
+        frame["snapshot_time"] = _iso(snapshot_time)
+    if total_matched != replay["total_matched"]:
+        replay["total_matched"] = total_matched
+        frame["total_matched"] = total_matched
+    return frame
+
+
+def _replay_deltas(
+    replay: Dict[str, Any], times: List[datetime], ladder_rows: List[Dict[str, Any]], liq_rows: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Delta lines of consecutive frame times from the ladder / liquidity rows after the previous frame (by publish_time)."""
+    frames = []
+    i = j = 0
+    snapshot_time, total_matched = replay["snapshot_time"], replay["total_matched"]
+    for t in times:
+        changed: Dict[tuple, tuple] = {}
+        while i < len(ladder_rows) and ladder_rows[i]["publish_time"] <= t:
+            r = ladder_rows[i]
+            changed[_replay_level_key(r)] = _replay_level_value(r)
+            snapshot_time = r["publish_time"]
+            i += 1
+        while j < len(liq_rows) and liq_rows[j]["publish_time"] <= t:
+            if liq_rows[j].get("total_matched") is not None:
+                total_matched = float(liq_rows[j]["total_matched"])
+            j += 1
+        frames.append(_replay_delta(replay, t, changed, snapshot_time, total_matched))
+    return frames
+
+
+async def _replay_lines(market_id: str, times: List[datetime], replay: Dict[str, Any], keyframe: Dict[str, Any]):
+    """NDJSON lines: the keyframe, then one delta per remaining frame time, reading the rows window by window."""
+    yield json.dumps(keyframe, separators=(",", ":")) + "\n"
+    prev, i = times[0], 1
+    while i < len(times):
+        if times[i] - prev > REPLAY_WINDOW:
+            # Sparse frame: ladder state at t (keyframe + rows) instead of every row since the previous frame
+            t = times[i]
+            ladder_rows, liq_row, snapshot_time = await asyncio.gather(
+                stream_data_async.ladder_state_rows([market_id], t),
+                fetchone(_SQL_REPLAY_LIQUIDITY_AT, (market_id, t)),
+                _replay_snapshot_time(market_id, t),
+            )
+            total_matched = float(liq_row["total_matched"]) if liq_row and liq_row.get("total_matched") is not None else None
+            changed = {_replay_level_key(r): _replay_level_value(r) for r in ladder_rows}
+            frames = [_replay_delta(replay, t, changed, snapshot_time, total_matched)]
+            prev, i = t, i + 1
+        else:
+            j = i
+            while j < len(times) and times[j] - prev <= REPLAY_WINDOW:
+                j += 1
+            hi = times[j - 1]
+            ladder_rows, liq_rows = await asyncio.gather(
+                fetchall(_SQL_REPLAY_LADDER_BETWEEN, (market_id, prev, hi)),
+                fetchall(_SQL_REPLAY_LIQUIDITY_BETWEEN, (market_id, prev, hi)),
+            )
+            frames = _replay_deltas(replay, times[i:j], ladder_rows, liq_rows)
+            prev, i = hi, j
+        yield "".join(json.dumps(f, separators=(",", ":")) + "\n" for f in frames)
+
+
+@stream_router.get("/events/{market_id}/replay")
+async def stream_event_replay(
+    market_id: str,
+    from_ts: Optional[str] = Query(None, description="Range start (ISO 8601 UTC), with to_ts and step_seconds"),
+    to_ts: Optional[str] = Query(None, description="Range end (ISO 8601 UTC)"),
+    step_seconds: int = Query(60, ge=1, le=86400, description="Frame step within from_ts..to_ts"),
+    at: Optional[List[str]] = Query(None, description="Frame timestamps (repeat or comma-separate); overrides the range"),
+):
+    """
+    Replay of a market over many timestamps in one request (scrubbing), streamed as NDJSON (application/x-ndjson).
+    First line: keyframe with the full ladder at the first frame time ("levels" rows as in "columns"), snapshot_time
+    (latest tick at or before it) and total_matched. Then one delta line per further frame time, in order: the levels
+    that changed since the previous frame, plus snapshot_time / total_matched only when they changed. Applying the
+    deltas to the keyframe gives, at every frame, the same ladder as replay_snapshot at that time.
+    The ladder is reconstructed once (ladder keyframe + rows); later frames read only the rows between frames.
+    """
+    times = _replay_times(at, from_ts, to_ts, step_seconds)
+    t0 = times[0]
+    ladder_rows, liq_row, snapshot_time, last_time = await asyncio.gather(
+        stream_data_async.ladder_state_rows([market_id], t0),
+        fetchone(_SQL_REPLAY_LIQUIDITY_AT, (market_id, t0)),
+        _replay_snapshot_time(market_id, t0),
+        _replay_snapshot_time(market_id, times[-1]),
+    )
+    if not last_time:
+        raise HTTPException(status_code=404, detail="No tick data available for market.")
+    total_matched = float(liq_row["total_matched"]) if liq_row and liq_row.get("total_matched") is not None else None
+    replay: Dict[str, Any] = {}
+    keyframe = _replay_keyframe(replay, market_id, t0, ladder_rows, snapshot_time, total_matched)
+    return StreamingResponse(_replay_lines(market_id, times, replay, keyframe), media_type="application/x-ndjson")
+
+
 @stream_router.get("/events/{market_id}/latest_raw")
 def stream_event_latest_raw(market_id: str):
     """Stream source has no raw_payload; return 404 so UI can handle gracefully."""
@@ -407,6 +718,7 @@ def stream_event_latest_raw(market_id: str):
 @stream_router.get("/debug/markets/{market_id}/snapshots")
 def stream_market_snapshots(
     market_id: str,
+    request: Request,
     from_ts: Optional[str] = Query(None),
     to_ts: Optional[str] = Query(None),
     limit: int = Query(200, ge=1, le=500),
@@ -418,7 +730,18 @@ def stream_market_snapshots(
     # Ensure from_dt <= to_dt
     if from_dt > to_dt:
         from_dt = to_dt - timedelta(hours=24)
-    points = get_event_timeseries_stream(market_id, from_dt, to_dt, 15)
+    bucket_times = _bucket_times_in_range(from_dt, to_dt)
+    if not bucket_times:
+        return _snapshot_rows(market_id, get_event_timeseries_stream(market_id, from_dt, to_dt, 15), limit)
+    key = (market_id, bucket_times[0], bucket_times[-1], limit)
+    rows = _cached_sync(
+        "snapshots", key, response_cache.timeseries_policy(market_id, bucket_times, now),
+        lambda: _snapshot_rows(market_id, get_event_timeseries_stream(market_id, from_dt, to_dt, 15), limit), market_id,
+    )
+    return _respond(request, "snapshots", key, rows)
+
+
+def _snapshot_rows(market_id: str, points: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
     # Trim to limit and map to DebugSnapshotRow-like shape (no snapshot_id; use index)
     out = []
     for i, p in enumerate(points[:limit]):
@@ -445,23 +768,88 @@ def stream_market_snapshots(
     return out
 
 
+@stream_router.post("/cache/purge")
+def stream_cache_purge(
+    endpoint: Optional[str] = Query(None, description="Only this endpoint's entries (e.g. buckets, timeseries, by_date_snapshots)"),
+    market_id: Optional[str] = Query(None, description="Only entries of this market"),
+):
+    """Drop stream response cache entries (all by default), e.g. after a backfill or a data repair."""
+    purged = stream_cache.purge(endpoint=endpoint, market_id=market_id)
+    logger.info("stream_cache_purge endpoint=%s market_id=%s purged=%d", endpoint, market_id, purged)
+    return {"purged": purged, "entries": stream_cache.stats()["entries"]}
+
+
 @stream_router.get("/debug/snapshots/{snapshot_id}/raw")
 def stream_snapshot_raw(snapshot_id: int):
     """Stream has no raw payload per snapshot."""
     raise HTTPException(status_code=404, detail="Raw payload not available for stream source")
 
 
+@stream_router.get("/events/{market_id}/book-risk-ticks")
+def stream_event_book_risk_ticks(
+    market_id: str,
+    from_ts: Optional[str] = Query(..., description="Start time (ISO 8601 UTC)"),
+    to_ts: Optional[str] = Query(..., description="End time (ISO 8601 UTC)"),
+    limit: int = Query(2000, ge=1, le=5000, description="Max number of points to return"),
+    layout: Optional[str] = Query(None, pattern="^(rows|columnar)$", description="rows | columnar (one array per field)"),
+    float32: bool = Query(False, description="Round floats to float32 precision"),
+    accept: Optional[str] = Header(None),
+):
+    """Book Risk (H/A/D) at every ladder update in the range, maintained incrementally from level deltas."""
+    from_dt = _parse_ts_stream(from_ts, datetime.now(timezone.utc) - timedelta(hours=1))
+    to_dt = _parse_ts_stream(to_ts, datetime.now(timezone.utc))
+    if from_dt > to_dt:
+        raise HTTPException(status_code=400, detail="from_ts must be <= to_ts")
+    points = get_book_risk_ticks_stream(market_id, from_dt, to_dt, limit)
+    if points is None:
+        raise HTTPException(status_code=404, detail="Market not found")
+    return columnar.rows_response(points, layout, accept, float32)
+
+
+_SQL_TICKS_SELECTIONS = """
+    SELECT home_selection_id, away_selection_id, draw_selection_id
+    FROM market_event_metadata
+    WHERE market_id = %s
+"""
+# Raw ticks (level=0, side='B' only for back odds/size) of the market's H/A/D selections
+_SQL_TICKS_BACK_L0 = """
+    SELECT
+        l.publish_time,
+        l.selection_id,
+        l.price AS back_odds,
+        l.size AS back_size
+    FROM stream_ingest.ladder_levels l
+    WHERE l.market_id = %s
+      AND l.side = 'B'
+      AND l.level = 0
+      AND l.publish_time >= %s
+      AND l.publish_time <= %s
+      AND l.selection_id IN (
+          SELECT unnest(ARRAY[m.home_selection_id, m.away_selection_id, m.draw_selection_id])
+          FROM market_event_metadata m
+          WHERE m.market_id = %s
+      )
+    ORDER BY l.publish_time ASC
+    LIMIT %s
+"""
+
+
 @stream_router.get("/markets/{market_id}/ticks")
-def stream_market_ticks(
+async def stream_market_ticks(
     market_id: str,
     from_ts: Optional[str] = Query(..., description="Start time (ISO 8601 UTC)"),
     to_ts: Optional[str] = Query(..., description="End time (ISO 8601 UTC)"),
     limit: int = Query(2000, ge=1, le=5000, description="Max number of ticks to return"),
+    layout: Optional[str] = Query(None, pattern="^(rows|columnar)$", description="rows | columnar (one array per field)"),
+    float32: bool = Query(False, description="Round floats to float32 precision"),
+    accept: Optional[str] = Header(None),
 ):
     """
     Raw ticks (ladder_levels) for a market within a time range.
     Returns all level=0, side='B' ticks ordered by publish_time ascending.
     Used for audit view of ticks within a 15-minute bucket.
+    Metadata and ticks are fetched concurrently (the tick query resolves H/A/D selection ids in SQL).
+    layout=columnar (or Accept: application/vnd.netbet.columnar+json): app.columnar.
     """
     t_start = time.perf_counter()
     from_dt = _parse_ts_stream(from_ts, datetime.now(timezone.utc) - timedelta(hours=1))
@@ -470,52 +858,29 @@ def stream_market_ticks(
     if from_dt > to_dt:
         raise HTTPException(status_code=400, detail="from_ts must be <= to_ts")
     
-    with cursor() as cur:
-        # Get selection IDs for home/away/draw
-        cur.execute(
-            """
-            SELECT home_selection_id, away_selection_id, draw_selection_id
-            FROM market_event_metadata
-            WHERE market_id = %s
-            """,
-            (market_id,),
-        )
-        meta = cur.fetchone()
-        if not meta:
-            raise HTTPException(status_code=404, detail="Market not found")
-        
-        home_sid = meta.get("home_selection_id")
-        away_sid = meta.get("away_selection_id")
-        draw_sid = meta.get("draw_selection_id")
-        
-        # Fetch raw ticks (level=0, side='B' only for back odds/size)
-        # Filter by selection_id if any are available
-        selection_ids = [sid for sid in [home_sid, away_sid, draw_sid] if sid is not None]
-        if not selection_ids:
-            return []
-        
-        cur.execute(
-            """
-            SELECT 
-                publish_time,
-                selection_id,
-                price AS back_odds,
-                size AS back_size
-            FROM stream_ingest.ladder_levels
-            WHERE market_id = %s
-              AND side = 'B'
-              AND level = 0
-              AND publish_time >= %s
-              AND publish_time <= %s
-              AND selection_id = ANY(%s)
-            ORDER BY publish_time ASC
-            LIMIT %s
-            """,
-            (market_id, from_dt, to_dt, selection_ids, limit),
-        )
-        rows = cur.fetchall()
-    
-    # Transform to per-tick format with H/A/D columns
+    meta, rows = await asyncio.gather(
+        fetchone(_SQL_TICKS_SELECTIONS, (market_id,)),
+        fetchall(_SQL_TICKS_BACK_L0, (market_id, from_dt, to_dt, market_id, limit)),
+    )
+    if not meta:
+        raise HTTPException(status_code=404, detail="Market not found")
+    ticks = _ticks_from_rows(rows, meta.get("home_selection_id"), meta.get("away_selection_id"), meta.get("draw_selection_id"))
+    response = columnar.rows_response(ticks, layout, accept, float32)
+
+    t_end = time.perf_counter()
+    total_ms = (t_end - t_start) * 1000
+    payload_bytes = len(response.body)  # already rendered
+    logger.info(
+        "ticks_endpoint market_id=%s rows=%d total_ms=%.1f payload_bytes=%d",
+        market_id, len(ticks), total_ms, payload_bytes,
+    )
+    return response
+
+
+def _ticks_from_rows(
+    rows: List[Dict[str, Any]], home_sid: Optional[int], away_sid: Optional[int], draw_sid: Optional[int]
+) -> List[Dict[str, Any]]:
+    """Transform to per-tick format with H/A/D columns."""
     ticks = []
     for row in rows:
         tick = {
@@ -556,16 +921,121 @@ def stream_market_ticks(
             tick["draw_back_size"] = None
         
         ticks.append(tick)
+    return ticks
 
-    t_end = time.perf_counter()
-    total_ms = (t_end - t_start) * 1000
+
+TICKS_EXPORT_COLUMNS = ["publish_time", "selection_id", "runner", "side", "level", "price", "size"]
+TICKS_EXPORT_CHUNK_BYTES = 64 * 1024
+# Keyset order (publish_time, selection_id, side, level) = the ladder_levels key: resumes after the last row exported
+_SQL_TICKS_EXPORT = """
+    SELECT publish_time, selection_id, side, level, price, size
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = %s AND publish_time >= %s AND publish_time <= %s
+    ORDER BY publish_time, selection_id, side, level
+    LIMIT %s
+"""
+_SQL_TICKS_EXPORT_AFTER = """
+    SELECT publish_time, selection_id, side, level, price, size
+    FROM stream_ingest.ladder_levels
+    WHERE market_id = %s AND publish_time >= %s AND publish_time <= %s
+      AND (publish_time, selection_id, side, level) > (%s, %s, %s, %s)
+    ORDER BY publish_time, selection_id, side, level
+    LIMIT %s
+"""
+
+
+def _parse_ticks_cursor(after: str) -> tuple:
+    """after = "<publish_time ISO>,<selection_id>,<side>,<level>" of the last row received; HTTP 400 when invalid."""
     try:
-        import json
-        payload_bytes = len(json.dumps(ticks).encode("utf-8"))
-    except Exception:
-        payload_bytes = 0
-    logger.info(
-        "ticks_endpoint market_id=%s rows=%d total_ms=%.1f payload_bytes=%d",
-        market_id, len(ticks), total_ms, payload_bytes,
-    )
-    return ticks
+        pt, sid, side, level = (v.strip() for v in after.split(","))
+        if "T" in pt:
+            pt = pt.replace(" ", "+")  # unencoded "+" of the UTC offset arrives as a space
+        publish_time = datetime.fromisoformat(pt.replace("Z", "+00:00"))
+        side = side.upper()
+        if side not in ("B", "L"):
+            raise ValueError(side)
+        return (publish_time, int(sid), side, int(level))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid after cursor; expected publish_time,selection_id,side,level")
+
+
+async def _ticks_export_lines(
+    market_id: str, sql: str, params: tuple, fmt: str, runners: Dict[int, str], t_start: float
+):
+    """Export body, written in chunks of about TICKS_EXPORT_CHUNK_BYTES as rows arrive; logs rows and bytes at the end."""
+    rows = payload_bytes = 0
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n") if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(TICKS_EXPORT_COLUMNS)
+    try:
+        async for r in iter_rows(sql, params):
+            values = [
+                r["publish_time"].isoformat() if r.get("publish_time") else None,
+                r["selection_id"],
+                runners.get(r["selection_id"]),
+                r["side"],
+                r["level"],
+                float(r["price"]) if r.get("price") is not None else None,
+                float(r["size"]) if r.get("size") is not None else None,
+            ]
+            if writer is not None:
+                writer.writerow(values)
+            else:
+                buf.write(json.dumps(dict(zip(TICKS_EXPORT_COLUMNS, values)), separators=(",", ":")) + "\n")
+            rows += 1
+            if buf.tell() >= TICKS_EXPORT_CHUNK_BYTES:
+                chunk = buf.getvalue().encode("utf-8")
+                payload_bytes += len(chunk)
+                buf.seek(0)
+                buf.truncate()
+                yield chunk
+        chunk = buf.getvalue().encode("utf-8")
+        if chunk:
+            payload_bytes += len(chunk)
+            yield chunk
+    finally:
+        logger.info(
+            "ticks_export market_id=%s format=%s rows=%d total_ms=%.1f payload_bytes=%d",
+            market_id, fmt, rows, (time.perf_counter() - t_start) * 1000, payload_bytes,
+        )
+
+
+@stream_router.get("/markets/{market_id}/ticks/export")
+async def stream_market_ticks_export(
+    market_id: str,
+    from_ts: Optional[str] = Query(..., description="Start time (ISO 8601 UTC)"),
+    to_ts: Optional[str] = Query(..., description="End time (ISO 8601 UTC)"),
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="ndjson | csv"),
+    after: Optional[str] = Query(None, description="Resume after this row: publish_time,selection_id,side,level"),
+    limit: Optional[int] = Query(None, ge=1, description="Max rows in this response (default: all)"),
+):
+    """
+    All ladder rows (every side and level) of a market within a time range, streamed from a server-side cursor as
+    NDJSON or CSV in (publish_time, selection_id, side, level) order, with runner = home / away / draw.
+    No row cap: the body is written while rows are read. To page or to resume an interrupted export, pass the last
+    row received as `after` (publish_time,selection_id,side,level); with `limit`, a response of exactly limit rows
+    may have more after it.
+    """
+    t_start = time.perf_counter()
+    from_dt = _parse_ts_stream(from_ts, datetime.now(timezone.utc) - timedelta(hours=1))
+    to_dt = _parse_ts_stream(to_ts, datetime.now(timezone.utc))
+    if from_dt > to_dt:
+        raise HTTPException(status_code=400, detail="from_ts must be <= to_ts")
+    if after:
+        sql, params = _SQL_TICKS_EXPORT_AFTER, (market_id, from_dt, to_dt, *_parse_ticks_cursor(after), limit)
+    else:
+        sql, params = _SQL_TICKS_EXPORT, (market_id, from_dt, to_dt, limit)
+    meta = await fetchone(_SQL_TICKS_SELECTIONS, (market_id,))
+    if not meta:
+        raise HTTPException(status_code=404, detail="Market not found")
+    runners = {
+        meta[key + "_selection_id"]: key for key in ("home", "away", "draw") if meta.get(key + "_selection_id") is not None
+    }
+    body = _ticks_export_lines(market_id, sql, params, fmt, runners, t_start)
+    if fmt == "csv":
+        filename = "ticks_%s.csv" % market_id
+        return StreamingResponse(
+            body, media_type="text/csv", headers={"Content-Disposition": 'attachment; filename="%s"' % filename}
+        )
+    return StreamingResponse(body, media_type="application/x-ndjson")
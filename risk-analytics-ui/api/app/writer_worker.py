@@ -0,0 +1,112 @@
+"""
+Background writer workers of the API process (the bucket store and the stream index workers built on it).
+
+Each worker is a daemon thread that runs refresh(cur, now) every interval on a connection with the bucket store
+writer credentials (POSTGRES_BUCKET_STORE_USER / PASSWORD), under a Postgres advisory lock so one replica writes.
+Without the credentials the worker does not start and its readers fall back to the source tables. Counters
+(runs_total, errors_total plus the worker's own) are exported on /metrics via status().
+"""
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from app.db import get_conn_kwargs
+
+logger = logging.getLogger(__name__)
+
+
+def _get_writer_conn_kwargs() -> Dict[str, Any]:
+    """Dedicated writer credentials; the API reader role has SELECT only. No fallback to other users."""
+    user = os.environ.get("POSTGRES_BUCKET_STORE_USER")
+    password = os.environ.get("POSTGRES_BUCKET_STORE_PASSWORD")
+    if not user or not password:
+        raise ValueError("POSTGRES_BUCKET_STORE_USER and POSTGRES_BUCKET_STORE_PASSWORD must be set for the writer workers")
+    return {**get_conn_kwargs(), "user": user, "password": password}
+
+
+def _writer_conn() -> Any:
+    return psycopg2.connect(**_get_writer_conn_kwargs(), cursor_factory=RealDictCursor)
+
+
+class WriterWorker:
+    """One advisory-locked maintenance task: refresh(cur, now) on a writer connection, periodically in a thread."""
+
+    def __init__(
+        self,
+        name: str,
+        lock_id: int,
+        refresh: Callable[[Any, Optional[datetime]], Any],
+        interval_seconds: float,
+        status: Dict[str, Any],
+        worth_logging: Callable[[Any], bool] = bool,
+    ):
+        self.name = name
+        self.lock_id = lock_id
+        self.interval_seconds = interval_seconds
+        self._refresh = refresh
+        self._worth_logging = worth_logging
+        self._lock = threading.Lock()
+        self._status: Dict[str, Any] = {"runs_total": 0, "errors_total": 0, **status}
+
+    def count(self, **increments: int) -> None:
+        with self._lock:
+            for name, n in increments.items():
+                self._status[name] += n
+
+    def set(self, **values: Any) -> None:
+        with self._lock:
+            self._status.update(values)
+
+    def status(self) -> Dict[str, Any]:
+        """Counters and watermark for /metrics."""
+        with self._lock:
+            return dict(self._status)
+
+    def run_cycle(self, now: Optional[datetime] = None) -> Any:
+        """refresh() under the advisory lock on a writer connection; None if another instance holds the lock."""
+        conn = _writer_conn()
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT pg_try_advisory_lock(%s::bigint) AS acquired", (self.lock_id,))
+            if not cur.fetchone()["acquired"]:
+                logger.debug("%s cycle skipped (lock held by another instance)", self.name)
+                return None
+            try:
+                result = self._refresh(cur, now)
+            finally:
+                conn.rollback()
+                cur.execute("SELECT pg_advisory_unlock(%s::bigint)", (self.lock_id,))
+                conn.commit()
+        finally:
+            conn.close()
+        self.count(runs_total=1)
+        return result
+
+    def _run_loop(self) -> None:
+        while True:
+            try:
+                result = self.run_cycle()
+                if result is not None and self._worth_logging(result):
+                    logger.info("%s: %s", self.name, result)
+            except Exception as e:
+                self.count(errors_total=1)
+                logger.exception("%s cycle failed: %s", self.name, e)
+            time.sleep(max(5.0, self.interval_seconds))
+
+    def start(self, disabled_fallback: str) -> bool:
+        """Start the daemon thread when writer credentials are configured; False (logged) otherwise."""
+        try:
+            _get_writer_conn_kwargs()
+        except ValueError:
+            logger.info("%s worker disabled (POSTGRES_BUCKET_STORE_USER not set); %s", self.name, disabled_fallback)
+            return False
+        t = threading.Thread(target=self._run_loop, name=self.name.replace(" ", "-"), daemon=True)
+        t.start()
+        logger.info("%s worker started (interval=%ss)", self.name, self.interval_seconds)
+        return True
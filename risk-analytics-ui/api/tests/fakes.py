@@ -0,0 +1,41 @@
+"""Shared test doubles for the writer workers (app/writer_worker.py)."""
+
+
+class FakeWriter:
+    """
+    Cursor + connection recording a worker's statements. `results` maps a statement to its rows, or to a function
+    of the statement's params returning them; any other statement returns no rows.
+    """
+
+    def __init__(self, results):
+        self.results = results
+        self.executed = []
+        self.commits = 0
+        self.connection = self
+        self._rows = []
+
+    def cursor(self):
+        return self
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        rows = self.results.get(sql, [])
+        self._rows = rows(params) if callable(rows) else rows
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def calls(self, sql):
+        return [p for s, p in self.executed if s == sql]
@@ -0,0 +1,105 @@
+"""
+Book Risk kernel mirrored from betfair-rest-client/risk.py: L3 golden example and curve slicing.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from app import stream_data
+from app.book_risk_l3 import BookRiskState, book_risk_curve_payload, compute_book_risk_curve, compute_book_risk_l3, curve_payload_at_depth
+
+META = {1001: "HOME", 1002: "AWAY", 1003: "DRAW"}
+RUNNERS = [
+    {"selectionId": 1001, "ex": {"availableToBack": [[2.96, 321.0], [2.98, 103.0], [3.00, 583.0]]}},
+    {"selectionId": 1002, "ex": {"availableToBack": [[2.32, 813.0], [2.34, 1105.0], [2.36, 153.0]]}},
+    {"selectionId": 1003, "ex": {"availableToBack": [[3.85, 138.0], [3.90, 82.0], [3.95, 21.0]]}},
+]
+
+
+def test_l3_matches_rest_client_golden_example():
+    out = compute_book_risk_l3(RUNNERS, META, depth_limit=3)
+    assert abs(out["home_book_risk_l3"] - (-312.90)) < 0.02
+    assert abs(out["away_book_risk_l3"] - 1513.94) < 0.02
+    assert abs(out["draw_book_risk_l3"] - (-2384.95)) < 0.02
+
+
+def test_curve_payload_slices_to_depth():
+    payload = book_risk_curve_payload(compute_book_risk_curve(RUNNERS, META, max_depth=4))
+    assert payload["depth"] == 4
+    at3 = curve_payload_at_depth(payload, 3)
+    assert at3["depth"] == 3 and at3["home"]["risk"] == -312.9
+    assert curve_payload_at_depth(payload, 9)["depth"] == 4  # clamped to stored depth
+    assert curve_payload_at_depth(None, 3) is None
+
+
+def test_incremental_state_matches_l3_after_level_deltas():
+    state = BookRiskState(META, depth_limit=3)
+    for runner in RUNNERS:
+        for level, (price, size) in enumerate(runner["ex"]["availableToBack"]):
+            state.apply_level(runner["selectionId"], "B", level, price, size)
+    state.apply_level(1003, "B", 0, 3.85, 0.0)  # best draw level pulled: next level shifts into the window
+    state.apply_level(1003, "B", 3, 4.0, 60.0)
+    runners = RUNNERS[:2] + [{"selectionId": 1003, "ex": {"availableToBack": [[3.90, 82.0], [3.95, 21.0], [4.0, 60.0]]}}]
+    expected = compute_book_risk_l3(runners, META, depth_limit=3)
+    assert all(abs(state.risk()[k] - v) < 1e-9 for k, v in expected.items())
+
+
+def test_ladder_core_matches_rest_client_copy():
+    """app/ladder_core.py must stay a verbatim copy of betfair-rest-client/ladder_core.py."""
+    source = Path(__file__).resolve().parents[3] / "betfair-rest-client" / "ladder_core.py"
+    if not source.exists():
+        pytest.skip("betfair-rest-client not present (API-only checkout)")
+    copy = Path(__file__).resolve().parents[1] / "app" / "ladder_core.py"
+    assert copy.read_bytes() == source.read_bytes(), "copy betfair-rest-client/ladder_core.py to app/ladder_core.py"
+
+
+def test_book_risk_ticks_stop_reading_at_limit(monkeypatch):
+    t0 = datetime(2026, 2, 14, 15, tzinfo=timezone.utc)
+    consumed = []
+
+    def updates():
+        for i in range(100000):
+            consumed.append(i)
+            yield {"publish_time": t0 + timedelta(seconds=i), "selection_id": 1001 + i % 3, "side": "B", "level": 0,
+                   "price": 2.0 + (i % 50) / 100, "size": 10.0 + i % 7}
+
+    class _Named:
+        def execute(self, sql, params):
+            assert sql == stream_data._SQL_BOOK_RISK_UPDATES
+            self.rows = updates()
+
+        def __iter__(self):
+            return self.rows
+
+        def close(self):
+            self.closed = True
+
+    named = _Named()
+
+    class _Cur:
+        class connection:
+            @staticmethod
+            def cursor(name):
+                assert name == "book_risk_ticks"
+                return named
+
+        def execute(self, sql, params=None):
+            self.sql = sql
+
+        def fetchone(self):
+            return {"home_selection_id": 1001, "away_selection_id": 1002, "draw_selection_id": 1003}
+
+        def fetchall(self):
+            return []  # no baseline
+
+    @contextmanager
+    def cursor():
+        yield _Cur()
+
+    monkeypatch.setattr(stream_data, "cursor", cursor)
+    monkeypatch.setattr(stream_data, "LADDER_KEYFRAME_READ", False)
+    points = stream_data.get_book_risk_ticks_stream("1.1", t0, t0 + timedelta(days=3), limit=5)
+    assert len(points) == 5 and named.closed and named.itersize == stream_data.BOOK_RISK_TICKS_ITERSIZE
+    assert len(consumed) < 10  # one row past the 5th point, not the whole range
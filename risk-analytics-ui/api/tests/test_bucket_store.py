@@ -0,0 +1,191 @@
+"""
+Materialized stream buckets: stored rows reproduce the on-the-fly buckets, endpoints skip the computation of stored
+closed buckets, worker catch-up window, consistency checker.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import bucket_store, stream_data
+
+HOME, AWAY, DRAW = 11, 12, 13
+NOW = datetime.now(timezone.utc)
+LAST_PT = NOW - timedelta(minutes=5)
+WATERMARK = NOW - timedelta(minutes=10)  # market activity counted up to here; later updates are read from the tail
+
+
+def _ladder():
+    ticks, levels = [], []
+    for sid, price in ((HOME, 2.1), (AWAY, 3.7), (DRAW, 3.4)):
+        for k in range(12):
+            pt = NOW - timedelta(minutes=70 - 6 * k)
+            ticks.append({"market_id": "1.1", "selection_id": sid, "publish_time": pt, "price": price + k / 100, "size": 40.0 + 3 * k})
+        levels.append({"market_id": "1.1", "selection_id": sid, "side": "B", "level": 0, "price": price, "size": 90.0})
+        levels.append({"market_id": "1.1", "selection_id": sid, "side": "L", "level": 0, "price": price + 0.04, "size": 20.0})
+    return ticks, levels
+
+
+class FakeStore:
+    """Cursor answering every stream query from one in-memory market; stored rows served when present."""
+
+    def __init__(self, stored_rows=None):
+        self.stored_rows = stored_rows
+        self.executed = []
+        self._rows = []
+
+    def cursor(self):
+        store = self
+
+        class _Ctx:
+            def __enter__(self):
+                return store
+
+            def __exit__(self, *exc):
+                return False
+
+        return _Ctx()
+
+    def execute(self, sql, params=None):
+        self.executed.append(sql)
+        ticks, levels = _ladder()
+        meta = {"market_id": "1.1", "home_selection_id": HOME, "away_selection_id": AWAY, "draw_selection_id": DRAW}
+        if sql == stream_data._SQL_STORED_BUCKETS_PRESENT:
+            self._rows = [{"present": self.stored_rows is not None}]
+        elif sql == stream_data._SQL_STORED_BUCKETS:
+            self._rows = list(self.stored_rows or [])
+        elif sql == stream_data._SQL_KEYFRAMES_PRESENT:
+            self._rows = [{"present": True}]
+        elif sql == stream_data._SQL_KEYFRAMES_RANGE:
+            self._rows = [{"interval_minutes": 5, "built_from": NOW - timedelta(hours=3), "built_until": NOW}]
+        elif sql == stream_data._SQL_ACTIVITY_PRESENT:
+            self._rows = [{"present": True}]
+        elif sql == stream_data._SQL_ACTIVITY_WATERMARK:
+            self._rows = [{"counted_until": WATERMARK}]
+        elif sql in (stream_data._SQL_ACTIVITY_MARKET, stream_data._SQL_ACTIVITY_DAY_AT_OR_BEFORE):
+            self._rows = [{"market_id": "1.1", "first_publish_time": NOW - timedelta(minutes=70), "last_publish_time": WATERMARK}]
+        elif sql == stream_data._SQL_LAST_PUBLISH_IN_RANGE:
+            self._rows = [{"market_id": "1.1", "t": LAST_PT}]
+        elif sql in (stream_data._SQL_MARKET_SELECTIONS, bucket_store._SQL_MARKETS, bucket_store._SQL_ACTIVE_MARKETS):
+            self._rows = [meta]
+        elif sql == stream_data._SQL_LATEST_PUBLISH_BEFORE or "MIN(publish_time) AS t" in sql:
+            self._rows = [{"t": LAST_PT}]
+        elif sql == bucket_store._SQL_LAST_PUBLISH:
+            self._rows = [{"market_id": "1.1", "t": LAST_PT}]
+        elif sql == bucket_store._SQL_BUCKET_TICKS:
+            self._rows = [{"market_id": "1.1", "ticks": 9, "tick_count": 7}]
+        elif "COUNT(*) AS cnt" in sql:
+            self._rows = [{"cnt": 7}]
+        elif "MIN(publish_time) AS min_pt" in sql:
+            self._rows = [{"min_pt": NOW - timedelta(minutes=70), "max_pt": NOW - timedelta(minutes=4)}]
+        elif sql == stream_data._SQL_LADDER_STATE_FROM_KEYFRAME:
+            self._rows = levels
+        elif "UNION ALL" in sql:
+            self._rows = ticks
+        elif "DISTINCT ON (market_id) market_id, total_matched" in sql:
+            self._rows = [{"market_id": "1.1", "total_matched": 4321.0}]
+        else:
+            raise AssertionError("unexpected query: " + sql)
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+
+@pytest.fixture
+def store(monkeypatch):
+    def use(stored_rows=None):
+        db = FakeStore(stored_rows)
+        monkeypatch.setattr(stream_data, "cursor", db.cursor)
+        monkeypatch.setattr(stream_data, "MARKET_ACTIVITY_READ", True)
+        monkeypatch.setattr(stream_data, "_activity_probe", {"watermark": None, "checked_at": None})
+        monkeypatch.setattr(stream_data, "LADDER_KEYFRAME_READ", True)
+        monkeypatch.setattr(stream_data, "_keyframe_probe", dict(stream_data._keyframe_probe, checked_at=None))
+        monkeypatch.setattr(stream_data, "_stored_buckets_probe", {"present": False, "checked_at": None})
+        return db
+    return use
+
+
+def _materialize(db, buckets):
+    rows = []
+    for b in buckets:
+        for mid, row in bucket_store.compute_closed_bucket(db, b).items():
+            rows.append({"market_id": mid, "bucket_start": b, **row})
+    return rows
+
+
+def _closed(buckets):
+    return [b for b in buckets if b + timedelta(minutes=15) <= NOW]
+
+
+def test_stored_row_round_trip_including_missing_medians():
+    ticks, levels = _ladder()
+    sels = {"1.1": (HOME, AWAY, DRAW), "1.2": (HOME, None, DRAW)}
+    b = stream_data._bucket_15_utc(NOW) - timedelta(minutes=30)
+    e = stream_data._assemble_bucket_enrichment(sels, ticks, levels, [], b, b + timedelta(minutes=15))
+    assert e["1.2"]["book_risk"] is None and e["1.1"]["impedance"] is not None
+    for mid in sels:
+        row = stream_data._stored_bucket_row(e[mid], LAST_PT, 3)
+        assert set(row) == set(stream_data.STORED_BUCKET_COLUMNS)
+        restored = stream_data._enrichment_from_stored(row)
+        assert stream_data._timeseries_point(b, restored) == stream_data._timeseries_point(b, e[mid])
+
+
+def test_timeseries_reads_closed_buckets_from_store(store):
+    store()
+    live = stream_data.get_event_timeseries_stream("1.1", NOW - timedelta(hours=1), NOW, 15)
+    buckets = [datetime.fromisoformat(p["snapshot_at"]) for p in live]
+    closed = _closed(buckets)
+    assert len(live) >= 4 and closed
+
+    db = store(_materialize(store(), closed))
+    served = stream_data.get_event_timeseries_stream("1.1", NOW - timedelta(hours=1), NOW, 15)
+    # The live bucket ends at "now", which moved between the two calls
+    assert served[:len(closed)] == live[:len(closed)] and len(served) == len(live)
+    # Only the buckets not stored (the live one) run the latest-publish + 3 enrichment queries
+    assert db.executed.count(stream_data._SQL_LATEST_PUBLISH_BEFORE) == len(buckets) - len(closed)
+    assert db.executed.count(stream_data._SQL_LADDER_STATE_FROM_KEYFRAME) == len(buckets) - len(closed)
+
+
+def test_event_aware_buckets_match_live_computation(store):
+    store()
+    live = stream_data.get_event_buckets_stream("1.1")
+    buckets = [datetime.fromisoformat(b["bucket_start"]) for b in live]
+    assert live and all(b["tick_count"] == 7 for b in live)
+
+    closed = _closed(buckets)
+    db = store(_materialize(store(), closed))
+    served = stream_data.get_event_buckets_stream("1.1")
+    assert served[:len(closed)] == live[:len(closed)] and len(served) == len(live)
+    assert db.executed.count(stream_data._SQL_LADDER_STATE_FROM_KEYFRAME) == len(buckets) - len(closed)
+    assert stream_data._SQL_ACTIVITY_MARKET in db.executed  # publish range from the market activity tables
+
+
+def test_store_read_can_be_disabled(store, monkeypatch):
+    monkeypatch.setattr(stream_data, "BUCKET_STORE_READ", False)
+    db = store([])
+    stream_data.get_event_timeseries_stream("1.1", NOW - timedelta(hours=1), NOW, 15)
+    assert stream_data._SQL_STORED_BUCKETS_PRESENT not in db.executed and stream_data._SQL_STORED_BUCKETS not in db.executed
+
+
+def test_pending_buckets_catch_up_window(monkeypatch):
+    monkeypatch.setattr(bucket_store, "MAX_CATCHUP_BUCKETS", 4)
+    last = datetime(2026, 2, 14, 12, 0, tzinfo=timezone.utc)
+    q = timedelta(minutes=15)
+    assert bucket_store.pending_buckets(None, last) == [last]
+    assert bucket_store.pending_buckets(last - 2 * q, last) == [last - q, last]
+    assert bucket_store.pending_buckets(last, last) == []
+    assert bucket_store.pending_buckets(last - 40 * q, last) == [last - 3 * q, last - 2 * q, last - q, last]
+    assert bucket_store.last_closed_bucket(datetime(2026, 2, 14, 12, 16, tzinfo=timezone.utc)) == last
+
+
+def test_check_reports_drifted_columns():
+    row = stream_data._stored_bucket_row(
+        {c: 1.5 for c in stream_data.STORED_BUCKET_COLUMNS[2:]} | {"book_risk": None, "impedance": None}, LAST_PT, 4
+    )
+    assert bucket_store.diff_rows(row, dict(row)) == []
+    assert bucket_store.diff_rows(row, {**row, "home_back_odds_median": 1.5 + 1e-13}) == []
+    drift = bucket_store.diff_rows(row, {**row, "tick_count": 5, "total_volume": 2.0})
+    assert [d.split(":")[0] for d in drift] == ["tick_count", "total_volume"]
+    assert bucket_store.diff_rows(row, None)
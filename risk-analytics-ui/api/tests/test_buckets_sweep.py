@@ -0,0 +1,125 @@
+"""
+Sweep-line _buckets_from_rows gives exactly the buckets of the per-bucket full scan it replaced.
+"""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+from app import stream_data
+
+HOME, AWAY, DRAW = 101, 102, 103
+
+
+def _reference_buckets(meta, all_rows, liq_rows, from_dt, to_dt, now):
+    """Previous implementation: every bucket rescans every row (O(buckets x ticks))."""
+    sids = [s for s in (meta.get("home_selection_id"), meta.get("away_selection_id"), meta.get("draw_selection_id")) if s is not None]
+    liq = [(r["publish_time"], float(r["total_matched"]) if r.get("total_matched") is not None else None) for r in liq_rows]
+    by_sel = {sid: [] for sid in sids}
+    for r in all_rows:
+        if int(r["selection_id"]) in by_sel:
+            by_sel[int(r["selection_id"])].append((
+                r["publish_time"],
+                float(r["price"]) if r.get("price") is not None else None,
+                float(r["size"]) if r.get("size") is not None else None,
+            ))
+    out = []
+    for bt in stream_data._bucket_times_in_range(from_dt, to_dt):
+        end = bt + timedelta(minutes=15)
+        eff = min(end, now)
+        item = {"tick_count": sum(1 for sid in sids for pt, _, _ in by_sel[sid] if bt <= pt < end)}
+        medians = []
+        for role, sid in (("home", meta.get("home_selection_id")), ("away", meta.get("away_selection_id")), ("draw", meta.get("draw_selection_id"))):
+            m = (None, None, 0.0, 0)
+            if sid is not None:
+                m = stream_data._compute_median_from_rows(by_sel[sid], bt, eff)
+            item.update({
+                role + "_back_odds_median": m[0], role + "_back_size_median": m[1],
+                role + "_seconds_covered": m[2], role + "_update_count": m[3],
+            })
+            medians.extend(m[:2])
+            priced = [(pt, p) for pt, p, _ in by_sel.get(sid, []) if pt <= bt and p is not None] if sid else []
+            item[role + "_best_back"] = max(priced, key=lambda x: x[0])[1] if priced else None
+        item["book_risk"] = stream_data.compute_book_risk_from_medians(*medians)
+        item["impedance"] = stream_data.compute_impedance_index_from_medians(*medians)
+        tv = None
+        for pt, v in liq:
+            if pt <= eff:
+                tv = v
+        item["total_volume"] = tv
+        out.append(item)
+    return out
+
+
+def _project(bucket):
+    """Reference-comparable view of a _buckets_from_rows item."""
+    keys = ["tick_count", "total_volume"] + [
+        f"{role}_{k}" for role in ("home", "away", "draw")
+        for k in ("back_odds_median", "back_size_median", "seconds_covered", "update_count", "best_back")
+    ]
+    out = {k: bucket[k] for k in keys}
+    out["book_risk"] = None if bucket["home_book_risk_l3"] is None else {
+        k: bucket[k] for k in ("home_book_risk_l3", "away_book_risk_l3", "draw_book_risk_l3")
+    }
+    out["impedance"] = None if bucket["impedance_index_15m"] is None else {
+        k: bucket[k] for k in ("impedance_index_15m", "impedance_abs_diff_home", "impedance_abs_diff_away", "impedance_abs_diff_draw")
+    }
+    return out
+
+
+def _random_window(seed, now):
+    rng = random.Random(seed)
+    from_dt = stream_data._bucket_15_utc(now) - timedelta(hours=rng.choice([1, 3, 8]))
+    # Window may run past now: the live bucket is clipped, future buckets carry no segments
+    to_dt = now + timedelta(minutes=rng.choice([0, 20, 50]))
+    fetch_from, fetch_to = stream_data._buckets_fetch_range(from_dt, to_dt)
+    span = int((min(fetch_to, now) - fetch_from).total_seconds())
+    rows = []
+    for sid in (HOME, AWAY, DRAW, 999):
+        price = rng.uniform(1.5, 6.0)
+        offsets = sorted(rng.randrange(0, span) for _ in range(rng.randrange(0, 200)))
+        for off in offsets:
+            price = max(1.01, price + rng.choice([-0.02, 0, 0.02]))
+            rows.append({
+                "publish_time": fetch_from + timedelta(seconds=off),  # repeated offsets: equal publish_time
+                "selection_id": sid,
+                "price": None if rng.random() < 0.05 else round(price, 2),
+                "size": None if rng.random() < 0.05 else round(rng.lognormvariate(4, 1), 2),
+            })
+    rows.sort(key=lambda r: r["publish_time"])
+    liq = [
+        {"publish_time": fetch_from + timedelta(seconds=off), "total_matched": None if rng.random() < 0.1 else 1000.0 + off}
+        for off in sorted(set(rng.randrange(0, span) for _ in range(rng.randrange(0, 30))))
+    ]
+    meta = {"home_selection_id": HOME, "away_selection_id": AWAY, "draw_selection_id": rng.choice([DRAW, None])}
+    return meta, rows, liq, from_dt, to_dt
+
+
+def test_sweep_matches_full_scan_on_random_windows(monkeypatch):
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+
+    class _Frozen(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return now
+
+    monkeypatch.setattr(stream_data, "datetime", _Frozen)
+    for seed in range(40):
+        meta, rows, liq, from_dt, to_dt = _random_window(seed, now)
+        got = stream_data._buckets_from_rows(meta, rows, liq, from_dt, to_dt)
+        want = _reference_buckets(meta, rows, liq, from_dt, to_dt, now)
+        assert [_project(b) for b in got] == want, seed
+        # Same JSON too (0 vs 0.0 seconds_covered for future buckets)
+        assert json.dumps([_project(b) for b in got], sort_keys=True) == json.dumps(want, sort_keys=True), seed
+
+
+def test_equal_publish_times_keep_first_row():
+    t0 = datetime(2026, 2, 14, 12, 0, tzinfo=timezone.utc)
+    rows = [
+        {"publish_time": t0 - timedelta(seconds=30), "selection_id": HOME, "price": 2.0, "size": 10.0},
+        {"publish_time": t0 - timedelta(seconds=30), "selection_id": HOME, "price": 2.5, "size": 20.0},
+        {"publish_time": t0 + timedelta(minutes=5), "selection_id": HOME, "price": 3.0, "size": 30.0},
+    ]
+    meta = {"home_selection_id": HOME, "away_selection_id": None, "draw_selection_id": None}
+    (bucket,) = stream_data._buckets_from_rows(meta, rows, [], t0, t0 + timedelta(minutes=15))
+    assert bucket["home_best_back"] == 2.0 and bucket["tick_count"] == 1
+    assert bucket["home_update_count"] == 1 and bucket["home_seconds_covered"] == 900.0
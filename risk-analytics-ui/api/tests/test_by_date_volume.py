@@ -0,0 +1,70 @@
+"""
+Volume tab (get_events_by_date_volume): one aggregation query with filter, sort and page in SQL; rows shaped into
+the event items without any snapshot enrichment.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from app import stream_data
+
+OPEN = datetime(2026, 2, 14, 15)
+
+
+class _Cur:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+
+    def fetchall(self):
+        return self.rows
+
+
+def _patch(monkeypatch, rows):
+    cur = _Cur(rows)
+
+    @contextmanager
+    def cursor():
+        yield cur
+
+    monkeypatch.setattr(stream_data, "cursor", cursor)
+    monkeypatch.setattr(stream_data, "_bulk_bucket_enrichment", None)  # must not be reached
+    return cur
+
+
+def test_volume_items_from_one_query(monkeypatch):
+    meta_open = datetime(2026, 2, 14, 15, tzinfo=timezone.utc)
+    rows = [
+        {"total": 3, "event_id": 35000001, "event_name": "A vs B", "has_meta": True, "meta_open_date": meta_open,
+         "rest_open_date": OPEN, "competition_name": "League", "competition_id": 10932509, "volume_total": 1500.5,
+         "markets": [{"market_id": "1.1", "market_name": "Match Odds", "volume": 1500.5},
+                     {"market_id": "1.2", "market_name": "Over/Under 2.5 Goals", "volume": None}]},
+        {"total": 3, "event_id": 35000002, "event_name": "C vs D", "has_meta": False, "meta_open_date": None,
+         "rest_open_date": OPEN, "competition_name": None, "competition_id": None, "volume_total": 0,
+         "markets": [{"market_id": "1.3", "market_name": "Match Odds", "volume": None}]},
+    ]
+    cur = _patch(monkeypatch, rows)
+    out = stream_data.get_events_by_date_volume("2026-02-14", limit=2, offset=0, min_volume=0.0, sort="volume_asc")
+    (sql, params), = cur.executed
+    assert sql == stream_data._SQL_BY_DATE_VOLUME_SORTED["volume_asc"] and "ORDER BY volume_total ASC" in sql
+    from_dt = datetime(2026, 2, 14, tzinfo=timezone.utc)
+    # Liquidity read within the day window, like the snapshots list (_SQL_REST_DRIVEN_LIQUIDITY)
+    assert "h.publish_time >= %s AND h.publish_time <= %s" in sql and params[0] == from_dt
+    assert params[2:] == (from_dt, datetime(2026, 2, 15, tzinfo=timezone.utc), 0.0, 2, 0)
+    assert out["paging"] == {"limit": 2, "offset": 0, "total": 3} and out["sort"] == "volume_asc"
+    first, second = out["items"]
+    assert first["event_id"] == "35000001" and first["competition_id"] == "10932509"
+    assert first["event_open_date"] == meta_open.isoformat() and first["volume_total"] == 1500.5
+    assert [m["market_id"] for m in first["markets"]] == ["1.1", "1.2"] and first["latest_snapshot_at"] is None
+    assert second["event_open_date"] == OPEN.isoformat() and second["volume_total"] == 0.0
+
+
+def test_page_past_the_end_keeps_total(monkeypatch):
+    cur = _patch(monkeypatch, [{"total": 7, "event_id": None}])
+    out = stream_data.get_events_by_date_volume("2026-02-14", limit=5, offset=100, min_volume=250.0)
+    assert out["items"] == [] and out["paging"]["total"] == 7
+    assert "ORDER BY volume_total DESC" in cur.executed[0][0] and cur.executed[0][1][4:] == (250.0, 5, 100)
+    assert stream_data.get_events_by_date_volume("14/02/2026")["paging"]["total"] == 0
+    assert len(cur.executed) == 1
@@ -0,0 +1,64 @@
+"""
+Columnar layout of the chart endpoints: one array per field, negotiated by ?layout= or the Accept header.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+from app import columnar, stream_router
+from app.response_cache import ResponseCache
+
+T0 = datetime(2026, 2, 14, 15, tzinfo=timezone.utc)
+
+
+def _points(n):
+    return [
+        {"snapshot_at": (T0 + timedelta(minutes=15 * i)).isoformat(), "home_best_back": 2.0 + i / 300,
+         "away_best_back": 3.6, "total_volume": 12345.678901 * (i + 1), "depth_limit": 3, "runners": [{"p": 1 / 3}]}
+        for i in range(n)
+    ]
+
+
+def test_columns_round_trip_and_float32():
+    rows = _points(3) + [{"snapshot_at": "x", "extra": 1}]
+    body = columnar.to_columns(rows)
+    assert body["length"] == 4 and list(body["columns"])[:3] == ["snapshot_at", "home_best_back", "away_best_back"]
+    assert [{k: v[i] for k, v in body["columns"].items() if v[i] is not None} for i in range(4)] == [
+        {k: v for k, v in r.items() if v is not None} for r in rows
+    ]
+    rounded = columnar.to_columns(rows, float32=True)["columns"]
+    assert rounded["total_volume"][:2] == [12345.68, 24691.36]
+    assert rounded["runners"][0] == [{"p": 0.3333333}] and rounded["depth_limit"][0] == 3
+    assert columnar.round_float32(_points(1))[0]["home_best_back"] == 2.0
+
+
+def test_negotiation():
+    assert columnar.wants_columnar("columnar", None)
+    assert columnar.wants_columnar(None, "application/vnd.netbet.columnar+json, application/json;q=0.5")
+    assert not columnar.wants_columnar("rows", columnar.COLUMNAR_MEDIA_TYPE)
+    assert not columnar.wants_columnar(None, "application/json")
+    rows = _points(2)
+    assert columnar.negotiate(rows, None, None) == (rows, "application/json")
+    response = columnar.rows_response(rows, "columnar", None, float32=True)
+    assert response.media_type == columnar.COLUMNAR_MEDIA_TYPE
+    assert json.loads(response.body) == columnar.to_columns(rows, float32=True)
+
+
+def test_timeseries_endpoint_columnar(monkeypatch):
+    points = _points(96 * 3)
+
+    async def get_timeseries(market_id, from_dt, to_dt, interval_minutes=15):
+        return points
+
+    monkeypatch.setattr(stream_router.stream_data_async, "get_event_timeseries_stream", get_timeseries)
+    monkeypatch.setattr(stream_router, "stream_cache", ResponseCache(max_entries=0))
+    params = {"from_ts": T0.isoformat(), "to_ts": T0.isoformat(), "interval_minutes": 15}
+    response = asyncio.run(stream_router.stream_event_timeseries("1.1", None, layout=None, float32=False, accept=None, **params))
+    assert response.media_type == "application/json" and json.loads(response.body) == points
+    response = asyncio.run(stream_router.stream_event_timeseries(
+        "1.1", None, layout=None, float32=False, accept=columnar.COLUMNAR_MEDIA_TYPE, **params,
+    ))
+    assert response.media_type == columnar.COLUMNAR_MEDIA_TYPE
+    body = json.loads(response.body)
+    assert body["columns"]["snapshot_at"] == [p["snapshot_at"] for p in points]
+    assert len(response.body) < 0.7 * len(json.dumps(points, separators=(",", ":")))
@@ -0,0 +1,119 @@
+"""
+Connection pool behind app.db.cursor(): reuse, bounded wait, discard of broken connections, per-request pinning.
+"""
+import threading
+import time
+
+import pytest
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_INTRANS
+
+from app import db
+
+
+class FakeConn:
+    def __init__(self):
+        self.closed = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.fail_select = False
+        self.info = type("Info", (), {"transaction_status": TRANSACTION_STATUS_IDLE})()
+
+    def cursor(self):
+        conn = self
+
+        class _Cur:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def execute(self, sql, params=None):
+                if conn.fail_select:
+                    raise RuntimeError("server closed the connection")
+                conn.info.transaction_status = TRANSACTION_STATUS_INTRANS
+
+        return _Cur()
+
+    def commit(self):
+        self.commits += 1
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = TRANSACTION_STATUS_IDLE
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    opened = []
+
+    def connect():
+        opened.append(FakeConn())
+        return opened[-1]
+
+    p = db.ConnectionPool(1, 2, wait_seconds=0.2, healthcheck_seconds=3600, connect=connect)
+    p.opened = opened
+    monkeypatch.setattr(db, "_pool", p)
+    monkeypatch.setattr(db, "POOL_MAX", 2)
+    return p
+
+
+def test_cursor_reuses_pooled_connection(pool):
+    for _ in range(3):
+        with db.cursor() as cur:
+            cur.execute("SELECT 1")
+    assert len(pool.opened) == 1
+    stats = pool.stats()
+    assert stats["checkouts_total"] == 3 and stats["in_use"] == 0 and stats["idle"] == 1
+
+
+def test_wait_is_bounded_and_counted(pool):
+    a, b = pool.getconn(), pool.getconn()
+    with pytest.raises(db.PoolTimeout):
+        pool.getconn()
+    threading.Timer(0.05, pool.putconn, args=(a,)).start()
+    assert pool.getconn() is a  # waiter gets the released connection
+    pool.putconn(a)
+    pool.putconn(b)
+    stats = pool.stats()
+    assert stats["timeouts_total"] == 1 and stats["wait_seconds_max"] >= 0.04
+
+
+def test_error_rolls_back_and_closed_connection_is_discarded(pool):
+    with pytest.raises(ValueError):
+        with db.cursor() as cur:
+            cur.execute("SELECT 1")
+            raise ValueError("boom")
+    assert pool.opened[0].rollbacks == 1 and pool.stats()["idle"] == 1
+    pool.opened[0].closed = 1  # server went away while idle
+    with db.cursor():
+        pass
+    assert len(pool.opened) == 2 and pool.stats()["discarded_total"] == 1
+
+
+def test_failed_healthcheck_replaces_connection(pool):
+    pool.healthcheck_seconds = 0
+    with db.cursor():
+        pass
+    pool.opened[0].fail_select = True
+    time.sleep(0.01)
+    with db.cursor():
+        pass
+    assert len(pool.opened) == 2 and pool.stats()["healthcheck_failures_total"] == 1
+
+
+def test_request_scope_pins_one_connection(pool):
+    with db.request_scope():
+        with db.cursor():
+            with db.cursor():  # nested use shares the pinned connection
+                pass
+        with db.cursor():
+            pass
+        assert pool.stats()["in_use"] == 1
+    stats = pool.stats()
+    assert stats["checkouts_total"] == 1 and stats["in_use"] == 0
+    assert len(pool.opened) == 1 and pool.opened[0].commits == 3
@@ -0,0 +1,113 @@
+"""
+Ladder keyframes: grid points, readers choosing the keyframe query only inside the built range, and the worker pass
+(first grid point before the oldest row, per-keyframe commits, retention pruning).
+"""
+from datetime import datetime, timedelta, timezone
+
+from app import ladder_keyframes, ladder_stats, stream_data
+from tests.fakes import FakeWriter
+
+T0 = datetime(2026, 2, 14, tzinfo=timezone.utc)
+
+
+def test_keyframe_floor_on_bucket_grid():
+    t = T0 + timedelta(hours=10, minutes=14, seconds=59, microseconds=7)
+    assert stream_data._keyframe_floor(t, 5) == T0 + timedelta(hours=10, minutes=10)
+    assert stream_data._keyframe_floor(t, 15) == T0 + timedelta(hours=10)
+    assert stream_data._keyframe_floor(T0 + timedelta(minutes=15), 5) == T0 + timedelta(minutes=15)
+    assert stream_data._keyframe_floor(datetime(2026, 2, 14, 0, 7), 5) == T0 + timedelta(minutes=5)
+
+
+class _ProbeCur:
+    def __init__(self, watermark):
+        self.watermark = watermark
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        if sql == stream_data._SQL_KEYFRAMES_PRESENT:
+            self._rows = [{"present": self.watermark is not None}]
+        elif sql == stream_data._SQL_KEYFRAMES_RANGE:
+            self._rows = [self.watermark]
+        else:
+            self._rows = []
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+
+def test_ladder_state_uses_keyframe_inside_built_range(monkeypatch):
+    monkeypatch.setattr(stream_data, "LADDER_KEYFRAME_READ", True)
+    monkeypatch.setattr(stream_data, "_keyframe_probe", dict(stream_data._keyframe_probe, checked_at=None))
+    built = {"interval_minutes": 5, "built_from": T0, "built_until": T0 + timedelta(hours=2)}
+    cur = _ProbeCur(built)
+    t = T0 + timedelta(hours=1, minutes=7)
+    stream_data._ladder_state_rows(cur, ["1.1"], t)
+    k = T0 + timedelta(hours=1, minutes=5)
+    assert cur.executed[-1] == (stream_data._SQL_LADDER_STATE_FROM_KEYFRAME, (["1.1"], k, ["1.1"], k, t))
+    # Probe cached: later reads issue the ladder query only; outside the range the history is scanned
+    cur.executed.clear()
+    late = T0 + timedelta(hours=2, minutes=5)
+    stream_data._ladder_state_rows(cur, ["1.1"], late)
+    assert cur.executed == [(stream_data._SQL_LADDER_STATE, (["1.1"], late))]
+    assert stream_data._keyframe_for(cur, T0 - timedelta(minutes=1)) is None
+    assert stream_data._keyframe_for(cur, T0) == T0
+
+
+def test_ladder_state_without_keyframes(monkeypatch):
+    monkeypatch.setattr(stream_data, "LADDER_KEYFRAME_READ", True)
+    monkeypatch.setattr(stream_data, "_keyframe_probe", dict(stream_data._keyframe_probe, checked_at=None))
+    cur = _ProbeCur(None)
+    t = T0 + timedelta(hours=1)
+    stream_data._ladder_state_rows(cur, ["1.1"], t)
+    assert [s for s, _ in cur.executed] == [stream_data._SQL_KEYFRAMES_PRESENT, stream_data._SQL_LADDER_STATE]
+    monkeypatch.setattr(stream_data, "LADDER_KEYFRAME_READ", False)
+    monkeypatch.setattr(stream_data, "_keyframe_probe", dict(stream_data._keyframe_probe, checked_at=None))
+    cur = _ProbeCur({"interval_minutes": 5, "built_from": T0, "built_until": t})
+    stream_data._ladder_state_rows(cur, ["1.1"], t)
+    assert [s for s, _ in cur.executed] == [stream_data._SQL_LADDER_STATE]
+
+
+def _writer(watermark=None, prunable=False, legacy_oldest=None, oldest=None):
+    """FakeWriter with the watermark row, prunable rows and oldest ladder rows of one scenario."""
+    return FakeWriter({
+        ladder_stats._SQL_PARTITIONS: [{"relname": "ladder_levels_20260212"}, {"relname": "ladder_levels_20260214"}],
+        ladder_stats._SQL_LEGACY_PRESENT: [{"present": legacy_oldest is not None}],
+        ladder_keyframes._SQL_LEGACY_OLDEST: [{"t": legacy_oldest}],
+        ladder_keyframes._SQL_OLDEST_IN: [{"t": oldest}],
+        ladder_keyframes._SQL_HAS_PRUNABLE: [{"prunable": prunable}] if watermark else [],
+        ladder_keyframes._SQL_WATERMARK: [watermark] if watermark else [],
+    })
+
+
+def test_refresh_builds_grid_points(monkeypatch):
+    monkeypatch.setattr(ladder_keyframes, "MAX_KEYFRAMES_PER_CYCLE", 3)
+    monkeypatch.setattr(ladder_keyframes, "INTERVAL_MINUTES", 5)
+    now = T0 + timedelta(hours=12)
+    start = datetime(2026, 2, 12, tzinfo=timezone.utc)
+    # First run: empty ladder at the grid point before the oldest row, capped per cycle
+    cur = _writer(oldest=start + timedelta(minutes=12, seconds=3))
+    first = start + timedelta(minutes=5)
+    result = ladder_keyframes.refresh(cur, now)
+    assert result == {"keyframes": 3, "pruned": False, "built_until": first + timedelta(minutes=15)}
+    assert [p["k"] for p in cur.calls(ladder_keyframes._SQL_BUILD)] == [first + timedelta(minutes=5 * n) for n in (1, 2, 3)]
+    assert [p["prev"] for p in cur.calls(ladder_keyframes._SQL_BUILD)] == [first + timedelta(minutes=5 * n) for n in (0, 1, 2)]
+    assert {p["built_from"] for p in cur.calls(ladder_keyframes._SQL_SET_WATERMARK)} == {first}
+    assert cur.commits == 3
+    # Caught up: grid points up to now - grace only; the stored interval wins; pruning of a dropped partition
+    monkeypatch.setattr(ladder_keyframes, "INTERVAL_MINUTES", 1)
+    built_until = now - timedelta(minutes=15)
+    cur = _writer({"interval_minutes": 5, "built_from": first, "built_until": built_until}, prunable=True)
+    result = ladder_keyframes.refresh(cur, now)
+    assert result == {"keyframes": 2, "pruned": True, "built_until": now - timedelta(minutes=5)}
+    assert cur.calls(ladder_keyframes._SQL_PRUNE) == [{"start": start, "source": "ladder_levels"}]
+    assert cur.commits == 3
+    # History before daily partitioning: first grid point before its oldest row, nothing is pruned
+    monkeypatch.setattr(ladder_keyframes, "INTERVAL_MINUTES", 5)
+    cur = _writer(prunable=True, legacy_oldest=T0 - timedelta(days=30, minutes=-7))
+    ladder_keyframes.refresh(cur, now)
+    assert cur.calls(ladder_keyframes._SQL_BUILD)[0]["prev"] == T0 - timedelta(days=30, minutes=-5) - timedelta(minutes=5)
+    assert not cur.calls(ladder_keyframes._SQL_HAS_PRUNABLE) and not cur.calls(ladder_keyframes._SQL_PRUNE)
@@ -0,0 +1,118 @@
+"""
+Daily ladder_levels stats: worker pass (finalize closed days, advance the open day, drop removed partitions)
+and the data horizon served from the stats rows.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+from app import ladder_stats, stream_data
+from tests.fakes import FakeWriter
+
+NOW = datetime(2026, 2, 14, 12, 0, tzinfo=timezone.utc)
+
+
+def _writer(partitions, state, legacy_days=None):
+    """FakeWriter with the ladder_levels partitions, stats rows and (optionally) legacy days of one scenario."""
+    return FakeWriter({
+        ladder_stats._SQL_PARTITIONS: [{"relname": n} for n in partitions],
+        ladder_stats._SQL_STATS_STATE: state,
+        ladder_stats._SQL_LEGACY_PRESENT: [{"present": legacy_days is not None}],
+        ladder_stats._SQL_COUNT_LEGACY: [
+            {"day": d, "ladder_rows": 5, "markets": 2, "min_pt": ladder_stats._day_start(d), "max_pt": ladder_stats._day_start(d)}
+            for d in legacy_days or ()
+        ],
+        ladder_stats._SQL_COUNT_RANGE: _count,
+        ladder_stats._SQL_COUNT_DAY: _count,
+    })
+
+
+def _count(params):
+    return [{"ladder_rows": 10, "markets": 3, "min_pt": params[0], "max_pt": params[1] - timedelta(seconds=1)}]
+
+
+def test_refresh_finalizes_advances_and_drops(monkeypatch):
+    monkeypatch.setattr(ladder_stats, "MAX_FINALIZE_PER_CYCLE", 2)
+    watermark = NOW - timedelta(minutes=10)
+    cur = _writer(
+        partitions=[
+            "ladder_levels_20260210", "ladder_levels_20260211", "ladder_levels_20260212",
+            "ladder_levels_20260213", "ladder_levels_20260214", "ladder_levels_20260215", "ladder_levels_default",
+        ],
+        state=[
+            {"day": date(2026, 2, 1), "counted_until": datetime(2026, 2, 2, tzinfo=timezone.utc), "is_final": True,
+             "partition_name": "ladder_levels_20260201"},
+            {"day": date(2026, 2, 12), "counted_until": datetime(2026, 2, 13, tzinfo=timezone.utc), "is_final": True,
+             "partition_name": "ladder_levels_20260212"},
+            {"day": date(2026, 2, 13), "counted_until": datetime(2026, 2, 13, 23, 50, tzinfo=timezone.utc), "is_final": False,
+             "partition_name": "ladder_levels_20260213"},
+            {"day": date(2026, 2, 14), "counted_until": watermark, "is_final": False, "partition_name": "ladder_levels_20260214"},
+        ],
+    )
+    result = ladder_stats.refresh(cur, NOW)
+    assert result == {"advanced": 1, "finalized": 2, "deleted": 1}
+    assert cur.calls(ladder_stats._SQL_DELETE_DAYS) == [{"days": [date(2026, 2, 1)]}]
+    # Oldest closed days first, capped per cycle (02-13 waits for the next cycle); 02-12 is frozen
+    assert [p["day"] for p in cur.calls(ladder_stats._SQL_FINALIZE)] == [date(2026, 2, 10), date(2026, 2, 11)]
+    # Today: from its watermark to now - grace; tomorrow's (provisioned) partition untouched
+    upper = NOW - timedelta(seconds=ladder_stats.GRACE_SECONDS)
+    assert cur.calls(ladder_stats._SQL_COUNT_RANGE) == [(watermark, upper)]
+    assert cur.calls(ladder_stats._SQL_ADD_MARKETS) == [(date(2026, 2, 14), watermark, upper)]
+    (advance,) = cur.calls(ladder_stats._SQL_ADVANCE)
+    assert advance["ladder_rows"] == 10 and advance["upper"] == upper and advance["partition_name"] == "ladder_levels_20260214"
+    assert cur.commits == 4
+
+
+def test_first_run_counts_today_from_midnight():
+    cur = _writer(partitions=["ladder_levels_20260214"], state=[])
+    assert ladder_stats.refresh(cur, NOW) == {"advanced": 1, "finalized": 0, "deleted": 0}
+    assert cur.calls(ladder_stats._SQL_COUNT_RANGE)[0][0] == datetime(2026, 2, 14, tzinfo=timezone.utc)
+
+
+def test_legacy_partition_counted_once_and_kept():
+    legacy = [date(2026, 2, 3), date(2026, 2, 4)]
+    cur = _writer(partitions=["ladder_levels_initial", "ladder_levels_20260214"], state=[], legacy_days=legacy)
+    ladder_stats.refresh(cur, NOW)
+    finals = cur.calls(ladder_stats._SQL_FINALIZE)
+    assert [(p["day"], p["partition_name"]) for p in finals] == [(d, "ladder_levels_initial") for d in legacy]
+    # Counted days are neither recounted nor deleted while the partition exists
+    state = [{"day": d, "partition_name": "ladder_levels_initial", "counted_until": None, "is_final": True} for d in legacy]
+    cur = _writer(partitions=["ladder_levels_initial", "ladder_levels_20260214"], state=state, legacy_days=legacy)
+    ladder_stats.refresh(cur, NOW)
+    assert not cur.calls(ladder_stats._SQL_COUNT_LEGACY) and not cur.calls(ladder_stats._SQL_DELETE_DAYS)
+
+
+def test_data_horizon_from_daily_stats(monkeypatch):
+    today = datetime.now(timezone.utc).date()
+    rows = [
+        {"day": today - timedelta(days=k), "ladder_rows": 0 if k == 1 else 100 * (k + 1), "markets": k + 1,
+         "min_publish_time": datetime(today.year, today.month, today.day, tzinfo=timezone.utc) - timedelta(days=k),
+         "max_publish_time": datetime(today.year, today.month, today.day, tzinfo=timezone.utc) - timedelta(days=k - 1, seconds=1)}
+        for k in range(5)
+    ]
+    executed = []
+
+    class _Cur:
+        def execute(self, sql, params=None):
+            executed.append(sql)
+            self._rows = [{"present": True}] if sql == stream_data._SQL_DAILY_STATS_PRESENT else rows
+
+        def fetchone(self):
+            return self._rows[0]
+
+        def fetchall(self):
+            return self._rows
+
+    class _Ctx:
+        def __enter__(self):
+            return _Cur()
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(stream_data, "cursor", lambda: _Ctx())
+    h = stream_data.get_data_horizon(include_days=True, days_limit=3)
+    assert executed == [stream_data._SQL_DAILY_STATS_PRESENT, stream_data._SQL_DAILY_STATS]
+    assert h["total_rows"] == 100 + 300 + 400 + 500
+    assert h["oldest_tick"] == rows[-1]["min_publish_time"].isoformat()
+    assert h["newest_tick"] == rows[0]["max_publish_time"].isoformat()
+    # Days without rows skipped, at most days_limit days back
+    assert [d["day"] for d in h["days"]] == [(today - timedelta(days=k)).isoformat() for k in (0, 2, 3)]
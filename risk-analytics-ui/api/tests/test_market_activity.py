@@ -0,0 +1,156 @@
+"""
+Market activity index: last update per market from the activity days plus bounded ladder_levels reads, markets with
+data on a date, and the worker pass (chunked watermark, retention pruning).
+"""
+import asyncio
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+
+from app import ladder_stats, market_activity, stream_data, stream_data_async
+from tests.fakes import FakeWriter
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+WATERMARK = NOW - timedelta(minutes=2)
+T0 = datetime(2026, 2, 14, tzinfo=timezone.utc)
+
+# Counted activity days (publish_time < WATERMARK) and ladder updates per market
+DAYS = {
+    "1.1": [(T0 - timedelta(days=1, hours=-20), T0 - timedelta(days=1, hours=-22)), (T0 + timedelta(hours=10), T0 + timedelta(hours=14))],
+    "1.2": [(T0 + timedelta(hours=9), T0 + timedelta(hours=9))],
+    "1.3": [(T0 + timedelta(hours=8), WATERMARK - timedelta(seconds=30))],
+}
+LADDER = {
+    "1.1": [T0 - timedelta(days=1, hours=-20), T0 - timedelta(days=1, hours=-22), T0 + timedelta(hours=10), T0 + timedelta(hours=12), T0 + timedelta(hours=14)],
+    "1.2": [T0 + timedelta(hours=9)],
+    "1.3": [T0 + timedelta(hours=8), WATERMARK - timedelta(seconds=30), WATERMARK + timedelta(seconds=10)],
+}
+
+
+def _answer(sql, params):
+    if sql == stream_data._SQL_ACTIVITY_DAY_AT_OR_BEFORE:
+        market_ids, t = params
+        rows = []
+        for mid in market_ids:
+            days = [d for d in DAYS.get(mid, []) if d[0] <= t]
+            if days:
+                rows.append({"market_id": mid, "first_publish_time": days[-1][0], "last_publish_time": days[-1][1]})
+        return rows
+    if sql == stream_data._SQL_LAST_PUBLISH_IN_RANGE:
+        market_ids, lo, hi = params
+        rows = []
+        for mid in market_ids:
+            ts = [pt for pt in LADDER.get(mid, []) if lo <= pt <= hi]
+            if ts:
+                rows.append({"market_id": mid, "t": max(ts)})
+        return rows
+    if sql == stream_data._SQL_ACTIVITY_MARKETS_ON_DAYS:
+        lo, hi = params
+        return [{"market_id": mid} for mid, days in DAYS.items() if any(lo <= d[0].date() < hi for d in days)]
+    if sql == stream_data._SQL_MARKETS_WITH_LADDER:
+        lo, hi = params
+        return [{"market_id": mid} for mid, ts in LADDER.items() if any(lo <= pt < hi for pt in ts)]
+    raise AssertionError("unexpected query: " + sql)
+
+
+class _Cur:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, sql, params=None):
+        self.executed.append((sql, params))
+        self._rows = _answer(sql, params)
+
+    def fetchall(self):
+        return self._rows
+
+
+def _expected(t):
+    out = {}
+    for mid, ts in LADDER.items():
+        before = [pt for pt in ts if pt <= t]
+        if before:
+            out[mid] = max(before)
+    return out
+
+
+def test_latest_publish_bounded_and_exact():
+    ids = ["1.1", "1.2", "1.3", "1.4"]
+    for t in (T0 + timedelta(hours=11), T0 + timedelta(hours=9), T0 - timedelta(hours=1), T0 + timedelta(hours=8, minutes=30)):
+        cur = _Cur()
+        assert stream_data._latest_publish_by_market(cur, ids, t, WATERMARK) == _expected(t)
+        assert len(cur.executed) <= 3
+    # Latest: the uncounted tail after the watermark wins
+    cur = _Cur()
+    latest = stream_data._latest_publish_by_market(cur, ids, None, WATERMARK)
+    assert latest == _expected(NOW + timedelta(days=1)) and latest["1.3"] == WATERMARK + timedelta(seconds=10)
+    assert [p[1] for s, p in cur.executed if s == stream_data._SQL_LAST_PUBLISH_IN_RANGE] == [WATERMARK]
+
+
+def test_async_latest_publish_matches_sync(monkeypatch):
+    async def fetchall(sql, params=()):
+        return _answer(sql, params)
+
+    monkeypatch.setattr(stream_data_async, "fetchall", fetchall)
+    for t in (None, T0 + timedelta(hours=11)):
+        got = asyncio.run(stream_data_async.latest_publish_by_market(["1.1", "1.2", "1.3"], t, WATERMARK))
+        assert got == stream_data._latest_publish_by_market(_Cur(), ["1.1", "1.2", "1.3"], t, WATERMARK)
+
+
+def test_markets_for_date_from_activity_days(monkeypatch):
+    cur = _Cur()
+
+    @contextmanager
+    def cursor():
+        yield cur
+
+    monkeypatch.setattr(stream_data, "cursor", cursor)
+    monkeypatch.setattr(stream_data, "_activity_probe", {"watermark": WATERMARK, "checked_at": float("inf")})
+    day = T0 - timedelta(days=1)
+    assert stream_data.get_stream_markets_with_ladder_for_date(day, day + timedelta(days=1)) == ["1.1"]
+    assert [s for s, _ in cur.executed] == [stream_data._SQL_ACTIVITY_MARKETS_ON_DAYS]
+    # Today: counted days plus the tail after the watermark; a partial range scans ladder_levels
+    today = datetime(NOW.year, NOW.month, NOW.day, tzinfo=timezone.utc)
+    stream_data.get_stream_markets_with_ladder_for_date(today, today + timedelta(days=1))
+    assert cur.executed[-1] == (stream_data._SQL_MARKETS_WITH_LADDER, (WATERMARK, today + timedelta(days=1)))
+    stream_data.get_stream_markets_with_ladder_for_date(T0 + timedelta(hours=9), T0 + timedelta(hours=10))
+    assert cur.executed[-1] == (stream_data._SQL_MARKETS_WITH_LADDER, (T0 + timedelta(hours=9), T0 + timedelta(hours=10)))
+
+
+def _writer(watermark, prunable=False, legacy_oldest=None):
+    """FakeWriter with the watermark, prunable days and (optionally) legacy history of one scenario."""
+    return FakeWriter({
+        ladder_stats._SQL_PARTITIONS: [{"relname": "ladder_levels_20260212"}, {"relname": "ladder_levels_20260214"}],
+        ladder_stats._SQL_LEGACY_PRESENT: [{"present": legacy_oldest is not None}],
+        market_activity._SQL_LEGACY_OLDEST: [{"t": legacy_oldest}],
+        market_activity._SQL_HAS_PRUNABLE: [{"prunable": prunable}],
+        market_activity._SQL_WATERMARK: [{"counted_until": watermark}] if watermark else [],
+    })
+
+
+def test_refresh_advances_in_chunks(monkeypatch):
+    monkeypatch.setattr(market_activity, "MAX_CHUNKS_PER_CYCLE", 3)
+    now = T0 + timedelta(hours=12)
+    upper = now - timedelta(seconds=market_activity.GRACE_SECONDS)
+    # First run: from the oldest partition, capped per cycle
+    cur = _writer(None)
+    result = market_activity.refresh(cur, now)
+    start = datetime(2026, 2, 12, tzinfo=timezone.utc)
+    assert result == {"chunks": 3, "pruned": False, "counted_until": start + timedelta(hours=3)}
+    assert [(p["lo"], p["hi"]) for p in cur.calls(market_activity._SQL_ADD_CHUNK)] == [
+        (start + timedelta(hours=k), start + timedelta(hours=k + 1)) for k in range(3)
+    ]
+    assert cur.calls(market_activity._SQL_SET_WATERMARK)[-1]["hi"] == start + timedelta(hours=3)
+    # Last level-0 price per selection and side, upserted in the same transaction as each chunk's counts
+    assert cur.calls(market_activity._SQL_ADD_PRICES) == cur.calls(market_activity._SQL_ADD_CHUNK)
+    assert "level = 0" in market_activity._SQL_ADD_PRICES and "WHERE p.publish_time <= EXCLUDED.publish_time" in market_activity._SQL_ADD_PRICES
+    assert cur.commits == 3
+    # Caught up: one short chunk up to now - grace; pruning of dropped days
+    cur = _writer(upper - timedelta(minutes=1), prunable=True)
+    assert market_activity.refresh(cur, now) == {"chunks": 1, "pruned": True, "counted_until": upper}
+    assert cur.calls(market_activity._SQL_PRUNE) == [{"day": date(2026, 2, 12), "start": start}]
+    assert cur.commits == 2
+    # History before daily partitioning: first run starts at its oldest row, nothing is pruned
+    cur = _writer(None, prunable=True, legacy_oldest=T0 - timedelta(days=30, minutes=-7))
+    market_activity.refresh(cur, now)
+    assert cur.calls(market_activity._SQL_ADD_CHUNK)[0]["lo"] == T0 - timedelta(days=30, minutes=-7)
+    assert not cur.calls(market_activity._SQL_HAS_PRUNABLE) and not cur.calls(market_activity._SQL_PRUNE)
@@ -0,0 +1,75 @@
+"""
+Served calculation_version selection (metric_versions). Pointer state is set directly; no DB used.
+"""
+import sqlite3
+import time
+
+import pytest
+
+from app import metric_versions as mv
+
+
+@pytest.fixture
+def pointer_state():
+    saved = dict(mv._state)
+    mv._state.update(served="v1", ready={"v2"}, built_through={}, latest_table=False, loaded_at=time.monotonic())
+    yield mv._state
+    mv._state.clear()
+    mv._state.update(saved)
+
+
+def test_baseline_serves_in_place_table(pointer_state):
+    assert mv.derived_metrics_source() == "market_derived_metrics"
+    assert mv.derived_metrics_source("v1") == "market_derived_metrics"
+
+
+def test_requested_ready_version_uses_partition(pointer_state):
+    src = mv.derived_metrics_source("V2")
+    assert src == "(SELECT * FROM market_derived_metrics_versions WHERE calculation_version = 'v2')"
+
+
+def test_pointer_flip_changes_default(pointer_state):
+    pointer_state["served"] = "v2"
+    assert "calculation_version = 'v2'" in mv.derived_metrics_source()
+
+
+def test_served_version_keeps_newer_v1_rows(pointer_state):
+    pointer_state.update(served="v2", built_through={"v2": 9000})
+    src = mv.derived_metrics_source()
+    recomputed, tail = src.split(" UNION ALL ")
+    assert recomputed.startswith("(SELECT calculation_version, snapshot_id,") and "calculation_version = 'v2'" in recomputed
+    # Snapshots the daemon wrote after the last run still come through, with the same columns
+    assert tail.endswith("FROM market_derived_metrics WHERE snapshot_id > 9000)")
+    assert recomputed.split(" FROM ")[0][1:] == tail.split(" FROM ")[0]
+    assert "snapshot_id > 9000" in mv.latest_metrics_source()
+    # Executed (the FROM-item is plain SQL): v2 rows up to the built range, then the newer v1 row
+    db = sqlite3.connect(":memory:")
+    for table in ("market_derived_metrics_versions", "market_derived_metrics"):
+        db.execute("CREATE TABLE %s (%s)" % (table, ", ".join(mv.VERSION_TABLE_COLUMNS)))
+    db.execute("INSERT INTO market_derived_metrics_versions (calculation_version, snapshot_id, market_id) VALUES ('v2', 9000, '1.1')")
+    db.executemany(
+        "INSERT INTO market_derived_metrics (calculation_version, snapshot_id, market_id) VALUES ('v1', ?, '1.1')",
+        [(9000,), (9001,)],
+    )
+    rows = db.execute("SELECT d.calculation_version, d.snapshot_id FROM %s d ORDER BY d.snapshot_id" % src).fetchall()
+    assert rows == [("v2", 9000), ("v1", 9001)]
+
+
+def test_unknown_or_malformed_version_rejected(pointer_state):
+    with pytest.raises(mv.UnknownVersionError):
+        mv.derived_metrics_source("v9")
+    with pytest.raises(mv.UnknownVersionError):
+        mv.derived_metrics_source("v2'; drop table x; --")
+
+
+def test_latest_source_uses_latest_table_for_baseline(pointer_state, monkeypatch):
+    assert mv.latest_metrics_source().startswith("(SELECT DISTINCT ON (d.market_id) d.market_id, d.snapshot_id")
+    pointer_state["latest_table"] = True
+    assert mv.latest_metrics_source() == "market_latest_metrics"
+    # Recomputed versions are not mirrored
+    src = mv.latest_metrics_source("v2")
+    assert "DISTINCT ON" in src and "calculation_version = 'v2'" in src
+    monkeypatch.setattr(mv, "LATEST_METRICS_READ", False)
+    assert "FROM market_derived_metrics d" in mv.latest_metrics_source("v1")
+    with pytest.raises(mv.UnknownVersionError):
+        mv.latest_metrics_source("v9")
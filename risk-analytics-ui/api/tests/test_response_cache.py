@@ -0,0 +1,147 @@
+"""
+Stream response cache: LRU bound and counters, expiry / validator invalidation, purge, per-endpoint policies,
+and the router serving closed windows without recomputing.
+"""
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from starlette.requests import Request
+
+from app import fast_json, response_cache, stream_router
+from app.response_cache import ResponseCache
+
+NOW = datetime(2026, 2, 14, 12, 7, tzinfo=timezone.utc)
+Q = timedelta(minutes=15)
+
+
+def test_lru_eviction_and_counters():
+    cache = ResponseCache(max_entries=2)
+    cache.put("buckets", "a", 1, None)
+    cache.put("buckets", "b", 2, None)
+    assert cache.get("buckets", "a") == (True, 1)  # a is now most recent
+    cache.put("timeseries", "c", 3, None)
+    assert cache.get("buckets", "b") == (False, None)
+    assert cache.get("buckets", "a") == (True, 1) and cache.get("timeseries", "c") == (True, 3)
+    assert cache.stats()["endpoints"] == {
+        "buckets": {"hits": 2, "misses": 1, "evictions": 1},
+        "timeseries": {"hits": 1, "misses": 0, "evictions": 0},
+    }
+
+
+def test_expiry_and_validator_invalidate():
+    cache = ResponseCache(max_entries=8)
+    cache.put("buckets", "k", "v", NOW + Q, validator=NOW - timedelta(seconds=5))
+    assert cache.get("buckets", "k", NOW - timedelta(seconds=5), now=NOW) == (True, "v")
+    assert cache.get("buckets", "k", NOW - timedelta(seconds=5), now=NOW + Q) == (False, None)
+    cache.put("buckets", "k", "v", NOW + Q, validator=None)
+    assert cache.get("buckets", "k", NOW, now=NOW) == (False, None)  # newer publish_time seen
+    assert cache.stats()["entries"] == 0
+
+
+def test_purge_by_endpoint_and_market():
+    cache = ResponseCache(max_entries=8)
+    cache.put("buckets", ("1.1", 1), 1, None, market_id="1.1")
+    cache.put("timeseries", ("1.1", 1), 2, None, market_id="1.1")
+    cache.put("buckets", ("1.2", 1), 3, None, market_id="1.2")
+    cache.put("by_date_snapshots", "2026-02-14", 4, None)
+    assert cache.purge(market_id="1.1") == 2
+    assert cache.purge(endpoint="by_date_snapshots") == 1
+    assert cache.purge() == 1 and cache.stats()["entries"] == 0
+    ResponseCache(max_entries=0).put("buckets", "k", 1, None)  # disabled: no-op
+
+
+def test_policies():
+    current = datetime(2026, 2, 14, 12, 0, tzinfo=timezone.utc)
+    closed = [current - 2 * Q, current - Q]
+    assert response_cache.buckets_policy("1.1", closed, NOW) == (None, None, ())
+    expires_at, sql, params = response_cache.buckets_policy("1.1", closed + [current], NOW)
+    assert expires_at == current + Q and sql == response_cache.SQL_MARKET_PUBLISHED_SINCE and params == ("1.1", current)
+    # Just closed, still inside the late-tick grace
+    grace = timedelta(seconds=response_cache.GRACE_SECONDS)
+    assert response_cache.buckets_policy("1.1", closed, current + grace / 2)[0] == current + grace
+    # Timeseries is final only past the staleness horizon
+    assert response_cache.timeseries_policy("1.1", closed, NOW)[1] is not None
+    assert response_cache.timeseries_policy("1.1", [current - timedelta(hours=3)], NOW) == (None, None, ())
+    assert response_cache.by_date_policy("2026-02-12", NOW) == (None, None, ())
+    assert response_cache.by_date_policy("2026-02-14", NOW)[0] == current + Q
+    # Yesterday settles PAST_DATE_SETTLE_HOURS (12) after midnight
+    assert response_cache.by_date_policy("2026-02-13", NOW - timedelta(hours=1))[1] == response_cache.SQL_STREAM_PUBLISHED_SINCE
+    assert response_cache.by_date_policy("2026-02-13", NOW) == (None, None, ())
+
+
+@pytest.fixture
+def router(monkeypatch):
+    cache = ResponseCache(max_entries=16)
+    monkeypatch.setattr(stream_router, "stream_cache", cache)
+    calls = {"compute": 0, "validator": 0}
+    latest = {"t": NOW}
+
+    async def fake_bulk(market_id, from_dt, to_dt):
+        calls["compute"] += 1
+        return [{"bucket_start": bt.isoformat()} for bt in stream_router._bucket_times_in_range(from_dt, to_dt)], 3
+
+    async def fake_fetchone(sql, params):
+        calls["validator"] += 1
+        return {"t": latest["t"]}
+
+    monkeypatch.setattr(stream_router.stream_data_async, "get_event_buckets_stream_bulk", fake_bulk)
+    monkeypatch.setattr(stream_router, "fetchone", fake_fetchone)
+    return calls, latest
+
+
+def _request(**headers):
+    raw = [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def _buckets_response(from_ts, to_ts, request=None):
+    return asyncio.run(stream_router.stream_event_buckets(
+        "1.1", request, from_ts=from_ts, to_ts=to_ts, event_aware=False, layout=None, float32=False, accept=None,
+    ))
+
+
+def _buckets(from_ts, to_ts):
+    return json.loads(_buckets_response(from_ts, to_ts).body)
+
+
+def test_closed_window_served_from_cache_without_queries(router):
+    calls, _ = router
+    first = _buckets("2026-02-13T10:00:00Z", "2026-02-13T13:00:00Z")
+    # Same bucket window (to_ts inside the last bucket): same entry
+    assert _buckets("2026-02-13T10:00:00Z", "2026-02-13T12:50:00Z") == first and len(first) == 12
+    assert calls == {"compute": 1, "validator": 0}
+
+
+def test_live_window_revalidated_on_newer_publish_time(router):
+    calls, latest = router
+    now = datetime.now(timezone.utc)
+    from_ts = (now - timedelta(hours=1)).isoformat()
+    _buckets(from_ts, None)
+    _buckets(from_ts, None)
+    assert calls == {"compute": 1, "validator": 2}
+    latest["t"] = NOW + timedelta(seconds=1)
+    _buckets(from_ts, None)
+    assert calls == {"compute": 2, "validator": 3}
+
+
+def test_cached_body_rendered_once_with_etag(router, monkeypatch, caplog):
+    renders, encodes = [], []
+    render, dumps = fast_json.render, fast_json.dumps
+    monkeypatch.setattr(fast_json, "render", lambda *a, **kw: renders.append(1) or render(*a, **kw))
+    monkeypatch.setattr(fast_json, "dumps", lambda *a, **kw: encodes.append(1) or dumps(*a, **kw))
+    window = ("2026-02-13T10:00:00Z", "2026-02-13T13:00:00Z")
+    with caplog.at_level("INFO", logger=stream_router.logger.name):
+        first = _buckets_response(*window, _request(accept_encoding="gzip, br"))
+    assert first.status_code == 200 and first.headers["content-encoding"] == "gzip"
+    # The miss is logged with the size of the body sent; buckets are encoded once, for the response
+    assert "payload_bytes=%d" % len(first.body) in caplog.text and len(encodes) == 1
+    assert json.loads(gzip.decompress(first.body)) == _buckets(*window)
+    etag = first.headers["etag"]
+    # Repeat poll: same stored body, 304 when the client already has it
+    assert _buckets_response(*window, _request(if_none_match=etag)).status_code == 304
+    assert _buckets_response(*window, _request(if_none_match='"other", ' + etag[2:])).status_code == 304
+    assert _buckets_response(*window, _request(if_none_match='W/"other"')).status_code == 200
+    assert len(renders) == 1
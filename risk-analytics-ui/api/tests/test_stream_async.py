@@ -0,0 +1,147 @@
+"""
+Async stream reads: same results as the sync functions on the same rows, with independent queries run concurrently.
+"""
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from app import stream_data, stream_data_async
+
+HOME, AWAY, DRAW = 1001, 1002, 1003
+WINDOW = stream_data._rest_driven_window("2026-02-14")
+BUCKET = WINDOW["latest_bucket"]
+
+
+def _rows():
+    market_ids = ["1.1", "1.2", "1.3"]  # 1.3 has no stream data
+    meta = [
+        {"market_id": mid, "event_id": "e" + mid, "event_name": "A v B", "event_open_date": BUCKET, "competition_name": "L",
+         "country_code": "GB", "competition_id": 7, "market_name": "Match Odds",
+         "home_selection_id": HOME, "away_selection_id": AWAY, "draw_selection_id": DRAW}
+        for mid in market_ids
+    ]
+    ticks, levels, ladder_window = [], [], []
+    for i, mid in enumerate(market_ids[:2]):
+        for sid, price in ((HOME, 2.0 + i / 10), (AWAY, 3.6), (DRAW, 3.3)):
+            ticks.append({"market_id": mid, "selection_id": sid, "publish_time": BUCKET - timedelta(seconds=20), "price": price, "size": 90.0})
+            ticks.append({"market_id": mid, "selection_id": sid, "publish_time": BUCKET + timedelta(seconds=200), "price": price + 0.02, "size": 60.0})
+            levels.append({"market_id": mid, "selection_id": sid, "side": "B", "level": 0, "price": price, "size": 90.0})
+            levels.append({"market_id": mid, "selection_id": sid, "side": "L", "level": 0, "price": price + 0.02, "size": 40.0})
+            for k in range(4):
+                ladder_window.append({"publish_time": BUCKET - timedelta(minutes=50 - 13 * k), "selection_id": sid, "price": price + k / 50, "size": 50.0 + k})
+    routes = {
+        stream_data._SQL_REST_DRIVEN_PRIMARY: [
+            {"market_id": mid, "event_id": "e" + mid, "market_type": "MATCH_ODDS_FT", "market_name": "Match Odds",
+             "rest_total_matched": 500.0, "re_event_name": "A v B", "home_team": "A", "away_team": "B",
+             "event_open_date": BUCKET, "competition_name": "L"}
+            for mid in market_ids
+        ],
+        stream_data._SQL_REST_DRIVEN_META: meta,
+        stream_data._SQL_KEYFRAMES_PRESENT: {"present": True},
+        stream_data._SQL_KEYFRAMES_RANGE: {
+            "interval_minutes": 5, "built_from": BUCKET - timedelta(days=1), "built_until": BUCKET,
+        },
+        stream_data._SQL_LADDER_STATE_FROM_KEYFRAME: levels,
+        stream_data._SQL_ACTIVITY_PRESENT: {"present": True},
+        stream_data._SQL_ACTIVITY_WATERMARK: {"counted_until": datetime.now(timezone.utc) - timedelta(minutes=1)},
+        stream_data._SQL_ACTIVITY_DAY_AT_OR_BEFORE: [
+            {"market_id": mid, "first_publish_time": BUCKET - timedelta(minutes=50), "last_publish_time": BUCKET}
+            for mid in market_ids[:2]
+        ],
+        stream_data._SQL_LAST_PUBLISH_IN_RANGE: [],  # nothing after the watermark
+        stream_data._SQL_REST_DRIVEN_LIQUIDITY: [{"market_id": "1.3", "total_matched": 77.0}],
+        stream_data._SQL_BUCKETS_META: meta[0],
+        stream_data._SQL_BUCKETS_BACK_L0: ladder_window,
+        stream_data._SQL_BUCKETS_LIQUIDITY: [{"publish_time": BUCKET - timedelta(minutes=40), "total_matched": 1234.0}],
+        stream_data._SQL_MARKET_SELECTIONS: meta[0],
+        stream_data._SQL_LATEST_PUBLISH_BEFORE: {"t": datetime.now(timezone.utc)},
+        stream_data._SQL_STORED_BUCKETS_PRESENT: {"present": False},
+    }
+    partial = [
+        ("UNION ALL", ticks),
+        ("DISTINCT ON (market_id) market_id, total_matched", [{"market_id": "1.1", "total_matched": 900.0}]),
+    ]
+    return routes, partial
+
+
+def _answer(sql):
+    routes, partial = _rows()
+    if sql in routes:
+        return routes[sql]
+    return next(rows for key, rows in partial if key in sql)
+
+
+class _Cur:
+    def execute(self, sql, params=None):
+        self._rows = _answer(sql)
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if isinstance(self._rows, list) else self._rows
+
+
+@contextmanager
+def _cursor():
+    yield _Cur()
+
+
+class AsyncFetch:
+    """Fake db_async.fetchall/fetchone that yields to the loop and records peak concurrency."""
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+
+    async def _run(self, sql):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        await asyncio.sleep(0.001)
+        self.active -= 1
+        return _answer(sql)
+
+    async def fetchall(self, sql, params=()):
+        return await self._run(sql)
+
+    async def fetchone(self, sql, params=()):
+        rows = await self._run(sql)
+        return rows[0] if isinstance(rows, list) else rows
+
+
+def _patch(monkeypatch):
+    fake = AsyncFetch()
+    monkeypatch.setattr(stream_data, "cursor", _cursor)
+    monkeypatch.setattr(stream_data, "MARKET_ACTIVITY_READ", True)
+    monkeypatch.setattr(stream_data, "_activity_probe", {"watermark": None, "checked_at": None})
+    monkeypatch.setattr(stream_data, "LADDER_KEYFRAME_READ", True)
+    monkeypatch.setattr(stream_data, "_keyframe_probe", dict(stream_data._keyframe_probe, checked_at=None))
+    monkeypatch.setattr(stream_data, "_stored_buckets_probe", {"present": False, "checked_at": None})
+    monkeypatch.setattr(stream_data_async, "fetchall", fake.fetchall)
+    monkeypatch.setattr(stream_data_async, "fetchone", fake.fetchone)
+    return fake
+
+
+def test_async_by_date_matches_sync(monkeypatch):
+    fake = _patch(monkeypatch)
+    sync = stream_data.get_events_by_date_rest_driven("2026-02-14")
+    stream_data._activity_probe["checked_at"] = stream_data._keyframe_probe["checked_at"] = None  # async probes too
+    got = asyncio.run(stream_data_async.get_events_by_date_rest_driven("2026-02-14"))
+    assert got == sync
+    assert [e["market_id"] for e in got] == ["1.1", "1.2", "1.3"]
+    assert got[0]["home_update_count"] == 1 and got[0]["total_volume"] == 900.0
+    assert got[2]["total_volume"] == 77.0  # liquidity fallback without ladder
+    assert fake.peak == 3
+
+
+def test_async_buckets_and_timeseries_match_sync(monkeypatch):
+    fake = _patch(monkeypatch)
+    from_dt, to_dt = BUCKET - timedelta(minutes=45), BUCKET
+    sync_buckets, _ = stream_data.get_event_buckets_stream_bulk("1.1", from_dt, to_dt)
+    buckets, db_count = asyncio.run(stream_data_async.get_event_buckets_stream_bulk("1.1", from_dt, to_dt))
+    assert buckets == sync_buckets and len(buckets) == 3 and db_count == 3
+    assert fake.peak == 3  # metadata, ladder and liquidity together
+
+    sync_points = stream_data.get_event_timeseries_stream("1.1", from_dt, to_dt + timedelta(minutes=15), 15)
+    points = asyncio.run(stream_data_async.get_event_timeseries_stream("1.1", from_dt, to_dt + timedelta(minutes=15)))
+    assert points == sync_points and len(points) == 4
@@ -0,0 +1,182 @@
+"""
+Bulk stream enrichment: constant query count and the same medians / ladder values as the per-market helpers.
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import stream_data
+from app.stream_data import _bulk_bucket_enrichment, _compute_median_from_rows
+
+BUCKET = datetime(2026, 2, 14, 18, 0, tzinfo=timezone.utc)
+END = BUCKET + timedelta(minutes=15)
+HOME, AWAY, DRAW = 1001, 1002, 1003
+
+
+@pytest.fixture(autouse=True)
+def _probes_due(monkeypatch):
+    """Keyframe and market activity reads on, with their probes due (the fakes answer PROBES)."""
+    monkeypatch.setattr(stream_data, "LADDER_KEYFRAME_READ", True)
+    monkeypatch.setattr(stream_data, "MARKET_ACTIVITY_READ", True)
+    _reset_probes(monkeypatch)
+
+
+def _reset_probes(monkeypatch):
+    monkeypatch.setattr(stream_data, "_keyframe_probe", dict(stream_data._keyframe_probe, checked_at=None))
+    monkeypatch.setattr(stream_data, "_activity_probe", {"watermark": None, "checked_at": None})
+
+
+# Keyframes built around BUCKET; market activity counted up to a minute ago
+PROBES = {
+    stream_data._SQL_KEYFRAMES_PRESENT: [{"present": True}],
+    stream_data._SQL_KEYFRAMES_RANGE: [
+        {"interval_minutes": 5, "built_from": BUCKET - timedelta(days=1), "built_until": BUCKET + timedelta(hours=1)}
+    ],
+    stream_data._SQL_ACTIVITY_PRESENT: [{"present": True}],
+    stream_data._SQL_ACTIVITY_WATERMARK: [{"counted_until": datetime.now(timezone.utc) - timedelta(minutes=1)}],
+}
+
+
+class FakeCursor:
+    """Returns canned result sets in execute order (PROBES answered by statement) and records the statements."""
+
+    def __init__(self, results):
+        self._results = list(results)
+        self.statements = []
+        self._current = []
+
+    def execute(self, sql, params=None):
+        self.statements.append((sql, params))
+        self._current = PROBES[sql] if sql in PROBES else self._results.pop(0)
+
+    def fetchall(self):
+        return self._current
+
+    def fetchone(self):
+        return self._current[0] if self._current else None
+
+
+def _tick(market_id, sid, seconds, price, size):
+    return {"market_id": market_id, "selection_id": sid, "publish_time": BUCKET + timedelta(seconds=seconds), "price": price, "size": size}
+
+
+def _level(market_id, sid, side, level, price, size):
+    return {"market_id": market_id, "selection_id": sid, "side": side, "level": level, "price": price, "size": size}
+
+
+def _results(market_ids):
+    ticks, levels, volumes = [], [], []
+    for i, mid in enumerate(market_ids):
+        for sid, price in ((HOME, 2.0 + i * 0.1), (AWAY, 3.5), (DRAW, 3.4)):
+            ticks.append(_tick(mid, sid, -30, price, 100.0))
+            ticks.append(_tick(mid, sid, 300, price + 0.02, 150.0))
+            levels.append(_level(mid, sid, "B", 0, price, 100.0))
+            levels.append(_level(mid, sid, "L", 0, price + 0.02, 80.0))
+        volumes.append({"market_id": mid, "total_matched": 1000.0 + i})
+    return [ticks, levels, volumes]
+
+
+def test_bulk_enrichment_uses_three_queries_for_any_market_count(monkeypatch):
+    for n in (1, 25):
+        market_ids = ["1.%d" % i for i in range(n)]
+        _reset_probes(monkeypatch)
+        cur = FakeCursor(_results(market_ids))
+        out = _bulk_bucket_enrichment(cur, {mid: (HOME, AWAY, DRAW) for mid in market_ids}, BUCKET, END)
+        assert len(cur.statements) == stream_data.KEYFRAME_PROBE_QUERIES + 3
+        assert stream_data._SQL_LADDER_STATE_FROM_KEYFRAME in [sql for sql, _ in cur.statements]
+        assert set(out) == set(market_ids)
+        # Probe cached: the next bucket runs the 3 queries only
+        cur = FakeCursor(_results(market_ids))
+        _bulk_bucket_enrichment(cur, {mid: (HOME, AWAY, DRAW) for mid in market_ids}, BUCKET, END)
+        assert len(cur.statements) == 3
+
+
+def test_bulk_enrichment_matches_per_market_medians_and_ladder():
+    cur = FakeCursor(_results(["1.0", "1.1"]))
+    out = _bulk_bucket_enrichment(cur, {"1.0": (HOME, AWAY, DRAW), "1.1": (HOME, AWAY, None)}, BUCKET, END)
+    rows = [(BUCKET + timedelta(seconds=-30), 2.1, 100.0), (BUCKET + timedelta(seconds=300), 2.12, 150.0)]
+    odds, size, covered, updates = _compute_median_from_rows(rows, BUCKET, END)
+    m = out["1.1"]
+    assert (m["home_back_odds_median"], m["home_back_size_median"]) == (odds, size)
+    assert (m["home_seconds_covered"], m["home_update_count"]) == (covered, updates) == (900.0, 1)
+    assert m["home_best_back"] == 2.1 and m["home_best_lay"] == 2.12
+    assert m["draw_back_odds_median"] is None and m["book_risk"] is None  # no draw selection -> no risk
+    assert m["draw_best_back"] is None  # draw ladder present but no draw role
+    assert m["total_volume"] == 1001.0
+    assert out["1.0"]["book_risk"] is not None and out["1.0"]["impedance"] is not None
+
+
+def test_bulk_enrichment_without_markets_runs_no_queries():
+    cur = FakeCursor([])
+    assert _bulk_bucket_enrichment(cur, {}, BUCKET, END) == {}
+    assert cur.statements == []
+
+
+class RoutingDB:
+    """Fake app.db.cursor(): answers by statement content and records statements and counts connections."""
+
+    def __init__(self, market_ids, stale=()):
+        self.market_ids = market_ids
+        self.stale = set(stale)
+        self.statements = []
+        self.connections = 0
+        ticks, levels, volumes = _results(market_ids)
+        last = {mid: BUCKET - timedelta(hours=5 if mid in self.stale else 0) for mid in market_ids}
+        self._routes = [
+            *PROBES.items(),
+            ("SELECT DISTINCT market_id", [{"market_id": mid} for mid in market_ids]),
+            ("FROM market_event_metadata", [
+                {"market_id": mid, "event_id": mid, "event_name": "A v B", "event_open_date": BUCKET, "competition_name": "L",
+                 "home_selection_id": HOME, "away_selection_id": AWAY, "draw_selection_id": DRAW}
+                for mid in market_ids
+            ]),
+            ("MAX(publish_time) AS t", [{"market_id": mid, "t": t} for mid, t in last.items()]),
+            ("DISTINCT ON (market_id, selection_id, side, level)", levels),  # before UNION ALL: keyframe ladder query
+            ("UNION ALL", ticks),
+            ("market_liquidity_history", volumes),
+        ]
+
+    @contextmanager
+    def cursor(self):
+        self.connections += 1
+        db = self
+
+        class _Cur(FakeCursor):
+            def execute(self, sql, params=None):
+                db.statements.append(sql)
+                self._current = next(rows for key, rows in db._routes if key in sql)
+
+        yield _Cur([])
+
+
+def test_snapshots_stream_query_budget_and_staleness(monkeypatch):
+    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")  # the day runs past the watermark: counted days + tail
+    for n in (2, 40):
+        market_ids = ["1.%d" % i for i in range(n)]
+        db = RoutingDB(market_ids, stale={"1.0"})
+        _reset_probes(monkeypatch)
+        monkeypatch.setattr(stream_data, "cursor", db.cursor)
+        monkeypatch.setattr(stream_data, "_bucket_times_in_range", lambda a, b: [BUCKET])
+        out = stream_data.get_events_by_date_snapshots_stream(today)
+        assert len(db.statements) <= stream_data.SNAPSHOTS_STREAM_QUERY_BUDGET
+        assert stream_data._SQL_ACTIVITY_WATERMARK in db.statements
+        assert stream_data._SQL_ACTIVITY_MARKETS_ON_DAYS in db.statements
+        assert stream_data._SQL_MARKETS_WITH_LADDER in db.statements
+        assert stream_data._SQL_KEYFRAMES_RANGE in db.statements
+        assert db.connections <= 2
+        assert [e["market_id"] for e in out] == market_ids[1:]  # stale market excluded
+        assert out[0]["home_update_count"] == 1 and out[0]["total_volume"] is not None
+
+
+def test_league_events_query_budget(monkeypatch):
+    for n in (1, 40):
+        market_ids = ["1.%d" % i for i in range(n)]
+        db = RoutingDB(market_ids)
+        _reset_probes(monkeypatch)
+        monkeypatch.setattr(stream_data, "cursor", db.cursor)
+        out = stream_data.get_league_events_stream("L", BUCKET, END, limit=100, offset=0)
+        assert len(db.statements) <= stream_data.LEAGUE_EVENTS_QUERY_BUDGET
+        assert stream_data._SQL_KEYFRAMES_RANGE in db.statements
+        assert db.connections == 1
+        assert len(out) == n and out[-1]["home_book_risk_l3"] is not None
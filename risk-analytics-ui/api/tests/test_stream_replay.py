@@ -0,0 +1,127 @@
+"""
+Multi-timestamp replay: keyframe plus deltas streamed as NDJSON, reproducing the ladder at every frame time.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app import stream_data_async, stream_router
+
+T0 = datetime(2026, 2, 14, 15, tzinfo=timezone.utc)
+HOME, AWAY = 1001, 1002
+
+# Ladder rows of the market (publish_time, selection, side, level, price, size)
+LADDER = [
+    (T0 - timedelta(minutes=20), HOME, "B", 0, 2.0, 100.0),
+    (T0 - timedelta(minutes=20), HOME, "B", 1, 1.98, 50.0),
+    (T0 - timedelta(minutes=20), AWAY, "L", 0, 3.6, 80.0),
+    (T0 + timedelta(seconds=30), HOME, "B", 0, 2.02, 90.0),
+    (T0 + timedelta(seconds=45), HOME, "B", 0, 2.02, 95.0),
+    (T0 + timedelta(seconds=90), AWAY, "L", 0, 3.6, 80.0),  # same value: no delta
+    (T0 + timedelta(minutes=5), AWAY, "B", 2, 3.4, 10.0),
+    (T0 + timedelta(hours=2), HOME, "B", 1, 1.96, 70.0),
+]
+LIQUIDITY = [(T0 - timedelta(minutes=1), 1000.0), (T0 + timedelta(seconds=100), 1500.0)]
+
+
+def _row(r):
+    return {"publish_time": r[0], "selection_id": r[1], "side": r[2], "level": r[3], "price": r[4], "size": r[5]}
+
+
+def _state(t):
+    out = {}
+    for r in sorted(LADDER, key=lambda r: r[0]):
+        if r[0] <= t:
+            out[(r[1], r[2], r[3])] = (r[4], r[5])
+    return out
+
+
+def _patch(monkeypatch):
+    queries = []
+
+    async def ladder_state_rows(market_ids, t):
+        queries.append(("state", t))
+        return [{"selection_id": k[0], "side": k[1], "level": k[2], "price": v[0], "size": v[1]} for k, v in _state(t).items()]
+
+    async def activity_watermark():
+        return None
+
+    async def fetchone(sql, params=()):
+        t = params[-1]
+        if sql == stream_router._SQL_REPLAY_LIQUIDITY_AT:
+            liq = [v for pt, v in LIQUIDITY if pt <= t]
+            return {"total_matched": liq[-1]} if liq else None
+        if sql == stream_router._SQL_REPLAY_SNAPSHOT_TIME_AT:
+            pts = [r[0] for r in LADDER if r[0] <= t]
+            return {"publish_time": max(pts)} if pts else None
+        raise AssertionError(sql)
+
+    async def fetchall(sql, params=()):
+        _, lo, hi = params
+        queries.append(("rows", lo, hi))
+        if sql == stream_router._SQL_REPLAY_LADDER_BETWEEN:
+            return [_row(r) for r in sorted(LADDER, key=lambda r: r[0]) if lo < r[0] <= hi]
+        if sql == stream_router._SQL_REPLAY_LIQUIDITY_BETWEEN:
+            return [{"publish_time": pt, "total_matched": v} for pt, v in LIQUIDITY if lo < pt <= hi]
+        raise AssertionError(sql)
+
+    monkeypatch.setattr(stream_data_async, "ladder_state_rows", ladder_state_rows)
+    monkeypatch.setattr(stream_data_async, "activity_watermark", activity_watermark)
+    monkeypatch.setattr(stream_router, "fetchone", fetchone)
+    monkeypatch.setattr(stream_router, "fetchall", fetchall)
+    return queries
+
+
+def _replay(**kwargs):
+    async def run():
+        params = {"from_ts": None, "to_ts": None, "step_seconds": 60, "at": None}
+        params.update(kwargs)
+        response = await stream_router.stream_event_replay("1.1", **params)
+        assert response.media_type == "application/x-ndjson"
+        body = "".join([chunk async for chunk in response.body_iterator])
+        return [json.loads(line) for line in body.splitlines()]
+
+    return asyncio.run(run())
+
+
+def test_replay_deltas_rebuild_every_frame(monkeypatch):
+    queries = _patch(monkeypatch)
+    times = [T0 + timedelta(seconds=15 * i) for i in range(25)] + [T0 + timedelta(hours=3)]
+    frames = _replay(at=[",".join(t.isoformat() for t in times[:10]), *(t.isoformat() for t in times[10:])])
+    assert len(frames) == len(times)
+    assert frames[0]["type"] == "keyframe" and frames[0]["columns"] == stream_router.REPLAY_LEVEL_COLUMNS
+    levels, total_matched, snapshot_time = {}, None, None
+    for t, frame in zip(times, frames):
+        assert frame["t"] == t.isoformat()
+        for sid, side, level, price, size in frame["levels"]:
+            levels[(sid, side, level)] = (price, size)
+        total_matched = frame.get("total_matched", total_matched)
+        snapshot_time = frame.get("snapshot_time", snapshot_time)
+        assert levels == _state(t)
+        assert total_matched == [v for pt, v in LIQUIDITY if pt <= t][-1]
+        assert snapshot_time == max(r[0] for r in LADDER if r[0] <= t).isoformat()
+    # Only changed levels are sent: the unchanged AWAY update and quiet frames are empty
+    by_t = {f["t"]: f for f in frames}
+    assert by_t[(T0 + timedelta(seconds=90)).isoformat()]["levels"] == []
+    assert "total_matched" not in by_t[(T0 + timedelta(seconds=15)).isoformat()]
+    # One ladder reconstruction for the dense frames, one for the sparse frame 3h later; rows read once per window
+    assert [q for q in queries if q[0] == "state"] == [("state", times[0]), ("state", times[-1])]
+    assert ("rows", times[0], times[24]) in queries
+
+
+def test_replay_range_and_errors(monkeypatch):
+    _patch(monkeypatch)
+    frames = _replay(from_ts=T0.isoformat(), to_ts=(T0 + timedelta(minutes=10)).isoformat(), step_seconds=120)
+    assert [f["t"] for f in frames] == [(T0 + timedelta(minutes=2 * i)).isoformat() for i in range(6)]
+    with pytest.raises(HTTPException) as e:
+        _replay(from_ts=T0.isoformat(), to_ts=(T0 + timedelta(days=1)).isoformat(), step_seconds=1)
+    assert e.value.status_code == 400
+    with pytest.raises(HTTPException) as e:
+        _replay(at=["not-a-time"])
+    assert e.value.status_code == 400
+    with pytest.raises(HTTPException) as e:
+        _replay(at=[(T0 - timedelta(days=1)).isoformat()])
+    assert e.value.status_code == 404
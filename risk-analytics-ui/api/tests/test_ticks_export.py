@@ -0,0 +1,110 @@
+"""
+Tick export: every side and level streamed as NDJSON / CSV in keyset order, resumable after the last row received.
+"""
+import asyncio
+import csv
+import io
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app import stream_router
+
+T0 = datetime(2026, 2, 14, 15, tzinfo=timezone.utc)
+HOME, AWAY, DRAW = 1001, 1002, 1003
+ROWS = sorted(
+    (
+        {"publish_time": T0 + timedelta(seconds=s), "selection_id": sid, "side": side, "level": level,
+         "price": 2.0 + level / 100, "size": 10.0 + s}
+        for s in range(0, 120, 7)
+        for sid in (HOME, AWAY, DRAW, 4004)
+        for side in ("B", "L")
+        for level in range(3)
+    ),
+    key=lambda r: (r["publish_time"], r["selection_id"], r["side"], r["level"]),
+)
+
+
+def _patch(monkeypatch):
+    executed = []
+
+    async def fetchone(sql, params=()):
+        assert sql == stream_router._SQL_TICKS_SELECTIONS
+        if params[0] != "1.1":
+            return None
+        return {"home_selection_id": HOME, "away_selection_id": AWAY, "draw_selection_id": DRAW}
+
+    async def iter_rows(sql, params=(), itersize=2000):
+        executed.append((sql, params))
+        _, lo, hi = params[:3]
+        after = params[3:7] if sql == stream_router._SQL_TICKS_EXPORT_AFTER else None
+        limit = params[-1]
+        out = [
+            r for r in ROWS
+            if lo <= r["publish_time"] <= hi
+            and (after is None or (r["publish_time"], r["selection_id"], r["side"], r["level"]) > tuple(after))
+        ]
+        for r in out[:limit]:
+            await asyncio.sleep(0)
+            yield r
+
+    monkeypatch.setattr(stream_router, "fetchone", fetchone)
+    monkeypatch.setattr(stream_router, "iter_rows", iter_rows)
+    return executed
+
+
+def _export(market_id="1.1", **kwargs):
+    async def run():
+        params = {"from_ts": T0.isoformat(), "to_ts": (T0 + timedelta(hours=1)).isoformat(), "fmt": "ndjson", "after": None, "limit": None}
+        params.update(kwargs)
+        response = await stream_router.stream_market_ticks_export(market_id, **params)
+        chunks = [chunk async for chunk in response.body_iterator]
+        return response, chunks
+
+    return asyncio.run(run())
+
+
+def test_export_streams_all_levels_and_resumes(monkeypatch, caplog):
+    executed = _patch(monkeypatch)
+    monkeypatch.setattr(stream_router, "TICKS_EXPORT_CHUNK_BYTES", 4096)
+    with caplog.at_level(logging.INFO, logger=stream_router.logger.name):
+        response, chunks = _export()
+    assert response.media_type == "application/x-ndjson" and len(chunks) > 1
+    body = b"".join(chunks)
+    rows = [json.loads(line) for line in body.decode().splitlines()]
+    assert len(rows) == len(ROWS)
+    assert {(r["side"], r["level"]) for r in rows} == {(s, lv) for s in "BL" for lv in range(3)}
+    assert {r["runner"] for r in rows} == {"home", "away", "draw", None}
+    assert "payload_bytes=%d" % len(body) in caplog.text
+    assert executed[0][1][-1] is None  # no row cap
+
+    # Pages of 50, each resuming after the last row of the previous one, add up to the full export
+    paged, after = [], None
+    while True:
+        _, chunks = _export(after=after, limit=50)
+        page = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+        paged += page
+        if len(page) < 50:
+            break
+        last = page[-1]
+        # As sent in a query string without encoding the "+" of the offset
+        after = "%s,%s,%s,%s" % (last["publish_time"].replace("+", " "), last["selection_id"], last["side"], last["level"])
+    assert paged == rows
+
+
+def test_export_csv_and_errors(monkeypatch):
+    _patch(monkeypatch)
+    response, chunks = _export(fmt="csv", to_ts=(T0 + timedelta(seconds=10)).isoformat())
+    assert response.media_type == "text/csv"
+    assert response.headers["content-disposition"] == 'attachment; filename="ticks_1.1.csv"'
+    table = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert table[0] == stream_router.TICKS_EXPORT_COLUMNS
+    assert len(table) - 1 == len([r for r in ROWS if r["publish_time"] <= T0 + timedelta(seconds=10)])
+    assert table[1][:5] == [T0.isoformat(), str(HOME), "home", "B", "0"]
+    for kwargs, status in (({"after": "yesterday,1,B,0"}, 400), ({"after": T0.isoformat() + ",1001,X,0"}, 400), ({"market_id": "9.9"}, 404)):
+        with pytest.raises(HTTPException) as e:
+            _export(**kwargs)
+        assert e.value.status_code == status
@@ -0,0 +1,44 @@
+"""
+WriterWorker.run_cycle: refresh under the advisory lock, unlock after success or failure, counters for /metrics.
+"""
+from datetime import datetime, timezone
+
+import pytest
+
+from app import writer_worker
+from tests.fakes import FakeWriter
+
+NOW = datetime(2026, 2, 14, 12, 0, tzinfo=timezone.utc)
+LOCK = "SELECT pg_try_advisory_lock(%s::bigint) AS acquired"
+UNLOCK = "SELECT pg_advisory_unlock(%s::bigint)"
+
+
+def _worker(monkeypatch, acquired, refresh):
+    conn = FakeWriter({LOCK: [{"acquired": acquired}]})
+    monkeypatch.setattr(writer_worker, "_writer_conn", lambda: conn)
+    return writer_worker.WriterWorker("test", 42, refresh, 60.0, {"items_total": 0}), conn
+
+
+def test_run_cycle_refreshes_under_the_lock(monkeypatch):
+    def refresh(cur, now):
+        worker.count(items_total=2)
+        return {"items": 2, "now": now}
+
+    worker, conn = _worker(monkeypatch, True, refresh)
+    assert worker.run_cycle(NOW) == {"items": 2, "now": NOW}
+    assert conn.calls(LOCK) == [(42,)] and conn.calls(UNLOCK) == [(42,)]
+    assert worker.status() == {"runs_total": 1, "errors_total": 0, "items_total": 2}
+
+
+def test_run_cycle_skips_when_locked_and_unlocks_on_failure(monkeypatch):
+    worker, conn = _worker(monkeypatch, False, lambda cur, now: pytest.fail("refresh without the lock"))
+    assert worker.run_cycle(NOW) is None
+    assert not conn.calls(UNLOCK) and worker.status()["runs_total"] == 0
+
+    def refresh(cur, now):
+        raise RuntimeError("boom")
+
+    worker, conn = _worker(monkeypatch, True, refresh)
+    with pytest.raises(RuntimeError):
+        worker.run_cycle(NOW)
+    assert conn.calls(UNLOCK) == [(42,)] and worker.status()["runs_total"] == 0
@@ -0,0 +1,33 @@
+-- Daily stats of stream_ingest.ladder_levels for /stream/data-horizon, written by the API's ladder stats worker
+-- (app/ladder_stats.py). One row per daily partition; closed days are recounted once and frozen (is_final),
+-- the open day is advanced incrementally from counted_until. Until the table has rows the endpoint scans ladder_levels.
+-- Idempotent. Run once per environment as the owner of stream_ingest.ladder_levels (the BRIN index is created on
+-- every partition, existing and future; building it reads each partition once):
+--   docker exec -i netbet-postgres psql -U netbet -d netbet < risk-analytics-ui/sql/migrations/2026-10-19_create_ladder_levels_daily_stats.sql
+
+-- Incremental counts read only the blocks of [counted_until, now); BRIN is a few pages per partition
+CREATE INDEX IF NOT EXISTS idx_ladder_levels_publish_time_brin
+    ON stream_ingest.ladder_levels USING brin (publish_time);
+
+CREATE TABLE IF NOT EXISTS public.ladder_levels_daily_stats (
+    day              DATE         PRIMARY KEY,  -- UTC day = partition range
+    partition_name   TEXT         NOT NULL,     -- ladder_levels_YYYYMMDD
+    ladder_rows      BIGINT       NOT NULL,
+    markets          INTEGER      NOT NULL,     -- distinct market_id
+    min_publish_time TIMESTAMPTZ  NULL,
+    max_publish_time TIMESTAMPTZ  NULL,
+    counted_until    TIMESTAMPTZ  NOT NULL,     -- rows with publish_time < counted_until are included
+    is_final         BOOLEAN      NOT NULL DEFAULT false,
+    updated_at       TIMESTAMPTZ  NOT NULL DEFAULT now()
+);
+
+-- Markets seen on days not final yet (distinct count maintained incrementally); emptied when the day is finalized
+CREATE TABLE IF NOT EXISTS public.ladder_levels_daily_markets (
+    day       DATE NOT NULL,
+    market_id TEXT NOT NULL,
+    PRIMARY KEY (day, market_id)
+);
+
+-- API reader role; writer role of the worker is the bucket store user (POSTGRES_BUCKET_STORE_USER)
+GRANT SELECT ON public.ladder_levels_daily_stats TO netbet_analytics_reader;
+-- GRANT SELECT, INSERT, UPDATE, DELETE ON public.ladder_levels_daily_stats, public.ladder_levels_daily_markets TO <bucket_store_user>;
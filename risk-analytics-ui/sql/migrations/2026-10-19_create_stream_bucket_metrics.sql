@@ -0,0 +1,45 @@
+-- Materialized 15-minute stream buckets, written by the API's bucket store worker (app/bucket_store.py).
+-- One row per closed bucket of each active market; same values as the on-the-fly computation of the
+-- timeseries / event-aware buckets endpoints, which read closed buckets from here and compute only the live one.
+-- Rows whose calculation_version differs from the API's BUCKET_METRICS_VERSION are ignored (computed on the fly).
+-- Idempotent. Run once per environment:
+--   docker exec -i netbet-postgres psql -U netbet -d netbet < risk-analytics-ui/sql/migrations/2026-10-19_create_stream_bucket_metrics.sql
+-- Then fill history: python -m app.bucket_store backfill --from ... --to ...
+
+CREATE TABLE IF NOT EXISTS public.stream_bucket_metrics (
+    market_id           TEXT         NOT NULL,
+    bucket_start        TIMESTAMPTZ  NOT NULL,
+    calculation_version TEXT         NOT NULL,
+    bucket_end          TIMESTAMPTZ  NOT NULL,
+    last_publish_time   TIMESTAMPTZ  NULL,      -- latest ladder update at or before bucket_start (timeseries staleness)
+    tick_count          INTEGER      NOT NULL,  -- level-0 back updates in [bucket_start, bucket_end)
+    home_best_back DOUBLE PRECISION NULL, away_best_back DOUBLE PRECISION NULL, draw_best_back DOUBLE PRECISION NULL,
+    home_best_lay  DOUBLE PRECISION NULL, away_best_lay  DOUBLE PRECISION NULL, draw_best_lay  DOUBLE PRECISION NULL,
+    home_back_odds_median DOUBLE PRECISION NULL, home_back_size_median DOUBLE PRECISION NULL,
+    home_seconds_covered  DOUBLE PRECISION NOT NULL, home_update_count INTEGER NOT NULL,
+    away_back_odds_median DOUBLE PRECISION NULL, away_back_size_median DOUBLE PRECISION NULL,
+    away_seconds_covered  DOUBLE PRECISION NOT NULL, away_update_count INTEGER NOT NULL,
+    draw_back_odds_median DOUBLE PRECISION NULL, draw_back_size_median DOUBLE PRECISION NULL,
+    draw_seconds_covered  DOUBLE PRECISION NOT NULL, draw_update_count INTEGER NOT NULL,
+    home_book_risk_l3 DOUBLE PRECISION NULL, away_book_risk_l3 DOUBLE PRECISION NULL, draw_book_risk_l3 DOUBLE PRECISION NULL,
+    impedance_index_15m     DOUBLE PRECISION NULL,
+    impedance_abs_diff_home DOUBLE PRECISION NULL,
+    impedance_abs_diff_away DOUBLE PRECISION NULL,
+    impedance_abs_diff_draw DOUBLE PRECISION NULL,
+    total_volume DOUBLE PRECISION NULL,        -- total_matched at or before bucket_start
+    computed_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (market_id, bucket_start)
+);
+
+-- Worker progress: last bucket written for each calculation_version
+CREATE TABLE IF NOT EXISTS public.stream_bucket_metrics_watermark (
+    calculation_version TEXT PRIMARY KEY,
+    bucket_start        TIMESTAMPTZ NOT NULL,
+    updated_at          TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- API reader role; writer role for the worker (POSTGRES_BUCKET_STORE_USER)
+GRANT SELECT ON public.stream_bucket_metrics, public.stream_bucket_metrics_watermark TO netbet_analytics_reader;
+-- GRANT SELECT ON ALL TABLES IN SCHEMA stream_ingest TO <bucket_store_user>;
+-- GRANT SELECT ON public.market_event_metadata TO <bucket_store_user>;
+-- GRANT SELECT, INSERT, UPDATE ON public.stream_bucket_metrics, public.stream_bucket_metrics_watermark TO <bucket_store_user>;
@@ -0,0 +1,31 @@
+-- Full-ladder keyframes of stream_ingest.ladder_levels, written by the API's ladder keyframe worker
+-- (app/ladder_keyframes.py). Point-in-time ladder states (bucket enrichment, replay snapshot, Book Risk baseline) read
+-- the nearest keyframe plus the rows after it; until keyframes are built they scan the market's history.
+-- Idempotent. Run once per environment:
+--   docker exec -i netbet-postgres psql -U netbet -d netbet < risk-analytics-ui/sql/migrations/2026-10-19_create_stream_ladder_keyframes.sql
+
+-- Latest row per (selection, side, level) at or before keyframe_time, for markets with rows since the previous keyframe
+CREATE TABLE IF NOT EXISTS public.stream_ladder_keyframes (
+    market_id     TEXT              NOT NULL,
+    keyframe_time TIMESTAMPTZ       NOT NULL,  -- grid point (every interval_minutes, UTC)
+    selection_id  BIGINT            NOT NULL,
+    side          CHAR(1)           NOT NULL,  -- 'B' / 'L'
+    level         SMALLINT          NOT NULL,
+    price         DOUBLE PRECISION  NOT NULL,
+    size          DOUBLE PRECISION  NOT NULL,
+    publish_time  TIMESTAMPTZ       NOT NULL,  -- of the ladder row (<= keyframe_time)
+    PRIMARY KEY (market_id, keyframe_time, selection_id, side, level)
+);
+
+-- Keyframes of every grid point in [built_from, built_until] are complete
+CREATE TABLE IF NOT EXISTS public.stream_ladder_keyframe_watermark (
+    source           TEXT         PRIMARY KEY,  -- 'ladder_levels'
+    interval_minutes INTEGER      NOT NULL,     -- divides 15
+    built_from       TIMESTAMPTZ  NOT NULL,
+    built_until      TIMESTAMPTZ  NOT NULL,
+    updated_at       TIMESTAMPTZ  NOT NULL DEFAULT now()
+);
+
+-- API reader role; writer role of the worker is the bucket store user (POSTGRES_BUCKET_STORE_USER)
+GRANT SELECT ON public.stream_ladder_keyframes, public.stream_ladder_keyframe_watermark TO netbet_analytics_reader;
+-- GRANT SELECT, INSERT, UPDATE, DELETE ON public.stream_ladder_keyframes, public.stream_ladder_keyframe_watermark TO <bucket_store_user>;
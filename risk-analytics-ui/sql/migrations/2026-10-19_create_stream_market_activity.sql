@@ -0,0 +1,50 @@
+-- Per-market stream activity index over stream_ingest.ladder_levels, written by the API's market activity worker
+-- (app/market_activity.py). Staleness and "has data" checks in the stream endpoints read it plus a bounded
+-- ladder_levels read after counted_until; until the watermark is recent they scan ladder_levels.
+-- Idempotent. Run once per environment:
+--   docker exec -i netbet-postgres psql -U netbet -d netbet < risk-analytics-ui/sql/migrations/2026-10-19_create_stream_market_activity.sql
+
+CREATE TABLE IF NOT EXISTS public.stream_market_activity (
+    market_id          TEXT         PRIMARY KEY,
+    first_publish_time TIMESTAMPTZ  NOT NULL,
+    last_publish_time  TIMESTAMPTZ  NOT NULL,
+    ticks              BIGINT       NOT NULL,     -- level-0 back updates (tick_count rule)
+    updated_at         TIMESTAMPTZ  NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS public.stream_market_activity_daily (
+    market_id          TEXT         NOT NULL,
+    day                DATE         NOT NULL,     -- UTC day of publish_time
+    first_publish_time TIMESTAMPTZ  NOT NULL,
+    last_publish_time  TIMESTAMPTZ  NOT NULL,
+    ladder_rows        BIGINT       NOT NULL,
+    ticks              BIGINT       NOT NULL,
+    PRIMARY KEY (market_id, day)
+);
+-- Markets with data on a date range; retention pruning
+CREATE INDEX IF NOT EXISTS idx_stream_market_activity_daily_day
+    ON public.stream_market_activity_daily (day);
+
+-- Last level-0 price / size per selection and side
+CREATE TABLE IF NOT EXISTS public.stream_market_selection_prices (
+    market_id    TEXT              NOT NULL,
+    selection_id BIGINT            NOT NULL,
+    side         CHAR(1)           NOT NULL,  -- 'B' / 'L'
+    price        DOUBLE PRECISION  NULL,
+    size         DOUBLE PRECISION  NULL,
+    publish_time TIMESTAMPTZ       NOT NULL,
+    PRIMARY KEY (market_id, selection_id, side)
+);
+
+-- Rows with publish_time < counted_until are counted in the tables above
+CREATE TABLE IF NOT EXISTS public.stream_market_activity_watermark (
+    source        TEXT         PRIMARY KEY,  -- 'ladder_levels'
+    counted_until TIMESTAMPTZ  NOT NULL,
+    updated_at    TIMESTAMPTZ  NOT NULL DEFAULT now()
+);
+
+-- API reader role; writer role of the worker is the bucket store user (POSTGRES_BUCKET_STORE_USER)
+GRANT SELECT ON public.stream_market_activity, public.stream_market_activity_daily,
+    public.stream_market_selection_prices, public.stream_market_activity_watermark TO netbet_analytics_reader;
+-- GRANT SELECT, INSERT, UPDATE, DELETE ON public.stream_market_activity, public.stream_market_activity_daily,
+--     public.stream_market_selection_prices, public.stream_market_activity_watermark TO <bucket_store_user>;
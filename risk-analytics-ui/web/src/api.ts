@@ -394,6 +394,23 @@ export async function fetchReplaySnapshot(
   return JSON.parse(raw) as ReplaySnapshot
 }
 
+/** Column-oriented body of the chart endpoints (layout=columnar): one array per field. */
+type ColumnarBody = { layout: 'columnar'; length: number; columns: Record<string, unknown[]> }
+
+/** Rows of a response requested with layout=columnar (plain row arrays pass through). */
+export function fromColumns(parsed: unknown): unknown {
+  const body = parsed as ColumnarBody | null
+  if (!body || typeof body !== 'object' || body.layout !== 'columnar') return parsed
+  const keys = Object.keys(body.columns)
+  const rows: Record<string, unknown>[] = new Array(body.length)
+  for (let i = 0; i < body.length; i++) {
+    const row: Record<string, unknown> = {}
+    for (const k of keys) row[k] = body.columns[k][i]
+    rows[i] = row
+  }
+  return rows
+}
+
 export async function fetchEventTimeseries(
   marketId: string,
   from: Date,
@@ -405,6 +422,7 @@ export async function fetchEventTimeseries(
     from_ts: toISO(from),
     to_ts: toISO(to),
     interval_minutes: String(intervalMinutes),
+    layout: 'columnar',
   })
   const url = `${apiBase}/events/${encodeURIComponent(marketId)}/timeseries?${params}`
   console.log('[api] fetchEventTimeseries request', { 
@@ -429,7 +447,7 @@ export async function fetchEventTimeseries(
   }
   let parsed: unknown = null
   try {
-    parsed = JSON.parse(raw)
+    parsed = fromColumns(JSON.parse(raw))
   } catch (e) {
     console.error('[api] fetchEventTimeseries json parse failed', e)
     throw new Error('Invalid JSON response')
@@ -459,6 +477,7 @@ export async function fetchEventBuckets(
   if (fromTs) params.set('from_ts', fromTs)
   if (toTs) params.set('to_ts', toTs)
   if (eventAware) params.set('event_aware', 'true')
+  params.set('layout', 'columnar')
   const qs = params.toString()
   const url = `${apiBase}/events/${encodeURIComponent(marketId)}/buckets${qs ? `?${qs}` : ''}`
   const res = await fetch(url)
@@ -467,7 +486,7 @@ export async function fetchEventBuckets(
     console.error('[api] fetchEventBuckets error', { status: res.status, statusText: res.statusText, body: raw })
     throw new Error(res.statusText)
   }
-  const parsed = JSON.parse(raw)
+  const parsed = fromColumns(JSON.parse(raw))
   if (!Array.isArray(parsed)) return []
   return parsed as BucketItem[]
 }
@@ -578,7 +597,7 @@ export async function fetchEventsByDateSnapshots(date: string): Promise<EventIte
   return parsed as EventItem[]
 }
 
-/** Volume tab: event-level aggregate (SUM of market volumes). Same source as by-date-snapshots. */
+/** Volume tab: event-level aggregate (SUM of market volumes). Same markets as by-date-snapshots. */
 export type ByDateVolumeMarket = { market_id: string; market_name?: string | null; volume: number | null }
 export type ByDateVolumeItem = {
   event_id: string
@@ -688,6 +707,7 @@ export async function fetchMarketTicks(
     from_ts: toISO(from),
     to_ts: toISO(to),
     limit: String(limit),
+    layout: 'columnar',
   })
   const url = `${apiBase}/markets/${encodeURIComponent(marketId)}/ticks?${params}`
   console.log('[api] fetchMarketTicks request', { 
@@ -712,7 +732,7 @@ export async function fetchMarketTicks(
   }
   let parsed: unknown = null
   try {
-    parsed = JSON.parse(raw)
+    parsed = fromColumns(JSON.parse(raw))
   } catch (e) {
     console.error('[api] fetchMarketTicks json parse failed', e)
     throw new Error('Invalid JSON response')